@@ -0,0 +1,74 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict
+from sqlalchemy import inspect
+from modelo import Vivienda, Habitante
+
+# Campos que acepta la API al registrar o actualizar
+CAMPOS_VIVIENDA = ('direccion', 'fecha_censo', 'coordenadas_gps')
+CAMPOS_HABITANTE = ('nombre_completo', 'edad', 'sexo', 'parentesco_con_jefe_familia')
+
+
+def _valor_json(valor: Any) -> Any:
+    """json.dumps(default=...): fechas en ISO y Decimal (promedios de MySQL) como float."""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def a_json(datos: Any) -> bytes:
+    return json.dumps(datos, default=_valor_json, ensure_ascii=False).encode("utf-8")
+
+
+def _cargado(entidad, relacion: str) -> bool:
+    """True si la relacion ya se cargo (leerla no dispara una consulta ni falla fuera de la sesion)."""
+    return relacion not in inspect(entidad).unloaded
+
+
+def catalogo_a_dict(entidad) -> Dict[str, Any]:
+    datos = {'id': entidad.id, 'nombre': entidad.nombre}
+    if hasattr(entidad, 'municipio_id'):
+        datos['municipio_id'] = entidad.municipio_id
+        if _cargado(entidad, 'municipio') and entidad.municipio is not None:
+            datos['municipio'] = entidad.municipio.nombre
+    return datos
+
+
+def habitante_a_dict(habitante: Habitante) -> Dict[str, Any]:
+    datos = {campo: getattr(habitante, campo) for campo in CAMPOS_HABITANTE}
+    datos.update(id=habitante.id, vivienda_id=habitante.vivienda_id, version=habitante.version)
+    return datos
+
+
+def vivienda_a_dict(vivienda: Vivienda) -> Dict[str, Any]:
+    """Columnas de la vivienda y, si vienen cargadas, sus relaciones."""
+    datos = {campo: getattr(vivienda, campo) for campo in CAMPOS_VIVIENDA}
+    datos.update(
+        id=vivienda.id,
+        total_habitantes=int(vivienda.total_habitantes or 0),
+        localidad_id=vivienda.localidad_id,
+        tipo_vivienda_id=vivienda.tipo_vivienda_id,
+        version=vivienda.version
+    )
+    if _cargado(vivienda, 'localidad'):
+        datos['localidad'] = vivienda.localidad.nombre
+    if _cargado(vivienda, 'tipo_vivienda'):
+        datos['tipo_vivienda'] = vivienda.tipo_vivienda.nombre
+    if _cargado(vivienda, 'habitantes'):
+        datos['habitantes'] = [habitante_a_dict(h) for h in vivienda.habitantes]
+    if _cargado(vivienda, 'actividades'):
+        datos['actividades'] = [catalogo_a_dict(a) for a in vivienda.actividades]
+    return datos
+
+
+def leer_vivienda(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos de vivienda recibidos en JSON, con 'fecha_censo' convertida a date (ValueError si no es ISO)."""
+    vivienda = {campo: datos[campo] for campo in CAMPOS_VIVIENDA if campo in datos}
+    if vivienda.get('fecha_censo'):
+        vivienda['fecha_censo'] = date.fromisoformat(vivienda['fecha_censo'])
+    else:
+        vivienda.pop('fecha_censo', None)
+    return vivienda
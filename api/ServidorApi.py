@@ -0,0 +1,550 @@
+import csv
+import hmac
+import io
+import ipaddress
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from dao import AplicadorLotes
+from dao.AlmacenCampo import desempaquetar, empaquetar
+from dao.Metricas import metricas
+from dao.Reintentos import ConflictoConcurrencia, ErrorTransitorio
+from .Serializacion import a_json, catalogo_a_dict, habitante_a_dict, leer_vivienda, vivienda_a_dict
+
+# Limites de la API
+TAM_MAXIMO_CUERPO = 10 * 1024 * 1024 # 10 MB por solicitud
+LIMITE_PAGINA = 1000                  # Viviendas por pagina en GET /viviendas
+TAM_BLOQUE_EXPORTACION = 1000         # Filas por consulta al exportar
+TAM_FRAGMENTO = 64 * 1024             # Bytes por fragmento (chunk) al exportar
+
+COLUMNAS_EXPORTACION = {
+    'viviendas': ['id', 'direccion', 'fecha_censo', 'coordenadas_gps', 'total_habitantes',
+                  'localidad', 'municipio', 'tipo_vivienda'],
+    'habitantes': ['id', 'vivienda_id', 'nombre_completo', 'edad', 'sexo', 'parentesco_con_jefe_familia'],
+}
+
+# Catalogo -> (listar, crear, actualizar, eliminar, campos que recibe crear/actualizar)
+CATALOGOS = {
+    'municipios': ('obtener_todos_municipios', 'guardar_municipio', 'actualizar_municipio', 'eliminar_municipio',
+                   ['nombre']),
+    'localidades': ('obtener_todas_localidades', 'guardar_localidad', 'actualizar_localidad', 'eliminar_localidad',
+                    ['nombre', 'id_municipio']),
+    'tipos_vivienda': ('obtener_todos_tipos_vivienda', 'guardar_tipo_vivienda', 'actualizar_tipo_vivienda',
+                       'eliminar_tipo_vivienda', ['nombre']),
+    'actividades': ('obtener_todas_actividades_economicas', 'guardar_actividad_economica',
+                    'actualizar_actividad_economica', 'eliminar_actividad_economica', ['nombre']),
+}
+
+SOLICITUDES = metricas.contador(
+    "censo_api_solicitudes_total", "Solicitudes a la API por ruta y codigo de respuesta", ('metodo', 'ruta', 'codigo'))
+DURACION_SOLICITUD = metricas.histograma(
+    "censo_api_solicitud_segundos", "Tiempo de respuesta de la API por ruta", ('ruta',))
+
+
+class ErrorApi(Exception):
+    """Error con codigo HTTP; el manejador lo responde como {'error': mensaje}."""
+
+    def __init__(self, codigo: int, mensaje: str):
+        super().__init__(mensaje)
+        self.codigo = codigo
+        self.mensaje = mensaje
+
+
+class Respuesta:
+    """Resultado de una ruta: JSON (con ETag opcional), bytes o un generador de fragmentos."""
+
+    def __init__(self, codigo: int = 200, datos: Any = None, etag: Optional[str] = None,
+                 cuerpo: Optional[bytes] = None, fragmentos=None, tipo: str = "application/json; charset=utf-8",
+                 encabezados: Optional[Dict[str, str]] = None):
+        self.codigo = codigo
+        self.datos = datos
+        self.etag = etag
+        self.cuerpo = cuerpo
+        self.fragmentos = fragmentos
+        self.tipo = tipo
+        self.encabezados = encabezados or {}
+
+
+class ApiCenso:
+    """
+    Rutas de la API sobre los controladores. Todas comparten el mismo engine
+    (y su pool): cada solicitud toma una conexion solo mientras dura su consulta.
+
+    Los reportes y catalogos llevan un ETag con la version de los datos: si el
+    cliente manda If-None-Match con la version actual, se responde 304 sin
+    ejecutar el reporte (estas rutas son 'condicionales': reciben el encabezado
+    en 'si_no_coincide').
+
+    Con 'token', toda solicitud debe traer 'Authorization: Bearer <token>'
+    (se revisa antes de resolver la ruta); sin el, se responde 401.
+    """
+
+    def __init__(self, censo_controller, catalogo_controller, asistente_controller=None,
+                 aplicador: Optional[AplicadorLotes] = None, token: str = ""):
+        self.censo = censo_controller
+        self.catalogo = catalogo_controller
+        self.asistente = asistente_controller
+        self.aplicador = aplicador
+        self.token = token
+        # (metodo, patron, nombre para metricas, funcion, condicional)
+        self.rutas: List[Tuple[str, re.Pattern, str, Callable, bool]] = []
+
+        self._ruta('GET', r'/catalogos/(\w+)', self.listar_catalogo, condicional=True)
+        self._ruta('POST', r'/catalogos/(\w+)', self.crear_catalogo)
+        self._ruta('PUT', r'/catalogos/(\w+)/(\d+)', self.actualizar_catalogo)
+        self._ruta('DELETE', r'/catalogos/(\w+)/(\d+)', self.eliminar_catalogo)
+
+        self._ruta('GET', r'/viviendas', self.listar_viviendas)
+        self._ruta('POST', r'/viviendas', self.registrar_vivienda)
+        self._ruta('POST', r'/viviendas/lote', self.registrar_lote)
+        self._ruta('GET', r'/viviendas/(\d+)', self.obtener_vivienda)
+        self._ruta('PUT', r'/viviendas/(\d+)', self.actualizar_vivienda)
+        self._ruta('DELETE', r'/viviendas/(\d+)', self.eliminar_vivienda)
+        self._ruta('POST', r'/viviendas/(\d+)/habitantes', self.registrar_habitante)
+        self._ruta('POST', r'/viviendas/(\d+)/actividades/(\d+)', self.asociar_actividad)
+        self._ruta('DELETE', r'/viviendas/(\d+)/actividades/(\d+)', self.desasociar_actividad)
+        self._ruta('PUT', r'/habitantes/(\d+)', self.actualizar_habitante)
+        self._ruta('DELETE', r'/habitantes/(\d+)', self.eliminar_habitante)
+
+        self._ruta('GET', r'/busqueda', self.buscar)
+        self._ruta('GET', r'/reportes/(poblacion|tipos_vivienda|edades)', self.reporte, condicional=True)
+        self._ruta('GET', r'/exportar/(viviendas|habitantes)\.(csv|json)', self.exportar)
+        self._ruta('GET', r'/version', self.version)
+
+        if self.asistente is not None:
+            self._ruta('POST', r'/asistente', self.preguntar)
+        if self.aplicador is not None:
+            self._ruta('POST', r'/campo/lote', self.aplicar_lote_campo)
+            self._ruta('POST', r'/campo/catalogos', self.catalogos_campo)
+
+    def _ruta(self, metodo: str, patron: str, funcion: Callable, condicional: bool = False) -> None:
+        # Nombre para las metricas: '/viviendas/(\d+)' -> '/viviendas/{}'
+        nombre = re.sub(r'\([^)]*\)', '{}', patron).replace('\\', '')
+        self.rutas.append((metodo, re.compile(patron + '$'), nombre, funcion, condicional))
+
+    def autorizado(self, encabezado: Optional[str]) -> bool:
+        """True si no hay token configurado o si el encabezado Authorization lo trae (comparacion en tiempo constante)."""
+        if not self.token:
+            return True
+        esquema, _, valor = (encabezado or "").partition(' ')
+        return esquema.lower() == 'bearer' and hmac.compare_digest(valor.strip().encode(), self.token.encode())
+
+    def resolver(self, metodo: str, ruta: str) -> Tuple[str, Callable, Tuple[str, ...], bool]:
+        """(nombre de la ruta, funcion, grupos capturados, condicional); ErrorApi 404/405 si no existe."""
+        permitidos = False
+        for metodo_ruta, patron, nombre, funcion, condicional in self.rutas:
+            coincidencia = patron.match(ruta)
+            if coincidencia:
+                if metodo_ruta == metodo:
+                    return nombre, funcion, coincidencia.groups(), condicional
+                permitidos = True
+        if permitidos:
+            raise ErrorApi(405, f"Método {metodo} no permitido en {ruta}")
+        raise ErrorApi(404, f"No existe la ruta {ruta}")
+
+    # --- Utilidades ---
+
+    def _etag(self) -> str:
+        version = self.censo.obtener_version_datos()
+        if version is None:
+            raise ErrorApi(503, "No se pudo leer la versión de los datos")
+        return f'"v{version}"'
+
+    def _no_modificado(self, etag: str, si_no_coincide: Optional[str]) -> Optional[Respuesta]:
+        """304 si el cliente ya tiene la version 'etag'; se llama ANTES de ejecutar la consulta."""
+        return Respuesta(304, etag=etag) if coincide_etag(etag, si_no_coincide) else None
+
+    @staticmethod
+    def _entero(consulta: Dict[str, List[str]], nombre: str, defecto: Optional[int] = None) -> Optional[int]:
+        valores = consulta.get(nombre)
+        if not valores:
+            return defecto
+        try:
+            return int(valores[0])
+        except ValueError:
+            raise ErrorApi(400, f"'{nombre}' debe ser un número entero")
+
+    @classmethod
+    def _version(cls, consulta: Dict[str, List[str]], cuerpo: Any) -> Optional[int]:
+        """'version' que leyo el cliente (?version= o en el cuerpo), o None si no la manda."""
+        version = cls._entero(consulta, 'version')
+        if version is None and isinstance(cuerpo, dict):
+            version = cuerpo.get('version')
+        return version
+
+    @staticmethod
+    def _campos(cuerpo: Any, campos: List[str]) -> List[Any]:
+        if not isinstance(cuerpo, dict) or any(c not in cuerpo for c in campos):
+            raise ErrorApi(400, f"Se esperan los campos {campos}")
+        return [cuerpo[c] for c in campos]
+
+    @staticmethod
+    def _catalogo(nombre: str) -> Tuple:
+        if nombre not in CATALOGOS:
+            raise ErrorApi(404, f"Catálogo desconocido '{nombre}' (disponibles: {', '.join(CATALOGOS)})")
+        return CATALOGOS[nombre]
+
+    @staticmethod
+    def _resultado(entidad, a_dict: Callable, codigo: int = 200) -> Respuesta:
+        if entidad is None:
+            raise ErrorApi(422, "No se pudo guardar (datos inválidos o referencias inexistentes)")
+        return Respuesta(codigo, a_dict(entidad))
+
+    @staticmethod
+    def _eliminado(exito: bool) -> Respuesta:
+        if not exito:
+            raise ErrorApi(404, "No se encontró el registro")
+        return Respuesta(204)
+
+    # --- Catalogos ---
+
+    def listar_catalogo(self, consulta, cuerpo, nombre, si_no_coincide=None):
+        listar = self._catalogo(nombre)[0]
+        etag = self._etag()
+        no_modificado = self._no_modificado(etag, si_no_coincide)
+        if no_modificado:
+            return no_modificado
+        return Respuesta(200, [catalogo_a_dict(e) for e in getattr(self.catalogo, listar)()], etag=etag)
+
+    def crear_catalogo(self, consulta, cuerpo, nombre):
+        _, crear, _, _, campos = self._catalogo(nombre)
+        return self._resultado(getattr(self.catalogo, crear)(*self._campos(cuerpo, campos)), catalogo_a_dict, 201)
+
+    def actualizar_catalogo(self, consulta, cuerpo, nombre, id_entidad):
+        _, _, actualizar, _, campos = self._catalogo(nombre)
+        entidad = getattr(self.catalogo, actualizar)(int(id_entidad), *self._campos(cuerpo, campos))
+        return self._resultado(entidad, catalogo_a_dict)
+
+    def eliminar_catalogo(self, consulta, cuerpo, nombre, id_entidad):
+        eliminar = self._catalogo(nombre)[3]
+        return self._eliminado(getattr(self.catalogo, eliminar)(int(id_entidad)))
+
+    # --- Viviendas y habitantes ---
+
+    def listar_viviendas(self, consulta, cuerpo):
+        limite = min(self._entero(consulta, 'limite', 100), LIMITE_PAGINA)
+        desplazamiento = self._entero(consulta, 'desplazamiento', 0)
+        viviendas = self.censo.obtener_pagina_viviendas_con_localidad(limite, desplazamiento)
+        return Respuesta(200, [vivienda_a_dict(v) for v in viviendas])
+
+    def obtener_vivienda(self, consulta, cuerpo, id_vivienda):
+        vivienda = self.censo.obtener_vivienda_detalle(int(id_vivienda))
+        if vivienda is None:
+            raise ErrorApi(404, f"No existe la vivienda {id_vivienda}")
+        return Respuesta(200, vivienda_a_dict(vivienda))
+
+    def buscar(self, consulta, cuerpo):
+        """?q=texto&pagina=0&tam=25 (&modo=, el que regreso la pagina 0, para las siguientes)."""
+        texto = (consulta.get('q') or [""])[0]
+        if not texto.strip():
+            raise ErrorApi(400, "Falta el texto a buscar ('q')")
+        modo = (consulta.get('modo') or [None])[0]
+        return Respuesta(200, self.censo.buscar(texto, self._entero(consulta, 'pagina', 0),
+                                                self._entero(consulta, 'tam', 25), modo))
+
+    def registrar_vivienda(self, consulta, cuerpo):
+        id_localidad, id_tipo = self._campos(cuerpo, ['id_localidad', 'id_tipo_vivienda'])
+        vivienda = self.censo.registrar_nueva_vivienda(leer_vivienda(cuerpo), id_localidad, id_tipo)
+        return self._resultado(vivienda, vivienda_a_dict, 201)
+
+    def registrar_lote(self, consulta, cuerpo):
+        """
+        Cuerpo: [{'vivienda': {...}, 'id_localidad', 'id_tipo_vivienda', 'habitantes': [...], 'actividades': [...]}]
+        Todo el lote en una transaccion; responde los IDs en el mismo orden.
+        """
+        if not isinstance(cuerpo, list) or not cuerpo:
+            raise ErrorApi(400, "Se espera una lista de viviendas")
+        lote = []
+        for elemento in cuerpo:
+            id_localidad, id_tipo, vivienda = self._campos(elemento, ['id_localidad', 'id_tipo_vivienda', 'vivienda'])
+            lote.append({
+                'vivienda': leer_vivienda(vivienda),
+                'id_localidad': id_localidad,
+                'id_tipo_vivienda': id_tipo,
+                'habitantes': elemento.get('habitantes', []),
+                'actividades': elemento.get('actividades', []),
+            })
+        ids = self.censo.registrar_lote_viviendas(lote)
+        if ids is None:
+            raise ErrorApi(422, "No se registró el lote (datos inválidos o referencias inexistentes)")
+        return Respuesta(201, {'ids': ids})
+
+    def actualizar_vivienda(self, consulta, cuerpo, id_vivienda):
+        id_localidad, id_tipo, _ = self._campos(cuerpo, ['id_localidad', 'id_tipo_vivienda', 'direccion'])
+        # 'version' (opcional): la que leyo el cliente; si otro la cambio se responde 409
+        vivienda = self.censo.actualizar_vivienda(int(id_vivienda), cuerpo, id_localidad, id_tipo, cuerpo.get('version'))
+        return self._resultado(vivienda, vivienda_a_dict)
+
+    def eliminar_vivienda(self, consulta, cuerpo, id_vivienda):
+        # 'version' (opcional), como en PUT: si otro la cambio se responde 409
+        return self._eliminado(self.censo.eliminar_vivienda(int(id_vivienda), self._version(consulta, cuerpo)))
+
+    def registrar_habitante(self, consulta, cuerpo, id_vivienda):
+        if not isinstance(cuerpo, dict):
+            raise ErrorApi(400, "Se esperan los datos del habitante")
+        return self._resultado(self.censo.registrar_habitante_en_vivienda(int(id_vivienda), cuerpo), habitante_a_dict, 201)
+
+    def actualizar_habitante(self, consulta, cuerpo, id_habitante):
+        self._campos(cuerpo, ['nombre_completo', 'edad', 'sexo', 'parentesco_con_jefe_familia'])
+        return self._resultado(self.censo.actualizar_habitante(int(id_habitante), cuerpo, cuerpo.get('version')),
+                               habitante_a_dict)
+
+    def eliminar_habitante(self, consulta, cuerpo, id_habitante):
+        return self._eliminado(self.censo.eliminar_habitante(int(id_habitante), self._version(consulta, cuerpo)))
+
+    def asociar_actividad(self, consulta, cuerpo, id_vivienda, id_actividad):
+        if not self.censo.asociar_actividad_a_vivienda(int(id_vivienda), int(id_actividad)):
+            raise ErrorApi(409, "No se pudo asociar (no existe o ya estaba asociada)")
+        return Respuesta(204)
+
+    def desasociar_actividad(self, consulta, cuerpo, id_vivienda, id_actividad):
+        if not self.censo.desasociar_actividad_de_vivienda(int(id_vivienda), int(id_actividad)):
+            raise ErrorApi(409, "No se pudo desasociar (no existe o no estaba asociada)")
+        return Respuesta(204)
+
+    # --- Reportes y exportacion ---
+
+    def version(self, consulta, cuerpo):
+        return Respuesta(200, {'version_datos': self.censo.obtener_version_datos()})
+
+    def reporte(self, consulta, cuerpo, nombre, si_no_coincide=None):
+        municipio_id = self._entero(consulta, 'municipio')
+        localidad_id = self._entero(consulta, 'localidad')
+        generar = {
+            'poblacion': self.censo.generar_dashboard_poblacion,
+            'tipos_vivienda': self.censo.generar_reporte_tipos_vivienda,
+            'edades': self.censo.generar_reporte_distribucion_edad,
+        }[nombre]
+        etag = self._etag()
+        no_modificado = self._no_modificado(etag, si_no_coincide)
+        if no_modificado:
+            return no_modificado
+        filas = generar(municipio_id, localidad_id)
+        return Respuesta(200, [dict(f) if not isinstance(f, int) else f for f in filas], etag=etag)
+
+    def exportar(self, consulta, cuerpo, tabla, formato):
+        """Exporta toda la tabla por fragmentos: la respuesta empieza antes de leer la ultima fila."""
+        filas = self.censo.iterar_exportacion(tabla, TAM_BLOQUE_EXPORTACION)
+        if formato == 'csv':
+            return Respuesta(200, fragmentos=_fragmentos_csv(filas, COLUMNAS_EXPORTACION[tabla]),
+                             tipo="text/csv; charset=utf-8")
+        return Respuesta(200, fragmentos=_fragmentos_json(filas))
+
+    # --- Asistente y sincronizacion de campo ---
+
+    def preguntar(self, consulta, cuerpo):
+        pregunta, = self._campos(cuerpo, ['pregunta'])
+        respuesta, tiempos = self.asistente.chatear_medido(str(pregunta))
+        return Respuesta(200, {'respuesta': respuesta, 'tiempos': tiempos})
+
+    def aplicar_lote_campo(self, consulta, cuerpo):
+        """Mismo contrato que TransporteDirecto.enviar_lote (lote empaquetado -> respuesta empaquetada)."""
+        return Respuesta(200, cuerpo=empaquetar(self.aplicador.aplicar(desempaquetar(cuerpo))),
+                         tipo="application/octet-stream")
+
+    def catalogos_campo(self, consulta, cuerpo):
+        huellas = desempaquetar(cuerpo).get('huellas', {})
+        return Respuesta(200, cuerpo=empaquetar(self.aplicador.catalogos(huellas)), tipo="application/octet-stream")
+
+
+def coincide_etag(etag: str, si_no_coincide: Optional[str]) -> bool:
+    """
+    True si el encabezado If-None-Match incluye 'etag' exactamente (o es '*').
+    Es una lista de entity-tags entre comillas separados por comas; la comparacion
+    es debil (RFC 9110): 'W/"v3"' coincide con '"v3"', pero '"v31"' no.
+    """
+    if not si_no_coincide:
+        return False
+    if si_no_coincide.strip() == '*':
+        return True
+    return any(etiqueta.removeprefix('W/') == etag
+               for etiqueta in re.findall(r'(?:W/)?"[^"]*"', si_no_coincide))
+
+
+def _fragmentos_csv(filas, columnas: List[str]):
+    """CSV (con BOM para Excel) en fragmentos de ~TAM_FRAGMENTO bytes."""
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    escritor = csv.DictWriter(buffer, fieldnames=columnas, extrasaction='ignore')
+    escritor.writeheader()
+    for fila in filas:
+        escritor.writerow(fila)
+        if buffer.tell() >= TAM_FRAGMENTO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _fragmentos_json(filas):
+    """Arreglo JSON en fragmentos: '[', filas separadas por comas y ']'."""
+    partes, tam, separador = [b"["], 1, b""
+    for fila in filas:
+        parte = separador + a_json(dict(fila))
+        separador = b","
+        partes.append(parte)
+        tam += len(parte)
+        if tam >= TAM_FRAGMENTO:
+            yield b"".join(partes)
+            partes, tam = [], 0
+    partes.append(b"]")
+    yield b"".join(partes)
+
+
+# --- SERVIDOR HTTP ---
+
+class _ManejadorApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Conexiones persistentes y respuestas por fragmentos
+    server_version = "CensoApi/1.0"
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def do_PUT(self):
+        self._atender('PUT')
+
+    def do_DELETE(self):
+        self._atender('DELETE')
+
+    def _leer_cuerpo(self) -> Any:
+        longitud = int(self.headers.get('Content-Length') or 0)
+        if longitud > TAM_MAXIMO_CUERPO:
+            self.close_connection = True
+            raise ErrorApi(413, f"El cuerpo excede {TAM_MAXIMO_CUERPO} bytes")
+        datos = self.rfile.read(longitud) if longitud else b""
+        if self.headers.get('Content-Type', '').startswith('application/octet-stream'):
+            return datos
+        if not datos:
+            return None
+        try:
+            return json.loads(datos)
+        except ValueError as e:
+            raise ErrorApi(400, f"JSON inválido: {e}")
+
+    def _atender(self, metodo: str) -> None:
+        inicio = time.perf_counter()
+        api: ApiCenso = self.server.api
+        partes = urlsplit(self.path)
+        nombre_ruta = "desconocida"
+        try:
+            if not api.autorizado(self.headers.get('Authorization')):
+                # Sin leer el cuerpo de un cliente no autorizado: se cierra la conexion
+                self.close_connection = True
+                raise ErrorApi(401, "Falta el token de la API o no es válido")
+            # El cuerpo se lee siempre (aun si la ruta no existe) para no desalinear la conexion
+            cuerpo = self._leer_cuerpo()
+            nombre_ruta, funcion, grupos, condicional = api.resolver(metodo, partes.path.rstrip('/') or '/')
+            argumentos = {'si_no_coincide': self.headers.get('If-None-Match')} if condicional else {}
+            respuesta = funcion(parse_qs(partes.query), cuerpo, *grupos, **argumentos)
+        except ErrorApi as e:
+            respuesta = Respuesta(e.codigo, {'error': e.mensaje},
+                                  encabezados={'WWW-Authenticate': "Bearer"} if e.codigo == 401 else None)
+        except ConflictoConcurrencia as e:
+            # El cliente debe volver a leer el registro (GET) y reenviar con la version nueva
+            respuesta = Respuesta(409, {'error': str(e), 'version_actual': e.version_actual})
+        except ErrorTransitorio as e:
+            # La escritura ya se repitio sin exito (deadlock, BD ocupada...): el cliente puede reintentar
+            respuesta = Respuesta(503, {'error': "Base de datos ocupada, intente de nuevo", 'tipo': e.tipo},
+                                  encabezados={'Retry-After': "1"})
+        except (ValueError, TypeError, KeyError) as e:
+            respuesta = Respuesta(400, {'error': f"Solicitud inválida: {e}"})
+        except Exception as e:
+            print(f"Error en la API ({metodo} {partes.path}): {e}")
+            respuesta = Respuesta(500, {'error': "Error interno"})
+
+        try:
+            respuesta = self._responder(respuesta)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # El cliente cerro la conexion (ej. canceló una exportación)
+        SOLICITUDES.con_etiquetas(metodo, nombre_ruta, str(respuesta.codigo)).inc()
+        DURACION_SOLICITUD.con_etiquetas(nombre_ruta).observar(time.perf_counter() - inicio)
+
+    def _responder(self, respuesta: Respuesta) -> Respuesta:
+        """Escribe la respuesta (los 304 ya los decidio la ruta, antes de ejecutar su consulta)."""
+        self.send_response(respuesta.codigo)
+        if respuesta.etag:
+            self.send_header("ETag", respuesta.etag)
+            self.send_header("Cache-Control", "no-cache") # Guardar, pero revalidar siempre
+        for nombre, valor in respuesta.encabezados.items():
+            self.send_header(nombre, valor)
+
+        if respuesta.fragmentos is not None:
+            self.send_header("Content-Type", respuesta.tipo)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for fragmento in respuesta.fragmentos:
+                    if fragmento:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(fragmento), fragmento))
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # Los encabezados ya salieron: se corta la conexion sin el fragmento final
+                print(f"Error al generar la respuesta por fragmentos: {e}")
+                self.close_connection = True
+                return respuesta
+            self.wfile.write(b"0\r\n\r\n")
+            return respuesta
+
+        if respuesta.codigo in (204, 304):
+            cuerpo = b""
+        elif respuesta.cuerpo is not None:
+            cuerpo = respuesta.cuerpo
+        else:
+            cuerpo = a_json(respuesta.datos)
+        if cuerpo:
+            self.send_header("Content-Type", respuesta.tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+        return respuesta
+
+    def log_message(self, formato, *args):
+        pass # Las solicitudes se cuentan en las metricas (censo_api_*)
+
+
+def _es_local(host: str) -> bool:
+    """True si 'host' solo acepta conexiones del mismo equipo (loopback)."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ServidorApi:
+    """
+    Servidor HTTP de la API (un hilo por conexion, todos sobre el mismo pool).
+    Por defecto solo escucha en 127.0.0.1; en otra interfaz no arranca si la
+    API no tiene token (ValueError).
+    """
+
+    def __init__(self, api: ApiCenso, puerto: int = 8080, host: str = "127.0.0.1"):
+        if not api.token and not _es_local(host):
+            raise ValueError(f"La API no escucha en '{host}' sin token: define CENSO_API_TOKEN o usa --host 127.0.0.1")
+        self.servidor = ThreadingHTTPServer((host, puerto), _ManejadorApi)
+        self.servidor.daemon_threads = True
+        self.servidor.api = api
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, name="api", daemon=True)
+
+    @property
+    def direccion(self) -> str:
+        host, puerto = self.servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self) -> "ServidorApi":
+        self._hilo.start()
+        print(f"API disponible en {self.direccion}")
+        return self
+
+    def cerrar(self) -> None:
+        self.servidor.shutdown()
+        self.servidor.server_close()
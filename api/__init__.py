@@ -0,0 +1,7 @@
+from .ServidorApi import ApiCenso, ServidorApi, ErrorApi
+
+__all__ = [
+    'ApiCenso',
+    'ServidorApi',
+    'ErrorApi'
+]
\ No newline at end of file
@@ -0,0 +1,128 @@
+# benchmark_asistente.py
+import sys
+import json
+import argparse
+import statistics
+from collections import Counter
+from sqlalchemy import create_engine
+from constants import ASSISTANT_CONNECTION_STRING, GEMINI_API_KEY
+
+# --- 1. IMPORTAR CONTROLADOR Y PROVEEDORES ---
+try:
+    from controlador.AsistenteController import AsistenteController
+    from controlador.CacheAsistente import CacheAsistente
+    from controlador.ProveedorLLM import ProveedorStub, ProveedorGemini, ProveedorLocal, ProveedorGrabador
+except ImportError as e:
+    print(f"Error: No se pudo importar el controlador del asistente. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+# --- 2. PREGUNTAS POR DEFECTO ---
+PREGUNTAS_DEFAULT = [
+    "¿Cuántos habitantes hay en total?",
+    "¿Cuántas mujeres hay?",
+    "¿Cuántos hombres viven en Saltillo?",
+    "¿Cuál es el promedio de edad de las mujeres en Torreón?",
+    "¿Cuántas viviendas de ladrillo hay?",
+    "¿Cuántos habitantes hay por municipio?",
+    "¿Qué actividades económicas sostienen la vivienda de Ana García?",
+    "¿Cuál es la localidad con más viviendas?",
+]
+
+ETAPAS = ['llm', 'sql', 'formato', 'primer_fragmento', 'total']
+
+
+def percentil(valores, p):
+    """Percentil por el metodo del rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+def crear_proveedor(args):
+    """Crea el backend de lenguaje indicado en la linea de comandos."""
+    if args.proveedor == 'stub':
+        grabaciones = {}
+        if args.grabaciones:
+            with open(args.grabaciones, "r", encoding="utf-8") as f:
+                grabaciones = json.load(f)
+        return ProveedorStub(grabaciones, latencia_sql=args.latencia, latencia_respuesta=args.latencia,
+                             latencia_fragmento=args.latencia_fragmento)
+    if args.proveedor == 'local':
+        proveedor = ProveedorLocal(args.modelo_local, url_base=args.url_local)
+    else:
+        proveedor = ProveedorGemini(api_key=GEMINI_API_KEY)
+
+    # Con un backend real se pueden grabar las respuestas para reproducirlas con el stub
+    if args.grabaciones:
+        return ProveedorGrabador(proveedor, args.grabaciones)
+    return proveedor
+
+
+def ejecutar_benchmark(args):
+    engine = create_engine(args.db)
+
+    cache = None
+    if not args.sin_cache:
+        cache = CacheAsistente(args.ruta_cache)
+        if args.cache_limpio:
+            cache.limpiar()
+
+    controlador = AsistenteController(engine, cache=cache, proveedor=crear_proveedor(args), usar_cache=not args.sin_cache)
+    if args.sin_ruta_rapida:
+        controlador.reconocedor = None
+
+    preguntas = PREGUNTAS_DEFAULT
+    if args.preguntas:
+        with open(args.preguntas, "r", encoding="utf-8") as f:
+            preguntas = [linea.strip() for linea in f if linea.strip()]
+
+    mediciones = []
+    for repeticion in range(args.repeticiones):
+        for pregunta in preguntas:
+            # Con --stream se mide tambien el tiempo hasta el primer fragmento
+            al_fragmento = (lambda fragmento: None) if args.stream else None
+            respuesta, tiempos = controlador.chatear_medido(pregunta, al_fragmento=al_fragmento)
+            mediciones.append(tiempos)
+            if args.verbose:
+                print(f"[{repeticion + 1}] ({tiempos['ruta']}, {tiempos['total'] * 1000:.1f} ms) {pregunta} -> {respuesta}")
+
+    # --- 3. REPORTE ---
+    print(f"\n--- BENCHMARK DEL ASISTENTE ({len(mediciones)} solicitudes, proveedor: {args.proveedor}) ---")
+    print(f"{'Etapa':<18}{'media ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    for etapa in ETAPAS:
+        valores = sorted(m[etapa] * 1000 for m in mediciones if etapa in m)
+        if not valores:
+            continue
+        print(f"{etapa:<18}{statistics.mean(valores):>12.2f}{percentil(valores, 50):>12.2f}"
+              f"{percentil(valores, 95):>12.2f}{valores[-1]:>12.2f}")
+
+    print("\nSolicitudes por ruta:")
+    for ruta, cantidad in Counter(m['ruta'] for m in mediciones).most_common():
+        print(f"  {ruta:<8}{cantidad}")
+
+    if cache:
+        print(f"\nCache SQL: {cache.aciertos_sql} aciertos / {cache.fallos_sql} fallos")
+        print(f"Cache respuestas: {cache.aciertos_respuesta} aciertos / {cache.fallos_respuesta} fallos")
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide la latencia del asistente (LLM, SQL y formato).")
+    parser.add_argument("--db", default=ASSISTANT_CONNECTION_STRING, help="URL de la base de datos (ej. sqlite:///censo.db)")
+    parser.add_argument("--proveedor", choices=['stub', 'gemini', 'local'], default='stub')
+    parser.add_argument("--grabaciones", help="JSON de respuestas grabadas (stub: se reproducen; gemini/local: se graban)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia simulada del stub por llamada (segundos)")
+    parser.add_argument("--latencia-fragmento", type=float, default=0.0, help="Latencia simulada del stub entre fragmentos (segundos)")
+    parser.add_argument("--stream", action="store_true", help="Redacta las respuestas por stream y mide el primer fragmento")
+    parser.add_argument("--modelo-local", default="llama3", help="Modelo del proveedor local (Ollama)")
+    parser.add_argument("--url-local", default="http://localhost:11434", help="URL del proveedor local")
+    parser.add_argument("--preguntas", help="Archivo de texto con una pregunta por linea")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-cache", action="store_true", help="Desactiva el cache de SQL y respuestas")
+    parser.add_argument("--ruta-cache", default="cache_benchmark.db", help="Archivo del cache para el benchmark")
+    parser.add_argument("--cache-limpio", action="store_true", help="Vacia el cache antes de empezar")
+    parser.add_argument("--sin-ruta-rapida", action="store_true", help="Desactiva la ruta rapida (todo pasa por el LLM)")
+    parser.add_argument("--verbose", action="store_true")
+
+    ejecutar_benchmark(parser.parse_args())
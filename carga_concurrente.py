@@ -0,0 +1,277 @@
+# carga_concurrente.py
+import sys
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from collections import Counter, defaultdict
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from constants import DB_CONNECTION_STRING
+
+# --- 1. IMPORTAR CAPA DE DATOS Y CONTROLADORES ---
+try:
+    from dao import crear_engine, migrar, verificar_esquema
+    from dao.Conexion import es_sqlite_en_memoria
+    from dao.Reintentos import AGOTADOS, REINTENTOS, ErrorPersistencia, clasificar_error
+    from controlador.CatalogoController import CatalogoController
+    from controlador.CensoController import CensoController
+except ImportError as e:
+    print(f"Error: No se pudieron importar los módulos. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+# --- 2. MEZCLA DE OPERACIONES ---
+# Peso relativo de cada operacion (se cambia con --mezcla registrar=40,reportes=10,...)
+MEZCLA_DEFAULT = {'registrar': 40, 'habitantes': 35, 'actividades': 15, 'reportes': 10}
+PARENTESCOS = ['Jefe(a) de Familia', 'Cónyuge', 'Hijo(a)', 'Nieto(a)']
+
+# Esperas por el pool mas largas que esto cuentan como "espera"
+UMBRAL_ESPERA_POOL_MS = 1.0
+
+
+def percentil(valores, p):
+    """Percentil por el metodo del rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuanto espera cada solicitud por una conexion."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.esperas_ms = []
+        self._lock_esperas = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera = (time.perf_counter() - inicio) * 1000
+            with self._lock_esperas:
+                self.esperas_ms.append(espera)
+
+
+def preparar_catalogos(engine) -> dict:
+    """IDs de localidades, tipos y actividades; si algun catalogo esta vacio se crea uno de prueba."""
+    catalogo = CatalogoController(engine)
+    if not catalogo.obtener_todas_localidades():
+        municipios = catalogo.obtener_todos_municipios() or [catalogo.guardar_municipio("Municipio Carga")]
+        catalogo.guardar_localidad("Localidad Carga", municipios[0].id)
+    if not catalogo.obtener_todos_tipos_vivienda():
+        catalogo.guardar_tipo_vivienda("Tipo Carga")
+    if not catalogo.obtener_todas_actividades_economicas():
+        catalogo.guardar_actividad_economica("Actividad Carga")
+    catalogo.invalidar_catalogos()
+    return {
+        'localidades': [l.id for l in catalogo.obtener_todas_localidades()],
+        'municipios': sorted({l.municipio_id for l in catalogo.obtener_todas_localidades()}),
+        'tipos': [t.id for t in catalogo.obtener_todos_tipos_vivienda()],
+        'actividades': [a.id for a in catalogo.obtener_todas_actividades_economicas()],
+    }
+
+
+# --- 3. TRABAJO DE CADA ENCUESTADOR (HILO) ---
+
+def _encuestador(numero, censo, ids, mezcla, duracion, pensar, resultados, semilla):
+    """Un encuestador: elige operaciones segun la mezcla hasta que se acaba el tiempo."""
+    azar = random.Random(semilla)
+    operaciones, pesos = list(mezcla), list(mezcla.values())
+    mis_viviendas, asociadas = [], set()
+    fin = time.perf_counter() + duracion
+    latencias, fallidas = defaultdict(list), Counter()
+
+    while time.perf_counter() < fin:
+        operacion = azar.choices(operaciones, pesos)[0]
+        # Sin viviendas propias todavia, primero se registra una
+        if operacion in ('habitantes', 'actividades') and not mis_viviendas:
+            operacion = 'registrar'
+
+        inicio = time.perf_counter()
+        try:
+            exito, causa = _ejecutar_operacion(operacion, numero, censo, ids, azar, mis_viviendas, asociadas), 'resultado'
+        except ErrorPersistencia as e:
+            # Escritura perdida aun con reintentos: la causa es el tipo de error
+            exito, causa = False, e.tipo
+        if exito is None:
+            continue
+        latencias[operacion].append((time.perf_counter() - inicio) * 1000)
+        if not exito:
+            fallidas[(operacion, causa)] += 1
+
+        if pensar:
+            time.sleep(azar.expovariate(1 / pensar))
+
+    resultados.append((dict(latencias), fallidas))
+
+
+def _ejecutar_operacion(operacion, numero, censo, ids, azar, mis_viviendas, asociadas):
+    """Ejecuta una operacion: True/False segun su resultado, o None si no toca la BD (no se mide)."""
+    if operacion == 'registrar':
+        datos = {'direccion': f"Calle Carga {numero}-{len(mis_viviendas)} #{azar.randint(1, 999)}"}
+        vivienda = censo.registrar_nueva_vivienda(datos, azar.choice(ids['localidades']), azar.choice(ids['tipos']))
+        if vivienda is not None:
+            mis_viviendas.append(vivienda.id)
+        return vivienda is not None
+    if operacion == 'habitantes':
+        datos = {'nombre_completo': f"Habitante Carga {numero}", 'edad': azar.randint(0, 95),
+                 'sexo': azar.choice("FM"), 'parentesco_con_jefe_familia': azar.choice(PARENTESCOS)}
+        return censo.registrar_habitante_en_vivienda(azar.choice(mis_viviendas), datos) is not None
+    if operacion == 'actividades':
+        par = (azar.choice(mis_viviendas), azar.choice(ids['actividades']))
+        # Una asociacion repetida regresa False sin tocar la BD: no se mide
+        if par in asociadas:
+            return None
+        asociadas.add(par)
+        return censo.asociar_actividad_a_vivienda(*par)
+    municipio = azar.choice(ids['municipios'] + [None])
+    return isinstance(censo.generar_dashboard_poblacion(municipio), list)
+
+
+def ejecutar_proceso(url, hilos, mezcla, duracion, pensar, conexiones, semilla) -> dict:
+    """Corre 'hilos' encuestadores sobre un engine propio; regresa las mediciones crudas."""
+    opciones = {}
+    if not es_sqlite_en_memoria(make_url(url)):
+        opciones = {'poolclass': PoolMedido, 'pool_size': conexiones, 'max_overflow': 0, 'pool_timeout': 30}
+    engine = crear_engine(url, **opciones)
+
+    errores_bd, lock_errores = Counter(), threading.Lock()
+
+    @event.listens_for(engine, "handle_error")
+    def _al_fallar(contexto):
+        with lock_errores:
+            errores_bd[clasificar_error(contexto.original_exception) or 'otro'] += 1
+
+    censo = CensoController(engine)
+    ids = preparar_catalogos(engine)
+    resultados = []
+    trabajadores = [
+        threading.Thread(target=_encuestador, args=(i, censo, ids, mezcla, duracion, pensar, resultados, semilla + i))
+        for i in range(hilos)
+    ]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+
+    latencias, fallidas = defaultdict(list), Counter()
+    for latencias_hilo, fallidas_hilo in resultados:
+        for operacion, valores in latencias_hilo.items():
+            latencias[operacion].extend(valores)
+        fallidas.update(fallidas_hilo)
+    esperas = getattr(engine.pool, 'esperas_ms', [])
+    engine.dispose()
+    # Contadores del proceso (dao/Reintentos.py): transacciones repetidas y escrituras perdidas por tipo
+    reintentos = Counter({etiquetas['tipo']: valor for _, etiquetas, valor in REINTENTOS.muestras()})
+    agotados = Counter({etiquetas['tipo']: valor for _, etiquetas, valor in AGOTADOS.muestras()})
+    return {'latencias': dict(latencias), 'fallidas': fallidas, 'errores_bd': errores_bd, 'esperas_pool_ms': esperas,
+            'reintentos': reintentos, 'agotados': agotados}
+
+
+def _ejecutar_proceso_args(argumentos):
+    return ejecutar_proceso(*argumentos)
+
+
+# --- 4. REPORTE ---
+
+def reportar(mediciones, duracion, hilos_totales):
+    latencias, fallidas, errores_bd, esperas = defaultdict(list), Counter(), Counter(), []
+    reintentos, agotados = Counter(), Counter()
+    for medicion in mediciones:
+        for operacion, valores in medicion['latencias'].items():
+            latencias[operacion].extend(valores)
+        fallidas.update(medicion['fallidas'])
+        errores_bd.update(medicion['errores_bd'])
+        esperas.extend(medicion['esperas_pool_ms'])
+        reintentos.update(medicion['reintentos'])
+        agotados.update(medicion['agotados'])
+    # fallidas: (operacion, causa) -> conteo; causa 'resultado' = el controlador regreso None/False
+    fallidas_operacion = Counter()
+    for (operacion, _), conteo in fallidas.items():
+        fallidas_operacion[operacion] += conteo
+
+    total = sum(len(v) for v in latencias.values())
+    print(f"\n--- CARGA: {hilos_totales} encuestador(es) durante {duracion:.0f} s ---")
+    print(f"Operaciones: {total} ({total / duracion:.1f} ops/s), fallidas: {sum(fallidas.values())}")
+    print(f"\n{'Operación':<14}{'total':>8}{'ops/s':>9}{'fallidas':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    for operacion in sorted(latencias):
+        valores = sorted(latencias[operacion])
+        print(f"{operacion:<14}{len(valores):>8}{len(valores) / duracion:>9.1f}{fallidas_operacion[operacion]:>10}"
+              f"{percentil(valores, 50):>10.1f}{percentil(valores, 95):>10.1f}{percentil(valores, 99):>10.1f}{valores[-1]:>10.1f}")
+
+    if fallidas:
+        print("\nFallidas por causa:")
+        for (operacion, causa), conteo in sorted(fallidas.items()):
+            print(f"  {operacion:<14}{causa:<16}{conteo}")
+
+    print("\nErrores de BD (incluye los que se repitieron con éxito):")
+    if errores_bd:
+        for tipo, conteo in errores_bd.most_common():
+            print(f"  {tipo:<14}{conteo}")
+    else:
+        print("  ninguno")
+
+    print(f"\nReintentos: {int(sum(reintentos.values()))} transacción(es) repetida(s)"
+          + (f" ({', '.join(f'{t}={int(c)}' for t, c in reintentos.most_common())})" if reintentos else "")
+          + f"; escrituras perdidas tras reintentar: {int(sum(agotados.values()))}")
+
+    if esperas:
+        esperas.sort()
+        largas = [e for e in esperas if e >= UMBRAL_ESPERA_POOL_MS]
+        print(f"\nPool: {len(esperas)} checkouts, {len(largas)} esperaron >= {UMBRAL_ESPERA_POOL_MS:.0f} ms "
+              f"(p95 {percentil(esperas, 95):.1f} ms, máx {esperas[-1]:.1f} ms, total {sum(esperas) / 1000:.1f} s)")
+    return 1 if agotados or fallidas else 0
+
+
+def leer_mezcla(texto: str) -> dict:
+    """'registrar=40,reportes=10' -> {'registrar': 40, 'reportes': 10}."""
+    mezcla = {}
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition('=')
+        if nombre.strip() not in MEZCLA_DEFAULT:
+            raise argparse.ArgumentTypeError(f"Operación desconocida '{nombre}' (usa {', '.join(MEZCLA_DEFAULT)})")
+        mezcla[nombre.strip()] = float(peso)
+    return mezcla
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera carga concurrente de encuestadores sobre CensoController.")
+    parser.add_argument("--db", default=DB_CONNECTION_STRING, help="URL de la BD (MySQL local o sqlite:///archivo.db)")
+    parser.add_argument("--hilos", type=int, default=8, help="Encuestadores (hilos) por proceso")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos (cada uno con su engine y sus hilos)")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--pensar", type=float, default=0.05, help="Pausa promedio entre operaciones (s, exponencial)")
+    parser.add_argument("--mezcla", type=leer_mezcla, default=MEZCLA_DEFAULT,
+                        help="Pesos por operación, ej. registrar=40,habitantes=35,actividades=15,reportes=10")
+    parser.add_argument("--conexiones", type=int, default=5, help="Tamaño del pool por proceso (sin overflow)")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla del generador aleatorio")
+    args = parser.parse_args()
+
+    # --- 2. ESQUEMA ---
+    engine = crear_engine(args.db)
+    if args.db.startswith('sqlite'):
+        migrar(engine)
+    elif not verificar_esquema(engine):
+        sys.exit(1)
+    preparar_catalogos(engine)
+    engine.dispose()
+
+    # --- 3. CARGA ---
+    print(f"Carga sobre {args.db.split('@')[-1]} con la mezcla {args.mezcla}...")
+    trabajos = [
+        (args.db, args.hilos, args.mezcla, args.duracion, args.pensar, args.conexiones, args.semilla + p * 1000)
+        for p in range(args.procesos)
+    ]
+    if args.procesos == 1:
+        mediciones = [ejecutar_proceso(*trabajos[0])]
+    else:
+        with multiprocessing.Pool(args.procesos) as procesos:
+            mediciones = procesos.map(_ejecutar_proceso_args, trabajos)
+
+    sys.exit(reportar(mediciones, args.duracion, args.hilos * args.procesos))
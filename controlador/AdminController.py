@@ -1,26 +1,71 @@
+import threading
 from .BaseController import BaseController
+from .Seguridad import ControlIntentos, hashear_contrasena, verificar_contrasena, necesita_rehash
+
+# Hash de una contraseña aleatoria: se verifica contra el cuando el usuario no existe,
+# para que la respuesta tarde lo mismo y no revele que usuarios existen
+_hash_ficticio = None
+_lock_hash_ficticio = threading.Lock()
+
+
+def _obtener_hash_ficticio() -> str:
+    global _hash_ficticio
+    with _lock_hash_ficticio:
+        if _hash_ficticio is None:
+            _hash_ficticio = hashear_contrasena("usuario-inexistente")
+        return _hash_ficticio
+
 
 class AdminController(BaseController):
     """
     Controlador de seguridad y login
     """
 
+    def __init__(self, engine, control_intentos: ControlIntentos = None):
+        super().__init__(engine)
+        # Limitador de intentos por usuario (protege contra fuerza bruta)
+        self.control_intentos = control_intentos if control_intentos is not None else ControlIntentos()
+        # El hash ficticio se precalcula en segundo plano para no retrasar el arranque
+        threading.Thread(target=_obtener_hash_ficticio, daemon=True).start()
+
     def verificar_login(self, usuario: str, contrasena: str) -> bool:
         """
         Verifica las credenciales del usuario contra la base de datos
         """
 
-        # 1. Aplicar el hashing: En un proyecto mas realista, la contrasena se hashea aqui
-        #    antes de pasarse al DAO para la verificacion
-        # contrasena_hasheada = hash_lib.hash_password(contrasena)
-        contrasena_hasheada = contrasena # SIMULACION para este ejemplo
+        # 1. Usuario bloqueado por intentos fallidos: no se calcula ningun hash
+        segundos = self.control_intentos.segundos_bloqueado(usuario)
+        if segundos > 0:
+            print(f"Fallo de autenticacion para {usuario}: bloqueado por {segundos:.0f} segundos mas")
+            return False
+
+        # 2. Lectura de solo lectura del hash guardado
+        credenciales = self.admin_dao.obtener_credenciales(usuario)
+
+        if credenciales is None:
+            verificar_contrasena(contrasena, _obtener_hash_ficticio())
+            valido = False
+        else:
+            id_administrador, hash_guardado = credenciales
+            valido = (self.control_intentos.verificado_recientemente(usuario, hash_guardado, contrasena)
+                      or verificar_contrasena(contrasena, hash_guardado))
+
+            # 3. Contraseñas heredadas en texto plano o con otro costo: se rehashean al entrar
+            if valido and necesita_rehash(hash_guardado):
+                nuevo_hash = hashear_contrasena(contrasena)
+                if self.admin_dao.actualizar_contrasena_hash(id_administrador, nuevo_hash, hash_anterior=hash_guardado):
+                    print(f"Contraseña de {usuario} actualizada al formato scrypt")
+                    hash_guardado = nuevo_hash
 
-        administrador = self.admin_dao.verificar_credenciales(usuario, contrasena_hasheada)
+            if valido:
+                self.control_intentos.recordar_verificado(usuario, hash_guardado, contrasena)
 
-        if administrador:
+        if valido:
+            self.control_intentos.registrar_exito(usuario)
             print(f"Administrador {usuario} autenticado existosamente")
             return True
         else:
+            self.control_intentos.registrar_fallo(usuario)
             print(f"Fallo de autenticacion para {usuario}")
             return False
         
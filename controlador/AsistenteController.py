@@ -1,144 +1,115 @@
-import sqlalchemy
-from google import genai
+import time
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from typing import Any, Callable, Dict, Optional, Tuple
 from constants import GEMINI_API_KEY
+from dao.Metricas import metricas
+from dao.Migraciones import VERSION_ESQUEMA
+from modelo import VersionDatos
+from .CacheAsistente import CacheAsistente, contexto_cache
+from .IntencionesAsistente import ReconocedorIntenciones, IndiceCatalogo
+from .EsquemaAsistente import EsquemaAsistente
+from .ProveedorLLM import ProveedorLLM, ProveedorGemini
+from .GobernadorConsultas import GobernadorConsultas, ConsultaRechazada
+
+
+SOLICITUDES = metricas.contador(
+    "censo_asistente_solicitudes_total", "Preguntas al asistente por ruta de respuesta", ('ruta',))
+DURACION_ETAPA = metricas.histograma(
+    "censo_asistente_etapa_segundos", "Tiempo por etapa de cada pregunta (llm, sql, formato, total)",
+    ('etapa',), cubetas=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0))
 
-SCHEMA_DB = """
--- La tabla 'actividad_economica' contiene el catálogo de sostenes económicos.
-CREATE TABLE actividad_economica (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        nombre VARCHAR(100) NOT NULL,
-        PRIMARY KEY (id),
-        UNIQUE (nombre)
-);
-CREATE TABLE administrador (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        usuario VARCHAR(50) NOT NULL,
-        contrasena_hash VARCHAR(256) NOT NULL,
-        PRIMARY KEY (id),
-        UNIQUE (usuario)
-);
-
--- Catálogo de municipios. Ejemplo: 'Saltillo', 'Arteaga'.
-CREATE TABLE municipio (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        nombre VARCHAR(100) NOT NULL,
-        PRIMARY KEY (id),
-        UNIQUE (nombre)
-);
-
--- Catálogo de tipos de vivienda. Ejemplo: 'Vivienda de concreto', 'Vivienda de ladrillo'.
-CREATE TABLE tipo_vivienda (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        nombre VARCHAR(50) NOT NULL,
-        PRIMARY KEY (id),
-        UNIQUE (nombre)
-);
-CREATE TABLE localidad (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        nombre VARCHAR(100) NOT NULL,
-        municipio_id INTEGER NOT NULL,
-        PRIMARY KEY (id),
-        FOREIGN KEY(municipio_id) REFERENCES municipio (id)
-);
-CREATE TABLE vivienda (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        direccion VARCHAR(255) NOT NULL,
-        fecha_censo DATE,
-        coordenadas_gps VARCHAR(50),
-        total_habitantes VARCHAR(50),
-        localidad_id INTEGER NOT NULL,
-        tipo_vivienda_id INTEGER NOT NULL,
-        PRIMARY KEY (id),
-        FOREIGN KEY(localidad_id) REFERENCES localidad (id),
-        FOREIGN KEY(tipo_vivienda_id) REFERENCES tipo_vivienda (id)
-);
-
--- Tabla de asociación para vivienda y actividad_economica (Muchos a Muchos)
-CREATE TABLE vivienda_actividad (
-        vivienda_id INTEGER NOT NULL,
-        actividad_id INTEGER NOT NULL,
-        PRIMARY KEY (vivienda_id, actividad_id),
-        FOREIGN KEY(vivienda_id) REFERENCES vivienda (id),
-        FOREIGN KEY(actividad_id) REFERENCES actividad_economica (id)
-);
-
--- Tabla principal de habitantes.
-CREATE TABLE habitante (
-        id INTEGER NOT NULL AUTO_INCREMENT,
-        nombre_completo VARCHAR(150) NOT NULL,
-        edad INTEGER NOT NULL,
-
-        -- Columna 'sexo' usa codificación: 'F' = Femenino (Mujer), 'M' = Masculino (Hombre).
-        sexo VARCHAR(10) NOT NULL,
-
-        -- Columna 'parentesco' usa valores como: 'Jefe(a) de Familia', 'Cónyuge', 'Hijo(a)'.
-        parentesco_con_jefe_familia VARCHAR(50) NOT NULL,
-        vivienda_id INTEGER NOT NULL,
-        PRIMARY KEY (id),
-        FOREIGN KEY(vivienda_id) REFERENCES vivienda (id)
-);
-"""
 
 class AsistenteController:
     """
     Controlador para el asistente de IA
     """
 
-    def __init__(self, engine):
+    def __init__(self, engine, cache: Optional[CacheAsistente] = None,
+                 proveedor: Optional[ProveedorLLM] = None, usar_cache: bool = True,
+                 gobernador: Optional[GobernadorConsultas] = None):
         # Recibe el engine en el main.py, el engine utilizara un usuario que solo tenga privilegios de select
         self.engine = engine
 
-        try:
-            self.client = genai.Client(api_key=GEMINI_API_KEY)
-            self.model_sql = 'gemini-2.5-flash'
-            self.model_chat = 'gemini-2.5-flash'
-            print("AsistenteController: Cliente de Gemini inicializado")
-        except Exception as e:
-            print(f"Error al inicializar el cliente de Gemini: {e}")
-            self.client = None
-
-    def chatear(self, pregunta_usuario: str) -> str:
+        # Cache persistente de SQL generado y respuestas (por version de datos)
+        self.cache = None
+        if usar_cache:
+            try:
+                self.cache = cache if cache is not None else CacheAsistente()
+            except Exception as e:
+                print(f"Advertencia: No se pudo abrir el cache del asistente, se trabajara sin cache. {e}")
+
+        # El SQL y las respuestas cacheadas valen solo para este motor y esta version del esquema
+        self.contexto_cache = contexto_cache(engine.dialect.name, VERSION_ESQUEMA)
+
+        # Nombres de catalogo en memoria (compartidos por la ruta rapida y la seleccion de tablas)
+        self.indice = IndiceCatalogo()
+
+        # Ruta rapida: preguntas frecuentes resueltas con plantillas, sin LLM
+        self.reconocedor = ReconocedorIntenciones(indice=self.indice)
+
+        # Esquema para el prompt, generado una vez desde Base.metadata (en el dialecto del engine)
+        self.esquema = EsquemaAsistente(dialecto=engine.dialect.name)
+
+        # Valida y acota el SQL generado (solo lectura, LIMIT, timeout y costo del plan)
+        self.gobernador = gobernador if gobernador is not None else GobernadorConsultas()
+
+        # Backend de lenguaje (Gemini por defecto; ProveedorStub para pruebas sin red)
+        if proveedor is not None:
+            self.proveedor = proveedor
+        else:
+            try:
+                # El cliente de Gemini se crea con la primera pregunta que llegue al modelo
+                self.proveedor = ProveedorGemini(api_key=GEMINI_API_KEY)
+            except Exception as e:
+                print(f"Error al inicializar el cliente de Gemini: {e}")
+                self.proveedor = None
+
+    def obtener_version_datos(self) -> Optional[int]:
         """
-        Toma una pregunta, genera SQL, lo ejecuta y devuelve una respuesta amigable.
+        Lee el sello de version de los datos del censo (una consulta por PK).
+        Retorna None si no se pudo leer (en ese caso no se usa el cache de respuestas).
         """
-        if not self.client:
-            return "Error: El cliente de IA no esta inicializado"
-        
-#         prompt_sql=f"""
-# Eres un asistente experto en SQL. Tu tarea es generar una consulta SQL
-# basada en el esquema de la base de datos y la pregunta del usuario.
-
-# ### ESQUEMA DE LA BASE DE DATOS ###
-# {SCHEMA_DB}
-
-# ### EJEMPLOS (Pregunta -> SQL) ###
-# Pregunta: ¿Cuántos habitantes hay en total?
-# SQL: SELECT COUNT(*) FROM habitante;
-
-# Pregunta: ¿Cuántas mujeres viven en Saltillo?
-# SQL: SELECT COUNT(t1.id) FROM habitante AS t1 JOIN vivienda AS t2 ON t1.vivienda_id = t2.id JOIN localidad AS t3 ON t2.localidad_id = t3.id JOIN municipio AS t4 ON t3.municipio_id = t4.id WHERE t1.sexo = 'F' AND t4.nombre = 'Saltillo';
-
-# Pregunta: ¿Qué actividades económicas sostienen la vivienda de 'Juan Pérez'?
-# SQL: SELECT t3.nombre FROM vivienda AS t1 JOIN vivienda_actividad AS t2 ON t1.id = t2.vivienda_id JOIN actividad_economica AS t3 ON t2.actividad_id = t3.id JOIN habitante AS t4 ON t1.id = t4.vivienda_id WHERE t4.nombre_completo = 'Juan Pérez';
-
-# ### REGLAS ###
-# - Solo genera la consulta SQL.
-# - No incluyas explicaciones, comentarios, markdown (```sql) ni texto adicional.
-# - **Solo genera consultas de tipo SELECT.** NUNCA uses DROP, DELETE, UPDATE, INSERT.
-# - Si la pregunta no se puede responder con el esquema, responde "ERROR: Imposible de responder".
+        try:
+            with self.engine.connect() as connection:
+                version = connection.execute(
+                    select(VersionDatos.version).where(VersionDatos.id == 1)
+                ).scalar_one_or_none()
+                return version or 0
+        except SQLAlchemyError as e:
+            print(f"[Debug IA] No se pudo leer la version de datos: {e}")
+            return None
 
-# ### PREGUNTA DEL USUARIO ###
-# {pregunta_usuario}
+    # --- PROMPTS ---
 
-# ### CONSULTA SQL GENERADA ###
-#         """
-        prompt_sql=f"""
+    def _construir_prompt_sql(self, pregunta_usuario: str) -> str:
+        """
+        Prompt para que el modelo genere la consulta SQL.
+        Solo incluye las tablas relevantes para la pregunta (y las reglas y
+        ejemplos que aplican a esas tablas), generadas desde el modelo.
+        """
+        tablas = self.esquema.tablas_relevantes(pregunta_usuario, self.indice)
+        print(f"[Debug IA] Tablas en el prompt: {sorted(tablas)}")
+
+        reglas = []
+        if 'habitante' in tablas:
+            reglas.append("**Codificación de Sexo:** La columna 'sexo' usa 'F' para mujeres y 'M' para hombres.")
+        if 'vivienda' in tablas:
+            reglas.append(f"**Conversión de Números (CAST):** La columna 'vivienda.total_habitantes' es un VARCHAR. Para CUALQUIER operación matemática (SUM, AVG, COUNT), DEBES convertirla usando `{self.esquema.cast_entero('total_habitantes')}`.")
+        reglas.append("**Búsqueda de Texto:** Las búsquedas de nombres (municipios, personas, etc.) deben ser insensibles a mayúsculas usando `LOWER()` o `UPPER()`.")
+        texto_reglas = "\n".join(f"{i}.  {regla}" for i, regla in enumerate(reglas, start=1))
+
+        texto_ejemplos = "\n\n".join(
+            f"Pregunta: {pregunta}\nSQL: {sql}" for pregunta, sql in self.esquema.ejemplos(tablas)
+        )
+
+        return f"""
 Eres un asistente experto en SQL. Tu tarea es generar una consulta SQL
 basada en el esquema de la base de datos y la pregunta del usuario.
+La base de datos es {self.esquema.nombre_dialecto}: usa solo sintaxis y funciones de ese motor.
 
 ### ESQUEMA DE LA BASE DE DATOS ###
-{SCHEMA_DB}
+{self.esquema.describir(tablas)}
 
 ### REGLAS DE GENERACIÓN DE SQL ###
 - Solo genera la consulta SQL.
@@ -147,31 +118,10 @@ basada en el esquema de la base de datos y la pregunta del usuario.
 - Si la pregunta no se puede responder con el esquema, responde "ERROR: Imposible de responder".
 
 ### REGLAS DE LÓGICA DE NEGOCIO (¡MUY IMPORTANTE!) ###
-1.  **Codificación de Sexo:** La columna 'sexo' usa 'F' para mujeres y 'M' para hombres.
-2.  **Conversión de Números (CAST):** La columna 'vivienda.total_habitantes' es un VARCHAR. Para CUALQUIER operación matemática (SUM, AVG, COUNT), DEBES convertirla usando `CAST(total_habitantes AS UNSIGNED)`.
-3.  **Búsqueda de Texto:** Las búsquedas de nombres (municipios, personas, etc.) deben ser insensibles a mayúsculas usando `LOWER()` o `UPPER()`.
+{texto_reglas}
 
 ### EJEMPLOS (Pregunta -> SQL) ###
-Pregunta: ¿Cuántos habitantes hay en total?
-SQL: SELECT COUNT(*) FROM habitante;
-
-Pregunta: ¿Cuántas mujeres hay?
-SQL: SELECT COUNT(*) FROM habitante WHERE sexo = 'F';
-
-Pregunta: ¿Cuántos hombres viven en Saltillo?
-SQL: SELECT COUNT(t1.id) FROM habitante AS t1 JOIN vivienda AS t2 ON t1.vivienda_id = t2.id JOIN localidad AS t3 ON t2.localidad_id = t3.id JOIN municipio AS t4 ON t3.municipio_id = t4.id WHERE t1.sexo = 'M' AND LOWER(t4.nombre) = 'saltillo';
-
-Pregunta: ¿Cuál es el total de habitantes censados (usando la columna total_habitantes de vivienda)?
-SQL: SELECT SUM(CAST(total_habitantes AS UNSIGNED)) FROM vivienda;
-
-Pregunta: ¿Cuál es el promedio de edad de las mujeres en Torreón?
-SQL: SELECT AVG(t1.edad) FROM habitante AS t1 JOIN vivienda AS t2 ON t1.vivienda_id = t2.id JOIN localidad AS t3 ON t2.localidad_id = t3.id JOIN municipio AS t4 ON t3.municipio_id = t4.id WHERE t1.sexo = 'F' AND LOWER(t4.nombre) = 'torreón';
-
-Pregáunta: ¿Cuántas viviendas de 'Vivienda de ladrillo' hay?
-SQL: SELECT COUNT(t1.id) FROM vivienda AS t1 JOIN tipo_vivienda AS t2 ON t1.tipo_vivienda_id = t2.id WHERE LOWER(t2.nombre) = 'vivienda de ladrillo';
-
-Pregunta: ¿Qué actividades económicas sostienen la vivienda de 'Ana García'?
-SQL: SELECT t3.nombre FROM vivienda AS t1 JOIN vivienda_actividad AS t2 ON t1.id = t2.vivienda_id JOIN actividad_economica AS t3 ON t2.actividad_id = t3.id JOIN habitante AS t4 ON t1.id = t4.vivienda_id WHERE LOWER(t4.nombre_completo) = 'ana garcía';
+{texto_ejemplos}
 
 ### PREGUNTA DEL USUARIO ###
 {pregunta_usuario}
@@ -179,44 +129,163 @@ SQL: SELECT t3.nombre FROM vivienda AS t1 JOIN vivienda_actividad AS t2 ON t1.id
 ### CONSULTA SQL GENERADA ###
         """
 
-        try:
-            print("[Debug IA] Enviando prompt para generar SQL...")
-            respuestas_gemini_sql = self.client.models.generate_content(
-                model=self.model_sql,
-                contents=prompt_sql
-            )
-            consulta_sql_generada = respuestas_gemini_sql.text.strip().replace("```sql", "").replace("```", "")
-
-            if not consulta_sql_generada.upper().startswith("SELECT"):
-                print(f"[ERROR IA] Consulta no valida: {consulta_sql_generada}")
-                return "Lo siento, solo puedo procesar consultas de informacion (SELECT)"
-            
-            print(f"[Debug IA] SQL Generado: {consulta_sql_generada}")
-
-            with self.engine.connect() as connection:
-                resultado = connection.execute(sqlalchemy.text(consulta_sql_generada))
-                filas_resultado = resultado.fetchall()
-
-            print(f"[Debu IA] Resultado BD: {filas_resultado}")
-            
-            prompt_amigable = f"""
+    def _construir_prompt_respuesta(self, pregunta_usuario: str, resumen_resultado: str) -> str:
+        """
+        Prompt para que el modelo redacte la respuesta a partir de los resultados
+        (ya resumidos por el gobernador si eran demasiadas filas).
+        """
+        return f"""
 Eres un asistente de chat amigable y servicial.
 La pregunta original del usuario fue: "{pregunta_usuario}"
-Se ejecutó una consulta en la base de datos y el resultado fue: {filas_resultado}
+Se ejecutó una consulta en la base de datos y el resultado fue: {resumen_resultado}
 
 Por favor, responde la pregunta original del usuario en lenguaje natural,
 basándote en esos resultados. Sé breve y directo.
 Si el resultado está vacío o es '[]', di que no se encontraron datos.
 """
-            print("[Debug IA] Enviando Prompt para respuesta amigable...")
 
-            respuesta_gemini_amigable = self.client.models.generate_content(
-                model=self.model_chat,
-                contents=prompt_amigable
-            )
+    # --- CHAT ---
+
+    def chatear(self, pregunta_usuario: str) -> str:
+        """
+        Toma una pregunta, genera SQL, lo ejecuta y devuelve una respuesta amigable.
+        Si la misma pregunta ya se respondio con la version de datos actual, la
+        respuesta sale del cache sin llamar al modelo ni a la base de datos del censo.
+        Las preguntas frecuentes se resuelven con la ruta rapida (ReconocedorIntenciones).
+        """
+        respuesta, _ = self.chatear_medido(pregunta_usuario)
+        return respuesta
+
+    def chatear_medido(self, pregunta_usuario: str,
+                       al_fragmento: Optional[Callable[[str], Optional[bool]]] = None
+                       ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Igual que chatear, pero ademas devuelve los tiempos de la solicitud (segundos):
+            {'ruta': 'cache' | 'rapida' | 'llm' | 'cancelada' | 'error',
+             'llm': ..., 'sql': ..., 'formato': ..., 'total': ...}
+        'sql' incluye la lectura de la version de datos y las consultas al censo;
+        'formato' incluye armar prompts, plantillas y el cache local.
+
+        Si se pasa 'al_fragmento', la respuesta del modelo se redacta por stream y
+        cada fragmento se entrega conforme llega (tiempos['primer_fragmento'] mide
+        el tiempo hasta el primero). Si el callback retorna False, el stream se
+        detiene y la respuesta parcial no se cachea.
+        """
+        inicio = time.perf_counter()
+        tiempos: Dict[str, Any] = {'ruta': 'error', 'llm': 0.0, 'sql': 0.0, 'formato': 0.0, 'total': 0.0}
+
+        def _medir(etapa: str, t0: float) -> None:
+            tiempos[etapa] += time.perf_counter() - t0
+
+        def _terminar(respuesta: str, ruta: str) -> Tuple[str, Dict[str, Any]]:
+            tiempos['ruta'] = ruta
+            tiempos['total'] = time.perf_counter() - inicio
+            SOLICITUDES.con_etiquetas(ruta).inc()
+            for etapa in ('llm', 'sql', 'formato', 'total'):
+                if tiempos[etapa]:
+                    DURACION_ETAPA.con_etiquetas(etapa).observar(tiempos[etapa])
+            return respuesta, tiempos
+
+        t0 = time.perf_counter()
+        pregunta_normalizada = CacheAsistente.normalizar_pregunta(pregunta_usuario)
+        _medir('formato', t0)
+
+        t0 = time.perf_counter()
+        version_datos = self.obtener_version_datos()
+        _medir('sql', t0)
+
+        if self.cache and version_datos is not None:
+            t0 = time.perf_counter()
+            respuesta_cacheada = self.cache.obtener_respuesta(pregunta_normalizada, self.contexto_cache, version_datos)
+            _medir('formato', t0)
+            if respuesta_cacheada is not None:
+                print("[Debug IA] Respuesta servida desde el cache")
+                return _terminar(respuesta_cacheada, 'cache')
+
+        if self.reconocedor is not None:
+            t0 = time.perf_counter()
+            respuesta_rapida = self.reconocedor.responder(pregunta_usuario, self.engine, version_datos)
+            _medir('sql', t0)
+            if respuesta_rapida is not None:
+                if self.cache and version_datos is not None:
+                    self.cache.guardar_respuesta(pregunta_normalizada, self.contexto_cache, version_datos, respuesta_rapida)
+                return _terminar(respuesta_rapida, 'rapida')
+
+        if not self.proveedor:
+            return _terminar("Error: El cliente de IA no esta inicializado", 'error')
+
+        try:
+            # 1. SQL: del cache si la pregunta ya se vio, si no del modelo
+            consulta_sql_generada = self.cache.obtener_sql(pregunta_normalizada, self.contexto_cache) if self.cache else None
+            sql_cacheado = consulta_sql_generada is not None
+
+            if not sql_cacheado:
+                t0 = time.perf_counter()
+                self.indice.actualizar(self.engine, version_datos)
+                _medir('sql', t0)
+
+                t0 = time.perf_counter()
+                prompt_sql = self._construir_prompt_sql(pregunta_usuario)
+                _medir('formato', t0)
+
+                print("[Debug IA] Enviando prompt para generar SQL...")
+                t0 = time.perf_counter()
+                texto_sql = self.proveedor.generar_sql(pregunta_usuario, prompt_sql)
+                _medir('llm', t0)
+                consulta_sql_generada = texto_sql.strip().replace("```sql", "").replace("```", "")
+            else:
+                print("[Debug IA] SQL servido desde el cache")
+            
+            print(f"[Debug IA] SQL Generado: {consulta_sql_generada}")
+
+            t0 = time.perf_counter()
+            try:
+                resultado = self.gobernador.ejecutar(self.engine, consulta_sql_generada)
+            except Exception as e:
+                # El SQL cacheado que ya no pasa (esquema o limites distintos) se descarta:
+                # la siguiente vez se genera de nuevo en lugar de fallar siempre
+                if sql_cacheado:
+                    self.cache.descartar_sql(pregunta_normalizada, self.contexto_cache)
+                if not isinstance(e, ConsultaRechazada):
+                    raise
+                print(f"[ERROR IA] Consulta no valida: {consulta_sql_generada} ({e})")
+                return _terminar(f"Lo siento, no pude procesar esa consulta. {e}.", 'error')
+            finally:
+                _medir('sql', t0)
+            filas_resultado = resultado.filas
+
+            # Solo se cachea el SQL que se ejecuto sin errores
+            if self.cache and not sql_cacheado:
+                self.cache.guardar_sql(pregunta_normalizada, self.contexto_cache, consulta_sql_generada)
+
+            print(f"[Debu IA] Resultado BD: {len(filas_resultado)} filas{' (truncado)' if resultado.truncado else ''}")
+
+            t0 = time.perf_counter()
+            resumen_resultado = self.gobernador.resumir_para_prompt(resultado)
+            prompt_amigable = self._construir_prompt_respuesta(pregunta_usuario, resumen_resultado)
+            _medir('formato', t0)
 
-            return respuesta_gemini_amigable.text
+            print("[Debug IA] Enviando Prompt para respuesta amigable...")
+            t0 = time.perf_counter()
+            if al_fragmento is None:
+                respuesta = self.proveedor.redactar_respuesta(pregunta_usuario, filas_resultado, prompt_amigable)
+            else:
+                partes = []
+                for fragmento in self.proveedor.redactar_respuesta_stream(pregunta_usuario, filas_resultado, prompt_amigable):
+                    if not partes:
+                        tiempos['primer_fragmento'] = time.perf_counter() - inicio
+                    partes.append(fragmento)
+                    if al_fragmento(fragmento) is False:
+                        _medir('llm', t0)
+                        return _terminar("".join(partes), 'cancelada')
+                respuesta = "".join(partes)
+            _medir('llm', t0)
+
+            if self.cache and version_datos is not None:
+                self.cache.guardar_respuesta(pregunta_normalizada, self.contexto_cache, version_datos, respuesta)
+
+            return _terminar(respuesta, 'llm')
         
         except Exception as e:
             print(f"[Error IA] Ha ocurrido un error: {e}")
-            return "Lo siento, tuve un problema al procesar tu solicitud"
\ No newline at end of file
+            return _terminar("Lo siento, tuve un problema al procesar tu solicitud", 'error')
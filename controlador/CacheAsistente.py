@@ -0,0 +1,173 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+from dao.Metricas import metricas
+
+CONSULTAS_CACHE = metricas.contador(
+    "censo_cache_asistente_total", "Busquedas en el cache del asistente", ('tipo', 'resultado'))
+ACIERTO_SQL, FALLO_SQL = CONSULTAS_CACHE.con_etiquetas('sql', 'acierto'), CONSULTAS_CACHE.con_etiquetas('sql', 'fallo')
+ACIERTO_RESPUESTA = CONSULTAS_CACHE.con_etiquetas('respuesta', 'acierto')
+FALLO_RESPUESTA = CONSULTAS_CACHE.con_etiquetas('respuesta', 'fallo')
+
+# Archivo SQLite local donde persiste el cache (relativo al directorio de ejecución)
+RUTA_CACHE_ASISTENTE = "cache_asistente.db"
+
+
+# Tablas del cache: (nombre, columnas, definicion). Un archivo con otras columnas
+# (version anterior del programa) se descarta: el cache se reconstruye solo.
+TABLAS_CACHE = (
+    ('cache_sql', ('pregunta', 'contexto', 'consulta_sql', 'creado'), """
+        CREATE TABLE cache_sql (
+            pregunta TEXT NOT NULL,
+            contexto TEXT NOT NULL,
+            consulta_sql TEXT NOT NULL,
+            creado REAL NOT NULL,
+            PRIMARY KEY (pregunta, contexto)
+        )
+    """),
+    ('cache_respuesta', ('pregunta', 'contexto', 'version_datos', 'respuesta', 'creado'), """
+        CREATE TABLE cache_respuesta (
+            pregunta TEXT NOT NULL,
+            contexto TEXT NOT NULL,
+            version_datos INTEGER NOT NULL,
+            respuesta TEXT NOT NULL,
+            creado REAL NOT NULL,
+            PRIMARY KEY (pregunta, contexto, version_datos)
+        )
+    """),
+)
+
+
+def contexto_cache(dialecto: str, version_esquema: int) -> str:
+    """
+    Llave del motor y del esquema (ej. 'mysql/6'): el SQL de MySQL no sirve en
+    SQLite (modo --campo) y una migracion puede invalidar el SQL ya generado.
+    """
+    return f"{dialecto}/{version_esquema}"
+
+
+class CacheAsistente:
+    """
+    Cache persistente (SQLite) del asistente de IA.
+
+    Guarda dos cosas, ambas por contexto (motor y version del esquema, ver contexto_cache):
+        - pregunta normalizada -> SQL generado
+        - (pregunta normalizada, version de datos) -> respuesta final
+          (la version de datos cambia con cualquier escritura del censo)
+    """
+
+    def __init__(self, ruta: str = RUTA_CACHE_ASISTENTE):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+        # Estadisticas del cache (aciertos / fallos)
+        self.aciertos_sql = 0
+        self.fallos_sql = 0
+        self.aciertos_respuesta = 0
+        self.fallos_respuesta = 0
+
+        # Una sola conexion compartida entre hilos, protegida por el lock
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            for nombre, columnas, definicion in TABLAS_CACHE:
+                actuales = tuple(fila[1] for fila in self._conexion.execute(f"PRAGMA table_info({nombre})"))
+                if actuales and actuales != columnas:
+                    self._conexion.execute(f"DROP TABLE {nombre}")
+                    actuales = ()
+                if not actuales:
+                    self._conexion.execute(definicion)
+            self._conexion.commit()
+
+    @staticmethod
+    def normalizar_pregunta(pregunta: str) -> str:
+        """
+        Normaliza una pregunta para usarla como llave del cache:
+        minusculas, sin acentos, sin signos de puntuación y con espacios colapsados.
+        Ej. '¿Cuántas  mujeres hay?' -> 'cuantas mujeres hay'
+        """
+        texto = unicodedata.normalize('NFKD', pregunta.lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        texto = re.sub(r"[^\w\s]", " ", texto)
+        return " ".join(texto.split())
+
+    # --- Cache de SQL generado ---
+
+    def obtener_sql(self, pregunta_normalizada: str, contexto: str) -> Optional[str]:
+        """Devuelve el SQL cacheado para la pregunta en el contexto, o None."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT consulta_sql FROM cache_sql WHERE pregunta = ? AND contexto = ?",
+                (pregunta_normalizada, contexto)
+            ).fetchone()
+
+            if fila:
+                self.aciertos_sql += 1
+                ACIERTO_SQL.inc()
+                return fila[0]
+            self.fallos_sql += 1
+            FALLO_SQL.inc()
+            return None
+
+    def guardar_sql(self, pregunta_normalizada: str, contexto: str, consulta_sql: str) -> None:
+        """Guarda (o reemplaza) el SQL generado para la pregunta en el contexto."""
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO cache_sql (pregunta, contexto, consulta_sql, creado) VALUES (?, ?, ?, ?)",
+                (pregunta_normalizada, contexto, consulta_sql, time.time())
+            )
+            self._conexion.commit()
+
+    def descartar_sql(self, pregunta_normalizada: str, contexto: str) -> None:
+        """Borra el SQL cacheado de la pregunta (fallo al ejecutarse: la proxima vez se genera de nuevo)."""
+        with self._lock:
+            self._conexion.execute(
+                "DELETE FROM cache_sql WHERE pregunta = ? AND contexto = ?",
+                (pregunta_normalizada, contexto)
+            )
+            self._conexion.commit()
+
+    # --- Cache de respuestas finales ---
+
+    def obtener_respuesta(self, pregunta_normalizada: str, contexto: str, version_datos: int) -> Optional[str]:
+        """Devuelve la respuesta cacheada para la pregunta, contexto y version de datos, o None."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT respuesta FROM cache_respuesta WHERE pregunta = ? AND contexto = ? AND version_datos = ?",
+                (pregunta_normalizada, contexto, version_datos)
+            ).fetchone()
+
+            if fila:
+                self.aciertos_respuesta += 1
+                ACIERTO_RESPUESTA.inc()
+                return fila[0]
+            self.fallos_respuesta += 1
+            FALLO_RESPUESTA.inc()
+            return None
+
+    def guardar_respuesta(self, pregunta_normalizada: str, contexto: str, version_datos: int, respuesta: str) -> None:
+        """
+        Guarda la respuesta para la version de datos actual.
+        Las respuestas de versiones anteriores de la misma pregunta se descartan.
+        """
+        with self._lock:
+            self._conexion.execute(
+                "DELETE FROM cache_respuesta WHERE pregunta = ? AND contexto = ? AND version_datos <> ?",
+                (pregunta_normalizada, contexto, version_datos)
+            )
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO cache_respuesta (pregunta, contexto, version_datos, respuesta, creado) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (pregunta_normalizada, contexto, version_datos, respuesta, time.time())
+            )
+            self._conexion.commit()
+
+    def limpiar(self) -> None:
+        """Vacia ambos caches (ej. despues de cambiar el esquema o el prompt)."""
+        with self._lock:
+            self._conexion.execute("DELETE FROM cache_sql")
+            self._conexion.execute("DELETE FROM cache_respuesta")
+            self._conexion.commit()
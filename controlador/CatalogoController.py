@@ -1,13 +1,80 @@
+import threading
 from .BaseController import BaseController
 from modelo import Municipio, Localidad, TipoVivienda, ActividadEconomica
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from sqlalchemy.orm import joinedload
+from dao.Metricas import metricas
+from dao.Reintentos import con_reintentos
+
+CONSULTAS_CACHE = metricas.contador(
+    "censo_cache_catalogos_total", "Lecturas de catalogos (acierto = servida de memoria)", ('catalogo', 'resultado'))
 
 class CatalogoController(BaseController):
     """
     Controlador para el CRUD de entidades de catalogo (Municipio, Localidad, etc.)
+
+    Las listas completas de cada catalogo se guardan en memoria: las pestañas
+    (y la precarga despues del login) las comparten sin repetir la consulta.
+    Cualquier escritura de un catalogo invalida todas las listas (las
+    localidades muestran el nombre de su municipio). Las escrituras de otros
+    clientes, de la sincronizacion de campo o de otro proceso se detectan con
+    el sello de version de los datos, que se lee en cada consulta.
     """
 
+    def __init__(self, engine):
+        super().__init__(engine)
+        self._cache_catalogos: Dict[str, list] = {}
+        self._lock_cache = threading.Lock()
+        self._generacion = 0 # Aumenta con cada invalidacion
+        self._version_cache: Optional[int] = None # Sello de version con el que se llenaron las listas
+
+    # --- CACHE DE CATALOGOS ---
+
+    def _catalogo(self, clave: str, cargar: Callable[[], list]) -> list:
+        """
+        Regresa la lista en cache de 'clave'; si no esta, la consulta con 'cargar'.
+        Si el sello de version de los datos cambio desde que se lleno el cache
+        (escritura de cualquier cliente), las listas se descartan.
+        """
+        version = self.censo_dao.obtener_version_datos()
+        with self._lock_cache:
+            if version is None or version != self._version_cache:
+                self._cache_catalogos.clear()
+                self._version_cache = version
+            lista = self._cache_catalogos.get(clave)
+            generacion = self._generacion
+        if lista is not None:
+            CONSULTAS_CACHE.con_etiquetas(clave, 'acierto').inc()
+            return lista
+
+        CONSULTAS_CACHE.con_etiquetas(clave, 'fallo').inc()
+        lista = cargar()
+        # Una lista vacia puede deberse a un error de BD: no se guarda (tampoco sin sello).
+        # Tampoco si hubo una escritura mientras se consultaba (la lista ya es vieja).
+        if lista and version is not None:
+            with self._lock_cache:
+                if generacion == self._generacion and version == self._version_cache:
+                    self._cache_catalogos[clave] = lista
+        return lista
+
+    def invalidar_catalogos(self) -> None:
+        """Descarta las listas en cache (despues de cualquier escritura de catalogos)."""
+        with self._lock_cache:
+            self._cache_catalogos.clear()
+            self._generacion += 1
+
+    def _tras_escritura(self, resultado):
+        """Invalida el cache despues de una escritura (ya confirmada) y regresa su resultado."""
+        self.invalidar_catalogos()
+        return resultado
+
+    def precargar_catalogos(self) -> None:
+        """Consulta y deja en cache todos los catalogos (se usa en la precarga tras el login)."""
+        self.obtener_todos_municipios()
+        self.obtener_todas_localidades()
+        self.obtener_todos_tipos_vivienda()
+        self.obtener_todas_actividades_economicas()
+
     # --- METODOS GENERICOS DE CATALOGO --- 
     # --- De municipios ---
 
@@ -15,8 +82,9 @@ class CatalogoController(BaseController):
         """
         Obtiene la lista de todos los municipios
         """
-        return self.municipio_dao.listar_todos(Municipio)
+        return self._catalogo('municipios', lambda: self.municipio_dao.listar_todos(Municipio))
     
+    @con_reintentos()
     def guardar_municipio(self, nombre_municipio: str) -> Municipio | None:
         """
         Crea y guarda un nuevo municipio.
@@ -30,8 +98,9 @@ class CatalogoController(BaseController):
         nuevo_municipio = Municipio(nombre=nombre_municipio)
         
         # 2. Persistir: Llama al DAO
-        return self.municipio_dao.guardar(nuevo_municipio)
+        return self._tras_escritura(self.municipio_dao.guardar(nuevo_municipio))
     
+    @con_reintentos(idempotente=True)
     def actualizar_municipio(self, id_municipio: int, nombre_nuevo: str) -> Optional[Municipio]:
         """(U)pdate: Actualiza un municipio existente."""
         # 1. Obtener el objeto
@@ -41,12 +110,22 @@ class CatalogoController(BaseController):
             # 2. Modificar el objeto
             municipio.nombre = nombre_nuevo
             # 3. Guardar (el DAO.guardar detecta que es una actualización)
-            return self.municipio_dao.guardar(municipio)
+            return self._tras_escritura(self.municipio_dao.guardar(municipio))
         return None
     
+    @con_reintentos(idempotente=True)
     def eliminar_municipio(self, id_municipio: int) -> bool:
         """(D)elete: Elimina un municipio por su ID."""
-        return self.municipio_dao.eliminar(Municipio, id_municipio)
+        return self._tras_escritura(self.municipio_dao.eliminar(Municipio, id_municipio))
+
+    @con_reintentos(idempotente=True)
+    def eliminar_municipios(self, ids_municipios: List[int]) -> int:
+        """
+        (D)elete en bloque: elimina varios municipios con una sola sentencia.
+        La BD borra en cascada sus localidades, viviendas y habitantes.
+        Retorna cuantos municipios se eliminaron.
+        """
+        return self._tras_escritura(self.municipio_dao.eliminar_varios(Municipio, ids_municipios))
 
     # --- De localidad ---
     
@@ -64,8 +143,9 @@ class CatalogoController(BaseController):
         # Usamos Eager Loading (joinedload) para que 'loc.municipio.nombre'
         # no cause consultas N+1 en la vista.
         opciones = [joinedload(Localidad.municipio)]
-        return self.localidad_dao.listar_todos(Localidad, options=opciones)
+        return self._catalogo('localidades', lambda: self.localidad_dao.listar_todos(Localidad, options=opciones))
     
+    @con_reintentos()
     def guardar_localidad(self, nombre: str, id_municipio: int) -> Optional[Localidad]:
         """(C)rea una nueva localidad."""
         municipio = self.municipio_dao.obtener_por_id(Municipio, id_municipio)
@@ -74,8 +154,9 @@ class CatalogoController(BaseController):
             return None
             
         nueva_localidad = Localidad(nombre=nombre, municipio=municipio)
-        return self.localidad_dao.guardar(nueva_localidad)
+        return self._tras_escritura(self.localidad_dao.guardar(nueva_localidad))
     
+    @con_reintentos(idempotente=True)
     def actualizar_localidad(self, id_localidad: int, nombre_nuevo: str, id_municipio: int) -> Optional[Localidad]:
         """(U)pdate: Actualiza una localidad existente."""
         localidad = self.localidad_dao.obtener_por_id(Localidad, id_localidad)
@@ -87,11 +168,22 @@ class CatalogoController(BaseController):
             
         localidad.nombre = nombre_nuevo
         localidad.municipio = municipio
-        return self.localidad_dao.guardar(localidad)
+        return self._tras_escritura(self.localidad_dao.guardar(localidad))
     
+    @con_reintentos(idempotente=True)
     def eliminar_localidad(self, id_localidad: int) -> bool:
         """(D)elete: Elimina una localidad por su ID."""
-        return self.localidad_dao.eliminar(Localidad, id_localidad)
+        return self._tras_escritura(self.localidad_dao.eliminar(Localidad, id_localidad))
+
+    @con_reintentos(idempotente=True)
+    def mover_localidades(self, ids_localidades: List[int], id_municipio: int) -> int:
+        """(U)pdate en bloque: cambia varias localidades de municipio con una sola sentencia. Retorna cuantas."""
+        return self._tras_escritura(self.localidad_dao.mover_a_municipio(ids_localidades, id_municipio))
+
+    @con_reintentos(idempotente=True)
+    def eliminar_localidades(self, ids_localidades: List[int]) -> int:
+        """(D)elete en bloque: elimina varias localidades (y en cascada sus viviendas). Retorna cuantas."""
+        return self._tras_escritura(self.localidad_dao.eliminar_varios(Localidad, ids_localidades))
     
 
 
@@ -100,54 +192,70 @@ class CatalogoController(BaseController):
         Obtiene todos los tipos de vivienda.
         Usado para el ComboBox de CensoWidget.
         """
-        return self.tipo_vivienda_dao.listar_todos(TipoVivienda)
+        return self._catalogo('tipos_vivienda', lambda: self.tipo_vivienda_dao.listar_todos(TipoVivienda))
     
     def obtener_todas_actividades_economicas(self) -> List[ActividadEconomica]:
         """Obtiene todas las actividades económicas del catálogo."""
-        return self.actividad_dao.listar_todos(ActividadEconomica)
+        return self._catalogo('actividades', lambda: self.actividad_dao.listar_todos(ActividadEconomica))
     
     # --- MÉTODOS CRUD PARA TIPO VIVIENDA (NUEVOS) ---
 
+    @con_reintentos()
     def guardar_tipo_vivienda(self, nombre: str) -> Optional[TipoVivienda]:
         """(C)rea un nuevo tipo de vivienda."""
         if not nombre:
             return None
         nuevo_tipo = TipoVivienda(nombre=nombre)
-        return self.tipo_vivienda_dao.guardar(nuevo_tipo)
+        return self._tras_escritura(self.tipo_vivienda_dao.guardar(nuevo_tipo))
 
+    @con_reintentos(idempotente=True)
     def actualizar_tipo_vivienda(self, id_tipo: int, nombre_nuevo: str) -> Optional[TipoVivienda]:
         """(U)pdate: Actualiza un tipo de vivienda."""
         tipo = self.tipo_vivienda_dao.obtener_por_id(TipoVivienda, id_tipo)
         if tipo:
             tipo.nombre = nombre_nuevo
-            return self.tipo_vivienda_dao.guardar(tipo)
+            return self._tras_escritura(self.tipo_vivienda_dao.guardar(tipo))
         return None
 
+    @con_reintentos(idempotente=True)
     def eliminar_tipo_vivienda(self, id_tipo: int) -> bool:
         """(D)elete: Elimina un tipo de vivienda."""
-        return self.tipo_vivienda_dao.eliminar(TipoVivienda, id_tipo)
+        return self._tras_escritura(self.tipo_vivienda_dao.eliminar(TipoVivienda, id_tipo))
+
+    @con_reintentos(idempotente=True)
+    def eliminar_tipos_vivienda(self, ids_tipos: List[int]) -> int:
+        """(D)elete en bloque: elimina varios tipos de vivienda (y en cascada sus viviendas). Retorna cuantos."""
+        return self._tras_escritura(self.tipo_vivienda_dao.eliminar_varios(TipoVivienda, ids_tipos))
 
     # --- MÉTODOS CRUD PARA ACTIVIDAD ECONOMICA (NUEVOS) ---
 
     def obtener_todas_actividades_economicas(self) -> List[ActividadEconomica]:
         """Obtiene todas las actividades (ya existía para ComboBox)."""
-        return self.actividad_dao.listar_todos(ActividadEconomica)
+        return self._catalogo('actividades', lambda: self.actividad_dao.listar_todos(ActividadEconomica))
 
+    @con_reintentos()
     def guardar_actividad_economica(self, nombre: str) -> Optional[ActividadEconomica]:
         """(C)rea una nueva actividad económica."""
         if not nombre:
             return None
         nueva_actividad = ActividadEconomica(nombre=nombre)
-        return self.actividad_dao.guardar(nueva_actividad)
+        return self._tras_escritura(self.actividad_dao.guardar(nueva_actividad))
 
+    @con_reintentos(idempotente=True)
     def actualizar_actividad_economica(self, id_actividad: int, nombre_nuevo: str) -> Optional[ActividadEconomica]:
         """(U)pdate: Actualiza una actividad económica."""
         actividad = self.actividad_dao.obtener_por_id(ActividadEconomica, id_actividad)
         if actividad:
             actividad.nombre = nombre_nuevo
-            return self.actividad_dao.guardar(actividad)
+            return self._tras_escritura(self.actividad_dao.guardar(actividad))
         return None
 
+    @con_reintentos(idempotente=True)
     def eliminar_actividad_economica(self, id_actividad: int) -> bool:
         """(D)elete: Elimina una actividad económica."""
-        return self.actividad_dao.eliminar(ActividadEconomica, id_actividad)
\ No newline at end of file
+        return self._tras_escritura(self.actividad_dao.eliminar(ActividadEconomica, id_actividad))
+
+    @con_reintentos(idempotente=True)
+    def eliminar_actividades_economicas(self, ids_actividades: List[int]) -> int:
+        """(D)elete en bloque: elimina varias actividades (la BD quita sus asociaciones). Retorna cuantas."""
+        return self._tras_escritura(self.actividad_dao.eliminar_varios(ActividadEconomica, ids_actividades))
\ No newline at end of file
@@ -1,15 +1,36 @@
+import asyncio
 from .BaseController import BaseController
+from dao import AsyncCensoDAO
+from dao.Reintentos import ConflictoConcurrencia, ErrorPersistencia, con_reintentos, es_reintento
 from modelo import Vivienda, Habitante, Localidad, TipoVivienda, ActividadEconomica
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import joinedload, selectinload
 
 class CensoController(BaseController):
     """
     Controlador para el registro de datos de censo y generacion de reportes
+
+    Cada metodo de escritura es una transaccion que se repite ante errores
+    transitorios (deadlock, lock, BD ocupada; ver dao/Reintentos.py). Si no se
+    logra, lanza ErrorTransitorio en vez de regresar None/False.
+
+    Las actualizaciones de Vivienda y Habitante usan concurrencia optimista:
+    si la fila cambio desde la 'version' que vio el usuario, lanzan
+    ConflictoConcurrencia (sin bloquear filas) y la vista fusiona los cambios.
     """
 
+    def __init__(self, engine, async_engine=None):
+        super().__init__(engine)
+        # DAO asincrono opcional (solo si main.py pudo crear un AsyncEngine)
+        self.censo_dao_async = AsyncCensoDAO(async_engine) if async_engine is not None else None
+
+    def soporta_async(self) -> bool:
+        """Indica si el controlador tiene un DAO asincrono disponible."""
+        return self.censo_dao_async is not None
+
     # --- REGISTRO DE DATOS (Usa el factory method) ---
 
+    @con_reintentos()
     def registrar_nueva_vivienda(self, datos_vivienda: Dict[str, Any], id_localidad: int, id_tipo_vivienda: int) -> Vivienda | None:
         """
         Usa el Factory para crear la vivienda y el DAO para guardarla
@@ -33,6 +54,7 @@ class CensoController(BaseController):
             print(f"Error de validacion al crear vivienda: {e}")
             return None
         
+    @con_reintentos()
     def registrar_habitante_en_vivienda(self, id_vivienda: int, datos_habitante: Dict[str, Any]) -> Habitante | None:
         """
         Registra un habitante y lo asocia a una vivienda existente.
@@ -50,19 +72,53 @@ class CensoController(BaseController):
             
             # 2. Asociar (Lógica de Negocio)
             nuevo_habitante.vivienda = vivienda
-            
-            # 3. Persistir (DAO)
-            habitante_guardado = self.censo_dao.guardar(nuevo_habitante)
-            
-            # Lógica de Negocio Adicional: Actualizar contador de habitantes en Vivienda
-            if habitante_guardado:
-                vivienda.total_habitante = int(vivienda.total_habitantes) + 1
-                self.censo_dao.guardar(vivienda) # Actualizar la vivienda
-                return habitante_guardado
-            return None
+
+            # 3. Persistir (DAO): el habitante y el contador de la vivienda ('total_habitantes')
+            # van en la misma transaccion, asi un reintento no cuenta dos veces. El contador
+            # se suma en SQL, sin cambiar la 'version' de la vivienda.
+            return self.censo_dao.guardar_habitante(nuevo_habitante)
         except ValueError as e:
             print(f"Error de validación al crear habitante: {e}")
             return None
+
+    @con_reintentos()
+    def registrar_lote_viviendas(self, lote: List[Dict[str, Any]]) -> Optional[List[int]]:
+        """
+        Registra varias viviendas, cada una con sus habitantes y actividades,
+        en una sola transaccion (todo o nada). Cada elemento del lote:
+            {'vivienda': {...}, 'id_localidad': n, 'id_tipo_vivienda': n,
+             'habitantes': [{...}], 'actividades': [id, ...]}
+        Retorna los IDs de las viviendas en el orden del lote, o None si algo es invalido.
+        """
+        # 1. Catalogos referenciados: una consulta por catalogo (no una por vivienda)
+        localidades = {l.id: l for l in self.localidad_dao.obtener_varios(Localidad, [e['id_localidad'] for e in lote])}
+        tipos = {t.id: t for t in self.tipo_vivienda_dao.obtener_varios(TipoVivienda, [e['id_tipo_vivienda'] for e in lote])}
+        actividades = {a.id: a for a in self.actividad_dao.obtener_varios(
+            ActividadEconomica, [i for e in lote for i in e.get('actividades', [])])}
+
+        try:
+            # 2. Crear objetos (Patron Factory Method)
+            viviendas = []
+            for numero, elemento in enumerate(lote, start=1):
+                faltantes = [i for i in elemento.get('actividades', []) if i not in actividades]
+                if faltantes:
+                    raise ValueError(f"actividades inexistentes {faltantes}")
+                vivienda = self.factory.crear_vivienda(
+                    elemento['vivienda'],
+                    localidades.get(elemento['id_localidad']),
+                    tipos.get(elemento['id_tipo_vivienda'])
+                )
+                vivienda.habitantes = [self.factory.crear_habitante(h) for h in elemento.get('habitantes', [])]
+                vivienda.total_habitantes = str(len(vivienda.habitantes))
+                vivienda.actividades = [actividades[i] for i in set(elemento.get('actividades', []))]
+                viviendas.append(vivienda)
+        except ValueError as e:
+            print(f"Error de validacion en la vivienda {numero} del lote: {e}")
+            return None
+
+        # 3. Persistir todo junto (DAO)
+        guardadas = self.censo_dao.guardar_todos(viviendas)
+        return [v.id for v in guardadas] if guardadas is not None else None
         
 
     # --- MÉTODOS DE REPORTE (Llamada directa al DAO) ---
@@ -74,6 +130,25 @@ class CensoController(BaseController):
         """Llama al DAO para obtener los datos del dashboard, aplicando filtros."""
         return self.censo_dao.obtener_conteo_poblacion_por_ubicacion(municipio_id, localidad_id)
 
+    async def generar_reportes_dashboard_async(self,
+                                               municipio_id: Optional[int] = None,
+                                               localidad_id: Optional[int] = None
+                                               ) -> Dict[str, Any]:
+        """
+        Version asincrona del dashboard: ejecuta los tres reportes en paralelo
+        (cada uno en su propia sesion/conexion) y los devuelve juntos.
+        """
+        poblacion, tipos_vivienda, edades = await asyncio.gather(
+            self.censo_dao_async.obtener_conteo_poblacion_por_ubicacion(municipio_id, localidad_id),
+            self.censo_dao_async.obtener_conteo_por_tipo_vivienda(municipio_id, localidad_id),
+            self.censo_dao_async.obtener_todas_las_edades(municipio_id, localidad_id)
+        )
+        return {
+            'poblacion': poblacion,
+            'tipos_vivienda': tipos_vivienda,
+            'edades': edades
+        }
+
     def generar_reporte_tipos_vivienda(self, 
                                        municipio_id: Optional[int] = None, 
                                        localidad_id: Optional[int] = None
@@ -93,6 +168,55 @@ class CensoController(BaseController):
         ]
         return self.censo_dao.listar_todos(Vivienda, options=opciones)
 
+    def obtener_pagina_viviendas_con_localidad(self, limite: int, desplazamiento: int = 0) -> List[Vivienda]:
+        """
+        Obtiene una pagina de viviendas (ordenadas por ID) con su localidad y tipo.
+        Usado para cargar la tabla de CensoWidget por partes.
+        """
+        opciones = [
+            joinedload(Vivienda.localidad),
+            joinedload(Vivienda.tipo_vivienda)
+        ]
+        return self.censo_dao.listar_pagina(Vivienda, limite, desplazamiento, options=opciones)
+
+    def buscar(self, texto: str, pagina: int = 0, tam_pagina: int = 25, modo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Busqueda global de habitantes (por nombre) y viviendas (por direccion), por paginas.
+        'modo' es el que regreso la pagina 0, para que las siguientes sigan la misma busqueda.
+        """
+        tam_pagina = max(1, min(tam_pagina, 200))
+        return self.censo_dao.buscar(texto, tam_pagina, max(0, pagina) * tam_pagina, modo)
+
+    def iterar_exportacion(self, tabla: str, tam_bloque: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todas las filas de 'viviendas' o 'habitantes' para exportarlas,
+        un bloque a la vez (memoria constante aunque el censo sea grande).
+        """
+        desde_id = 0
+        while True:
+            filas = self.censo_dao.listar_bloque_exportacion(tabla, desde_id, tam_bloque)
+            yield from filas
+            if len(filas) < tam_bloque:
+                return
+            desde_id = filas[-1]['id']
+
+    def obtener_version_datos(self) -> Optional[int]:
+        """Sello de version de los datos (para ETag y caches de reportes)."""
+        return self.censo_dao.obtener_version_datos()
+
+    def obtener_vivienda_detalle(self, id_vivienda: int) -> Optional[Vivienda]:
+        """
+        Obtiene una vivienda con su localidad, tipo, habitantes y actividades
+        (todo cargado, para usarse fuera de la sesion).
+        """
+        opciones = [
+            joinedload(Vivienda.localidad),
+            joinedload(Vivienda.tipo_vivienda),
+            selectinload(Vivienda.habitantes),
+            selectinload(Vivienda.actividades)
+        ]
+        return self.censo_dao.obtener_por_id(Vivienda, id_vivienda, options=opciones)
+
     def obtener_habitantes_por_vivienda(self, id_vivienda: int) -> List[Habitante]:
         """
         (Req 8) Obtiene solo los habitantes de una vivienda específica.
@@ -117,6 +241,7 @@ class CensoController(BaseController):
         return []
     
 
+    @con_reintentos(idempotente=True)
     def asociar_actividad_a_vivienda(self, id_vivienda: int, id_actividad: int) -> bool:
         """Asocia una Actividad (M:M) a una Vivienda."""
         try:
@@ -128,20 +253,32 @@ class CensoController(BaseController):
                 print("Error: No se encontró la vivienda o la actividad.")
                 return False
                 
-            # Verificar si ya existe la asociación
-            if actividad in vivienda.actividades:
+            # Verificar si ya existe la asociación (por ID: cada DAO carga en su propia sesion)
+            if any(a.id == actividad.id for a in vivienda.actividades):
+                if es_reintento():
+                    return True # La creo el intento anterior (se perdio la conexion tras el COMMIT)
                 print("La actividad ya está asociada a la vivienda.")
-                return False # O True, si la idempotencia es deseada
+                return False
             
             # Crear la asociación
             vivienda.actividades.append(actividad)
-            self.censo_dao.guardar(vivienda) # Guardar la entidad 'padre'
-            return True
+            return self.censo_dao.guardar(vivienda) is not None # Guardar la entidad 'padre'
+        except ErrorPersistencia:
+            raise
         except Exception as e:
             print(f"Error al asociar actividad: {e}")
             return False
         
 
+    @con_reintentos(idempotente=True)
+    def asociar_actividad_a_viviendas(self, id_actividad: int, ids_viviendas: List[int]) -> int:
+        """
+        Asocia una Actividad (M:M) a varias Viviendas con una sola sentencia.
+        Las viviendas que ya la tenian se omiten. Retorna cuantas asociaciones se crearon.
+        """
+        return self.censo_dao.asociar_actividad_a_viviendas(id_actividad, ids_viviendas)
+
+    @con_reintentos(idempotente=True)
     def desasociar_actividad_de_vivienda(self, id_vivienda: int, id_actividad: int) -> bool:
         """Desasocia una Actividad (M:M) de una Vivienda."""
         try:
@@ -153,30 +290,92 @@ class CensoController(BaseController):
                 print("Error: No se encontró la vivienda o la actividad.")
                 return False
 
-            # Verificar si la asociación existe y eliminarla
-            if actividad in vivienda.actividades:
-                vivienda.actividades.remove(actividad)
-                self.censo_dao.guardar(vivienda)
-                return True
+            # Verificar si la asociación existe y eliminarla (por ID, como al asociar)
+            asociada = next((a for a in vivienda.actividades if a.id == actividad.id), None)
+            if asociada is not None:
+                vivienda.actividades.remove(asociada)
+                return self.censo_dao.guardar(vivienda) is not None
+            elif es_reintento():
+                return True # La quito el intento anterior
             else:
                 print("Error: La actividad no estaba asociada a esta vivienda.")
                 return False
+        except ErrorPersistencia:
+            raise
         except Exception as e:
             print(f"Error al desasociar actividad: {e}")
             return False
 
     
+    # --- CONCURRENCIA OPTIMISTA ---
+
+    @staticmethod
+    def _verificar_version(entidad, version: Optional[int], objetivo: Dict[str, Any]) -> bool:
+        """
+        Compara la version leida ahora con la que vio el usuario. Si otro usuario
+        guarda entre esta lectura y el UPDATE, el 'WHERE version' del ORM lo detecta.
+
+        Retorna True si la fila ya tiene los valores de 'objetivo' porque los
+        guardo el intento anterior (reintento: version + 1 con lo enviado); en
+        ese caso no hay nada que actualizar.
+        """
+        if version is None or entidad.version == version:
+            return False
+        if es_reintento() and entidad.version == version + 1 and all(
+                getattr(entidad, campo) == valor for campo, valor in objetivo.items()):
+            return True
+        raise ConflictoConcurrencia(type(entidad).__name__, entidad.id, version, entidad.version)
+
+    def obtener_vivienda(self, id_vivienda: int) -> Optional[Vivienda]:
+        """Obtiene una vivienda por su ID (estado actual, para fusionar cambios)."""
+        return self.censo_dao.obtener_por_id(Vivienda, id_vivienda)
+
+    def obtener_habitante(self, id_habitante: int) -> Optional[Habitante]:
+        """Obtiene un habitante por su ID (estado actual, para fusionar cambios)."""
+        return self.censo_dao.obtener_por_id(Habitante, id_habitante)
+
+    @staticmethod
+    def fusionar_cambios(original: Dict[str, Any], mios: Dict[str, Any],
+                         actuales: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Fusion de tres vias de los campos de un formulario:
+        - 'original': como estaban cuando el usuario empezo a editar
+        - 'mios': lo que el usuario quiere guardar
+        - 'actuales': lo que guardo el otro usuario
+
+        Si solo uno de los dos cambio un campo, gana ese cambio. Si ambos lo
+        cambiaron a valores distintos es un conflicto (se propone el del usuario).
+        Retorna (valores fusionados, campos en conflicto).
+        """
+        fusion, conflictos = {}, []
+        for campo, mio in mios.items():
+            base, actual = original.get(campo), actuales.get(campo)
+            if mio == base or mio == actual:
+                fusion[campo] = actual
+            elif actual == base:
+                fusion[campo] = mio
+            else:
+                fusion[campo] = mio
+                conflictos.append(campo)
+        return fusion, conflictos
+
     # --- NUEVOS MÉTODOS PARA CRUD DE VIVIENDA ---
 
-    def actualizar_vivienda(self, id_vivienda: int, datos: Dict[str, Any], id_localidad: int, id_tipo_vivienda: int) -> Optional[Vivienda]:
+    @con_reintentos(idempotente=True)
+    def actualizar_vivienda(self, id_vivienda: int, datos: Dict[str, Any], id_localidad: int, id_tipo_vivienda: int,
+                            version: Optional[int] = None) -> Optional[Vivienda]:
         """
         (U)pdate: Actualiza una vivienda existente.
+        Con 'version' (la que vio el usuario), lanza ConflictoConcurrencia si otro la cambio.
         """
         # 1. Obtener la entidad a actualizar
         vivienda = self.censo_dao.obtener_por_id(Vivienda, id_vivienda)
         if not vivienda:
             print(f"Error: No se encontró la vivienda ID {id_vivienda} para actualizar.")
             return None
+        objetivo = {'direccion': datos["direccion"], 'localidad_id': id_localidad, 'tipo_vivienda_id': id_tipo_vivienda}
+        if self._verificar_version(vivienda, version, objetivo):
+            return vivienda
             
         # 2. Obtener las entidades de relación
         localidad = self.localidad_dao.obtener_por_id(Localidad, id_localidad)
@@ -195,25 +394,43 @@ class CensoController(BaseController):
         # 4. Guardar (el DAO.guardar maneja la actualización)
         return self.censo_dao.guardar(vivienda)
 
-    def eliminar_vivienda(self, id_vivienda: int) -> bool:
+    @con_reintentos(idempotente=True)
+    def eliminar_vivienda(self, id_vivienda: int, version: Optional[int] = None) -> bool:
         """
         (D)elete: Elimina una vivienda por su ID.
-        (La relación 'cascade="all, delete-orphan"' en el Modelo
-        debería eliminar automáticamente a los habitantes).
+        (La BD elimina sus habitantes y asociaciones con ON DELETE CASCADE).
+        Con 'version' (la que vio el usuario), lanza ConflictoConcurrencia si otro la cambio.
+        En un reintento, que ya no exista cuenta como exito (la borro el intento anterior).
+        """
+        if self.censo_dao.eliminar(Vivienda, id_vivienda, version):
+            return True
+        return es_reintento() and self.censo_dao.obtener_por_id(Vivienda, id_vivienda) is None
+
+    @con_reintentos(idempotente=True)
+    def eliminar_viviendas(self, ids_viviendas: List[int]) -> int:
         """
-        return self.censo_dao.eliminar(Vivienda, id_vivienda)
+        (D)elete en bloque: elimina varias viviendas (y sus habitantes) con una sola sentencia.
+        Retorna cuantas se eliminaron.
+        """
+        return self.censo_dao.eliminar_varios(Vivienda, ids_viviendas)
     
     # --- NUEVOS MÉTODOS PARA CRUD DE HABITANTE ---
 
-    def actualizar_habitante(self, id_habitante: int, datos: Dict[str, Any]) -> Optional[Habitante]:
+    @con_reintentos(idempotente=True)
+    def actualizar_habitante(self, id_habitante: int, datos: Dict[str, Any],
+                             version: Optional[int] = None) -> Optional[Habitante]:
         """
         (U)pdate: Actualiza un habitante existente.
+        Con 'version' (la que vio el usuario), lanza ConflictoConcurrencia si otro lo cambio.
         """
         # 1. Obtener la entidad a actualizar
         habitante = self.censo_dao.obtener_por_id(Habitante, id_habitante)
         if not habitante:
             print(f"Error: No se encontró el habitante ID {id_habitante} para actualizar.")
             return None
+        campos = ('nombre_completo', 'edad', 'sexo', 'parentesco_con_jefe_familia')
+        if self._verificar_version(habitante, version, {campo: datos[campo] for campo in campos}):
+            return habitante
             
         # 2. Actualizar los campos
         habitante.nombre_completo = datos["nombre_completo"]
@@ -224,36 +441,19 @@ class CensoController(BaseController):
         # 3. Guardar
         return self.censo_dao.guardar(habitante)
 
-    def eliminar_habitante(self, id_habitante: int) -> bool:
+    @con_reintentos(idempotente=True)
+    def eliminar_habitante(self, id_habitante: int, version: Optional[int] = None) -> bool:
         """
-        (D)elete: Elimina un habitante por su ID y actualiza el conteo de la vivienda.
+        (D)elete: Elimina un habitante por su ID y actualiza el conteo de la vivienda
+        (ambos en una sola transaccion del DAO).
+        Con 'version' (la que vio el usuario), lanza ConflictoConcurrencia si otro lo cambio.
         """
-        # 1. Obtener el habitante y su vivienda (Eager Load)
-        opciones = [joinedload(Habitante.vivienda)]
-        habitante = self.censo_dao.obtener_por_id(Habitante, id_habitante, options=opciones)
-        
-        if not habitante:
-            print(f"Error: No se encontró el habitante ID {id_habitante} para eliminar.")
-            return False
-            
-        vivienda_asociada = habitante.vivienda
-
-        # 2. Eliminar el habitante
-        exito = self.censo_dao.eliminar(Habitante, id_habitante)
-        
-        # 3. Lógica de Negocio: Actualizar el contador de la vivienda
-        if exito and vivienda_asociada:
-            try:
-                # Recalcular el total (la forma más segura es contar)
-                # (Una forma más simple es restar 1 si total_habitantes no es Nulo)
-                if vivienda_asociada.total_habitantes is not None and vivienda_asociada.total_habitantes > 0:
-                    vivienda_asociada.total_habitantes -= 1
-                    self.censo_dao.guardar(vivienda_asociada)
-                return True
-            except Exception as e:
-                print(f"Error al actualizar el conteo de habitantes: {e}")
-                return False # La eliminación fue exitosa pero el conteo falló
-        
+        exito = self.censo_dao.eliminar_habitante(id_habitante, version)
+        if not exito and es_reintento():
+            # Ya no existe: lo borro el intento anterior
+            exito = self.censo_dao.obtener_por_id(Habitante, id_habitante) is None
+        if not exito:
+            print(f"Error: No se pudo eliminar el habitante ID {id_habitante}.")
         return exito
     
 
@@ -0,0 +1,235 @@
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import MetaData
+from modelo import Base
+from .CacheAsistente import CacheAsistente
+from .IntencionesAsistente import IndiceCatalogo
+
+# Tablas que nunca se describen al modelo
+TABLAS_EXCLUIDAS = {'administrador', 'version_datos', 'esquema_version', 'registro_campo'}
+
+# --- PALABRAS CLAVE POR TABLA ---
+# Coincidencia barata (sin acentos ni mayusculas) para decidir que tablas mandar en el prompt
+PALABRAS_POR_TABLA = {
+    'habitante': {
+        'habitante', 'habitantes', 'persona', 'personas', 'gente', 'poblacion', 'censados', 'censadas',
+        'mujer', 'mujeres', 'hombre', 'hombres', 'sexo', 'genero', 'edad', 'edades', 'anos',
+        'mayores', 'menores', 'nino', 'ninos', 'adultos', 'parentesco', 'jefe', 'jefa', 'conyuge',
+        'hijo', 'hijos', 'hija', 'hijas', 'familia', 'familias', 'nombre', 'llama', 'viven', 'vive',
+    },
+    'vivienda': {
+        'vivienda', 'viviendas', 'casa', 'casas', 'hogar', 'hogares', 'direccion', 'domicilio',
+        'calle', 'coordenadas', 'gps', 'fecha', 'censo', 'censada', 'censadas',
+    },
+    'localidad': {'localidad', 'localidades', 'colonia', 'colonias', 'comunidad', 'comunidades', 'pueblo'},
+    'municipio': {'municipio', 'municipios'},
+    'tipo_vivienda': {
+        'tipo', 'tipos', 'material', 'materiales', 'construccion', 'construida',
+        'concreto', 'adobe', 'ladrillo', 'madera', 'carton', 'piedra', 'prefabricada', 'paja',
+    },
+    'actividad_economica': {
+        'actividad', 'actividades', 'economica', 'economicas', 'sosten', 'sostienen', 'sostiene',
+        'trabajo', 'trabajan', 'empleo', 'ingreso', 'ingresos', 'ocupacion', 'economia',
+    },
+}
+
+# Tablas que se agregan por cada tipo de nombre de catalogo encontrado en la pregunta
+TABLAS_POR_CATALOGO = {
+    'municipio': 'municipio',
+    'localidad': 'localidad',
+    'tipo_vivienda': 'tipo_vivienda',
+    'actividad_economica': 'actividad_economica',
+}
+
+# --- DIALECTOS ---
+# Nombre para el prompt y tipo entero valido en CAST(... AS tipo) por dialecto de SQLAlchemy
+NOMBRES_DIALECTO = {'mysql': 'MySQL', 'mariadb': 'MariaDB', 'sqlite': 'SQLite', 'postgresql': 'PostgreSQL'}
+TIPO_ENTERO_CAST = {'mysql': 'UNSIGNED', 'mariadb': 'UNSIGNED'} # Los demas usan INTEGER
+
+# --- EJEMPLOS (Pregunta -> SQL) ---
+# Cada ejemplo declara las tablas que usa; solo se envian los que caben en las tablas elegidas.
+# '{entero}' se reemplaza por el tipo entero del dialecto (TIPO_ENTERO_CAST)
+EJEMPLOS_SQL = [
+    ("¿Cuántos habitantes hay en total?",
+     "SELECT COUNT(*) FROM habitante;",
+     {'habitante'}),
+    ("¿Cuántas mujeres hay?",
+     "SELECT COUNT(*) FROM habitante WHERE sexo = 'F';",
+     {'habitante'}),
+    ("¿Cuántos hombres viven en Saltillo?",
+     "SELECT COUNT(t1.id) FROM habitante AS t1 JOIN vivienda AS t2 ON t1.vivienda_id = t2.id JOIN localidad AS t3 ON t2.localidad_id = t3.id JOIN municipio AS t4 ON t3.municipio_id = t4.id WHERE t1.sexo = 'M' AND LOWER(t4.nombre) = 'saltillo';",
+     {'habitante', 'vivienda', 'localidad', 'municipio'}),
+    ("¿Cuál es el total de habitantes censados (usando la columna total_habitantes de vivienda)?",
+     "SELECT SUM(CAST(total_habitantes AS {entero})) FROM vivienda;",
+     {'vivienda'}),
+    ("¿Cuál es el promedio de edad de las mujeres en Torreón?",
+     "SELECT AVG(t1.edad) FROM habitante AS t1 JOIN vivienda AS t2 ON t1.vivienda_id = t2.id JOIN localidad AS t3 ON t2.localidad_id = t3.id JOIN municipio AS t4 ON t3.municipio_id = t4.id WHERE t1.sexo = 'F' AND LOWER(t4.nombre) = 'torreón';",
+     {'habitante', 'vivienda', 'localidad', 'municipio'}),
+    ("¿Cuántas viviendas de 'Vivienda de ladrillo' hay?",
+     "SELECT COUNT(t1.id) FROM vivienda AS t1 JOIN tipo_vivienda AS t2 ON t1.tipo_vivienda_id = t2.id WHERE LOWER(t2.nombre) = 'vivienda de ladrillo';",
+     {'vivienda', 'tipo_vivienda'}),
+    ("¿Qué actividades económicas sostienen la vivienda de 'Ana García'?",
+     "SELECT t3.nombre FROM vivienda AS t1 JOIN vivienda_actividad AS t2 ON t1.id = t2.vivienda_id JOIN actividad_economica AS t3 ON t2.actividad_id = t3.id JOIN habitante AS t4 ON t1.id = t4.vivienda_id WHERE LOWER(t4.nombre_completo) = 'ana garcía';",
+     {'habitante', 'vivienda', 'vivienda_actividad', 'actividad_economica'}),
+]
+
+
+class EsquemaAsistente:
+    """
+    Descripcion del esquema para el prompt del asistente, generada desde Base.metadata
+    (tipos, nulabilidad, llaves, comentarios de columna y valores validos en
+    column.info['valores']), para que no se desincronice de 'modelo'.
+
+    Cada tabla se describe una sola vez; las combinaciones de tablas ya armadas
+    se guardan en memoria. Por pregunta solo se envian las tablas relevantes
+    (palabras clave + nombres de catalogo, incluidas las actividades economicas)
+    mas las necesarias para unirlas.
+
+    'dialecto' (engine.dialect.name) ajusta los ejemplos y las reglas al SQL
+    de la BD que ejecutara las consultas (MySQL por defecto).
+    """
+
+    def __init__(self, metadata: MetaData = Base.metadata, excluir: Iterable[str] = TABLAS_EXCLUIDAS,
+                 dialecto: str = 'mysql'):
+        self.metadata = metadata
+        self.dialecto = dialecto
+        self.nombre_dialecto = NOMBRES_DIALECTO.get(dialecto, dialecto)
+        self.tipo_entero = TIPO_ENTERO_CAST.get(dialecto, 'INTEGER')
+        self.tablas = {nombre: tabla for nombre, tabla in metadata.tables.items() if nombre not in set(excluir)}
+        self._lock = threading.Lock()
+
+        # Texto por tabla (generado una sola vez) y por combinacion de tablas
+        self._descripciones: Dict[str, str] = {nombre: self._describir_tabla(tabla) for nombre, tabla in self.tablas.items()}
+        self._cache_esquemas: Dict[FrozenSet[str], str] = {}
+
+        # Grafo no dirigido de llaves foraneas, para completar las rutas de JOIN
+        self._vecinos: Dict[str, Set[str]] = {nombre: set() for nombre in self.tablas}
+        for nombre, tabla in self.tablas.items():
+            for llave in tabla.foreign_keys:
+                destino = llave.column.table.name
+                if destino in self._vecinos:
+                    self._vecinos[nombre].add(destino)
+                    self._vecinos[destino].add(nombre)
+
+    # --- Descripcion de tablas ---
+
+    @staticmethod
+    def _describir_tabla(tabla) -> str:
+        """Texto tipo CREATE TABLE, con los comentarios y valores validos como comentarios SQL."""
+        lineas = []
+        if tabla.comment:
+            lineas.append(f"-- {tabla.comment}")
+        lineas.append(f"CREATE TABLE {tabla.name} (")
+
+        definiciones = []
+        for columna in tabla.columns:
+            definicion = f"{columna.name} {columna.type}"
+            if not columna.nullable and not columna.primary_key:
+                definicion += " NOT NULL"
+
+            notas = []
+            if columna.comment:
+                notas.append(columna.comment)
+            valores = columna.info.get('valores')
+            if valores:
+                notas.append("valores: " + ", ".join(f"'{v}'" for v in valores))
+            definiciones.append((definicion, " -- " + "; ".join(notas) if notas else ""))
+
+        llaves_primarias = [c.name for c in tabla.primary_key.columns]
+        if llaves_primarias:
+            definiciones.append((f"PRIMARY KEY ({', '.join(llaves_primarias)})", ""))
+        for llave in sorted(tabla.foreign_keys, key=lambda fk: fk.parent.name):
+            definiciones.append((
+                f"FOREIGN KEY ({llave.parent.name}) REFERENCES {llave.column.table.name} ({llave.column.name})", ""
+            ))
+
+        for i, (definicion, nota) in enumerate(definiciones):
+            coma = "," if i < len(definiciones) - 1 else ""
+            lineas.append(f"    {definicion}{coma}{nota}")
+        lineas.append(");")
+        return "\n".join(lineas)
+
+    def describir(self, tablas: Optional[Iterable[str]] = None) -> str:
+        """Esquema de las tablas indicadas (todas si es None), en orden de dependencias."""
+        elegidas = frozenset(tablas) if tablas is not None else frozenset(self.tablas)
+        with self._lock:
+            texto = self._cache_esquemas.get(elegidas)
+            if texto is None:
+                orden = [t.name for t in self.metadata.sorted_tables if t.name in elegidas]
+                texto = "\n\n".join(self._descripciones[nombre] for nombre in orden)
+                self._cache_esquemas[elegidas] = texto
+            return texto
+
+    # --- Seleccion de tablas relevantes ---
+
+    def _ruta(self, origen: Set[str], destino: str) -> List[str]:
+        """Ruta mas corta (BFS por llaves foraneas) desde cualquier tabla de 'origen' hasta 'destino'."""
+        anteriores = {tabla: None for tabla in origen}
+        pendientes = deque(origen)
+        while pendientes:
+            actual = pendientes.popleft()
+            if actual == destino:
+                ruta = []
+                while actual is not None:
+                    ruta.append(actual)
+                    actual = anteriores[actual]
+                return ruta
+            for vecino in sorted(self._vecinos.get(actual, ())):
+                if vecino not in anteriores:
+                    anteriores[vecino] = actual
+                    pendientes.append(vecino)
+        return [destino]
+
+    @staticmethod
+    def _nombres_propios(pregunta: str) -> Set[int]:
+        """
+        Posiciones (en los tokens de normalizar_pregunta) de las palabras con
+        mayuscula inicial, sin contar la primera: nombres de personas, calles o lugares.
+        """
+        texto = unicodedata.normalize('NFKD', pregunta)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        palabras = re.sub(r"[^\w\s]", " ", texto).split()
+        return {i for i, palabra in enumerate(palabras) if i > 0 and palabra[0].isupper()}
+
+    def tablas_relevantes(self, pregunta: str, indice: Optional[IndiceCatalogo] = None) -> Set[str]:
+        """
+        Tablas que probablemente necesita la pregunta, mas las tablas intermedias
+        para poder unirlas. Si no se reconoce ninguna, o si la pregunta trae un
+        nombre propio que no es de catalogo (una persona como 'Ana García', una
+        calle), se regresan todas: no se sabe en que tabla buscarlo.
+        """
+        tokens = tuple(CacheAsistente.normalizar_pregunta(pregunta).split())
+        palabras = set(tokens)
+
+        # Orden estable (el de las dependencias) para que la ruta de JOIN sea determinista
+        candidatas = [t.name for t in self.metadata.sorted_tables
+                      if t.name in self.tablas and palabras & PALABRAS_POR_TABLA.get(t.name, set())]
+        sin_resolver = self._nombres_propios(pregunta)
+        if indice is not None:
+            for inicio, fin, tipo, _, _ in indice.buscar(tokens):
+                sin_resolver -= set(range(inicio, fin))
+                tabla = TABLAS_POR_CATALOGO.get(tipo)
+                if tabla in self.tablas and tabla not in candidatas:
+                    candidatas.append(tabla)
+
+        if not candidatas or sin_resolver:
+            return set(self.tablas)
+
+        elegidas = {candidatas[0]}
+        for tabla in candidatas[1:]:
+            elegidas.update(self._ruta(elegidas, tabla))
+        return elegidas
+
+    # --- Ejemplos ---
+
+    def cast_entero(self, columna: str) -> str:
+        """Expresion para convertir una columna de texto a entero en el dialecto de la BD."""
+        return f"CAST({columna} AS {self.tipo_entero})"
+
+    def ejemplos(self, tablas: Set[str]) -> List[Tuple[str, str]]:
+        """Ejemplos (pregunta, sql) que solo usan tablas incluidas en el prompt."""
+        return [(pregunta, sql.replace('{entero}', self.tipo_entero))
+                for pregunta, sql, usadas in EJEMPLOS_SQL if usadas <= tablas]
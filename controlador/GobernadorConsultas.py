@@ -0,0 +1,301 @@
+import re
+import time
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+import sqlalchemy
+from sqlalchemy.exc import DBAPIError
+
+
+class ConsultaRechazada(Exception):
+    """
+    El SQL generado por el modelo no paso las validaciones del gobernador
+    (no es de solo lectura, es demasiado costoso o excedio el tiempo limite).
+    """
+    pass
+
+
+class ResultadoConsulta:
+    """
+    Resultado acotado de una consulta gobernada.
+
+    Attributes:
+        columnas: nombres de las columnas
+        filas: como maximo 'max_filas' filas
+        truncado: True si la consulta devolvia mas filas que el limite
+        filas_estimadas: estimacion del plan (EXPLAIN), o None si no se pudo calcular
+    """
+
+    def __init__(self, columnas: List[str], filas: List[Tuple], truncado: bool, filas_estimadas: Optional[float]):
+        self.columnas = columnas
+        self.filas = filas
+        self.truncado = truncado
+        self.filas_estimadas = filas_estimadas
+
+
+# --- Tokenizador minimo de SQL ---
+# Suficiente para distinguir palabras clave de cadenas, identificadores y comentarios.
+_PATRON_TOKEN = re.compile(
+    r"""
+      (?P<comentario>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+    | (?P<cadena>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    | (?P<identificador>`(?:[^`]|``)*`)
+    | (?P<palabra>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<numero>\d+(?:\.\d+)?)
+    | (?P<espacio>\s+)
+    | (?P<simbolo>.)
+    """,
+    re.VERBOSE | re.DOTALL
+)
+
+# Palabras que nunca deben aparecer (fuera de cadenas) en una consulta del asistente
+PALABRAS_PROHIBIDAS = {
+    'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'UPSERT',
+    'DROP', 'ALTER', 'CREATE', 'TRUNCATE', 'RENAME',
+    'GRANT', 'REVOKE', 'CALL', 'EXEC', 'EXECUTE', 'PREPARE', 'DEALLOCATE',
+    'LOAD', 'HANDLER', 'LOCK', 'UNLOCK', 'SET', 'INTO', 'OUTFILE', 'DUMPFILE',
+    'ATTACH', 'DETACH', 'PRAGMA', 'VACUUM', 'SLEEP', 'BENCHMARK', 'GET_LOCK',
+}
+
+
+class GobernadorConsultas:
+    """
+    Valida y ejecuta de forma acotada el SQL generado por el asistente.
+
+    - Solo una sentencia, y debe ser SELECT (o WITH ... SELECT).
+    - Inyecta un LIMIT, o reduce el que traiga la consulta, a 'max_filas'.
+    - Limita el tiempo de ejecucion por sentencia (MySQL: max_execution_time,
+      SQLite: progress handler).
+    - En MySQL rechaza los planes cuyo EXPLAIN estima mas de 'max_filas_estimadas' filas.
+    - Resume los resultados grandes antes de mandarlos al prompt.
+
+    Args:
+        max_filas: filas maximas que se leen de la base de datos
+        timeout_ms: tiempo maximo de ejecucion por sentencia (milisegundos)
+        max_filas_estimadas: umbral del EXPLAIN (None para no revisar el plan)
+        max_filas_prompt: filas que se copian literalmente al prompt
+    """
+
+    def __init__(self, max_filas: int = 200, timeout_ms: int = 5000,
+                 max_filas_estimadas: Optional[float] = 10_000_000, max_filas_prompt: int = 30):
+        self.max_filas = max_filas
+        self.timeout_ms = timeout_ms
+        self.max_filas_estimadas = max_filas_estimadas
+        self.max_filas_prompt = max_filas_prompt
+
+    # --- Validacion ---
+
+    @staticmethod
+    def _tokenizar(sql: str) -> List[Tuple[str, str, int, int]]:
+        """Devuelve (tipo, valor, inicio, fin) por token, sin espacios."""
+        tokens = []
+        for coincidencia in _PATRON_TOKEN.finditer(sql):
+            tipo = coincidencia.lastgroup
+            if tipo == 'espacio':
+                continue
+            tokens.append((tipo, coincidencia.group(), coincidencia.start(), coincidencia.end()))
+        return tokens
+
+    def validar(self, sql: str) -> str:
+        """
+        Verifica que el SQL sea una sola sentencia de solo lectura.
+        Retorna el SQL limpio (sin comentarios ni ';' final) o lanza ConsultaRechazada.
+        """
+        sql = sql.strip()
+        tokens = self._tokenizar(sql)
+
+        # Los comentarios ejecutables de MySQL (/*! ... */) se ejecutarian como SQL
+        if any(tipo == 'comentario' and valor.startswith('/*!') for tipo, valor, _, _ in tokens):
+            raise ConsultaRechazada("La consulta contiene comentarios ejecutables")
+
+        tokens = [t for t in tokens if t[0] != 'comentario']
+        while tokens and tokens[-1][1] == ';':
+            tokens.pop()
+
+        if not tokens:
+            raise ConsultaRechazada("La consulta esta vacia")
+        if any(valor == ';' for _, valor, _, _ in tokens):
+            raise ConsultaRechazada("Solo se permite una sentencia por consulta")
+
+        primera = tokens[0][1].upper()
+        if tokens[0][0] != 'palabra' or primera not in ('SELECT', 'WITH'):
+            raise ConsultaRechazada("Solo se permiten consultas de tipo SELECT")
+
+        for tipo, valor, _, _ in tokens:
+            if tipo == 'palabra' and valor.upper() in PALABRAS_PROHIBIDAS:
+                raise ConsultaRechazada(f"La consulta contiene una operacion no permitida: {valor.upper()}")
+
+        # Se reconstruye el texto sin comentarios (un espacio donde habia separacion)
+        partes = []
+        for i, (_, valor, inicio, _) in enumerate(tokens):
+            if i > 0 and inicio > tokens[i - 1][3]:
+                partes.append(" ")
+            partes.append(valor)
+        return "".join(partes)
+
+    def aplicar_limite(self, sql: str) -> str:
+        """
+        Agrega 'LIMIT max_filas + 1' al nivel superior de la consulta, o reduce
+        el LIMIT existente si es mayor. La fila extra solo sirve para saber si se trunco.
+        """
+        limite = self.max_filas + 1
+        tokens = self._tokenizar(sql)
+
+        profundidad = 0
+        posicion_limit = None
+        for i, (_, valor, _, _) in enumerate(tokens):
+            if valor == '(':
+                profundidad += 1
+            elif valor == ')':
+                profundidad -= 1
+            elif profundidad == 0 and valor.upper() == 'LIMIT':
+                posicion_limit = i
+
+        if posicion_limit is None:
+            return f"{sql} LIMIT {limite}"
+
+        # LIMIT n | LIMIT desplazamiento, n | LIMIT n OFFSET desplazamiento
+        siguientes = tokens[posicion_limit + 1:posicion_limit + 4]
+        if not siguientes or siguientes[0][0] != 'numero':
+            raise ConsultaRechazada("El LIMIT de la consulta no es un numero")
+        conteo = siguientes[0]
+        if len(siguientes) >= 3 and siguientes[1][1] == ',':
+            if siguientes[2][0] != 'numero':
+                raise ConsultaRechazada("El LIMIT de la consulta no es un numero")
+            conteo = siguientes[2]
+
+        if int(float(conteo[1])) <= limite:
+            return sql
+        return sql[:conteo[2]] + str(limite) + sql[conteo[3]:]
+
+    # --- Plan de ejecucion ---
+
+    def estimar_filas(self, connection, sql: str) -> Optional[float]:
+        """
+        Estima las filas que examinara la consulta con EXPLAIN (solo MySQL/MariaDB).
+        Para cada SELECT del plan se multiplican las filas de sus tablas (nested loop,
+        ajustado por 'filtered') y se suman los SELECT. Retorna None si no aplica.
+        """
+        if connection.dialect.name not in ('mysql', 'mariadb'):
+            return None
+
+        try:
+            plan = connection.execute(sqlalchemy.text(f"EXPLAIN {sql}")).mappings().all()
+        except DBAPIError as e:
+            print(f"[Debug IA] No se pudo obtener el plan de la consulta: {e}")
+            return None
+
+        productos = {}
+        for paso in plan:
+            filas = paso.get('rows')
+            if filas is None:
+                continue
+            filtrado = paso.get('filtered')
+            factor = float(filas) * (float(filtrado) / 100 if filtrado is not None else 1.0)
+            id_select = paso.get('id')
+            productos[id_select] = productos.get(id_select, 1.0) * max(factor, 1.0)
+        return sum(productos.values()) if productos else None
+
+    # --- Ejecucion ---
+
+    def _configurar_timeout(self, connection) -> Optional[float]:
+        """
+        Aplica el limite de tiempo a la conexion.
+        En SQLite retorna el instante limite que revisa el progress handler.
+        """
+        dialecto = connection.dialect.name
+        # Las conexiones de crear_engine_asistente ya traen el limite de la sesion
+        info_conexion = connection.connection.info
+        if dialecto != 'sqlite' and info_conexion.get('max_execution_time') == self.timeout_ms:
+            return None
+
+        if dialecto in ('mysql', 'mariadb'):
+            # Solo afecta a sentencias SELECT, que son las unicas permitidas
+            connection.execute(sqlalchemy.text(f"SET SESSION max_execution_time = {int(self.timeout_ms)}"))
+            info_conexion['max_execution_time'] = self.timeout_ms
+        elif dialecto == 'postgresql':
+            connection.execute(sqlalchemy.text(f"SET LOCAL statement_timeout = {int(self.timeout_ms)}"))
+        elif dialecto == 'sqlite':
+            limite = time.monotonic() + self.timeout_ms / 1000
+            conexion_dbapi = connection.connection.dbapi_connection
+            # Se revisa cada 10k instrucciones de la VM de SQLite; un valor distinto de 0 interrumpe
+            conexion_dbapi.set_progress_handler(lambda: int(time.monotonic() > limite), 10_000)
+            return limite
+        return None
+
+    @staticmethod
+    def _es_timeout(error: DBAPIError) -> bool:
+        """Identifica los errores de 'tiempo excedido' de cada motor."""
+        original = getattr(error, 'orig', None)
+        codigo = original.args[0] if original is not None and original.args else None
+        # MySQL 3024: maximum statement execution time exceeded; MariaDB 1969
+        if codigo in (3024, 1969):
+            return True
+        mensaje = str(original).lower()
+        return 'interrupted' in mensaje or 'statement timeout' in mensaje
+
+    def ejecutar(self, engine, sql: str) -> ResultadoConsulta:
+        """
+        Valida, limita y ejecuta el SQL. Lanza ConsultaRechazada si no pasa
+        las validaciones, si el plan es demasiado costoso o si excede el tiempo limite.
+        """
+        sql_limitado = self.aplicar_limite(self.validar(sql))
+
+        with engine.connect() as connection:
+            filas_estimadas = None
+            if self.max_filas_estimadas is not None:
+                filas_estimadas = self.estimar_filas(connection, sql_limitado)
+                if filas_estimadas is not None and filas_estimadas > self.max_filas_estimadas:
+                    print(f"[Debug IA] Plan rechazado: ~{filas_estimadas:,.0f} filas estimadas")
+                    raise ConsultaRechazada("La consulta es demasiado costosa para ejecutarse")
+
+            es_sqlite = self._configurar_timeout(connection) is not None
+            try:
+                resultado = connection.execute(sqlalchemy.text(sql_limitado))
+                columnas = list(resultado.keys())
+                filas = [tuple(fila) for fila in resultado.fetchmany(self.max_filas + 1)]
+                resultado.close()
+            except DBAPIError as e:
+                if self._es_timeout(e):
+                    raise ConsultaRechazada("La consulta excedio el tiempo limite") from e
+                raise
+            finally:
+                if es_sqlite:
+                    connection.connection.dbapi_connection.set_progress_handler(None, 0)
+
+        truncado = len(filas) > self.max_filas
+        return ResultadoConsulta(columnas, filas[:self.max_filas], truncado, filas_estimadas)
+
+    # --- Resumen para el prompt ---
+
+    @staticmethod
+    def _es_numero(valor: Any) -> bool:
+        return isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool)
+
+    def resumir_para_prompt(self, resultado: ResultadoConsulta) -> str:
+        """
+        Texto del resultado para el prompt de la respuesta.
+        Los resultados chicos se copian tal cual; los grandes se resumen con
+        las primeras filas y estadisticas de las columnas numericas.
+        """
+        filas = resultado.filas
+        if len(filas) <= self.max_filas_prompt and not resultado.truncado:
+            return str(filas)
+
+        lineas = [
+            f"Columnas: {', '.join(resultado.columnas)}",
+            f"Filas: {'mas de ' if resultado.truncado else ''}{len(filas)}{' (resultado truncado)' if resultado.truncado else ''}",
+            f"Primeras {self.max_filas_prompt} filas: {filas[:self.max_filas_prompt]}",
+        ]
+
+        for indice, columna in enumerate(resultado.columnas):
+            valores = [fila[indice] for fila in filas if fila[indice] is not None]
+            if valores and all(self._es_numero(v) for v in valores):
+                numeros = [float(v) for v in valores]
+                lineas.append(
+                    f"Columna '{columna}': minimo={min(numeros):g}, maximo={max(numeros):g}, "
+                    f"suma={sum(numeros):g}, promedio={sum(numeros) / len(numeros):.2f}"
+                )
+            elif valores:
+                lineas.append(f"Columna '{columna}': {len(set(valores))} valores distintos")
+
+        return "\n".join(lineas)
@@ -0,0 +1,377 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+from modelo import Habitante, Vivienda, Localidad, Municipio, TipoVivienda, ActividadEconomica
+from .CacheAsistente import CacheAsistente
+
+# --- VOCABULARIO RECONOCIDO ---
+# Una pregunta solo entra a la ruta rapida si TODAS sus palabras (fuera de los nombres
+# de catalogo) pertenecen a este vocabulario. Cualquier otra palabra ('mayores',
+# 'actividad', 'nombre', ...) cambia el significado y se delega al modelo.
+PALABRAS_CONTEO = {'cuantos', 'cuantas', 'cuanta', 'cuanto', 'numero', 'cantidad', 'total'}
+PALABRAS_HABITANTES = {'habitantes', 'habitante', 'personas', 'persona', 'gente', 'poblacion', 'censados', 'censadas'}
+PALABRAS_MUJERES = {'mujeres', 'mujer'}
+PALABRAS_HOMBRES = {'hombres', 'hombre'}
+PALABRAS_VIVIENDAS = {'viviendas', 'vivienda', 'casas', 'casa'}
+PALABRAS_PROMEDIO = {'promedio', 'media'}
+PALABRAS_EDAD = {'edad', 'edades'}
+PALABRAS_AGRUPACION = {'por', 'cada'}
+PALABRAS_MUNICIPIO = {'municipio', 'municipios'}
+PALABRAS_LOCALIDAD = {'localidad', 'localidades'}
+PALABRAS_SEXO = {'sexo', 'genero'}
+PALABRAS_TIPO = {'tipo', 'tipos', 'material'}
+PALABRAS_RELLENO = {
+    'hay', 'en', 'el', 'la', 'los', 'las', 'de', 'del', 'a', 'al', 'y', 'es', 'son', 'cual',
+    'viven', 'vive', 'registrados', 'registradas', 'existen', 'tiene', 'tienen',
+    'totales', 'dame', 'dime', 'muestra', 'muestrame', 'que', 'con'
+}
+VOCABULARIO = (
+    PALABRAS_CONTEO | PALABRAS_HABITANTES | PALABRAS_MUJERES | PALABRAS_HOMBRES |
+    PALABRAS_VIVIENDAS | PALABRAS_PROMEDIO | PALABRAS_EDAD | PALABRAS_AGRUPACION |
+    PALABRAS_MUNICIPIO | PALABRAS_LOCALIDAD | PALABRAS_SEXO | PALABRAS_TIPO | PALABRAS_RELLENO
+)
+
+# Prefijos que se quitan de los tipos de vivienda para crear alias ('Vivienda de ladrillo' -> 'ladrillo')
+PREFIJOS_TIPO_VIVIENDA = (('vivienda', 'de'), ('casa', 'de'), ('material',), ('vivienda',))
+
+
+def _tokens(texto: str) -> Tuple[str, ...]:
+    """Normaliza (sin acentos ni puntuación) y separa en palabras."""
+    return tuple(CacheAsistente.normalizar_pregunta(texto).split())
+
+
+class IndiceCatalogo:
+    """
+    Indice en memoria de los nombres de catalogo (municipios, localidades, tipos de vivienda
+    y actividades economicas) para resolver los nombres que aparecen en una pregunta.
+    Se recarga solo cuando cambia la version de los datos del censo.
+    """
+
+    def __init__(self):
+        self.version_datos = None
+        # Cada entrada: (tokens del alias, tipo de entidad, id, nombre original)
+        self.entradas: List[Tuple[Tuple[str, ...], str, int, str]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_nombres(cls,
+                      municipios: Iterable[Tuple[int, str]] = (),
+                      localidades: Iterable[Tuple[int, str]] = (),
+                      tipos_vivienda: Iterable[Tuple[int, str]] = (),
+                      actividades: Iterable[Tuple[int, str]] = ()) -> "IndiceCatalogo":
+        """Construye el indice a partir de listas (id, nombre). Util para pruebas sin BD."""
+        indice = cls()
+        indice._construir(municipios, localidades, tipos_vivienda, actividades)
+        return indice
+
+    def _construir(self, municipios, localidades, tipos_vivienda, actividades=()) -> None:
+        entradas = []
+        for id_municipio, nombre in municipios:
+            entradas.append((_tokens(nombre), 'municipio', id_municipio, nombre))
+        for id_localidad, nombre in localidades:
+            entradas.append((_tokens(nombre), 'localidad', id_localidad, nombre))
+        for id_tipo, nombre in tipos_vivienda:
+            tokens = _tokens(nombre)
+            entradas.append((tokens, 'tipo_vivienda', id_tipo, nombre))
+            for prefijo in PREFIJOS_TIPO_VIVIENDA:
+                if tokens[:len(prefijo)] == prefijo and len(tokens) > len(prefijo):
+                    entradas.append((tokens[len(prefijo):], 'tipo_vivienda', id_tipo, nombre))
+                    break
+        for id_actividad, nombre in actividades:
+            entradas.append((_tokens(nombre), 'actividad_economica', id_actividad, nombre))
+
+        # Los alias que apuntan a mas de una entidad distinta son ambiguos: se descartan
+        destinos: Dict[Tuple[str, ...], set] = {}
+        for tokens, tipo, id_entidad, _ in entradas:
+            destinos.setdefault(tokens, set()).add((tipo, id_entidad))
+        self.entradas = [e for e in entradas if e[0] and len(destinos[e[0]]) == 1]
+
+    def actualizar(self, engine, version_datos: Optional[int]) -> None:
+        """Recarga los nombres desde la BD si la version de datos cambio."""
+        with self._lock:
+            if version_datos is not None and version_datos == self.version_datos:
+                return
+            try:
+                with engine.connect() as connection:
+                    municipios = connection.execute(select(Municipio.id, Municipio.nombre)).all()
+                    localidades = connection.execute(select(Localidad.id, Localidad.nombre)).all()
+                    tipos = connection.execute(select(TipoVivienda.id, TipoVivienda.nombre)).all()
+                    actividades = connection.execute(select(ActividadEconomica.id, ActividadEconomica.nombre)).all()
+            except SQLAlchemyError as e:
+                print(f"[Debug IA] No se pudo cargar el indice de catalogos: {e}")
+                return
+            self._construir(municipios, localidades, tipos, actividades)
+            self.version_datos = version_datos
+
+    def buscar(self, tokens: Tuple[str, ...]) -> List[Tuple[int, int, str, int, str]]:
+        """
+        Encuentra los nombres de catalogo presentes en la pregunta.
+        Retorna (inicio, fin, tipo, id, nombre) sin traslapes, prefiriendo los mas largos.
+        """
+        candidatos = []
+        for alias, tipo, id_entidad, nombre in self.entradas:
+            n = len(alias)
+            for inicio in range(len(tokens) - n + 1):
+                if tokens[inicio:inicio + n] == alias:
+                    candidatos.append((inicio, inicio + n, tipo, id_entidad, nombre))
+
+        # Mas largos primero; a igual longitud, municipio antes que localidad
+        prioridad = {'municipio': 0, 'localidad': 1, 'tipo_vivienda': 2, 'actividad_economica': 3}
+        candidatos.sort(key=lambda c: (-(c[1] - c[0]), prioridad[c[2]]))
+
+        ocupados = set()
+        elegidos = []
+        for candidato in candidatos:
+            rango = set(range(candidato[0], candidato[1]))
+            if rango & ocupados:
+                continue
+            ocupados |= rango
+            elegidos.append(candidato)
+        return elegidos
+
+
+class ReconocedorIntenciones:
+    """
+    Ruta rapida del asistente: reconoce las preguntas frecuentes (totales, conteos por
+    sexo, por municipio, por tipo de vivienda y edad promedio), ejecuta una consulta
+    parametrizada prearmada y redacta la respuesta con una plantilla, sin llamar al modelo.
+    Las preguntas que no encajan devuelven None y siguen la ruta normal (LLM).
+    """
+
+    def __init__(self, indice: Optional[IndiceCatalogo] = None):
+        self.indice = indice if indice is not None else IndiceCatalogo()
+
+    # --- 1. INTERPRETACIÓN (no usa la BD: se puede probar sin conexión) ---
+
+    def interpretar(self, pregunta: str) -> Optional[Dict[str, Any]]:
+        """
+        Convierte la pregunta en una intención, ej.
+        {'tipo': 'conteo_habitantes', 'sexo': 'F', 'municipio': (1, 'Saltillo'), ...}
+        Retorna None si la pregunta no corresponde a ninguna plantilla.
+        """
+        tokens = _tokens(pregunta)
+        if not tokens:
+            return None
+
+        intencion: Dict[str, Any] = {'sexo': None, 'municipio': None, 'localidad': None, 'tipo_vivienda': None}
+        resto = list(tokens)
+        for inicio, fin, tipo, id_entidad, nombre in self.indice.buscar(tokens):
+            if tipo not in intencion:
+                return None # Catalogo sin plantilla (actividades economicas): se delega al modelo
+            if intencion[tipo] is not None:
+                return None # Dos lugares/tipos en la misma pregunta: se delega al modelo
+            intencion[tipo] = (id_entidad, nombre)
+            for i in range(inicio, fin):
+                resto[i] = None
+
+        # 'tipo de vivienda' nombra la agrupacion, no a las viviendas que se cuentan
+        for i in range(2, len(resto)):
+            if resto[i] in PALABRAS_VIVIENDAS and resto[i - 1] == 'de' and resto[i - 2] in PALABRAS_TIPO:
+                resto[i] = None
+
+        palabras = {p for p in resto if p is not None}
+        if not palabras <= VOCABULARIO:
+            return None
+
+        if intencion['municipio'] and intencion['localidad']:
+            return None
+
+        mujeres = bool(palabras & PALABRAS_MUJERES)
+        hombres = bool(palabras & PALABRAS_HOMBRES)
+        if mujeres and hombres:
+            return None
+        intencion['sexo'] = 'F' if mujeres else ('M' if hombres else None)
+
+        agrupa = bool(palabras & PALABRAS_AGRUPACION)
+        habla_de_personas = bool(palabras & (PALABRAS_HABITANTES | PALABRAS_MUJERES | PALABRAS_HOMBRES))
+        habla_de_viviendas = bool(palabras & PALABRAS_VIVIENDAS) or intencion['tipo_vivienda'] is not None
+
+        # 'viviendas que tienen mujeres', 'viviendas por sexo': no se sabe que se cuenta
+        if palabras & PALABRAS_VIVIENDAS and (habla_de_personas or palabras & PALABRAS_SEXO):
+            return None
+
+        # Edad promedio (de todos o por sexo, en un lugar)
+        if palabras & PALABRAS_PROMEDIO and palabras & PALABRAS_EDAD:
+            if agrupa or intencion['tipo_vivienda']:
+                return None
+            intencion['tipo'] = 'promedio_edad'
+            return intencion
+
+        if palabras & PALABRAS_EDAD or palabras & PALABRAS_PROMEDIO:
+            return None
+
+        # Conteos agrupados ('habitantes por municipio', 'viviendas por tipo', ...)
+        if agrupa:
+            if palabras & PALABRAS_MUNICIPIO and not intencion['municipio'] and not intencion['localidad']:
+                # 'viviendas por municipio' cuenta viviendas; 'habitantes por municipio' cuenta personas
+                intencion['tipo'] = 'conteo_por_municipio'
+                intencion['contar_habitantes'] = not habla_de_viviendas or habla_de_personas
+            elif palabras & PALABRAS_SEXO and intencion['sexo'] is None and not habla_de_viviendas:
+                intencion['tipo'] = 'conteo_por_sexo'
+            elif palabras & PALABRAS_TIPO and not intencion['tipo_vivienda']:
+                # 'habitantes por tipo de vivienda' cuenta personas; 'viviendas por tipo' cuenta viviendas
+                intencion['tipo'] = 'conteo_por_tipo_vivienda'
+                intencion['contar_habitantes'] = habla_de_personas
+            else:
+                return None
+            return intencion
+
+        # Conteos simples
+        if not (palabras & PALABRAS_CONTEO or 'hay' in palabras):
+            return None
+        if habla_de_viviendas and not (palabras & (PALABRAS_HABITANTES | PALABRAS_MUJERES | PALABRAS_HOMBRES)):
+            if intencion['sexo']:
+                return None
+            intencion['tipo'] = 'conteo_viviendas'
+            return intencion
+        if habla_de_personas and not intencion['tipo_vivienda']:
+            intencion['tipo'] = 'conteo_habitantes'
+            return intencion
+        return None
+
+    # --- 2. CONSULTAS PARAMETRIZADAS ---
+
+    @staticmethod
+    def _filtrar(consulta, intencion: Dict[str, Any], incluir_habitante: bool):
+        """Aplica los filtros de sexo / lugar / tipo de vivienda con los JOINs necesarios."""
+        requiere_vivienda = incluir_habitante and (
+            intencion['municipio'] or intencion['localidad'] or intencion['tipo_vivienda']
+        )
+        if requiere_vivienda:
+            consulta = consulta.join(Vivienda, Habitante.vivienda_id == Vivienda.id)
+        if intencion['municipio']:
+            consulta = consulta.join(Localidad, Vivienda.localidad_id == Localidad.id) \
+                               .where(Localidad.municipio_id == intencion['municipio'][0])
+        elif intencion['localidad']:
+            consulta = consulta.where(Vivienda.localidad_id == intencion['localidad'][0])
+        if intencion['tipo_vivienda']:
+            consulta = consulta.where(Vivienda.tipo_vivienda_id == intencion['tipo_vivienda'][0])
+        if intencion['sexo'] and incluir_habitante:
+            consulta = consulta.where(Habitante.sexo == intencion['sexo'])
+        return consulta
+
+    def construir_consulta(self, intencion: Dict[str, Any]):
+        """Retorna la consulta SQLAlchemy (parametrizada) para la intención."""
+        tipo = intencion['tipo']
+
+        if tipo == 'conteo_habitantes':
+            return self._filtrar(select(func.count(Habitante.id)).select_from(Habitante), intencion, True)
+
+        if tipo == 'promedio_edad':
+            return self._filtrar(select(func.avg(Habitante.edad)).select_from(Habitante), intencion, True)
+
+        if tipo == 'conteo_viviendas':
+            return self._filtrar(select(func.count(Vivienda.id)).select_from(Vivienda), intencion, False)
+
+        if tipo == 'conteo_por_municipio':
+            if intencion.get('contar_habitantes', True):
+                consulta = select(Municipio.nombre, func.count(Habitante.id)).select_from(Habitante) \
+                    .join(Vivienda, Habitante.vivienda_id == Vivienda.id)
+                if intencion['sexo']:
+                    consulta = consulta.where(Habitante.sexo == intencion['sexo'])
+            else:
+                consulta = select(Municipio.nombre, func.count(Vivienda.id)).select_from(Vivienda)
+            consulta = consulta.join(Localidad, Vivienda.localidad_id == Localidad.id) \
+                .join(Municipio, Localidad.municipio_id == Municipio.id)
+            if intencion['tipo_vivienda']:
+                consulta = consulta.where(Vivienda.tipo_vivienda_id == intencion['tipo_vivienda'][0])
+            return consulta.group_by(Municipio.nombre).order_by(Municipio.nombre)
+
+        if tipo == 'conteo_por_sexo':
+            consulta = self._filtrar(select(Habitante.sexo, func.count(Habitante.id)).select_from(Habitante), intencion, True)
+            return consulta.group_by(Habitante.sexo).order_by(Habitante.sexo)
+
+        if tipo == 'conteo_por_tipo_vivienda':
+            if intencion.get('contar_habitantes'):
+                consulta = select(TipoVivienda.nombre, func.count(Habitante.id)).select_from(Habitante) \
+                    .join(Vivienda, Habitante.vivienda_id == Vivienda.id)
+                if intencion['sexo']:
+                    consulta = consulta.where(Habitante.sexo == intencion['sexo'])
+            else:
+                consulta = select(TipoVivienda.nombre, func.count(Vivienda.id)).select_from(Vivienda)
+            consulta = self._filtrar(
+                consulta.join(TipoVivienda, Vivienda.tipo_vivienda_id == TipoVivienda.id),
+                intencion, False
+            )
+            return consulta.group_by(TipoVivienda.nombre).order_by(TipoVivienda.nombre)
+
+        raise ValueError(f"Intención desconocida: {tipo}")
+
+    # --- 3. PLANTILLAS DE RESPUESTA ---
+
+    @staticmethod
+    def _describir_lugar(intencion: Dict[str, Any]) -> str:
+        if intencion['municipio']:
+            return f" en el municipio de {intencion['municipio'][1]}"
+        if intencion['localidad']:
+            return f" en la localidad {intencion['localidad'][1]}"
+        return ""
+
+    def formatear_respuesta(self, intencion: Dict[str, Any], filas: List[Tuple]) -> str:
+        """Redacta la respuesta en lenguaje natural a partir de una plantilla."""
+        tipo = intencion['tipo']
+        lugar = self._describir_lugar(intencion)
+        sujeto = {'F': 'mujeres', 'M': 'hombres', None: 'habitantes'}[intencion['sexo']]
+        articulo = 'las' if intencion['sexo'] == 'F' else 'los'
+
+        if tipo == 'conteo_habitantes':
+            total = filas[0][0] if filas else 0
+            if not lugar:
+                registrados = 'registradas' if intencion['sexo'] == 'F' else 'registrados'
+                return f"Hay {total:,} {sujeto} {registrados} en total."
+            return f"Hay {total:,} {sujeto}{lugar}."
+
+        if tipo == 'promedio_edad':
+            promedio = filas[0][0] if filas else None
+            if promedio is None:
+                return f"No se encontraron datos de edad para {sujeto}{lugar}."
+            return f"La edad promedio de {articulo} {sujeto}{lugar} es de {float(promedio):.1f} años."
+
+        if tipo == 'conteo_viviendas':
+            total = filas[0][0] if filas else 0
+            tipo_vivienda = f" de tipo '{intencion['tipo_vivienda'][1]}'" if intencion['tipo_vivienda'] else ""
+            return f"Hay {total:,} viviendas{tipo_vivienda}{lugar}."
+
+        if not filas:
+            return "No se encontraron datos para esa consulta."
+
+        if tipo == 'conteo_por_municipio':
+            tipo_vivienda = f" de tipo '{intencion['tipo_vivienda'][1]}'" if intencion['tipo_vivienda'] else ""
+            if intencion.get('contar_habitantes', True):
+                encabezado = f"{sujeto.capitalize()} en viviendas{tipo_vivienda} por municipio:" if tipo_vivienda \
+                    else f"{sujeto.capitalize()} por municipio:"
+            else:
+                encabezado = f"Viviendas{tipo_vivienda} por municipio:"
+        elif tipo == 'conteo_por_sexo':
+            encabezado = f"Habitantes por sexo{lugar}:"
+            filas = [({'F': 'Mujeres', 'M': 'Hombres'}.get(sexo, sexo or 'Sin especificar'), total) for sexo, total in filas]
+        elif intencion.get('contar_habitantes'):
+            encabezado = f"{sujeto.capitalize()} por tipo de vivienda{lugar}:"
+        else:
+            encabezado = f"Viviendas por tipo{lugar}:"
+
+        return "\n".join([encabezado] + [f"- {nombre}: {total:,}" for nombre, total in filas])
+
+    # --- 4. PUNTO DE ENTRADA ---
+
+    def responder(self, pregunta: str, engine, version_datos: Optional[int] = None) -> Optional[str]:
+        """
+        Intenta responder la pregunta por la ruta rapida.
+        Retorna la respuesta, o None si la pregunta debe ir al modelo.
+        """
+        self.indice.actualizar(engine, version_datos)
+
+        intencion = self.interpretar(pregunta)
+        if intencion is None:
+            return None
+
+        try:
+            with engine.connect() as connection:
+                filas = connection.execute(self.construir_consulta(intencion)).all()
+        except SQLAlchemyError as e:
+            print(f"[Debug IA] Fallo la ruta rapida ({intencion['tipo']}), se usara el modelo: {e}")
+            return None
+
+        print(f"[Debug IA] Ruta rapida: {intencion['tipo']}")
+        return self.formatear_respuesta(intencion, filas)
@@ -0,0 +1,245 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional
+
+# Estados de una solicitud
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+LISTA = "lista"
+CANCELADA = "cancelada"
+
+
+class SolicitudAsistente:
+    """
+    Una pregunta enviada al pool del asistente.
+
+    Attributes:
+        id: identificador incremental (orden de llegada)
+        estado: pendiente | en_proceso | lista | cancelada
+        respuesta: texto final (None si se cancelo)
+        tiempos: desglose de chatear_medido (llm, sql, formato, total, ruta)
+    """
+
+    def __init__(self, id_solicitud: int, pregunta: str):
+        self.id = id_solicitud
+        self.pregunta = pregunta
+        self.estado = PENDIENTE
+        self.respuesta: Optional[str] = None
+        self.tiempos: Dict[str, Any] = {}
+        self.encolada = time.perf_counter()
+        self.iniciada: Optional[float] = None
+        self.primer_fragmento: Optional[float] = None
+        self.terminada: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def espera(self) -> float:
+        """Segundos en cola antes de que un worker la tomara."""
+        return (self.iniciada or self.terminada or time.perf_counter()) - self.encolada
+
+    @property
+    def latencia(self) -> float:
+        """Segundos desde que se encolo hasta que se termino."""
+        return (self.terminada or time.perf_counter()) - self.encolada
+
+
+class PoolAsistente:
+    """
+    Pool persistente de workers para el asistente.
+
+    Permite varias preguntas en vuelo a la vez; cada una recibe un id y puede
+    cancelarse. Las respuestas se entregan (callback 'al_entregar') en el mismo
+    orden en que llegaron las preguntas, aunque terminen en otro orden.
+
+    Si se pasa 'al_fragmento', las respuestas del modelo se piden por stream y
+    cada fragmento se reenvia en cuanto llega (cada solicitud tiene su propio id,
+    asi que varios streams pueden avanzar a la vez).
+
+    Los callbacks se llaman desde el hilo del worker (o desde el que cancela), sin
+    el lock del pool tomado: pueden volver a llamar al pool (metricas, cancelar).
+    En la vista deben reenviarse al hilo de la UI (ej. con una pyqtSignal).
+
+    Args:
+        controller: AsistenteController (se usa chatear_medido)
+        max_workers: preguntas que se procesan en paralelo
+        al_entregar: callback(SolicitudAsistente) en orden de llegada
+        al_fragmento: callback(id_solicitud, texto) por cada fragmento de la respuesta
+    """
+
+    def __init__(self, controller, max_workers: int = 3,
+                 al_entregar: Optional[Callable[[SolicitudAsistente], None]] = None,
+                 al_fragmento: Optional[Callable[[int, str], None]] = None):
+        self.controller = controller
+        self.al_entregar = al_entregar
+        self.al_fragmento = al_fragmento
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asistente")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        # Solicitudes aun no entregadas, en orden de llegada
+        self._por_entregar: "OrderedDict[int, SolicitudAsistente]" = OrderedDict()
+        # Terminadas que esperan su callback (se llama fuera del lock), y si algun hilo las esta entregando
+        self._entregas: "deque[SolicitudAsistente]" = deque()
+        self._entregando = False
+
+        # Metricas (ventana de las ultimas solicitudes terminadas)
+        self._latencias = deque(maxlen=200)
+        self._esperas = deque(maxlen=200)
+        self._primeros_fragmentos = deque(maxlen=200)
+        self.completadas = 0
+        self.canceladas = 0
+
+    # --- Solicitudes ---
+
+    def enviar(self, pregunta: str) -> int:
+        """Encola una pregunta y retorna su id."""
+        with self._lock:
+            solicitud = SolicitudAsistente(next(self._ids), pregunta)
+            self._por_entregar[solicitud.id] = solicitud
+            solicitud.future = self._executor.submit(self._procesar, solicitud)
+        return solicitud.id
+
+    def cancelar(self, id_solicitud: int) -> bool:
+        """
+        Cancela una solicitud. Si aun no empezaba, no se ejecuta; si ya estaba en
+        proceso, su resultado se descarta. Retorna False si ya se habia entregado.
+        """
+        with self._lock:
+            solicitud = self._por_entregar.get(id_solicitud)
+            if solicitud is None or solicitud.estado in (LISTA, CANCELADA):
+                return False
+
+            solicitud.estado = CANCELADA
+            solicitud.terminada = time.perf_counter()
+            self.canceladas += 1
+            solicitud.future.cancel()
+            self._entregar_listas()
+        self._despachar_entregas()
+        return True
+
+    def cancelar_todas(self) -> int:
+        """Cancela todas las solicitudes pendientes o en proceso. Retorna cuantas."""
+        with self._lock:
+            ids = [s.id for s in self._por_entregar.values() if s.estado in (PENDIENTE, EN_PROCESO)]
+        return sum(1 for id_solicitud in ids if self.cancelar(id_solicitud))
+
+    def _procesar(self, solicitud: SolicitudAsistente) -> None:
+        """Corre en un hilo del pool."""
+        with self._lock:
+            if solicitud.estado == CANCELADA:
+                return
+            solicitud.estado = EN_PROCESO
+            solicitud.iniciada = time.perf_counter()
+
+        al_fragmento = None
+        if self.al_fragmento:
+            al_fragmento = lambda texto: self._reenviar_fragmento(solicitud, texto)
+
+        try:
+            respuesta, tiempos = self.controller.chatear_medido(solicitud.pregunta, al_fragmento=al_fragmento)
+        except Exception as e:
+            respuesta, tiempos = f"Error en el hilo: {e}", {'ruta': 'error'}
+
+        with self._lock:
+            if solicitud.estado == CANCELADA:
+                return
+            solicitud.respuesta = respuesta
+            solicitud.tiempos = tiempos
+            solicitud.terminada = time.perf_counter()
+            solicitud.estado = LISTA
+            self.completadas += 1
+            self._latencias.append(solicitud.latencia)
+            self._esperas.append(solicitud.espera)
+            self._entregar_listas()
+        self._despachar_entregas()
+
+    def _reenviar_fragmento(self, solicitud: SolicitudAsistente, texto: str) -> bool:
+        """Reenvia un fragmento; retorna False si la solicitud se cancelo (detiene el stream)."""
+        with self._lock:
+            if solicitud.estado == CANCELADA:
+                return False
+            if solicitud.primer_fragmento is None:
+                solicitud.primer_fragmento = time.perf_counter()
+                self._primeros_fragmentos.append(solicitud.primer_fragmento - solicitud.encolada)
+        try:
+            self.al_fragmento(solicitud.id, texto)
+        except Exception as e:
+            print(f"Error al reenviar el fragmento de {solicitud.id}: {e}")
+        return True
+
+    def _entregar_listas(self) -> None:
+        """
+        Pasa a la cola de entregas, en orden de llegada, las solicitudes terminadas
+        al frente de la cola. Se llama con el lock tomado.
+        """
+        while self._por_entregar:
+            solicitud = next(iter(self._por_entregar.values()))
+            if solicitud.estado not in (LISTA, CANCELADA):
+                break
+            del self._por_entregar[solicitud.id]
+            self._entregas.append(solicitud)
+
+    def _despachar_entregas(self) -> None:
+        """
+        Llama a 'al_entregar' con las solicitudes de la cola de entregas, SIN el lock
+        tomado (el callback puede llamar a metricas() o cancelar() en el mismo hilo).
+        Un solo hilo entrega a la vez, asi que el orden de llegada se conserva: si
+        otro ya esta entregando, el tambien despacha lo que se acaba de encolar.
+        """
+        with self._lock:
+            if self._entregando:
+                return
+            self._entregando = True
+        while True:
+            with self._lock:
+                if not self._entregas:
+                    self._entregando = False
+                    return
+                solicitud = self._entregas.popleft()
+            if self.al_entregar:
+                try:
+                    self.al_entregar(solicitud)
+                except Exception as e:
+                    print(f"Error al entregar la respuesta {solicitud.id}: {e}")
+
+    # --- Metricas ---
+
+    @staticmethod
+    def _percentil(valores: List[float], p: float) -> float:
+        if not valores:
+            return 0.0
+        ordenados = sorted(valores)
+        return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Profundidad de la cola y latencias (segundos) de las ultimas solicitudes:
+        en_cola, en_proceso, por_entregar, completadas, canceladas,
+        latencia_p50/p95, espera_p50/p95, primer_fragmento_p50/p95.
+        """
+        with self._lock:
+            estados = [s.estado for s in self._por_entregar.values()]
+            latencias = list(self._latencias)
+            esperas = list(self._esperas)
+            primeros = list(self._primeros_fragmentos)
+            return {
+                'en_cola': estados.count(PENDIENTE),
+                'en_proceso': estados.count(EN_PROCESO),
+                'por_entregar': len(estados),
+                'completadas': self.completadas,
+                'canceladas': self.canceladas,
+                'latencia_p50': self._percentil(latencias, 50),
+                'latencia_p95': self._percentil(latencias, 95),
+                'espera_p50': self._percentil(esperas, 50),
+                'espera_p95': self._percentil(esperas, 95),
+                'primer_fragmento_p50': self._percentil(primeros, 50),
+                'primer_fragmento_p95': self._percentil(primeros, 95),
+            }
+
+    def cerrar(self) -> None:
+        """Cancela lo pendiente y libera los hilos del pool."""
+        self.cancelar_todas()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, Optional
+from dao.Instrumentacion import instrumentacion
+
+# Viviendas por pagina en la tabla de CensoWidget
+TAM_PAGINA_VIVIENDAS = 200
+
+
+class PrecargaDashboard:
+    """
+    Precarga posterior al login.
+
+    Mientras se pinta el Dashboard, consulta en hilos de fondo (en paralelo) lo
+    que cada pestaña necesita para su primera vista:
+        - 'catalogos': llena el cache de CatalogoController
+        - 'viviendas': primera pagina de viviendas (con localidad y tipo)
+        - 'reporte_poblacion', 'reporte_tipos_vivienda', 'reporte_edades':
+          reportes del dashboard sin filtros
+
+    Las pestañas piden cada resultado con 'cuando_lista'; el callback se ejecuta
+    en el hilo de la UI (a traves de 'despachar') en cuanto la consulta termina,
+    asi ninguna pestaña se bloquea esperando su consulta.
+
+    Cada resultado se entrega una sola vez: las recargas posteriores (filtros,
+    guardar, eliminar) ya consultan la BD directamente.
+
+    Args:
+        catalogo_controller: CatalogoController
+        censo_controller: CensoController
+        despachar: callable(funcion) que ejecuta 'funcion' en el hilo de la UI
+                   (por defecto se ejecuta en el hilo del worker)
+        max_workers: consultas simultaneas (cada una usa una conexion del pool)
+    """
+
+    def __init__(self, catalogo_controller, censo_controller,
+                 despachar: Optional[Callable[[Callable[[], None]], None]] = None,
+                 max_workers: int = 3):
+        self.catalogo_controller = catalogo_controller
+        self.censo_controller = censo_controller
+        self.despachar = despachar or (lambda funcion: funcion())
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._tareas: Dict[str, Future] = {}
+
+    def iniciar(self) -> None:
+        """Lanza todas las consultas en segundo plano (regresa de inmediato)."""
+        tareas = {
+            'catalogos': self.catalogo_controller.precargar_catalogos,
+            'viviendas': lambda: self.censo_controller.obtener_pagina_viviendas_con_localidad(TAM_PAGINA_VIVIENDAS, 0),
+            'reporte_poblacion': self.censo_controller.generar_dashboard_poblacion,
+            'reporte_tipos_vivienda': self.censo_controller.generar_reporte_tipos_vivienda,
+            'reporte_edades': self.censo_controller.generar_reporte_distribucion_edad,
+        }
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="precarga")
+            for nombre, funcion in tareas.items():
+                self._tareas[nombre] = self._executor.submit(self._ejecutar, nombre, funcion)
+        print("Precarga del Dashboard iniciada.")
+
+    @staticmethod
+    def _ejecutar(nombre: str, funcion: Callable[[], Any]) -> Any:
+        # En el panel de diagnóstico estas consultas aparecen como pantalla 'Precarga'
+        with instrumentacion.en_pantalla("Precarga"):
+            return funcion()
+
+    def cuando_lista(self, nombre: str, callback: Callable[[Any], None]) -> bool:
+        """
+        Entrega el resultado precargado 'nombre' a callback(resultado), en el hilo
+        de la UI, en cuanto este listo (de inmediato si ya termino).
+
+        Retorna False si no hay precarga para 'nombre' (no se inicio, ya se entrego
+        o se descarto): en ese caso la pestaña debe consultar por su cuenta.
+        Si la consulta falla, callback recibe None.
+        """
+        with self._lock:
+            future = self._tareas.pop(nombre, None)
+        if future is None:
+            return False
+
+        def _al_terminar(f: Future):
+            try:
+                resultado = f.result()
+            except Exception as e:
+                print(f"Error en la precarga de '{nombre}': {e}")
+                resultado = None
+            self.despachar(lambda: callback(resultado))
+
+        future.add_done_callback(_al_terminar)
+        return True
+
+    def descartar(self, *nombres: str) -> None:
+        """
+        Descarta resultados aun no entregados (todos si no se indican nombres),
+        por ejemplo despues de modificar catalogos que aparecen en ellos.
+        """
+        with self._lock:
+            for nombre in (nombres or list(self._tareas)):
+                future = self._tareas.pop(nombre, None)
+                if future is not None:
+                    future.cancel()
+
+    def cerrar(self) -> None:
+        """Descarta lo pendiente y libera los hilos."""
+        self.descartar()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,221 @@
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Iterator, Optional, Sequence
+from .CacheAsistente import CacheAsistente
+
+
+class ProveedorLLM:
+    """
+    Interfaz de los backends de lenguaje del asistente.
+    El controlador arma los prompts; el proveedor solo los resuelve.
+    """
+
+    nombre = "base"
+
+    def generar_sql(self, pregunta: str, prompt: str) -> str:
+        """Devuelve el texto de la consulta SQL para la pregunta."""
+        raise NotImplementedError
+
+    def redactar_respuesta(self, pregunta: str, filas: Sequence[Any], prompt: str) -> str:
+        """Devuelve la respuesta en lenguaje natural a partir de los resultados."""
+        raise NotImplementedError
+
+    def redactar_respuesta_stream(self, pregunta: str, filas: Sequence[Any], prompt: str) -> Iterator[str]:
+        """
+        Igual que redactar_respuesta, pero entrega el texto por fragmentos conforme se genera.
+        Por defecto entrega la respuesta completa en un solo fragmento.
+        """
+        yield self.redactar_respuesta(pregunta, filas, prompt)
+
+
+class ProveedorGemini(ProveedorLLM):
+    """
+    Backend de Google Gemini (google-genai).
+    El SDK se importa y el cliente se crea con la primera pregunta que llega al
+    modelo (importar google.genai tarda segundos y no debe retrasar el arranque).
+    """
+
+    nombre = "gemini"
+
+    def __init__(self, api_key: str, modelo_sql: str = 'gemini-2.5-flash', modelo_chat: str = 'gemini-2.5-flash'):
+        if not api_key:
+            raise ValueError("Falta la API key de Gemini")
+        self.api_key = api_key
+        self.model_sql = modelo_sql
+        self.model_chat = modelo_chat
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Cliente de google.genai, creado al primer uso."""
+        with self._lock:
+            if self._client is None:
+                from google import genai
+
+                self._client = genai.Client(api_key=self.api_key)
+                print("ProveedorGemini: Cliente de Gemini inicializado")
+            return self._client
+
+    def generar_sql(self, pregunta: str, prompt: str) -> str:
+        respuesta = self.client.models.generate_content(model=self.model_sql, contents=prompt)
+        return respuesta.text
+
+    def redactar_respuesta(self, pregunta: str, filas: Sequence[Any], prompt: str) -> str:
+        respuesta = self.client.models.generate_content(model=self.model_chat, contents=prompt)
+        return respuesta.text
+
+    def redactar_respuesta_stream(self, pregunta: str, filas: Sequence[Any], prompt: str) -> Iterator[str]:
+        for fragmento in self.client.models.generate_content_stream(model=self.model_chat, contents=prompt):
+            if fragmento.text:
+                yield fragmento.text
+
+
+class ProveedorStub(ProveedorLLM):
+    """
+    Backend local y determinista para pruebas de carga y benchmarks sin red.
+
+    Reproduce respuestas grabadas (archivo JSON con la forma
+    {"pregunta normalizada": {"sql": "...", "respuesta": "..."}}).
+    Si una pregunta no esta grabada, el SQL es "ERROR: Imposible de responder" y la
+    respuesta se arma directamente con las filas del resultado.
+
+    Args:
+        latencia_sql / latencia_respuesta: segundos de espera simulados por llamada
+        latencia_fragmento: segundos entre fragmentos al responder por stream
+    """
+
+    nombre = "stub"
+
+    def __init__(self, grabaciones: Optional[Dict[str, Dict[str, str]]] = None,
+                 latencia_sql: float = 0.0, latencia_respuesta: float = 0.0,
+                 latencia_fragmento: float = 0.0):
+        self.grabaciones = grabaciones or {}
+        self.latencia_sql = latencia_sql
+        self.latencia_respuesta = latencia_respuesta
+        self.latencia_fragmento = latencia_fragmento
+
+    @classmethod
+    def desde_archivo(cls, ruta: str, **kwargs) -> "ProveedorStub":
+        """Carga las grabaciones desde un archivo JSON."""
+        with open(ruta, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def _grabacion(self, pregunta: str) -> Dict[str, str]:
+        return self.grabaciones.get(CacheAsistente.normalizar_pregunta(pregunta), {})
+
+    def generar_sql(self, pregunta: str, prompt: str) -> str:
+        if self.latencia_sql:
+            time.sleep(self.latencia_sql)
+        return self._grabacion(pregunta).get("sql", "ERROR: Imposible de responder")
+
+    def _respuesta(self, pregunta: str, filas: Sequence[Any]) -> str:
+        grabada = self._grabacion(pregunta).get("respuesta")
+        if grabada is not None:
+            return grabada
+        if not filas:
+            return "No se encontraron datos."
+        return "Resultado: " + "; ".join(", ".join(str(valor) for valor in fila) for fila in filas)
+
+    def redactar_respuesta(self, pregunta: str, filas: Sequence[Any], prompt: str) -> str:
+        if self.latencia_respuesta:
+            time.sleep(self.latencia_respuesta)
+        return self._respuesta(pregunta, filas)
+
+    def redactar_respuesta_stream(self, pregunta: str, filas: Sequence[Any], prompt: str) -> Iterator[str]:
+        # La latencia_respuesta simula el tiempo hasta el primer fragmento
+        if self.latencia_respuesta:
+            time.sleep(self.latencia_respuesta)
+        for i, fragmento in enumerate(re.findall(r"\s*\S+", self._respuesta(pregunta, filas))):
+            if i and self.latencia_fragmento:
+                time.sleep(self.latencia_fragmento)
+            yield fragmento
+
+
+class ProveedorGrabador(ProveedorLLM):
+    """
+    Envuelve otro proveedor (ej. Gemini) y guarda sus respuestas en un archivo JSON
+    compatible con ProveedorStub, para poder reproducirlas despues sin red.
+    """
+
+    def __init__(self, proveedor: ProveedorLLM, ruta: str):
+        self.proveedor = proveedor
+        self.ruta = ruta
+        self.nombre = f"grabador({proveedor.nombre})"
+        self._lock = threading.Lock()
+        self.grabaciones: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                self.grabaciones = json.load(f)
+
+    def _guardar(self, pregunta: str, llave: str, valor: str) -> None:
+        with self._lock:
+            self.grabaciones.setdefault(CacheAsistente.normalizar_pregunta(pregunta), {})[llave] = valor
+            with open(self.ruta, "w", encoding="utf-8") as f:
+                json.dump(self.grabaciones, f, ensure_ascii=False, indent=2)
+
+    def generar_sql(self, pregunta: str, prompt: str) -> str:
+        sql = self.proveedor.generar_sql(pregunta, prompt)
+        self._guardar(pregunta, "sql", sql)
+        return sql
+
+    def redactar_respuesta(self, pregunta: str, filas: Sequence[Any], prompt: str) -> str:
+        respuesta = self.proveedor.redactar_respuesta(pregunta, filas, prompt)
+        self._guardar(pregunta, "respuesta", respuesta)
+        return respuesta
+
+    def redactar_respuesta_stream(self, pregunta: str, filas: Sequence[Any], prompt: str) -> Iterator[str]:
+        partes = []
+        for fragmento in self.proveedor.redactar_respuesta_stream(pregunta, filas, prompt):
+            partes.append(fragmento)
+            yield fragmento
+        # Solo se graba si el stream se consumio completo
+        self._guardar(pregunta, "respuesta", "".join(partes))
+
+
+class ProveedorLocal(ProveedorLLM):
+    """
+    Adaptador opcional para un modelo local servido por HTTP con la API de Ollama
+    (POST /api/generate). No requiere dependencias adicionales.
+    """
+
+    nombre = "local"
+
+    def __init__(self, modelo: str, url_base: str = "http://localhost:11434", timeout: float = 120.0):
+        self.modelo = modelo
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+
+    def _solicitud(self, prompt: str, stream: bool) -> urllib.request.Request:
+        cuerpo = json.dumps({"model": self.modelo, "prompt": prompt, "stream": stream}).encode("utf-8")
+        return urllib.request.Request(
+            f"{self.url_base}/api/generate",
+            data=cuerpo,
+            headers={"Content-Type": "application/json"}
+        )
+
+    def _generar(self, prompt: str) -> str:
+        with urllib.request.urlopen(self._solicitud(prompt, stream=False), timeout=self.timeout) as respuesta:
+            return json.loads(respuesta.read().decode("utf-8"))["response"]
+
+    def generar_sql(self, pregunta: str, prompt: str) -> str:
+        return self._generar(prompt)
+
+    def redactar_respuesta(self, pregunta: str, filas: Sequence[Any], prompt: str) -> str:
+        return self._generar(prompt)
+
+    def redactar_respuesta_stream(self, pregunta: str, filas: Sequence[Any], prompt: str) -> Iterator[str]:
+        # Con stream=True, Ollama responde un objeto JSON por linea
+        with urllib.request.urlopen(self._solicitud(prompt, stream=True), timeout=self.timeout) as respuesta:
+            for linea in respuesta:
+                if not linea.strip():
+                    continue
+                datos = json.loads(linea.decode("utf-8"))
+                if datos.get("response"):
+                    yield datos["response"]
+                if datos.get("done"):
+                    break
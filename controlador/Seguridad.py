@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# --- PARÁMETROS DE SCRYPT ---
+# Costo ajustable: n (CPU/memoria, potencia de 2), r (tamaño de bloque), p (paralelismo).
+# Con n=2**14, r=8 se usan ~16 MB y ~50 ms por verificación en un equipo de escritorio.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+LONGITUD_SAL = 16
+LONGITUD_HASH = 32
+PREFIJO = "scrypt"
+
+
+def _b64(datos: bytes) -> str:
+    return base64.b64encode(datos).decode("ascii")
+
+
+def _derivar(contrasena: str, sal: bytes, n: int, r: int, p: int, longitud: int = LONGITUD_HASH) -> bytes:
+    return hashlib.scrypt(
+        contrasena.encode("utf-8"), salt=sal, n=n, r=r, p=p,
+        maxmem=128 * n * r * p + 1024 * 1024, dklen=longitud
+    )
+
+
+def hashear_contrasena(contrasena: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """
+    Genera el hash para guardar en 'administrador.contrasena_hash'.
+    Formato: 'scrypt$n$r$p$sal_base64$hash_base64'
+    """
+    sal = os.urandom(LONGITUD_SAL)
+    derivado = _derivar(contrasena, sal, n, r, p)
+    return f"{PREFIJO}${n}${r}${p}${_b64(sal)}${_b64(derivado)}"
+
+
+def _desarmar(almacenado: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    """Separa un hash 'scrypt$...' en sus partes; None si no tiene ese formato."""
+    partes = almacenado.split("$")
+    if len(partes) != 6 or partes[0] != PREFIJO:
+        return None
+    try:
+        return int(partes[1]), int(partes[2]), int(partes[3]), base64.b64decode(partes[4]), base64.b64decode(partes[5])
+    except (ValueError, TypeError):
+        return None
+
+
+def es_hash(almacenado: str) -> bool:
+    """True si el valor guardado ya es un hash scrypt (y no una contraseña en texto plano heredada)."""
+    return _desarmar(almacenado) is not None
+
+
+def verificar_contrasena(contrasena: str, almacenado: str) -> bool:
+    """
+    Compara en tiempo constante la contraseña contra el valor guardado.
+    Acepta valores heredados en texto plano (se deben rehashear con necesita_rehash).
+    """
+    partes = _desarmar(almacenado)
+    if partes is None:
+        return hmac.compare_digest(contrasena.encode("utf-8"), almacenado.encode("utf-8"))
+
+    n, r, p, sal, esperado = partes
+    return hmac.compare_digest(_derivar(contrasena, sal, n, r, p, len(esperado)), esperado)
+
+
+def necesita_rehash(almacenado: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> bool:
+    """True si el valor esta en texto plano o se genero con otro costo."""
+    partes = _desarmar(almacenado)
+    return partes is None or partes[:3] != (n, r, p)
+
+
+class ControlIntentos:
+    """
+    Limitador de intentos de login en memoria (por usuario).
+
+    Despues de 'max_fallos' fallos seguidos el usuario queda bloqueado
+    'bloqueo_inicial' segundos; cada bloqueo siguiente dura el doble (hasta
+    'bloqueo_maximo'). Mientras dura el bloqueo no se calcula ningun hash,
+    asi que los intentos repetidos no consumen CPU.
+
+    Tambien guarda, para los logins exitosos recientes, un HMAC (con una llave
+    aleatoria del proceso) de la contraseña: volver a entrar con la misma
+    contraseña y el mismo hash guardado no repite el calculo de scrypt.
+    """
+
+    def __init__(self, max_fallos: int = 5, bloqueo_inicial: float = 30.0,
+                 bloqueo_maximo: float = 900.0, max_verificados: int = 32):
+        self.max_fallos = max_fallos
+        self.bloqueo_inicial = bloqueo_inicial
+        self.bloqueo_maximo = bloqueo_maximo
+        self.max_verificados = max_verificados
+        self._lock = threading.Lock()
+
+        # usuario -> (fallos seguidos, bloqueos aplicados, bloqueado hasta)
+        self._estado: Dict[str, Tuple[int, int, float]] = {}
+
+        # usuario -> (hash guardado, HMAC de la contraseña); llave solo en memoria
+        self._llave = os.urandom(32)
+        self._verificados: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+    # --- Bloqueo ---
+
+    def segundos_bloqueado(self, usuario: str) -> float:
+        """Segundos que faltan para que el usuario pueda volver a intentar (0 si puede)."""
+        with self._lock:
+            _, _, hasta = self._estado.get(usuario, (0, 0, 0.0))
+            return max(0.0, hasta - time.monotonic())
+
+    def registrar_fallo(self, usuario: str) -> None:
+        with self._lock:
+            fallos, bloqueos, hasta = self._estado.get(usuario, (0, 0, 0.0))
+            fallos += 1
+            if fallos >= self.max_fallos:
+                duracion = min(self.bloqueo_maximo, self.bloqueo_inicial * (2 ** bloqueos))
+                hasta = time.monotonic() + duracion
+                fallos, bloqueos = 0, bloqueos + 1
+                print(f"Usuario {usuario} bloqueado por {duracion:.0f} segundos tras varios intentos fallidos")
+            self._estado[usuario] = (fallos, bloqueos, hasta)
+            self._verificados.pop(usuario, None)
+
+    def registrar_exito(self, usuario: str) -> None:
+        with self._lock:
+            self._estado.pop(usuario, None)
+
+    # --- Logins verificados recientes ---
+
+    def _huella(self, contrasena: str) -> bytes:
+        return hmac.new(self._llave, contrasena.encode("utf-8"), hashlib.sha256).digest()
+
+    def verificado_recientemente(self, usuario: str, almacenado: str, contrasena: str) -> bool:
+        with self._lock:
+            entrada = self._verificados.get(usuario)
+        if entrada is None or entrada[0] != almacenado:
+            return False
+        return hmac.compare_digest(entrada[1], self._huella(contrasena))
+
+    def recordar_verificado(self, usuario: str, almacenado: str, contrasena: str) -> None:
+        huella = self._huella(contrasena)
+        with self._lock:
+            self._verificados[usuario] = (almacenado, huella)
+            self._verificados.move_to_end(usuario)
+            while len(self._verificados) > self.max_verificados:
+                self._verificados.popitem(last=False)
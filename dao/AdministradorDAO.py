@@ -1,25 +1,55 @@
 from .BaseDAO import BaseDAO
 from modelo import Administrador
-from sqlalchemy import select
-from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, Optional, Tuple
+from .Instrumentacion import medir_operacion
 
 class AdministradorDAO(BaseDAO):
     """
     DAO especifico para la entidad Administrador
     """
 
-    def verificar_credenciales(self, usuario: str, contrasena_hash: str) -> Optional[Administrador]:
+    @medir_operacion
+    def obtener_credenciales(self, usuario: str) -> Optional[Tuple[int, str]]:
         """
-        Busca un administrador por usuario y verifica el hash de la contraseña
+        Busca (id, contrasena_hash) de un administrador por usuario.
+        Consulta de solo lectura: sin objetos ORM ni commit.
         """
         try:
-            with self._get_session() as session:
-                statement = select(Administrador).where(Administrador.usuario == usuario)
-                administrador = session.scalar(statement)
-
-                if administrador and administrador.contrasena_hash == contrasena_hash:
-                    return administrador
-                return None
-        except Exception as e:
+            with self._get_session_lectura() as session:
+                statement = select(Administrador.id, Administrador.contrasena_hash).where(Administrador.usuario == usuario)
+                fila = session.execute(statement).first()
+                return tuple(fila) if fila else None
+        except SQLAlchemyError as e:
             print(f"Error en la verificacion de credenciales: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @medir_operacion
+    def listar_credenciales(self) -> List[Tuple[int, str, str]]:
+        """
+        Lista (id, usuario, contrasena_hash) de todos los administradores (para migraciones).
+        """
+        try:
+            with self._get_session_lectura() as session:
+                statement = select(Administrador.id, Administrador.usuario, Administrador.contrasena_hash)
+                return [tuple(fila) for fila in session.execute(statement).all()]
+        except SQLAlchemyError as e:
+            print(f"Error al listar las credenciales: {e}")
+            return []
+
+    @medir_operacion
+    def actualizar_contrasena_hash(self, id_administrador: int, contrasena_hash: str, hash_anterior: Optional[str] = None) -> bool:
+        """
+        Reemplaza el hash guardado de un administrador.
+        Si se pasa 'hash_anterior', solo se actualiza si no ha cambiado desde que se leyo.
+        """
+        try:
+            with self._get_session() as session:
+                statement = update(Administrador).where(Administrador.id == id_administrador).values(contrasena_hash=contrasena_hash)
+                if hash_anterior is not None:
+                    statement = statement.where(Administrador.contrasena_hash == hash_anterior)
+                return session.execute(statement).rowcount == 1
+        except SQLAlchemyError as e:
+            print(f"Error al actualizar la contraseña del administrador {id_administrador}: {e}")
+            return False
\ No newline at end of file
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import uuid
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Engine
+from .Conexion import crear_engine
+from .Migraciones import migrar
+
+# --- TABLAS PROPIAS DEL ALMACEN DE CAMPO ---
+# MetaData aparte: solo existen en el SQLite local, nunca en la BD central
+METADATA_CAMPO = MetaData()
+
+# Clave/valor: 'dispositivo' (uuid del almacen) y 'huellas_catalogos' (JSON con la huella de cada catalogo bajado)
+estado_campo = Table(
+    'estado_campo', METADATA_CAMPO,
+    Column('clave', String(50), primary_key=True),
+    Column('valor', String(255), nullable=False),
+)
+
+# Filas locales ya subidas: id local -> id central, y huella de los datos al subirlas
+mapa_ids = Table(
+    'mapa_ids', METADATA_CAMPO,
+    Column('tabla', String(30), primary_key=True),
+    Column('id_local', Integer, primary_key=True, autoincrement=False),
+    Column('id_central', Integer, nullable=False),
+    Column('huella', String(40), nullable=False),
+)
+
+# Asociaciones vivienda <-> actividad ya subidas (ids locales de vivienda)
+enlaces_sincronizados = Table(
+    'enlaces_sincronizados', METADATA_CAMPO,
+    Column('vivienda_id', Integer, primary_key=True, autoincrement=False),
+    Column('actividad_id', Integer, primary_key=True, autoincrement=False),
+)
+
+# Conflictos de la ultima sincronizacion (se reintentan en la siguiente)
+conflicto_campo = Table(
+    'conflicto_campo', METADATA_CAMPO,
+    Column('tabla', String(30), primary_key=True),
+    Column('id_local', Integer, primary_key=True, autoincrement=False),
+    Column('motivo', String(255), nullable=False),
+    Column('detectado_en', DateTime, nullable=False, default=datetime.now),
+)
+
+# --- COLUMNAS QUE SE SINCRONIZAN ---
+# Altas y cambios de campo (suben a la central)
+COLUMNAS_SUBIDA = {
+    'vivienda': ['direccion', 'fecha_censo', 'coordenadas_gps', 'total_habitantes', 'localidad_id', 'tipo_vivienda_id'],
+    'habitante': ['nombre_completo', 'edad', 'sexo', 'parentesco_con_jefe_familia', 'vivienda_id'],
+}
+
+# Catalogos (bajan de la central con los mismos ids), en orden de dependencias.
+# Las cuentas de administrador NUNCA viajan en la sincronizacion (la ruta de catalogos
+# no se autentica): las del equipo de campo se dan de alta en el propio equipo
+# (python sincronizar.py --campo ... --crear-usuario USUARIO).
+COLUMNAS_CATALOGO = {
+    'municipio': ['id', 'nombre'],
+    'localidad': ['id', 'nombre', 'municipio_id'],
+    'tipo_vivienda': ['id', 'nombre'],
+    'actividad_economica': ['id', 'nombre'],
+}
+
+
+# --- FORMATO DE LOS LOTES ---
+
+def _a_json(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def empaquetar(datos: Dict[str, Any]) -> bytes:
+    """Serializa un lote (JSON compacto) y lo comprime con zlib."""
+    texto = json.dumps(datos, default=_a_json, separators=(',', ':'), ensure_ascii=False)
+    return zlib.compress(texto.encode('utf-8'), 6)
+
+
+def desempaquetar(lote: bytes) -> Dict[str, Any]:
+    """Inverso de empaquetar."""
+    return json.loads(zlib.decompress(lote).decode('utf-8'))
+
+
+def huella_tabla(filas: List[Dict[str, Any]]) -> str:
+    """Huella (sha1) de un catalogo completo; si no cambia en la central no se vuelve a bajar."""
+    normalizadas = sorted(json.dumps(fila, default=_a_json, sort_keys=True) for fila in filas)
+    return hashlib.sha1("\n".join(normalizadas).encode('utf-8')).hexdigest()
+
+
+def huella(datos: Dict[str, Any]) -> str:
+    """
+    Huella (sha1) de los datos de una fila, con las llaves foraneas ya en ids
+    centrales. Campo y central la calculan igual, para detectar quien cambio la fila.
+    """
+    normalizados = {columna: (None if valor is None else str(_a_json(valor))) for columna, valor in datos.items()}
+    return hashlib.sha1(json.dumps(normalizados, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# --- CREACION DEL ALMACEN ---
+
+def crear_almacen_campo(ruta: str) -> Engine:
+    """
+    Abre (o crea) el almacen de campo: un SQLite local con el mismo esquema que la
+    central (para que los controladores y vistas funcionen igual) mas las tablas
+    de sincronizacion. Asigna un identificador de dispositivo la primera vez.
+    """
+    engine = crear_engine(f"sqlite:///{ruta}")
+    migrar(engine)
+    METADATA_CAMPO.create_all(engine)
+
+    with engine.begin() as conexion:
+        if leer_estado(conexion, 'dispositivo') is None:
+            conexion.execute(estado_campo.insert().values(clave='dispositivo', valor=str(uuid.uuid4())))
+    return engine
+
+
+def leer_estado(conexion, clave: str) -> Optional[str]:
+    return conexion.execute(select(estado_campo.c.valor).where(estado_campo.c.clave == clave)).scalar()
+
+
+def guardar_estado(conexion, clave: str, valor: str) -> None:
+    if conexion.execute(estado_campo.update().where(estado_campo.c.clave == clave).values(valor=valor)).rowcount == 0:
+        conexion.execute(estado_campo.insert().values(clave=clave, valor=valor))
\ No newline at end of file
@@ -0,0 +1,355 @@
+import time
+import urllib.request
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import Date, and_, bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.engine import Connection, Engine
+from modelo import Base, RegistroCampo, vivienda_actividad
+from .AlmacenCampo import COLUMNAS_CATALOGO, COLUMNAS_SUBIDA, desempaquetar, empaquetar, huella, huella_tabla
+from .BaseDAO import incrementar_version_datos
+from .Conexion import crear_engine
+from .Metricas import metricas
+from .Reintentos import reintentar
+
+FILAS_APLICADAS = metricas.contador(
+    "censo_importacion_filas_total", "Filas de campo aplicadas en la central", ('tabla',))
+CONFLICTOS_LOTE = metricas.contador(
+    "censo_importacion_conflictos_total", "Filas de campo rechazadas por conflicto", ('tabla',))
+DURACION_LOTE = metricas.histograma(
+    "censo_importacion_lote_segundos", "Tiempo de aplicar un lote de campo", ('tabla',))
+
+
+class AplicadorLotes:
+    """
+    Lado central de la sincronizacion de campo.
+
+    Cada lote trae los movimientos de UNA tabla ('vivienda', 'habitante' o
+    'vivienda_actividad') y se aplica en UNA transaccion, con inserciones,
+    actualizaciones y borrados en bloque (executemany) en vez de fila por fila.
+
+    Formato del lote (llaves foraneas ya en ids centrales):
+        {'dispositivo': uuid, 'tabla': 'vivienda',
+         'altas':   [{'id_local', 'datos'}],
+         'cambios': [{'id_local', 'id_central', 'huella', 'datos'}],   # huella = datos de la ultima subida
+         'bajas':   [{'id_local', 'id_central', 'huella'}]}
+    Para 'vivienda_actividad', altas y bajas son [{'vivienda_local', 'vivienda_id', 'actividad_id'}].
+
+    Respuesta (listas y no diccionarios: las llaves int no sobreviven a JSON):
+        {'ids': [[id_local, id_central, huella]], 'bajas': [id_local],
+         'conflictos': [{'id_local', 'motivo'}], 'aplicados': n}
+    Para 'vivienda_actividad': {'enlaces': [[vivienda_local, actividad_id]], 'bajas': [...], ...}
+
+    Resolucion de conflictos: gana la central. Un cambio o baja solo se aplica si
+    la fila central sigue igual a como el equipo la subio (misma huella).
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    # --- Catalogos (central -> campo) ---
+
+    def catalogos(self, huellas_conocidas: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Regresa {tabla: {'huella', 'filas'}} solo de los catalogos cuya huella
+        difiere de la que ya tiene el equipo de campo.
+        """
+        respuesta = {}
+        with self.engine.connect() as conexion:
+            for nombre, columnas in COLUMNAS_CATALOGO.items():
+                tabla = Base.metadata.tables[nombre]
+                filas = [dict(fila._mapping) for fila in conexion.execute(select(*(tabla.c[c] for c in columnas)))]
+                huella_actual = huella_tabla(filas)
+                if huellas_conocidas.get(nombre) != huella_actual:
+                    respuesta[nombre] = {'huella': huella_actual, 'filas': filas}
+        return respuesta
+
+    # --- Lotes (campo -> central) ---
+
+    def aplicar(self, lote: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Aplica un lote en una sola transaccion (todo o nada). Ante un deadlock o
+        una conexion perdida la transaccion se repite: reenviar un lote es seguro
+        (las altas ya aplicadas se reconocen por RegistroCampo).
+        """
+        inicio = time.perf_counter()
+        resultado = reintentar(self._aplicar_transaccion, lote, idempotente=True)
+        DURACION_LOTE.con_etiquetas(lote['tabla']).observar(time.perf_counter() - inicio)
+        FILAS_APLICADAS.con_etiquetas(lote['tabla']).inc(resultado['aplicados'])
+        CONFLICTOS_LOTE.con_etiquetas(lote['tabla']).inc(len(resultado['conflictos']))
+        return resultado
+
+    def _aplicar_transaccion(self, lote: Dict[str, Any]) -> Dict[str, Any]:
+        with self.engine.begin() as conexion:
+            if lote['tabla'] == vivienda_actividad.name:
+                resultado = self._aplicar_enlaces(conexion, lote)
+            else:
+                resultado = self._aplicar_filas(conexion, lote)
+        if resultado['aplicados']:
+            # Invalida caches de reportes y del asistente (una vez por lote, ya confirmado)
+            incrementar_version_datos(self.engine)
+        return resultado
+
+    def _aplicar_filas(self, conexion: Connection, lote: Dict[str, Any]) -> Dict[str, Any]:
+        nombre = lote['tabla']
+        tabla = Base.metadata.tables[nombre]
+        columnas = COLUMNAS_SUBIDA[nombre]
+        resultado = {'ids': [], 'bajas': [], 'conflictos': [], 'aplicados': 0}
+        altas, cambios, bajas = lote.get('altas', []), lote.get('cambios', []), lote.get('bajas', [])
+
+        def conflicto(id_local: int, motivo: str) -> None:
+            resultado['conflictos'].append({'id_local': id_local, 'motivo': motivo})
+
+        # Llaves foraneas y duplicados, validados en bloque para todo el lote
+        invalidas = self._llaves_invalidas(conexion, nombre, [m['datos'] for m in altas + cambios])
+
+        # --- Altas ---
+        previas = {}
+        if altas:
+            previas = dict(conexion.execute(
+                select(RegistroCampo.id_local, RegistroCampo.id_central).where(
+                    RegistroCampo.dispositivo == lote['dispositivo'],
+                    RegistroCampo.tabla == nombre,
+                    RegistroCampo.id_local.in_([a['id_local'] for a in altas])
+                )
+            ).all())
+
+        # Reenvio de un lote ya aplicado: no se duplica, se regresa la huella de la fila central
+        huellas_previas = self._huellas_centrales(conexion, tabla, columnas, list(previas.values()))
+
+        nuevas = []
+        for alta in altas:
+            if alta['id_local'] in previas:
+                id_central = previas[alta['id_local']]
+                if id_central in huellas_previas:
+                    resultado['ids'].append([alta['id_local'], id_central, huellas_previas[id_central]])
+                else:
+                    conflicto(alta['id_local'], "La fila fue eliminada en la central")
+            elif motivo := self._motivo_invalido(nombre, alta['datos'], invalidas):
+                conflicto(alta['id_local'], motivo)
+            else:
+                nuevas.append(alta)
+
+        if nuevas:
+            ids_centrales = self._insertar(conexion, tabla, [self._de_json(tabla, a['datos']) for a in nuevas])
+            conexion.execute(insert(RegistroCampo), [
+                {'dispositivo': lote['dispositivo'], 'tabla': nombre, 'id_local': a['id_local'], 'id_central': id_central}
+                for a, id_central in zip(nuevas, ids_centrales)
+            ])
+            for alta, id_central in zip(nuevas, ids_centrales):
+                resultado['ids'].append([alta['id_local'], id_central, huella(alta['datos'])])
+            resultado['aplicados'] += len(nuevas)
+
+        # Huellas actuales de las filas centrales que el lote quiere cambiar o borrar
+        actuales = self._huellas_centrales(conexion, tabla, columnas, [m['id_central'] for m in cambios + bajas])
+
+        # --- Cambios ---
+        aceptados = []
+        for cambio in cambios:
+            actual = actuales.get(cambio['id_central'])
+            if actual is None:
+                conflicto(cambio['id_local'], "La fila fue eliminada en la central")
+            elif actual not in (cambio['huella'], huella(cambio['datos'])):
+                conflicto(cambio['id_local'], "La fila fue modificada en la central")
+            elif motivo := self._motivo_invalido(nombre, cambio['datos'], invalidas, cambio['id_central']):
+                conflicto(cambio['id_local'], motivo)
+            else:
+                aceptados.append(cambio)
+
+        if aceptados:
+            valores = {c: bindparam(c) for c in columnas}
+            if 'version' in tabla.c:
+                # Igual que un UPDATE del ORM: una edicion abierta en la central detecta el cambio
+                valores['version'] = tabla.c.version + 1
+            conexion.execute(
+                update(tabla).where(tabla.c.id == bindparam('_id')).values(valores),
+                [{'_id': c['id_central'], **self._de_json(tabla, c['datos'])} for c in aceptados]
+            )
+            for cambio in aceptados:
+                resultado['ids'].append([cambio['id_local'], cambio['id_central'], huella(cambio['datos'])])
+            resultado['aplicados'] += len(aceptados)
+
+        # --- Bajas ---
+        borrar = []
+        for baja in bajas:
+            actual = actuales.get(baja['id_central'])
+            if actual is None:
+                resultado['bajas'].append(baja['id_local'])  # Ya no existe: nada que hacer
+            elif actual != baja['huella']:
+                conflicto(baja['id_local'], "La fila fue modificada en la central; no se elimino")
+            else:
+                borrar.append(baja)
+
+        if borrar:
+            conexion.execute(delete(tabla).where(tabla.c.id == bindparam('_id')), [{'_id': b['id_central']} for b in borrar])
+            resultado['bajas'].extend(b['id_local'] for b in borrar)
+            resultado['aplicados'] += len(borrar)
+        return resultado
+
+    def _aplicar_enlaces(self, conexion: Connection, lote: Dict[str, Any]) -> Dict[str, Any]:
+        resultado = {'enlaces': [], 'bajas': [], 'conflictos': [], 'aplicados': 0}
+        altas, bajas = lote.get('altas', []), lote.get('bajas', [])
+        ids_viviendas = {e['vivienda_id'] for e in altas + bajas}
+        if not ids_viviendas:
+            return resultado
+
+        viviendas = self._ids_existentes(conexion, 'vivienda', ids_viviendas)
+        actividades = self._ids_existentes(conexion, 'actividad_economica', {e['actividad_id'] for e in altas})
+        existentes = set(conexion.execute(
+            select(vivienda_actividad.c.vivienda_id, vivienda_actividad.c.actividad_id)
+            .where(vivienda_actividad.c.vivienda_id.in_(ids_viviendas))
+        ).all())
+
+        nuevas = []
+        for enlace in altas:
+            par = (enlace['vivienda_id'], enlace['actividad_id'])
+            if enlace['vivienda_id'] not in viviendas:
+                resultado['conflictos'].append({'id_local': enlace['vivienda_local'], 'motivo': "La vivienda fue eliminada en la central"})
+                continue
+            if enlace['actividad_id'] not in actividades:
+                resultado['conflictos'].append({'id_local': enlace['vivienda_local'], 'motivo': f"La actividad {par[1]} ya no existe en la central"})
+                continue
+            if par not in existentes:
+                nuevas.append({'vivienda_id': par[0], 'actividad_id': par[1]})
+                existentes.add(par)
+            resultado['enlaces'].append([enlace['vivienda_local'], enlace['actividad_id']])
+
+        if nuevas:
+            conexion.execute(insert(vivienda_actividad), nuevas)
+            resultado['aplicados'] += len(nuevas)
+
+        quitar = [e for e in bajas if (e['vivienda_id'], e['actividad_id']) in existentes]
+        if quitar:
+            conexion.execute(
+                delete(vivienda_actividad).where(
+                    tuple_(vivienda_actividad.c.vivienda_id, vivienda_actividad.c.actividad_id)
+                    .in_([(e['vivienda_id'], e['actividad_id']) for e in quitar])
+                )
+            )
+            resultado['aplicados'] += len(quitar)
+        resultado['bajas'] = [[e['vivienda_local'], e['actividad_id']] for e in bajas]
+        return resultado
+
+    # --- Auxiliares ---
+
+    @staticmethod
+    def _de_json(tabla, datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte los valores del JSON a los tipos de la columna (fechas)."""
+        convertidos = dict(datos)
+        for columna, valor in datos.items():
+            if isinstance(valor, str) and isinstance(tabla.c[columna].type, Date):
+                convertidos[columna] = date.fromisoformat(valor)
+        return convertidos
+
+    @staticmethod
+    def _insertar(conexion: Connection, tabla, filas: List[Dict[str, Any]]) -> List[int]:
+        """
+        Inserta en bloque y regresa los ids en el orden de 'filas'.
+        Con RETURNING ordenado (SQLite, PostgreSQL) es un solo executemany;
+        en MySQL se inserta fila por fila dentro de la misma transaccion.
+        """
+        if conexion.dialect.insert_executemany_returning_sort_by_parameter_order:
+            return list(conexion.execute(insert(tabla).returning(tabla.c.id, sort_by_parameter_order=True), filas).scalars())
+        return [conexion.execute(insert(tabla).values(**fila)).inserted_primary_key[0] for fila in filas]
+
+    @staticmethod
+    def _ids_existentes(conexion: Connection, nombre: str, ids: Set[int]) -> Set[int]:
+        if not ids:
+            return set()
+        tabla = Base.metadata.tables[nombre]
+        return set(conexion.execute(select(tabla.c.id).where(tabla.c.id.in_(ids))).scalars())
+
+    @staticmethod
+    def _huellas_centrales(conexion: Connection, tabla, columnas: List[str], ids: List[int]) -> Dict[int, str]:
+        if not ids:
+            return {}
+        filas = conexion.execute(select(tabla.c.id, *(tabla.c[c] for c in columnas)).where(tabla.c.id.in_(ids)))
+        return {fila.id: huella({c: fila._mapping[c] for c in columnas}) for fila in filas}
+
+    def _llaves_invalidas(self, conexion: Connection, nombre: str, datos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Llaves foraneas existentes y viviendas ya registradas (direccion, localidad), en pocas consultas."""
+        if nombre == 'habitante':
+            return {'viviendas': self._ids_existentes(conexion, 'vivienda', {d['vivienda_id'] for d in datos})}
+
+        vivienda = Base.metadata.tables['vivienda']
+        pares = {(d['direccion'], d['localidad_id']) for d in datos}
+        duplicadas: Dict[Tuple[str, int], int] = {}
+        if pares:
+            duplicadas = {(f.direccion, f.localidad_id): f.id for f in conexion.execute(
+                select(vivienda.c.id, vivienda.c.direccion, vivienda.c.localidad_id).where(and_(
+                    vivienda.c.localidad_id.in_({p[1] for p in pares}),
+                    vivienda.c.direccion.in_({p[0] for p in pares})
+                ))
+            )}
+        return {
+            'localidades': self._ids_existentes(conexion, 'localidad', {d['localidad_id'] for d in datos}),
+            'tipos': self._ids_existentes(conexion, 'tipo_vivienda', {d['tipo_vivienda_id'] for d in datos}),
+            'duplicadas': duplicadas,
+        }
+
+    @staticmethod
+    def _motivo_invalido(nombre: str, datos: Dict[str, Any], invalidas: Dict[str, Any],
+                         id_central: Optional[int] = None) -> Optional[str]:
+        """Motivo por el que la fila no se puede aplicar, o None si es valida."""
+        if nombre == 'habitante':
+            if datos['vivienda_id'] not in invalidas['viviendas']:
+                return "La vivienda del habitante no existe en la central"
+            return None
+        if datos['localidad_id'] not in invalidas['localidades']:
+            return "La localidad ya no existe en la central"
+        if datos['tipo_vivienda_id'] not in invalidas['tipos']:
+            return "El tipo de vivienda ya no existe en la central"
+        duplicada = invalidas['duplicadas'].get((datos['direccion'], datos['localidad_id']))
+        if duplicada is not None and duplicada != id_central:
+            return f"Ya existe la vivienda {duplicada} con la misma direccion en la localidad"
+        return None
+
+
+class TransporteDirecto:
+    """
+    Transporte que habla directo con la BD central (red local o VPN).
+    Recibe y regresa lotes empaquetados (bytes comprimidos), igual que lo haria
+    un transporte HTTP, asi el sincronizador no depende de como se llega a la central.
+    """
+
+    def __init__(self, engine_central: Engine):
+        self.aplicador = AplicadorLotes(engine_central)
+
+    def enviar_lote(self, lote: bytes) -> bytes:
+        return empaquetar(self.aplicador.aplicar(desempaquetar(lote)))
+
+    def obtener_catalogos(self, solicitud: bytes) -> bytes:
+        return empaquetar(self.aplicador.catalogos(desempaquetar(solicitud).get('huellas', {})))
+
+
+class TransporteHttp:
+    """
+    Transporte contra la API de la central (python servicio.py --api PUERTO):
+    POST /campo/lote y /campo/catalogos con los mismos bytes empaquetados.
+    Si la API pide token (--token del servicio), se manda como 'Authorization: Bearer'.
+    """
+
+    def __init__(self, url_servicio: str, token: str = "", timeout: float = 60):
+        self.url_servicio = url_servicio.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _enviar(self, ruta: str, cuerpo: bytes) -> bytes:
+        encabezados = {'Content-Type': 'application/octet-stream'}
+        if self.token:
+            encabezados['Authorization'] = f"Bearer {self.token}"
+        solicitud = urllib.request.Request(self.url_servicio + ruta, data=cuerpo, method='POST', headers=encabezados)
+        with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+            return respuesta.read()
+
+    def enviar_lote(self, lote: bytes) -> bytes:
+        return self._enviar('/campo/lote', lote)
+
+    def obtener_catalogos(self, solicitud: bytes) -> bytes:
+        return self._enviar('/campo/catalogos', solicitud)
+
+
+def crear_transporte(central: str, token: str = ""):
+    """TransporteHttp si 'central' es la URL de la API (http/https, con su token); si no, TransporteDirecto a esa BD."""
+    if central.startswith(('http://', 'https://')):
+        return TransporteHttp(central, token)
+    return TransporteDirecto(crear_engine(central))
\ No newline at end of file
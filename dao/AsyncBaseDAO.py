@@ -0,0 +1,127 @@
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import TypeVar, Type, List, Optional, Any, AsyncIterator
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from .BaseDAO import SesionCenso
+from .Conexion import configurar_sqlite
+from .Instrumentacion import instrumentacion, medir_operacion
+
+T = TypeVar('T') # Tipo genérico
+
+# Drivers asyncio por backend, en orden de preferencia
+DRIVERS_ASINCRONOS = {
+    'sqlite': ['aiosqlite'],
+    'mysql': ['asyncmy', 'aiomysql'],
+}
+
+
+def a_url_asincrona(url: str) -> str:
+    """
+    Convierte una URL sincrona (ej. 'mysql+pymysql://...') a su equivalente asyncio
+    (ej. 'mysql+asyncmy://...'), usando el primer driver instalado.
+    Lanza ValueError si el backend no tiene un driver asyncio disponible.
+    """
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+
+    for driver in DRIVERS_ASINCRONOS.get(backend, []):
+        if importlib.util.find_spec(driver) is not None:
+            return url_obj.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+    raise ValueError(f"No hay un driver asyncio instalado para '{backend}' (opciones: {DRIVERS_ASINCRONOS.get(backend, [])})")
+
+
+def crear_engine_asincrono(url: str, **kwargs) -> AsyncEngine:
+    """
+    Crea un AsyncEngine a partir de la misma URL que usa el engine sincrono.
+    """
+    engine = create_async_engine(a_url_asincrona(url), **kwargs)
+    if engine.dialect.name == 'sqlite':
+        # Mismos PRAGMA que el engine sincrono (WAL, llaves foraneas, cache)
+        configurar_sqlite(engine.sync_engine)
+    return engine
+
+
+class AsyncBaseDAO:
+    """
+    Variante asyncio de BaseDAO (sqlalchemy.ext.asyncio), solo de lectura.
+    Hoy la usan solo los reportes del dashboard
+    (CensoController.generar_reportes_dashboard_async). Las escrituras van por
+    los DAO sincronos, que son los que traducen StaleDataError a
+    ConflictoConcurrencia, aplican los reintentos y revisan la 'version'.
+
+    Nota: en asyncio no hay lazy loading implicito; las relaciones que use la
+    vista deben cargarse con 'options' (selectinload/joinedload).
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        """
+        Inicializa el SessionLocal asincrono (async_sessionmaker)
+        """
+        self.engine = engine
+        # Los eventos de ejecucion viven en el engine sincrono interno
+        instrumentacion.instrumentar_engine(engine.sync_engine)
+        self.SessionLocal = async_sessionmaker(bind=engine, sync_session_class=SesionCenso, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def _get_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Manejador de contexto asincrono para la sesion.
+        Garantiza que la sesion cierre y se haga rollback/commit
+        """
+        session = self.SessionLocal()
+
+        try:
+            yield session
+            # Si no hay errores, se hace commit al salir del 'async with'
+            await session.commit()
+        except SQLAlchemyError as e:
+            # Si hay errores se hace rollback
+            await session.rollback()
+            raise e
+        finally:
+            # Siempre se cierra la sesion
+            await session.close()
+
+    @medir_operacion
+    async def obtener_por_id(self, modelo: Type[T], id_entidad: int, options: List[Any]=None) -> Optional[T]:
+        """
+        Obtiene una entidad por su clave primaria
+
+        Args:
+            options: Lista de estrategias de carga (ej. [selectinload(Vivienda.habitantes)])
+        """
+        try:
+            async with self._get_session() as session:
+                statement = select(modelo).where(modelo.id == id_entidad)
+
+                if options:
+                    statement = statement.options(*options)
+
+                return await session.scalar(statement)
+        except SQLAlchemyError as e:
+            print(f"Error al buscar {modelo.__name__} por ID (async): {e}")
+            return None
+
+    @medir_operacion
+    async def listar_todos(self, modelo: Type[T], options: List[Any]=None) -> List[T]:
+        """
+        Obtiene todas las entidades de un tipo con posibles estrategias de Eager Loading
+
+        Args:
+            options: Lista de estrategias de carga (ej. [selectinload(Municipio.localidades)])
+        """
+        try:
+            async with self._get_session() as session:
+                statement = select(modelo)
+
+                if options:
+                    statement = statement.options(*options)
+
+                return (await session.scalars(statement)).all()
+        except SQLAlchemyError as e:
+            print(f"Error al listar todos los {modelo.__name__} (async): {e}")
+            return []
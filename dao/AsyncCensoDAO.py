@@ -0,0 +1,101 @@
+from .AsyncBaseDAO import AsyncBaseDAO
+from .CensoDAO import CensoDAO
+from modelo import Vivienda
+from sqlalchemy.orm import selectinload
+from typing import List, Dict, Any, Optional
+from .Instrumentacion import medir_operacion
+
+class AsyncCensoDAO(AsyncBaseDAO):
+    """
+    Variante asyncio de CensoDAO.
+    Reutiliza los constructores de consultas de CensoDAO para que ambas
+    versiones generen exactamente el mismo SQL.
+    """
+
+    @medir_operacion
+    async def obtener_vivienda_con_habitantes(self, id_vivienda: int) -> Vivienda | None:
+        """
+        Obtiene una vivienda y carga eagerly (anticipadamente) sus habitantes
+        """
+        opciones = [selectinload(Vivienda.habitantes)]
+        return await self.obtener_por_id(Vivienda, id_vivienda, options=opciones)
+
+    # --- Metodos para Reportes y Dashboard ---
+
+    @medir_operacion
+    async def obtener_conteo_poblacion_por_ubicacion(self,
+                                                     municipio_id: Optional[int] = None,
+                                                     localidad_id: Optional[int] = None
+                                                     ) -> List[Dict[str, Any]]:
+        """
+        Calcula el número total de población por Localidad, Municipio.
+        """
+        try:
+            async with self._get_session() as session:
+                consulta = CensoDAO._consulta_conteo_poblacion(municipio_id, localidad_id)
+                return list((await session.execute(consulta)).mappings().all())
+        except Exception as e:
+            print(f"Error al generar reporte de población (async): {e}")
+            return []
+
+    @medir_operacion
+    async def obtener_conteo_por_tipo_vivienda(self,
+                                               municipio_id: Optional[int] = None,
+                                               localidad_id: Optional[int] = None
+                                               ) -> List[Dict[str, Any]]:
+        """
+        Calcula la cantidad de habitantes que viven en cada tipo de casa.
+        """
+        try:
+            async with self._get_session() as session:
+                consulta = CensoDAO._consulta_conteo_tipo_vivienda(municipio_id, localidad_id)
+                return (await session.execute(consulta)).mappings().all()
+        except Exception as e:
+            print(f"Error al generar reporte por tipo de vivienda (async): {e}")
+            return []
+
+    @medir_operacion
+    async def obtener_actividades_economicas_por_vivienda(self, id_vivienda: int) -> List[str]:
+        """
+        Obtiene los nombres de las actividades economicas de una vivienda especifica
+        """
+        try:
+            async with self._get_session() as session:
+                resultado = await session.execute(CensoDAO._consulta_actividades_vivienda(id_vivienda))
+                vivienda = resultado.scalar_one_or_none()
+
+                if vivienda:
+                    return [act.nombre for act in vivienda.actividades]
+                return []
+        except Exception as e:
+            print(f"Error al obtener actividades economicas para vivienda {id_vivienda} (async): {e}")
+            return []
+
+    @medir_operacion
+    async def obtener_estimaciones_estadisticas_por_localidad(self) -> List[Dict[str, Any]]:
+        """
+        Calcula estadisticas clave por localidad.
+        """
+        try:
+            async with self._get_session() as session:
+                consulta = CensoDAO._consulta_estimaciones_por_localidad()
+                return (await session.execute(consulta)).mappings().all()
+        except Exception as e:
+            print(f"Error al generar estimaciones estadisticas por localidad (async): {e}")
+            return []
+
+    @medir_operacion
+    async def obtener_todas_las_edades(self,
+                                       municipio_id: Optional[int] = None,
+                                       localidad_id: Optional[int] = None
+                                       ) -> List[int]:
+        """
+        Obtiene una lista de las edades de todos los habitantes.
+        """
+        try:
+            async with self._get_session() as session:
+                statement = CensoDAO._consulta_edades(municipio_id, localidad_id)
+                return (await session.scalars(statement)).all()
+        except Exception as e:
+            print(f"Error al obtener la lista de edades (async): {e}")
+            return []
@@ -1,12 +1,91 @@
 from sqlalchemy.orm import sessionmaker, Session, joinedload, selectinload
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 from typing import TypeVar, Type, List, Optional, Any
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, event, inspect
 from contextlib import contextmanager
 from constants import ENGINE
+from modelo import Administrador, VersionDatos
+from .Instrumentacion import instrumentacion, medir_operacion
+from .Reintentos import ConflictoConcurrencia, relanzar_si_transitorio
 
 T = TypeVar('T') # Tipo genérico
 
+# IDs por sentencia en los IN (...) de escrituras en bloque (SQLite antiguo admite 999 parametros)
+TAM_BLOQUE_IN = 900
+
+
+def incrementar_version_datos(engine) -> None:
+    """
+    Incrementa el sello de version de los datos del censo (tabla 'version_datos',
+    fila sembrada por la migracion 6).
+    Se ejecuta en su propia transaccion corta, despues del COMMIT de la escritura:
+    asi el bloqueo de esa unica fila no se mantiene durante las transacciones de
+    los escritores (que en MySQL quedarian en fila unos tras otros).
+    Quien cachea lee el sello ANTES que los datos, por lo que subirlo despues
+    del COMMIT nunca deja datos viejos guardados con un sello nuevo.
+    """
+    try:
+        with engine.begin() as conexion:
+            conexion.execute(
+                update(VersionDatos)
+                .where(VersionDatos.id == 1)
+                .values(version=VersionDatos.version + 1)
+            )
+    except SQLAlchemyError as e:
+        # La escritura ya se confirmo: no se propaga (un reintento la repetiria)
+        print(f"Advertencia: No se pudo incrementar la versión de los datos: {e}")
+
+
+def marcar_cambio_censo(session: Session) -> None:
+    """Indica que la transaccion de 'session' modifico datos del censo (el sello sube al hacer commit)."""
+    session.info['censo_modificado'] = True
+
+
+def _al_hacer_flush(session, flush_context) -> None:
+    """
+    Listener 'after_flush': si el flush modifico datos del censo
+    (cualquier entidad salvo Administrador), marca la sesion.
+    """
+    for entidad in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(entidad, (Administrador, VersionDatos)):
+            marcar_cambio_censo(session)
+            return
+
+
+def _al_confirmar(session) -> None:
+    """
+    Listener 'after_commit': si la transaccion confirmada cambio el censo, deja
+    pendiente subir el sello. Aqui la sesion aun tiene su conexion: subirlo ya
+    pediria una segunda conexion al pool (con el pool lleno se queda esperando).
+    """
+    if session.info.pop('censo_modificado', False):
+        session.info['version_pendiente'] = True
+
+
+def subir_version_pendiente(session: Session, engine) -> None:
+    """Despues de session.close() (conexion ya devuelta al pool): sube el sello si quedo pendiente."""
+    if session.info.pop('version_pendiente', False):
+        incrementar_version_datos(engine)
+
+
+def _al_revertir(session) -> None:
+    """Listener 'after_rollback': los cambios se descartaron, el sello no se toca."""
+    session.info.pop('censo_modificado', None)
+
+
+class SesionCenso(Session):
+    """
+    Session usada por todos los DAOs (sincronos y asincronos).
+    Cada escritura del censo incrementa la version de los datos (invalida caches).
+    """
+    pass
+
+
+event.listen(SesionCenso, 'after_flush', _al_hacer_flush)
+event.listen(SesionCenso, 'after_commit', _al_confirmar)
+event.listen(SesionCenso, 'after_rollback', _al_revertir)
+
 class BaseDAO:
     """
     Clase base que implementa el CRUD generico y soporta estrategias de carga para Eager Loading
@@ -14,9 +93,12 @@ class BaseDAO:
 
     def __init__(self, engine):
         """
-        Inicializa el SessionLocal (SessionMaker)
+        Inicializa el SessionLocal (SessionMaker) sobre el engine recibido
+        (MySQL o SQLite); si es None se usa el ENGINE de constants.py.
+        El engine queda instrumentado (tiempos y conteos en dao/Instrumentacion.py)
         """
-        self.SessionLocal = sessionmaker(bind=ENGINE, expire_on_commit=False)
+        self.engine = instrumentacion.instrumentar_engine(engine if engine is not None else ENGINE)
+        self.SessionLocal = sessionmaker(bind=self.engine, class_=SesionCenso, expire_on_commit=False)
 
     @contextmanager
     def _get_session(self) -> Session:
@@ -35,9 +117,25 @@ class BaseDAO:
             session.rollback()
             raise e
         finally:
-            # Siempre se cierra la sesion
+            # Siempre se cierra la sesion; despues, con la conexion libre, se sube el sello
             session.close()
+            subir_version_pendiente(session, self.engine)
+
+    @contextmanager
+    def _get_session_lectura(self) -> Session:
+        """
+        Manejador de contexto para consultas de solo lectura.
+        No hace commit (ni flush); al cerrar, la conexion regresa al pool.
+        """
+        session = self.SessionLocal()
 
+        try:
+            yield session
+        finally:
+            session.close()
+            subir_version_pendiente(session, self.engine)
+
+    @medir_operacion
     def guardar(self, entidad: T) -> Optional[T]:
         """
         Guarda (INSERT) o actualiza (UPDATE) una entidad
@@ -47,9 +145,17 @@ class BaseDAO:
                 session.add(entidad)
                 # session.refresh(entidad)
                 return entidad
-        except SQLAlchemyError:
+        except StaleDataError as e:
+            # El UPDATE no encontro la version leida: otro usuario la cambio antes
+            # (la identidad no dispara una carga: tras el rollback la entidad quedo expirada)
+            identidad = inspect(entidad).identity
+            raise ConflictoConcurrencia(type(entidad).__name__, identidad[0] if identidad else None) from e
+        except SQLAlchemyError as e:
+            # Deadlock, lock o BD ocupada: el controlador decide si repite
+            relanzar_si_transitorio(e)
             return None
         
+    @medir_operacion
     def obtener_por_id(self, modelo: Type[T], id_entidad: int, options: List[Any]=None) -> Optional[T]:
         """
         Obtiene una entidad por su clave primaria
@@ -71,6 +177,42 @@ class BaseDAO:
             print(f"Error al buscar {modelo.__name__} por ID: {e}")
             return None
         
+    @medir_operacion
+    def obtener_varios(self, modelo: Type[T], ids: List[int], options: List[Any]=None) -> List[T]:
+        """
+        Obtiene las entidades de varios IDs en una sola consulta (IN).
+        Los IDs que no existen simplemente no aparecen en el resultado.
+        """
+        if not ids:
+            return []
+        try:
+            with self._get_session_lectura() as session:
+                statement = select(modelo).where(modelo.id.in_(set(ids)))
+
+                if options:
+                    statement = statement.options(*options)
+
+                return session.scalars(statement).all()
+        except SQLAlchemyError as e:
+            print(f"Error al buscar varios {modelo.__name__}: {e}")
+            return []
+
+    @medir_operacion
+    def guardar_todos(self, entidades: List[T]) -> Optional[List[T]]:
+        """
+        Guarda varias entidades (con sus relaciones en cascada) en una sola
+        transaccion: se guardan todas o ninguna.
+        """
+        try:
+            with self._get_session() as session:
+                session.add_all(entidades)
+                return entidades
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al guardar el lote: {e}")
+            return None
+
+    @medir_operacion
     def listar_todos(self, modelo: Type[T], options: List[Any]=None) -> List[T]:
         """
         Obtiene todas las entidades de un tipo con posibles estrategias con Eager Loading
@@ -90,19 +232,89 @@ class BaseDAO:
             print(f"Error al listar todos los {modelo.__name__}: {e}")
             return []
         
-    def eliminar(self, modelo: Type[T], id_entidad: int) -> bool:
+    @medir_operacion
+    def listar_pagina(self, modelo: Type[T], limite: int, desplazamiento: int = 0, options: List[Any]=None) -> List[T]:
+        """
+        Obtiene una pagina de entidades (ordenadas por ID) con posibles estrategias de Eager Loading
+
+        Args:
+            limite: cantidad maxima de entidades
+            desplazamiento: entidades a saltar (limite * numero de pagina)
+        """
+        try:
+            with self._get_session_lectura() as session:
+                statement = select(modelo).order_by(modelo.id).limit(limite).offset(desplazamiento)
+
+                if options:
+                    statement = statement.options(*options)
+
+                return session.scalars(statement).all()
+        except SQLAlchemyError as e:
+            print(f"Error al listar la pagina de {modelo.__name__}: {e}")
+            return []
+
+    @medir_operacion
+    def eliminar(self, modelo: Type[T], id_entidad: int, version: Optional[int] = None) -> bool:
         """
         Elimina una entidad por su ID.
+        Con 'version' (modelos con columna 'version': Vivienda, Habitante) solo la
+        borra si sigue en la version que vio el usuario (DELETE ... AND version = :v);
+        si otro la cambio, lanza ConflictoConcurrencia.
         Retorna True si fue exitoso, False si no.
         """
+        if version is None:
+            return self.eliminar_varios(modelo, [id_entidad]) == 1
         try:
             with self._get_session() as session:
-                # Primero, obtenemos la entidad para asegurar que existe
-                entidad = session.get(modelo, id_entidad)
-                if entidad:
-                    session.delete(entidad)
+                resultado = session.execute(
+                    delete(modelo).where(modelo.id == id_entidad, modelo.version == version),
+                    execution_options={'synchronize_session': False})
+                if resultado.rowcount:
+                    marcar_cambio_censo(session)
                     return True
-                return False # No se encontró la entidad
+                actual = session.scalar(select(modelo.version).where(modelo.id == id_entidad))
         except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
             print(f"Error al eliminar {modelo.__name__} ID {id_entidad}: {e}")
-            return False
\ No newline at end of file
+            return False
+        if actual is not None:
+            raise ConflictoConcurrencia(modelo.__name__, id_entidad, version, actual)
+        return False # No se encontró la entidad
+
+    @staticmethod
+    def _ejecutar_en_bloque(session: Session, ids: List[int], sentencia, censo: bool = True) -> int:
+        """
+        Ejecuta sentencia(bloque_de_ids) por bloques de TAM_BLOQUE_IN IDs en la
+        transaccion de 'session' y regresa el total de filas afectadas.
+        Las sentencias en bloque (Core) no pasan por el flush: si 'censo' y
+        hubo cambios, la sesion se marca para subir el sello al confirmar.
+        """
+        afectadas = 0
+        for inicio in range(0, len(ids), TAM_BLOQUE_IN):
+            resultado = session.execute(sentencia(ids[inicio:inicio + TAM_BLOQUE_IN]),
+                                        execution_options={'synchronize_session': False})
+            afectadas += resultado.rowcount
+        if afectadas and censo:
+            marcar_cambio_censo(session)
+        return afectadas
+
+    @medir_operacion
+    def eliminar_varios(self, modelo: Type[T], ids: List[int]) -> int:
+        """
+        Elimina varias entidades con DELETE ... WHERE id IN (...), sin cargarlas.
+        Los hijos (localidades, viviendas, habitantes, asociaciones) los borra
+        la BD con ON DELETE CASCADE en la misma sentencia.
+        Retorna cuantas filas se eliminaron (0 si ninguna o si hubo error).
+        """
+        ids = list(set(ids))
+        if not ids:
+            return 0
+        try:
+            with self._get_session() as session:
+                return self._ejecutar_en_bloque(
+                    session, ids, lambda bloque: delete(modelo).where(modelo.id.in_(bloque)),
+                    censo=modelo is not Administrador)
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al eliminar {modelo.__name__} IDs {ids[:10]}: {e}")
+            return 0
\ No newline at end of file
@@ -0,0 +1,170 @@
+import re
+import sqlite3
+from typing import List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import TextClause
+
+# --- INDICES DE BUSQUEDA ---
+# Columnas con busqueda de texto: (tabla, columna)
+CAMPOS_BUSQUEDA: Tuple[Tuple[str, str], ...] = (('habitante', 'nombre_completo'), ('vivienda', 'direccion'))
+
+# SQLite (FTS5): un indice por palabras, sin acentos ni mayusculas ("Gonzalez" encuentra "González"),
+# y uno por trigramas para la busqueda aproximada (errores de dedo, fragmentos de palabra).
+TOKENIZADOR_PALABRAS = "unicode61 remove_diacritics 2"
+# remove_diacritics en trigramas requiere SQLite 3.45; antes los trigramas distinguen acentos
+TOKENIZADOR_TRIGRAMAS = "trigram remove_diacritics 1" if sqlite3.sqlite_version_info >= (3, 45, 0) else "trigram"
+
+# Modos de busqueda, del mas preciso al mas tolerante
+MODO_PALABRAS = 'palabras'       # Todas las palabras (o su inicio), con el indice de texto completo
+MODO_APROXIMADO = 'aproximada'   # Trigramas / n-gramas en comun, ordenado por parecido
+MODO_LIKE = 'like'               # Sin indice (BD sin migrar o sin FTS5): LIKE '%texto%'
+
+
+def _crear_fts5(conexion: Connection, tabla: str, columna: str) -> None:
+    """Tablas FTS5 de 'tabla.columna' (contenido externo) y los triggers que las mantienen al dia."""
+    indices = [(f"{tabla}_fts", TOKENIZADOR_PALABRAS), (f"{tabla}_trigramas", TOKENIZADOR_TRIGRAMAS)]
+    for nombre, tokenizador in indices:
+        conexion.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {nombre} USING fts5("
+            f"{columna}, content='{tabla}', content_rowid='id', tokenize='{tokenizador}')"
+        ))
+        # Indexa las filas que ya existian
+        conexion.execute(text(f"INSERT INTO {nombre}({nombre}) VALUES ('rebuild')"))
+
+    # Los triggers tambien cubren las escrituras en bloque (Core) y el ON DELETE CASCADE
+    alta = " ".join(f"INSERT INTO {n}(rowid, {columna}) VALUES (new.id, new.{columna});" for n, _ in indices)
+    baja = " ".join(f"INSERT INTO {n}({n}, rowid, {columna}) VALUES ('delete', old.id, old.{columna});"
+                    for n, _ in indices)
+    conexion.execute(text(f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_ai AFTER INSERT ON {tabla} BEGIN {alta} END"))
+    conexion.execute(text(f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_ad AFTER DELETE ON {tabla} BEGIN {baja} END"))
+    conexion.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_au AFTER UPDATE OF {columna} ON {tabla} BEGIN {baja} {alta} END"
+    ))
+
+
+def _crear_fulltext(conexion: Connection, tabla: str, columna: str) -> None:
+    """Indice FULLTEXT de MySQL con el parser ngram (bigramas: tolera errores y no depende de espacios)."""
+    nombre = f"ftx_{tabla}_{columna}"
+    if nombre in {i['name'] for i in inspect(conexion).get_indexes(tabla)}:
+        return
+    # MariaDB no tiene el parser ngram: usa el FULLTEXT por palabras
+    parser = "" if conexion.dialect.name == 'mariadb' or getattr(conexion.dialect, 'is_mariadb', False) \
+        else " WITH PARSER ngram"
+    conexion.execute(text(f"ALTER TABLE {tabla} ADD FULLTEXT INDEX {nombre} ({columna}){parser}"))
+
+
+def crear_indices_busqueda(conexion: Connection) -> None:
+    """
+    Crea los indices de texto completo de CAMPOS_BUSQUEDA segun el motor
+    (FTS5 en SQLite, FULLTEXT en MySQL). Es idempotente.
+    Si SQLite no trae FTS5, no crea nada y la busqueda usa LIKE.
+    """
+    dialecto = conexion.dialect.name
+    for tabla, columna in CAMPOS_BUSQUEDA:
+        if dialecto == 'sqlite':
+            try:
+                _crear_fts5(conexion, tabla, columna)
+            except OperationalError as e:
+                print(f"Advertencia: SQLite sin FTS5, la búsqueda usará LIKE ({e.orig}).")
+                return
+        elif dialecto in ('mysql', 'mariadb'):
+            _crear_fulltext(conexion, tabla, columna)
+
+
+# --- CONSULTAS ---
+
+def terminos(texto: str) -> List[str]:
+    """Palabras del texto buscado (sin comillas ni operadores de la sintaxis de busqueda)."""
+    return re.findall(r"\w+", texto or "")
+
+
+def modos(dialecto: str) -> List[str]:
+    """
+    Modos que se prueban, en orden, cuando la busqueda anterior no encontro nada.
+    MODO_LIKE no esta en la lista de los motores con indice: recorre toda la tabla,
+    asi que solo se usa si falta el indice (ver CensoDAO.buscar).
+    """
+    if dialecto in ('sqlite', 'mysql', 'mariadb'):
+        return [MODO_PALABRAS, MODO_APROXIMADO]
+    return [MODO_LIKE]
+
+
+def _fragmentos_trigramas(palabra: str) -> List[str]:
+    """
+    Fragmentos de 'palabra' para la busqueda aproximada con trigramas: un error
+    de dedo (letra cambiada, de mas o de menos) deja intacta al menos una de
+    las dos mitades, asi que basta con que coincida cualquiera. Las palabras
+    cortas (menos de 6 letras) se buscan por cualquiera de sus trigramas.
+    """
+    if len(palabra) < 6:
+        return list(dict.fromkeys(palabra[i:i + 3] for i in range(len(palabra) - 2)))
+    mitad = len(palabra) // 2
+    return [palabra[:mitad], palabra[-mitad:]]
+
+
+def expresion(dialecto: str, modo: str, palabras: List[str]) -> Optional[str]:
+    """
+    Valor del parametro :q para la consulta de 'modo' (None si con esas
+    palabras el modo no puede encontrar nada, ej. trigramas de palabras cortas).
+    """
+    if modo == MODO_LIKE:
+        return "%" + " ".join(palabras) + "%"
+    if dialecto == 'sqlite':
+        if modo == MODO_PALABRAS:
+            # Todas las palabras, cada una como prefijo: "gonz"* "ram"*
+            return " ".join(f'"{p}"*' for p in palabras)
+        # Aproximada: cada palabra por cualquiera de sus fragmentos; todas las palabras
+        grupos = []
+        for palabra in palabras:
+            if len(palabra) >= 3:
+                grupos.append("(" + " OR ".join(f'"{f}"' for f in _fragmentos_trigramas(palabra.lower())) + ")")
+        return " AND ".join(grupos) or None
+    if modo == MODO_PALABRAS:
+        # Modo booleano: todas las palabras (con ngram cada una es una frase de bigramas)
+        return " ".join(f'+"{p}"' for p in palabras)
+    # Lenguaje natural: con ngram, cualquier bigrama en comun suma relevancia
+    return " ".join(palabras)
+
+
+def _rama(dialecto: str, modo: str, tabla: str) -> str:
+    """SELECT de una tabla buscada, con las columnas comunes (tipo, id, texto, detalle, vivienda_id, relevancia)."""
+    if tabla == 'habitante':
+        columnas = "'habitante' AS tipo, h.id AS id, h.nombre_completo AS texto, v.direccion AS detalle, h.vivienda_id AS vivienda_id"
+        principal, enlace = "habitante h", "JOIN vivienda v ON v.id = h.vivienda_id"
+        campo, fila = "h.nombre_completo", "h.id"
+    else:
+        columnas = "'vivienda' AS tipo, v.id AS id, v.direccion AS texto, l.nombre AS detalle, v.id AS vivienda_id"
+        principal, enlace = "vivienda v", "JOIN localidad l ON l.id = v.localidad_id"
+        campo, fila = "v.direccion", "v.id"
+
+    if modo == MODO_LIKE:
+        return f"SELECT {columnas}, 0 AS relevancia FROM {principal} {enlace} WHERE {campo} LIKE :q ORDER BY {fila} LIMIT :limite_rama"
+    if dialecto == 'sqlite' and modo == MODO_PALABRAS:
+        # Todas las filas tienen todas las palabras: se recorren por rowid y FTS5 se detiene
+        # en el LIMIT (ordenar por bm25 obligaria a puntuar todas las coincidencias)
+        fts = f"{tabla}_fts"
+        return (f"SELECT {columnas}, 0 AS relevancia FROM {fts} JOIN {principal} ON {fila} = {fts}.rowid {enlace} "
+                f"WHERE {fts} MATCH :q ORDER BY {fts}.rowid LIMIT :limite_rama")
+    if dialecto == 'sqlite':
+        # Aproximada: bm25 (rank) ordena por cuantos fragmentos comparte
+        fts = f"{tabla}_trigramas"
+        return (f"SELECT {columnas}, -{fts}.rank AS relevancia FROM {fts} JOIN {principal} ON {fila} = {fts}.rowid {enlace} "
+                f"WHERE {fts} MATCH :q ORDER BY {fts}.rank LIMIT :limite_rama")
+    coincidencia = f"MATCH({campo}) AGAINST (:q IN {'BOOLEAN' if modo == MODO_PALABRAS else 'NATURAL LANGUAGE'} MODE)"
+    return (f"SELECT {columnas}, {coincidencia} AS relevancia FROM {principal} {enlace} "
+            f"WHERE {coincidencia} ORDER BY relevancia DESC LIMIT :limite_rama")
+
+
+def consulta_busqueda(dialecto: str, modo: str) -> TextClause:
+    """
+    Busqueda en habitantes y viviendas a la vez (UNION ALL), paginada.
+    Cada rama se corta en :limite_rama (desplazamiento + limite + 1) antes de unirlas,
+    asi el costo depende de la pagina pedida y no del total de coincidencias.
+    Parametros: q, limite_rama, limite, desplazamiento.
+    """
+    ramas = " UNION ALL ".join(
+        f"SELECT * FROM ({_rama(dialecto, modo, tabla)}) AS r_{tabla}" for tabla, _ in CAMPOS_BUSQUEDA
+    )
+    return text(f"{ramas} ORDER BY relevancia DESC, tipo, id LIMIT :limite OFFSET :desplazamiento")
@@ -1,8 +1,14 @@
 from .BaseDAO import BaseDAO
-from modelo import Vivienda, Habitante, TipoVivienda, Localidad, Municipio
-from sqlalchemy import select, func, join, cast, Integer
-from sqlalchemy.orm import selectinload, joinedload
+from modelo import (Vivienda, Habitante, TipoVivienda, Localidad, Municipio, VersionDatos, ActividadEconomica,
+                    vivienda_actividad)
+from sqlalchemy import select, insert, update, literal, func, join, cast, Integer, String, Select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Dict, Any, Optional
+from .Instrumentacion import medir_operacion
+from .Reintentos import ConflictoConcurrencia, clasificar_error, relanzar_si_transitorio
+from . import Busqueda
 
 class CensoDAO(BaseDAO):
     """
@@ -10,8 +16,176 @@ class CensoDAO(BaseDAO):
     Contiene metodos de consulta avanzados para reportes y estadisticas
     """
 
+    # --- Constructores de consultas (compartidos con AsyncCensoDAO) ---
+
+    @staticmethod
+    def _consulta_conteo_poblacion(municipio_id: Optional[int] = None,
+                                   localidad_id: Optional[int] = None) -> Select:
+        """
+        Construye la consulta de población por Municipio/Localidad con filtros dinámicos.
+        """
+        # Base de la consulta
+        consulta = select(
+            Municipio.nombre.label('municipio'),
+            Localidad.nombre.label('localidad'),
+            func.count(Habitante.id).label('total_habitantes')
+        ).select_from(
+            join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
+            .join(Localidad, Vivienda.localidad_id == Localidad.id)
+            .join(Municipio, Localidad.municipio_id == Municipio.id)
+        )
+
+        # --- AÑADIR FILTROS DINÁMICOS ---
+        if localidad_id:
+            consulta = consulta.where(Localidad.id == localidad_id)
+        elif municipio_id:
+            consulta = consulta.where(Municipio.id == municipio_id)
+
+        # Agrupación y orden
+        return consulta.group_by(
+            Municipio.nombre, Localidad.nombre
+        ).order_by(
+            Municipio.nombre, Localidad.nombre
+        )
+
+    @staticmethod
+    def _consulta_conteo_tipo_vivienda(municipio_id: Optional[int] = None,
+                                       localidad_id: Optional[int] = None) -> Select:
+        """
+        Construye la consulta de habitantes por tipo de vivienda con filtros dinámicos.
+        """
+        # Base de la consulta
+        consulta = select(
+            TipoVivienda.nombre.label('tipo_vivienda'),
+            func.count(Habitante.id).label('habitantes')
+        ).select_from(
+            join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
+            .join(TipoVivienda, Vivienda.tipo_vivienda_id == TipoVivienda.id)
+        )
+
+        # --- AÑADIR FILTROS DINÁMICOS ---
+        # Necesitamos un JOIN extra si filtramos por ubicación
+        if localidad_id or municipio_id:
+            consulta = consulta.join(Localidad, Vivienda.localidad_id == Localidad.id)
+            if localidad_id:
+                consulta = consulta.where(Localidad.id == localidad_id)
+            elif municipio_id:
+                consulta = consulta.where(Localidad.municipio_id == municipio_id)
+
+        # Agrupación y orden
+        return consulta.group_by(
+            TipoVivienda.nombre
+        ).order_by(
+            TipoVivienda.nombre
+        )
+
+    @staticmethod
+    def _consulta_actividades_vivienda(id_vivienda: int) -> Select:
+        """
+        Construye la consulta de una vivienda con sus actividades (M:M) cargadas.
+        """
+        return (
+            select(Vivienda)
+            .where(Vivienda.id == id_vivienda)
+            .options(selectinload(Vivienda.actividades))
+        )
+
+    @staticmethod
+    def _consulta_estimaciones_por_localidad() -> Select:
+        """
+        Construye la consulta de estadísticas clave por localidad.
+        """
+        return select(
+            Localidad.nombre.label('localidad'),
+            func.count(Habitante.id).label('total_poblacion'),
+            func.avg(Habitante.edad).label('promedio_edad_poblacion'),
+            (cast(func.count(Habitante.id), Integer) / func.count(Vivienda.id.distinct())).label('promedio_habitantes_por_vivienda')
+        ).select_from(
+            join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
+            .join(Localidad, Vivienda.localidad_id == Localidad.id)
+        ).group_by(
+            Localidad.nombre
+        ).order_by(
+            Localidad.nombre
+        )
+
+    @staticmethod
+    def _consulta_edades(municipio_id: Optional[int] = None,
+                         localidad_id: Optional[int] = None) -> Select:
+        """
+        Construye la consulta de edades de los habitantes con filtros dinámicos.
+        """
+        # Base de la consulta
+        statement = select(Habitante.edad)
+
+        # --- AÑADIR FILTROS DINÁMICOS ---
+        if localidad_id or municipio_id:
+            # Necesitamos JOINs para filtrar por ubicación
+            statement = statement.join(Vivienda, Habitante.vivienda_id == Vivienda.id) \
+                                 .join(Localidad, Vivienda.localidad_id == Localidad.id)
+
+            if localidad_id:
+                statement = statement.where(Localidad.id == localidad_id)
+            elif municipio_id:
+                statement = statement.where(Localidad.municipio_id == municipio_id)
+
+        return statement
+
+    @staticmethod
+    def _consulta_exportacion(tabla: str, desde_id: int, limite: int) -> Select:
+        """
+        Bloque de filas planas para exportar ('viviendas' o 'habitantes'), con los
+        nombres de los catalogos ya resueltos. Paginacion por llave (id > desde_id):
+        cada bloque usa el indice de la PK sin importar que tan lejos vaya.
+        """
+        if tabla == 'habitantes':
+            statement = select(
+                Habitante.id, Habitante.vivienda_id, Habitante.nombre_completo, Habitante.edad,
+                Habitante.sexo, Habitante.parentesco_con_jefe_familia
+            ).where(Habitante.id > desde_id).order_by(Habitante.id)
+        else:
+            statement = (
+                select(
+                    Vivienda.id, Vivienda.direccion, Vivienda.fecha_censo, Vivienda.coordenadas_gps,
+                    Vivienda.total_habitantes,
+                    Localidad.nombre.label('localidad'),
+                    Municipio.nombre.label('municipio'),
+                    TipoVivienda.nombre.label('tipo_vivienda')
+                )
+                .join(Vivienda.localidad)
+                .join(Localidad.municipio)
+                .join(Vivienda.tipo_vivienda)
+                .where(Vivienda.id > desde_id)
+                .order_by(Vivienda.id)
+            )
+        return statement.limit(limite)
+
     # --- Metodos generales (Pueden usar los genericos de BaseDAO) ---
 
+    @medir_operacion
+    def obtener_version_datos(self) -> Optional[int]:
+        """
+        Sello de version de los datos del censo (cambia con cada escritura).
+        Retorna None si no se pudo leer.
+        """
+        try:
+            with self._get_session_lectura() as session:
+                return session.scalar(select(VersionDatos.version).where(VersionDatos.id == 1)) or 0
+        except SQLAlchemyError as e:
+            print(f"Error al leer la version de datos: {e}")
+            return None
+
+    @medir_operacion
+    def listar_bloque_exportacion(self, tabla: str, desde_id: int, limite: int) -> List[Dict[str, Any]]:
+        """Un bloque de filas para exportar (ver _consulta_exportacion)."""
+        try:
+            with self._get_session_lectura() as session:
+                return session.execute(self._consulta_exportacion(tabla, desde_id, limite)).mappings().all()
+        except SQLAlchemyError as e:
+            print(f"Error al exportar {tabla}: {e}")
+            return []
+
+    @medir_operacion
     def obtener_vivienda_con_habitantes(self, id_vivienda: int) -> Vivienda | None:
         """
         Obtiene una vivienda y carga eagerly (anticipadamente) sus habitantes
@@ -21,11 +195,147 @@ class CensoDAO(BaseDAO):
 
         opciones = [selectinload(Vivienda.habitantes)]
         return self.obtener_por_id(Vivienda, id_vivienda, options=opciones)
-    
+
+    @staticmethod
+    def _sumar_habitantes(session: Session, id_vivienda: int, cambio: int) -> None:
+        """
+        Suma 'cambio' al contador 'total_habitantes' (VARCHAR) de la vivienda con un
+        UPDATE en SQL. No pasa por el flush versionado de Vivienda: agregar o quitar
+        habitantes no choca con quien edita la vivienda ni con otros encuestadores.
+        """
+        total = func.coalesce(cast(Vivienda.total_habitantes, Integer), 0)
+        sentencia = update(Vivienda).where(Vivienda.id == id_vivienda).values(total_habitantes=cast(total + cambio, String))
+        if cambio < 0:
+            sentencia = sentencia.where(total + cambio >= 0)
+        session.execute(sentencia, execution_options={'synchronize_session': False})
+
+    @medir_operacion
+    def guardar_habitante(self, habitante: Habitante) -> Optional[Habitante]:
+        """
+        Inserta un habitante y suma 1 al total de su vivienda en la misma
+        transaccion (un reintento no cuenta dos veces).
+        """
+        try:
+            with self._get_session() as session:
+                session.add(habitante)
+                session.flush()
+                self._sumar_habitantes(session, habitante.vivienda_id, 1)
+                return habitante
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al registrar el habitante: {e}")
+            return None
+
+    @medir_operacion
+    def eliminar_habitante(self, id_habitante: int, version: Optional[int] = None) -> bool:
+        """
+        Elimina un habitante y descuenta el total de su vivienda en la misma
+        transaccion (si algo falla no queda el conteo desfasado).
+        Con 'version' (la que vio el usuario), lanza ConflictoConcurrencia si otro lo cambio.
+        """
+        try:
+            with self._get_session() as session:
+                habitante = session.get(Habitante, id_habitante)
+                if not habitante:
+                    return False
+                if version is not None and habitante.version != version:
+                    raise ConflictoConcurrencia('Habitante', id_habitante, version, habitante.version)
+                session.delete(habitante)
+                self._sumar_habitantes(session, habitante.vivienda_id, -1)
+                return True
+        except StaleDataError as e:
+            raise ConflictoConcurrencia('Habitante', id_habitante) from e
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al eliminar el habitante ID {id_habitante}: {e}")
+            return False
+
+    @medir_operacion
+    def asociar_actividad_a_viviendas(self, id_actividad: int, ids_viviendas: List[int]) -> int:
+        """
+        Asocia una actividad a varias viviendas con un solo
+        INSERT INTO vivienda_actividad ... SELECT: solo las viviendas que existen
+        y que aun no la tienen (NOT EXISTS), asi que repetirlo no duplica nada.
+        Retorna cuantas asociaciones nuevas se crearon.
+        """
+        ids = list(set(ids_viviendas))
+        if not ids:
+            return 0
+        ya_asociada = (
+            select(vivienda_actividad.c.vivienda_id)
+            .where(vivienda_actividad.c.vivienda_id == Vivienda.id,
+                   vivienda_actividad.c.actividad_id == id_actividad)
+            .exists()
+        )
+        existe_actividad = select(ActividadEconomica.id).where(ActividadEconomica.id == id_actividad).exists()
+        try:
+            with self._get_session() as session:
+                return self._ejecutar_en_bloque(session, ids, lambda bloque: (
+                    insert(vivienda_actividad).from_select(
+                        ['vivienda_id', 'actividad_id'],
+                        select(Vivienda.id, literal(id_actividad))
+                        .where(Vivienda.id.in_(bloque), ~ya_asociada, existe_actividad)
+                    )
+                ))
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al asociar la actividad {id_actividad} a {len(ids)} viviendas: {e}")
+            return 0
+
+    # --- Busqueda de texto ---
+
+    @medir_operacion
+    def buscar(self, texto: str, limite: int = 25, desplazamiento: int = 0,
+               modo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Busca 'texto' en nombres de habitantes y direcciones de viviendas, con
+        el indice de texto completo (ver dao/Busqueda.py). Si no hay
+        coincidencias por palabras, prueba la busqueda aproximada (trigramas /
+        n-gramas, tolera errores de dedo). LIKE solo se usa si falta el indice
+        (la consulta del indice falla), no cuando el indice no encontro nada.
+
+        Para pedir las paginas siguientes se pasa el 'modo' que regreso la primera.
+        Retorna {'resultados': [{'tipo', 'id', 'texto', 'detalle', 'vivienda_id',
+        'relevancia'}], 'hay_mas': bool, 'modo': str | None}.
+        """
+        palabras = Busqueda.terminos(texto)
+        vacio = {'resultados': [], 'hay_mas': False, 'modo': None}
+        if not palabras:
+            return vacio
+
+        dialecto = self.engine.dialect.name
+        if modo not in Busqueda.modos(dialecto) + [Busqueda.MODO_LIKE]:
+            modo = None
+        intentos = [modo] if modo else Busqueda.modos(dialecto)
+        while intentos:
+            intento = intentos.pop(0)
+            expresion = Busqueda.expresion(dialecto, intento, palabras)
+            if expresion is None:
+                continue
+            parametros = {'q': expresion, 'limite_rama': desplazamiento + limite + 1,
+                          'limite': limite + 1, 'desplazamiento': desplazamiento}
+            try:
+                with self._get_session_lectura() as session:
+                    filas = session.execute(Busqueda.consulta_busqueda(dialecto, intento), parametros).mappings().all()
+            except SQLAlchemyError as e:
+                if intento == Busqueda.MODO_LIKE or clasificar_error(e) is not None:
+                    print(f"Error en la busqueda ({intento}) de '{texto}': {e}")
+                    return vacio
+                # Sin el indice (BD sin la migracion 5 o SQLite sin FTS5): LIKE en su lugar
+                print(f"Advertencia: Sin índice de búsqueda ({intento}), se usa LIKE: {e}")
+                intentos = [Busqueda.MODO_LIKE]
+                continue
+            if filas or modo:
+                # La fila extra solo indica si hay otra pagina
+                return {'resultados': [dict(f) for f in filas[:limite]], 'hay_mas': len(filas) > limite,
+                        'modo': intento}
+        return vacio
+
     # --- Metodos para Reportes y Dashboard ---
-    
-    def obtener_conteo_poblacion_por_ubicacion(self, 
-                                                municipio_id: Optional[int] = None, 
+
+    @medir_operacion
+    def obtener_conteo_poblacion_por_ubicacion(self,
+                                                municipio_id: Optional[int] = None,
                                                 localidad_id: Optional[int] = None
                                                 ) -> List[Dict[str, Any]]:
         """
@@ -34,38 +344,16 @@ class CensoDAO(BaseDAO):
         """
         try:
             with self._get_session() as session:
-                # Base de la consulta
-                consulta = select(
-                    Municipio.nombre.label('municipio'),
-                    Localidad.nombre.label('localidad'),
-                    func.count(Habitante.id).label('total_habitantes')
-                ).select_from(
-                    join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
-                    .join(Localidad, Vivienda.localidad_id == Localidad.id)
-                    .join(Municipio, Localidad.municipio_id == Municipio.id)
-                )
-
-                # --- AÑADIR FILTROS DINÁMICOS ---
-                if localidad_id:
-                    consulta = consulta.where(Localidad.id == localidad_id)
-                elif municipio_id:
-                    consulta = consulta.where(Municipio.id == municipio_id)
-
-                # Agrupación y orden
-                consulta = consulta.group_by(
-                    Municipio.nombre, Localidad.nombre
-                ).order_by(
-                    Municipio.nombre, Localidad.nombre
-                )
-                
+                consulta = self._consulta_conteo_poblacion(municipio_id, localidad_id)
                 resultados = session.execute(consulta).mappings().all()
                 return list(resultados)
         except Exception as e:
             print(f"Error al generar reporte de población: {e}")
             return []
-        
-    def obtener_conteo_por_tipo_vivienda(self, 
-                                         municipio_id: Optional[int] = None, 
+
+    @medir_operacion
+    def obtener_conteo_por_tipo_vivienda(self,
+                                         municipio_id: Optional[int] = None,
                                          localidad_id: Optional[int] = None
                                          ) -> List[Dict[str, Any]]:
         """
@@ -74,42 +362,19 @@ class CensoDAO(BaseDAO):
         """
         try:
             with self._get_session() as session:
-                # Base de la consulta
-                consulta = select(
-                    TipoVivienda.nombre.label('tipo_vivienda'),
-                    func.count(Habitante.id).label('habitantes')
-                ).select_from(
-                    join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
-                    .join(TipoVivienda, Vivienda.tipo_vivienda_id == TipoVivienda.id)
-                )
-
-                # --- AÑADIR FILTROS DINÁMICOS ---
-                # Necesitamos un JOIN extra si filtramos por ubicación
-                if localidad_id or municipio_id:
-                    consulta = consulta.join(Localidad, Vivienda.localidad_id == Localidad.id)
-                    if localidad_id:
-                        consulta = consulta.where(Localidad.id == localidad_id)
-                    elif municipio_id:
-                        consulta = consulta.where(Localidad.municipio_id == municipio_id)
-
-                # Agrupación y orden
-                consulta = consulta.group_by(
-                    TipoVivienda.nombre
-                ).order_by(
-                    TipoVivienda.nombre
-                )
-                
+                consulta = self._consulta_conteo_tipo_vivienda(municipio_id, localidad_id)
                 return session.execute(consulta).mappings().all()
         except Exception as e:
             print(f"Error al generar reporte por tipo de vivienda: {e}")
             return []
-        
 
+
+    @medir_operacion
     def obtener_actividades_economicas_por_vivienda(self, id_vivienda: int) -> List[str]:
         """
         Obtiene los nombres de las actividades economicas que son el sosten de una vivienda especifica
         Cumple:
-            Conocer por vivienda la o las actividades economicas 
+            Conocer por vivienda la o las actividades economicas
         """
 
         try:
@@ -117,9 +382,7 @@ class CensoDAO(BaseDAO):
                 # Utilizamos la relacion Many-to-Many para obtener las actividades a traves de la tabla de asociacion
 
                 vivienda = session.execute(
-                    select(Vivienda)
-                    .where(Vivienda.id == id_vivienda)
-                    .options(selectinload(Vivienda.actividades))
+                    self._consulta_actividades_vivienda(id_vivienda)
                 ).scalar_one_or_none()
 
                 if vivienda:
@@ -129,8 +392,9 @@ class CensoDAO(BaseDAO):
         except Exception as e:
             print(f"Error al obtener actividades economicas para vivienda {id_vivienda}: {e}")
             return []
-        
-    
+
+
+    @medir_operacion
     def obtener_estimaciones_estadisticas_por_localidad(self) -> List[Dict[str, Any]]:
         """
         Calcula estadisticas clave (poblacion total, promedio de edad y promedio de habitantes por vivienda) por localidad.
@@ -138,28 +402,16 @@ class CensoDAO(BaseDAO):
             Reportes, graficos y estimaciones estadisticas por localidades
         """
         try:
-            with self._get_session as session:
-                consulta = select(
-                    Localidad.nombre.label('localidad'),
-                    func.count(Habitante.id).label('total_poblacion'),
-                    func.avg(Habitante.edad).label('promedio_edad_poblacion'),
-                    cast(func.count(Habitante.id), Integer) / func.count(Vivienda.id.distinct()).label('promedio_habitantes_por_vivienda')
-                ).select_from(
-                    join(Habitante, Vivienda, Habitante.vivienda_id == Vivienda.id)
-                    .join(Localidad, Vivienda.localidad_id == Localidad.id)
-                ).group_by(
-                    Localidad.nombre
-                ).order_by(
-                    Localidad.nombre
-                )
-
+            with self._get_session() as session:
+                consulta = self._consulta_estimaciones_por_localidad()
                 return session.execute(consulta).mappings().all()
         except Exception as e:
             print(f"Error al generar estimaciones estadisticas por localidad: {e}")
             return []
 
-    def obtener_todas_las_edades(self, 
-                                 municipio_id: Optional[int] = None, 
+    @medir_operacion
+    def obtener_todas_las_edades(self,
+                                 municipio_id: Optional[int] = None,
                                  localidad_id: Optional[int] = None
                                  ) -> List[int]:
         """
@@ -168,20 +420,7 @@ class CensoDAO(BaseDAO):
         """
         try:
             with self._get_session() as session:
-                # Base de la consulta
-                statement = select(Habitante.edad)
-
-                # --- AÑADIR FILTROS DINÁMICOS ---
-                if localidad_id or municipio_id:
-                    # Necesitamos JOINs para filtrar por ubicación
-                    statement = statement.join(Vivienda, Habitante.vivienda_id == Vivienda.id) \
-                                         .join(Localidad, Vivienda.localidad_id == Localidad.id)
-                    
-                    if localidad_id:
-                        statement = statement.where(Localidad.id == localidad_id)
-                    elif municipio_id:
-                        statement = statement.where(Localidad.municipio_id == municipio_id)
-
+                statement = self._consulta_edades(municipio_id, localidad_id)
                 return session.scalars(statement).all()
         except Exception as e:
             print(f"Error al obtener la lista de edades: {e}")
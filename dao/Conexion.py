@@ -0,0 +1,157 @@
+from typing import List
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import StaticPool
+from .Instrumentacion import instrumentacion
+
+# --- AJUSTES DE SQLITE ---
+# Los PRAGMA son por conexion: se aplican a cada conexion nueva del pool
+PRAGMAS_SQLITE = [
+    "PRAGMA foreign_keys = ON",         # Sin esto SQLite ignora ON DELETE CASCADE
+    "PRAGMA synchronous = NORMAL",      # Con WAL no se pierde integridad y se ahorran fsync
+    "PRAGMA cache_size = -65536",       # 64 MB de cache de paginas (negativo = KiB)
+    "PRAGMA mmap_size = 268435456",     # Hasta 256 MB del archivo leidos por memoria mapeada
+    "PRAGMA temp_store = MEMORY",       # Ordenamientos y tablas temporales en memoria
+    "PRAGMA busy_timeout = 5000",       # Espera hasta 5 s el lock de escritura de otra conexion
+]
+
+
+def es_sqlite_en_memoria(url_obj: URL) -> bool:
+    """True si la URL es una BD SQLite en memoria ('sqlite://' o 'sqlite:///:memory:')."""
+    return url_obj.get_backend_name() == 'sqlite' and url_obj.database in (None, '', ':memory:')
+
+
+def _sentencias_sqlite(en_memoria: bool) -> List[str]:
+    """PRAGMA de rendimiento para SQLite; WAL solo aplica a archivos."""
+    if en_memoria:
+        return list(PRAGMAS_SQLITE)
+    # WAL: los lectores (reportes, asistente) no bloquean al escritor ni al reves
+    return ["PRAGMA journal_mode = WAL"] + PRAGMAS_SQLITE
+
+
+def configurar_sqlite(engine: Engine) -> None:
+    """Registra los PRAGMA de _sentencias_sqlite en cada conexion nueva del engine."""
+    sentencias = _sentencias_sqlite(es_sqlite_en_memoria(engine.url))
+
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+        finally:
+            cursor.close()
+
+
+def crear_engine(url: str, pool_recycle: int = 1800, **kwargs) -> Engine:
+    """
+    Engine principal de la aplicacion (CRUD y reportes), para MySQL o SQLite.
+
+    - MySQL: pre_ping y pool_recycle, para no usar conexiones que el servidor
+      ya cerro por inactividad (wait_timeout).
+    - SQLite en archivo: PRAGMA de rendimiento (WAL, synchronous=NORMAL, mmap,
+      cache_size) y llaves foraneas en cada conexion.
+    - SQLite en memoria: una sola conexion compartida entre hilos (StaticPool);
+      con el pool normal cada hilo veria una BD vacia distinta.
+    """
+    url_obj = make_url(url)
+
+    if url_obj.get_backend_name() != 'sqlite':
+        opciones = {'pool_pre_ping': True, 'pool_recycle': pool_recycle}
+    elif es_sqlite_en_memoria(url_obj):
+        opciones = {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+    else:
+        opciones = {}
+    opciones.update(kwargs)
+
+    engine = create_engine(url, **opciones)
+    if url_obj.get_backend_name() == 'sqlite':
+        configurar_sqlite(engine)
+    return engine
+
+
+def _sentencias_solo_lectura(dialecto: str, timeout_ms: int) -> List[str]:
+    """Sentencias que dejan una conexion nueva en modo solo lectura y con limite de tiempo."""
+    if dialecto in ('mysql', 'mariadb'):
+        return [
+            "SET SESSION TRANSACTION READ ONLY",
+            f"SET SESSION max_execution_time = {int(timeout_ms)}",
+        ]
+    if dialecto == 'postgresql':
+        return [
+            "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+            f"SET statement_timeout = {int(timeout_ms)}",
+        ]
+    if dialecto == 'sqlite':
+        # SQLite no tiene timeout por sentencia (el gobernador usa un progress handler)
+        return PRAGMAS_SQLITE + ["PRAGMA query_only = ON"]
+    return []
+
+
+def crear_engine_asistente(url: str, pool_size: int = 3, max_overflow: int = 0,
+                           pool_timeout: float = 10, timeout_ms: int = 5000,
+                           pool_recycle: int = 1800, **kwargs) -> Engine:
+    """
+    Engine dedicado al asistente de IA, separado del pool de los CRUD.
+
+    - Pool chico (uno por worker del PoolAsistente) y sin overflow: el trafico del
+      asistente nunca toma conexiones del pool de la aplicacion y, si se satura,
+      espera como maximo 'pool_timeout' segundos en lugar de abrir mas conexiones.
+    - Cada conexion nueva queda en modo solo lectura y con 'max_execution_time'.
+    - pre_ping descarta conexiones muertas antes de usarlas; pool_recycle evita los
+      cierres por inactividad del servidor (wait_timeout de MySQL).
+    """
+    url_obj = make_url(url)
+    dialecto = url_obj.get_backend_name()
+
+    opciones = {'pool_pre_ping': True}
+    # SQLite en memoria usa un pool de una conexion por hilo; no acepta estos parametros
+    if dialecto != 'sqlite' or (url_obj.database and url_obj.database != ':memory:'):
+        opciones.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_use_lifo=True, # Reusa las conexiones "calientes" y deja enfriar las demas
+        )
+    opciones.update(kwargs)
+
+    engine = create_engine(url, **opciones)
+    sentencias = _sentencias_solo_lectura(dialecto, timeout_ms)
+
+    @event.listens_for(engine, "connect")
+    def _configurar_conexion(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+        finally:
+            cursor.close()
+        dbapi_connection.commit()
+        # El gobernador de consultas lo revisa para no repetir el SET en cada pregunta
+        connection_record.info['max_execution_time'] = timeout_ms
+        connection_record.info['solo_lectura'] = True
+
+    return instrumentacion.instrumentar_engine(engine)
+
+
+def calentar_engine(engine: Engine, conexiones: int = 1) -> bool:
+    """
+    Abre 'conexiones' conexiones a la vez (handshake, autenticacion y SET de sesion)
+    y las regresa al pool, para que la primera pregunta no pague ese costo.
+    Retorna True si se pudieron abrir todas.
+    """
+    abiertas = []
+    try:
+        for _ in range(conexiones):
+            conexion = engine.connect()
+            abiertas.append(conexion)
+            conexion.execute(text("SELECT 1"))
+        return True
+    except SQLAlchemyError as e:
+        print(f"Advertencia: No se pudo precalentar el pool ({engine.url.render_as_string()}): {e}")
+        return False
+    finally:
+        for conexion in abiertas:
+            conexion.close()
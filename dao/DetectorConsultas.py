@@ -0,0 +1,164 @@
+import functools
+import inspect
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from .Instrumentacion import instrumentacion
+
+# --- MODO DESARROLLO ---
+# CENSO_DETECTOR_CONSULTAS=advertir -> imprime un aviso por cada accion con consultas repetidas
+# CENSO_DETECTOR_CONSULTAS=error    -> ademas lanza ConsultasRepetidas (la accion falla)
+# Sin definir: @accion_ui no envuelve nada (costo cero en produccion)
+VARIABLE_MODO = "CENSO_DETECTOR_CONSULTAS"
+MODOS = ('advertir', 'error')
+
+# Veces que la misma sentencia (con distintos parametros) puede repetirse en una accion
+UMBRAL_REPETICIONES = 3
+
+
+class ConsultasRepetidas(AssertionError):
+    """Una accion ejecuto la misma sentencia muchas veces con distintos parametros (N+1)."""
+
+
+class LimiteConsultasExcedido(AssertionError):
+    """Una operacion ejecuto mas sentencias de las permitidas."""
+
+
+def modo_detector() -> Optional[str]:
+    """'advertir', 'error' o None (desactivado), segun la variable de entorno."""
+    modo = os.environ.get(VARIABLE_MODO, "").strip().lower()
+    return modo if modo in MODOS else None
+
+
+class RegistroConsultas:
+    """Sentencias ejecutadas durante una accion (en el hilo o tarea que la inicio)."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.sentencias: List[str] = []
+        self._conteo: Counter = Counter()
+        self._parametros: Dict[str, Set[str]] = {}
+
+    @property
+    def total(self) -> int:
+        return len(self.sentencias)
+
+    def registrar(self, statement: str, parameters: Any) -> None:
+        sql = " ".join(statement.split())
+        self.sentencias.append(sql)
+        self._conteo[sql] += 1
+        self._parametros.setdefault(sql, set()).add(repr(parameters))
+
+    def repetidas(self, umbral: int = UMBRAL_REPETICIONES) -> List[Tuple[str, int, int]]:
+        """(sql, veces, juegos de parametros distintos) de las sentencias que parecen N+1."""
+        return [
+            (sql, veces, len(self._parametros[sql]))
+            for sql, veces in self._conteo.most_common()
+            if veces >= umbral and len(self._parametros[sql]) > 1
+        ]
+
+    def describir(self, limite_sql: int = 160) -> str:
+        lineas = [f"{self.nombre}: {self.total} sentencia(s)"]
+        for sql, veces in self._conteo.most_common():
+            lineas.append(f"  {veces:4d} x {sql[:limite_sql]}")
+        return "\n".join(lineas)
+
+
+_registro_actual: ContextVar[Optional[RegistroConsultas]] = ContextVar('registro_consultas', default=None)
+
+
+def _observar(statement: str, parameters: Any, duracion_ms: float) -> None:
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro.registrar(statement, parameters)
+
+
+instrumentacion.agregar_observador(_observar)
+
+
+@contextmanager
+def contar_consultas(nombre: str = "bloque"):
+    """
+    Cuenta las sentencias que se ejecutan dentro del 'with' (en este hilo/tarea).
+    Si ya hay un conteo activo, se reutiliza (las acciones anidadas cuentan en la externa).
+    """
+    activo = _registro_actual.get()
+    if activo is not None:
+        yield activo
+        return
+    registro = RegistroConsultas(nombre)
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+
+def revisar_repetidas(registro: RegistroConsultas, modo: str = 'advertir', umbral: int = UMBRAL_REPETICIONES) -> None:
+    """Avisa (o lanza ConsultasRepetidas) si la accion repitio sentencias con distintos parametros."""
+    repetidas = registro.repetidas(umbral)
+    if not repetidas:
+        return
+    detalle = "\n".join(f"  {veces} veces ({distintos} parametros distintos): {sql[:200]}" for sql, veces, distintos in repetidas)
+    mensaje = f"Posible N+1 en '{registro.nombre}' ({registro.total} sentencias en total):\n{detalle}"
+    if modo == 'error':
+        raise ConsultasRepetidas(mensaje)
+    print(f"Advertencia: {mensaje}")
+
+
+def recortar_argumentos_qt(funcion: Callable) -> Callable[[Tuple], Tuple]:
+    """
+    Para decoradores de slots: regresa una funcion que recorta los argumentos
+    de la señal a los posicionales que acepta 'funcion' (sin contar 'self').
+    Qt pasa los argumentos de la señal (ej. 'checked' de clicked) aunque el
+    slot no los use; si 'funcion' acepta *args, los deja todos.
+    """
+    parametros = inspect.signature(funcion).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in parametros):
+        return lambda args: args
+    aceptados = sum(1 for p in parametros if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+    return lambda args: args[:aceptados - 1]
+
+
+def accion_ui(funcion: Callable) -> Callable:
+    """
+    Decorador para los slots de las vistas: en modo desarrollo cuenta las
+    sentencias de cada invocacion y revisa si hay consultas repetidas (N+1).
+    Fuera de modo desarrollo regresa el slot sin cambios.
+    """
+    modo = modo_detector()
+    if modo is None:
+        return funcion
+
+    recortar = recortar_argumentos_qt(funcion)
+
+    @functools.wraps(funcion)
+    def envoltura(self, *args):
+        args = recortar(args)
+        if _registro_actual.get() is not None:
+            return funcion(self, *args)
+        with contar_consultas(f"{type(self).__name__}.{funcion.__name__}") as registro:
+            resultado = funcion(self, *args)
+        revisar_repetidas(registro, modo)
+        return resultado
+    return envoltura
+
+
+def maximo_consultas(maximo: int, funcion: Callable, *args, permitir_repetidas: bool = False, **kwargs) -> Any:
+    """
+    Ayuda para pruebas: ejecuta funcion(*args, **kwargs) y lanza
+    LimiteConsultasExcedido si ejecuto mas de 'maximo' sentencias (o
+    ConsultasRepetidas si repitio sentencias y no se permite). Regresa el resultado.
+
+    Ej: maximo_consultas(1, censo_controller.obtener_pagina_viviendas_con_localidad, 200)
+    """
+    nombre = getattr(funcion, '__qualname__', repr(funcion))
+    with contar_consultas(nombre) as registro:
+        resultado = funcion(*args, **kwargs)
+    if registro.total > maximo:
+        raise LimiteConsultasExcedido(f"Se esperaban como maximo {maximo} sentencia(s).\n{registro.describir()}")
+    if not permitir_repetidas:
+        revisar_repetidas(registro, 'error')
+    return resultado
@@ -0,0 +1,327 @@
+import functools
+import inspect
+import json
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- CONFIGURACIÓN ---
+# Limites superiores (ms) de las cubetas del histograma de latencia; la ultima es "mas de 2.5 s"
+CUBETAS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+UMBRAL_LENTA_MS = 200.0          # Sentencias mas lentas que esto van al log de consultas lentas
+ARCHIVO_LENTAS = "consultas_lentas.log"
+MAX_SQL_LOG = 2000               # Caracteres de SQL que se guardan por sentencia lenta
+SIN_OPERACION = "(sin operacion)"
+
+
+class OperacionEnCurso:
+    """Contadores de una operacion logica (una llamada a un metodo del DAO) mientras corre."""
+    __slots__ = ('nombre', 'pantalla', 'sentencias', 'filas_afectadas', 'checkouts', 'ms_sql', 'error')
+
+    def __init__(self, nombre: str, pantalla: str):
+        self.nombre = nombre
+        self.pantalla = pantalla
+        self.sentencias = 0
+        self.filas_afectadas = 0
+        self.checkouts = 0
+        self.ms_sql = 0.0
+        self.error = False
+
+
+class EstadisticaOperacion:
+    """Acumulado de una operacion en una pantalla: llamadas, histograma de latencia, sentencias, filas."""
+    __slots__ = ('llamadas', 'errores', 'total_ms', 'max_ms', 'cubetas', 'sentencias', 'filas', 'checkouts', 'ms_sql')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.cubetas = [0] * len(CUBETAS_MS)
+        self.sentencias = 0
+        self.filas = 0
+        self.checkouts = 0
+        self.ms_sql = 0.0
+
+    def percentil(self, p: float) -> float:
+        """Percentil aproximado (limite superior de la cubeta donde cae); max_ms para la ultima."""
+        objetivo = self.llamadas * p
+        acumulado = 0
+        for limite, cantidad in zip(CUBETAS_MS, self.cubetas):
+            acumulado += cantidad
+            if cantidad and acumulado >= objetivo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+
+# Operacion y pantalla del contexto actual (por hilo y por tarea de asyncio)
+_operacion_actual: ContextVar[Optional[OperacionEnCurso]] = ContextVar('operacion_actual', default=None)
+_pantalla_actual: ContextVar[Optional[str]] = ContextVar('pantalla_actual', default=None)
+
+
+class Instrumentacion:
+    """
+    Registro de consultas de la aplicacion (una instancia global: 'instrumentacion').
+
+    - Eventos del engine (before/after_cursor_execute y checkout del pool):
+      tiempo de cada sentencia, filas afectadas y conexiones tomadas del pool.
+    - @medir_operacion en los metodos de los DAOs: agrupa esas sentencias por
+      operacion logica (ej. 'CensoDAO.obtener_todas_las_edades') y registra su
+      latencia total en un histograma, junto con las filas que regreso.
+    - Cada operacion se atribuye a la pantalla activa (pestaña del Dashboard)
+      o a la indicada con 'en_pantalla', para saber que pantalla consulta que.
+    - Sentencias arriba de 'umbral_lenta_ms' se escriben (una linea JSON cada
+      una) en 'archivo_lentas' y se guardan las ultimas en memoria para el panel.
+    """
+
+    def __init__(self, umbral_lenta_ms: float = UMBRAL_LENTA_MS, archivo_lentas: Optional[str] = ARCHIVO_LENTAS,
+                 max_lentas: int = 100):
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self.archivo_lentas = archivo_lentas
+        self.pantalla_activa = "(sin pantalla)"
+        self._lock = threading.Lock()
+        self._estadisticas: Dict[Tuple[str, str], EstadisticaOperacion] = {}
+        self._lentas: deque = deque(maxlen=max_lentas)
+        self._engines = weakref.WeakSet()
+        self._observadores: List[Callable[[str, Any, float], None]] = []
+        self.desde = datetime.now()
+
+    def configurar(self, umbral_lenta_ms: Optional[float] = None, archivo_lentas: Optional[str] = None) -> None:
+        if umbral_lenta_ms is not None:
+            self.umbral_lenta_ms = umbral_lenta_ms
+        if archivo_lentas is not None:
+            self.archivo_lentas = archivo_lentas or None
+
+    def engines(self) -> List[Engine]:
+        """Engines instrumentados que siguen vivos (para las metricas de pool)."""
+        with self._lock:
+            return list(self._engines)
+
+    def agregar_observador(self, observador: Callable[[str, Any, float], None]) -> None:
+        """Registra observador(sql, parametros, duracion_ms), llamado despues de cada sentencia."""
+        self._observadores.append(observador)
+
+    # --- Enganche a los engines ---
+
+    def instrumentar_engine(self, engine: Engine) -> Engine:
+        """Registra los eventos en 'engine' (una sola vez por engine). Retorna el mismo engine."""
+        with self._lock:
+            if engine in self._engines:
+                return engine
+            self._engines.add(engine)
+
+        event.listen(engine, "before_cursor_execute", self._antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", self._despues_de_ejecutar)
+        event.listen(engine, "checkout", self._al_tomar_conexion)
+        event.listen(engine, "handle_error", self._al_fallar)
+        return engine
+
+    @staticmethod
+    def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_inicio_sentencia', []).append((context, time.perf_counter()))
+
+    def _despues_de_ejecutar(self, conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('_inicio_sentencia')
+        if not inicios:
+            return
+        duracion_ms = (time.perf_counter() - inicios.pop()[1]) * 1000
+        # rowcount solo es confiable en INSERT/UPDATE/DELETE (en SELECT suele ser -1)
+        afectadas = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+
+        operacion = _operacion_actual.get()
+        if operacion is not None:
+            operacion.sentencias += 1
+            operacion.filas_afectadas += afectadas
+            operacion.ms_sql += duracion_ms
+        else:
+            self._acumular(SIN_OPERACION, self._pantalla(), duracion_ms, 0, 1, afectadas, 0, duracion_ms, False)
+
+        for observador in self._observadores:
+            observador(statement, parameters, duracion_ms)
+
+        if duracion_ms >= self.umbral_lenta_ms:
+            self._registrar_lenta(statement, duracion_ms, afectadas, executemany, conn.engine.url.get_backend_name(), operacion)
+
+    @staticmethod
+    def _al_tomar_conexion(dbapi_connection, connection_record, connection_proxy):
+        operacion = _operacion_actual.get()
+        if operacion is not None:
+            operacion.checkouts += 1
+
+    @staticmethod
+    def _al_fallar(contexto_excepcion):
+        # Una sentencia que falla no llega a after_cursor_execute: se saca su inicio
+        # (si no, la lista crece mientras viva la conexion del pool)
+        conexion = contexto_excepcion.connection
+        inicios = conexion.info.get('_inicio_sentencia') if conexion is not None else None
+        if inicios and inicios[-1][0] is contexto_excepcion.execution_context:
+            inicios.pop()
+
+        # Los DAOs atrapan el error y regresan None/[]; aqui se cuenta de todos modos
+        operacion = _operacion_actual.get()
+        if operacion is not None:
+            operacion.error = True
+
+    # --- Operaciones logicas ---
+
+    def _pantalla(self) -> str:
+        return _pantalla_actual.get() or self.pantalla_activa
+
+    @contextmanager
+    def en_pantalla(self, pantalla: str):
+        """Atribuye a 'pantalla' las operaciones de este hilo/tarea (ej. la precarga de una pestaña)."""
+        token = _pantalla_actual.set(pantalla)
+        try:
+            yield
+        finally:
+            _pantalla_actual.reset(token)
+
+    def _acumular(self, nombre: str, pantalla: str, ms: float, filas: int, sentencias: int, afectadas: int,
+                  checkouts: int, ms_sql: float, error: bool) -> None:
+        cubeta = next(i for i, limite in enumerate(CUBETAS_MS) if ms <= limite)
+        with self._lock:
+            estadistica = self._estadisticas.get((pantalla, nombre))
+            if estadistica is None:
+                estadistica = self._estadisticas[(pantalla, nombre)] = EstadisticaOperacion()
+            estadistica.llamadas += 1
+            estadistica.errores += error
+            estadistica.total_ms += ms
+            estadistica.max_ms = max(estadistica.max_ms, ms)
+            estadistica.cubetas[cubeta] += 1
+            estadistica.sentencias += sentencias
+            estadistica.filas += filas + afectadas
+            estadistica.checkouts += checkouts
+            estadistica.ms_sql += ms_sql
+
+    def _registrar_lenta(self, statement: str, duracion_ms: float, afectadas: int, executemany: bool,
+                         backend: str, operacion: Optional[OperacionEnCurso]) -> None:
+        # Sin parametros: pueden traer datos personales de los habitantes
+        registro = {
+            'fecha': datetime.now().isoformat(timespec='milliseconds'),
+            'duracion_ms': round(duracion_ms, 2),
+            'operacion': operacion.nombre if operacion else SIN_OPERACION,
+            'pantalla': operacion.pantalla if operacion else self._pantalla(),
+            'hilo': threading.current_thread().name,
+            'backend': backend,
+            'executemany': executemany,
+            'filas_afectadas': afectadas,
+            'sql': " ".join(statement.split())[:MAX_SQL_LOG],
+        }
+        with self._lock:
+            self._lentas.append(registro)
+            archivo = self.archivo_lentas
+        if archivo:
+            try:
+                with open(archivo, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"Advertencia: No se pudo escribir el log de consultas lentas: {e}")
+
+    # --- Consulta (panel de diagnostico) ---
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        """Una fila por (pantalla, operacion), de mayor a menor tiempo total."""
+        with self._lock:
+            copia = [(clave, estadistica) for clave, estadistica in self._estadisticas.items()]
+            filas = []
+            for (pantalla, nombre), e in copia:
+                filas.append({
+                    'pantalla': pantalla,
+                    'operacion': nombre,
+                    'llamadas': e.llamadas,
+                    'errores': e.errores,
+                    'promedio_ms': e.total_ms / e.llamadas,
+                    'p50_ms': e.percentil(0.50),
+                    'p95_ms': e.percentil(0.95),
+                    'max_ms': e.max_ms,
+                    'total_ms': e.total_ms,
+                    'ms_sql': e.ms_sql,
+                    'sentencias_por_llamada': e.sentencias / e.llamadas,
+                    'filas': e.filas,
+                    'checkouts': e.checkouts,
+                    'histograma': list(zip(CUBETAS_MS, e.cubetas)),
+                })
+        return sorted(filas, key=lambda f: f['total_ms'], reverse=True)
+
+    def consultas_lentas(self) -> List[Dict[str, Any]]:
+        """Ultimas sentencias lentas (la mas reciente primero)."""
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._estadisticas.clear()
+            self._lentas.clear()
+            self.desde = datetime.now()
+
+
+instrumentacion = Instrumentacion()
+
+
+def _contar_filas(resultado: Any) -> int:
+    """Filas que regreso una operacion: largo de la lista, 1 por entidad, 0 si nada."""
+    if resultado is None or isinstance(resultado, (bool, str)):
+        return 0
+    try:
+        return len(resultado)
+    except TypeError:
+        return 1
+
+
+def medir_operacion(funcion: Callable) -> Callable:
+    """
+    Decorador para metodos de los DAOs (sincronos o corrutinas).
+
+    La operacion se nombra con la clase concreta ('MunicipioDAO.listar_todos',
+    no 'BaseDAO.listar_todos'). Si un metodo medido llama a otro (ej.
+    obtener_vivienda_con_habitantes -> obtener_por_id), solo cuenta el externo.
+    """
+    def _iniciar(self) -> Tuple[Optional[OperacionEnCurso], Any]:
+        if _operacion_actual.get() is not None:
+            return None, None
+        operacion = OperacionEnCurso(f"{type(self).__name__}.{funcion.__name__}", instrumentacion._pantalla())
+        return operacion, _operacion_actual.set(operacion)
+
+    def _terminar(operacion: OperacionEnCurso, token, inicio: float, resultado: Any, error: bool) -> None:
+        _operacion_actual.reset(token)
+        instrumentacion._acumular(
+            operacion.nombre, operacion.pantalla, (time.perf_counter() - inicio) * 1000,
+            _contar_filas(resultado), operacion.sentencias, operacion.filas_afectadas,
+            operacion.checkouts, operacion.ms_sql, error or operacion.error
+        )
+
+    if inspect.iscoroutinefunction(funcion):
+        @functools.wraps(funcion)
+        async def envoltura_asincrona(self, *args, **kwargs):
+            operacion, token = _iniciar(self)
+            if operacion is None:
+                return await funcion(self, *args, **kwargs)
+            inicio, resultado, error = time.perf_counter(), None, True
+            try:
+                resultado = await funcion(self, *args, **kwargs)
+                error = False
+                return resultado
+            finally:
+                _terminar(operacion, token, inicio, resultado, error)
+        return envoltura_asincrona
+
+    @functools.wraps(funcion)
+    def envoltura(self, *args, **kwargs):
+        operacion, token = _iniciar(self)
+        if operacion is None:
+            return funcion(self, *args, **kwargs)
+        inicio, resultado, error = time.perf_counter(), None, True
+        try:
+            resultado = funcion(self, *args, **kwargs)
+            error = False
+            return resultado
+        finally:
+            _terminar(operacion, token, inicio, resultado, error)
+    return envoltura
\ No newline at end of file
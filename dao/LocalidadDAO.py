@@ -1,13 +1,17 @@
 from .BaseDAO import BaseDAO
 from modelo import Localidad, Municipio
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
 from typing import List
+from .Instrumentacion import medir_operacion
+from .Reintentos import relanzar_si_transitorio
 
 class LocalidadDAO(BaseDAO):
     """
     DAO específico para la entidad Localidad
     """
     
+    @medir_operacion
     def obtener_por_municipio(self, id_municipio: int) -> List[Localidad]:
         """
         Obtiene todas las localidades que pertenecen a un municipio especifico
@@ -19,4 +23,27 @@ class LocalidadDAO(BaseDAO):
                 return session.scalars(statement).all()
         except Exception as e:
             print(f"Error al obtener localidades para municipio {id_municipio}: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    @medir_operacion
+    def mover_a_municipio(self, ids_localidades: List[int], id_municipio: int) -> int:
+        """
+        Cambia el municipio de varias localidades con un solo
+        UPDATE ... WHERE id IN (...). Si el municipio no existe no se mueve nada.
+        Retorna cuantas localidades cambiaron de municipio.
+        """
+        ids = list(set(ids_localidades))
+        if not ids:
+            return 0
+        existe_municipio = select(Municipio.id).where(Municipio.id == id_municipio).exists()
+        try:
+            with self._get_session() as session:
+                return self._ejecutar_en_bloque(session, ids, lambda bloque: (
+                    update(Localidad)
+                    .where(Localidad.id.in_(bloque), Localidad.municipio_id != id_municipio, existe_municipio)
+                    .values(municipio_id=id_municipio)
+                ))
+        except SQLAlchemyError as e:
+            relanzar_si_transitorio(e)
+            print(f"Error al mover localidades al municipio {id_municipio}: {e}")
+            return 0
\ No newline at end of file
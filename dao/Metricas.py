@@ -0,0 +1,331 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from .Instrumentacion import CUBETAS_MS, instrumentacion
+
+# Cubetas por defecto (segundos) de los histogramas
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Una muestra: (nombre, etiquetas, valor)
+Muestra = Tuple[str, Dict[str, str], float]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _formatear(valor: float) -> str:
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+# --- TIPOS DE METRICA ---
+# Cada metrica con etiquetas guarda un "hijo" por combinacion de valores; el hijo
+# se obtiene una vez (con_etiquetas) y en el camino caliente solo suma bajo un lock.
+
+class _ValorContador:
+    __slots__ = ('valor', '_lock')
+
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        with self._lock:
+            self.valor += cantidad
+
+
+class _ValorMedidor(_ValorContador):
+    __slots__ = ()
+
+    def set(self, valor: float) -> None:
+        self.valor = valor
+
+    def dec(self, cantidad: float = 1.0) -> None:
+        self.inc(-cantidad)
+
+
+class _ValorHistograma:
+    __slots__ = ('cubetas', 'conteos', 'suma', 'total', '_lock')
+
+    def __init__(self, cubetas: Sequence[float]):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1) # La ultima es +Inf
+        self.suma = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float) -> None:
+        indice = bisect.bisect_left(self.cubetas, valor)
+        with self._lock:
+            self.conteos[indice] += 1
+            self.suma += valor
+            self.total += 1
+
+
+class Metrica:
+    """Base de Contador, Medidor e Histograma (nombre, ayuda y etiquetas)."""
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._hijos: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _nuevo_valor(self):
+        raise NotImplementedError
+
+    def con_etiquetas(self, *valores: str):
+        """Valor para una combinacion de etiquetas (guardarlo evita buscarlo en cada uso)."""
+        clave = tuple(str(v) for v in valores)
+        hijo = self._hijos.get(clave)
+        if hijo is None:
+            if len(clave) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            with self._lock:
+                hijo = self._hijos.setdefault(clave, self._nuevo_valor())
+        return hijo
+
+    def _etiquetas(self, clave: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.etiquetas, clave))
+
+    def muestras(self) -> List[Muestra]:
+        return [(self.nombre, self._etiquetas(clave), hijo.valor) for clave, hijo in list(self._hijos.items())]
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def _nuevo_valor(self):
+        return _ValorContador()
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        self.con_etiquetas().inc(cantidad)
+
+
+class Medidor(Metrica):
+    """Gauge. Con 'funcion', el valor se calcula al momento de exportar."""
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 funcion: Optional[Callable[[], float]] = None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def _nuevo_valor(self):
+        return _ValorMedidor()
+
+    def set(self, valor: float) -> None:
+        self.con_etiquetas().set(valor)
+
+    def muestras(self) -> List[Muestra]:
+        if self.funcion is not None:
+            return [(self.nombre, {}, float(self.funcion()))]
+        return super().muestras()
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 cubetas: Sequence[float] = CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas))
+
+    def _nuevo_valor(self):
+        return _ValorHistograma(self.cubetas)
+
+    def observar(self, valor: float) -> None:
+        self.con_etiquetas().observar(valor)
+
+    def muestras(self) -> List[Muestra]:
+        resultado = []
+        for clave, hijo in list(self._hijos.items()):
+            etiquetas = self._etiquetas(clave)
+            resultado.extend(_muestras_histograma(self.nombre, etiquetas, self.cubetas, hijo.conteos, hijo.suma, hijo.total))
+        return resultado
+
+
+def _muestras_histograma(nombre: str, etiquetas: Dict[str, str], cubetas: Sequence[float],
+                         conteos: Sequence[int], suma: float, total: int) -> List[Muestra]:
+    """_bucket acumulados (con +Inf), _sum y _count, como los espera Prometheus."""
+    muestras, acumulado = [], 0
+    for limite, conteo in zip(list(cubetas) + [float('inf')], conteos):
+        acumulado += conteo
+        muestras.append((f"{nombre}_bucket", {**etiquetas, 'le': _formatear(limite)}, acumulado))
+    muestras.append((f"{nombre}_sum", etiquetas, suma))
+    muestras.append((f"{nombre}_count", etiquetas, total))
+    return muestras
+
+
+# --- REGISTRO ---
+
+class RegistroMetricas:
+    """
+    Registro global de metricas (instancia 'metricas').
+
+    Las metricas del camino caliente (cache, asistente, sincronizacion, UI) se
+    actualizan al momento. Lo que ya se mide en otro lado (latencia de los DAOs
+    en Instrumentacion, uso de los pools) se lee con colectores al exportar,
+    sin costo adicional por consulta.
+    """
+
+    def __init__(self):
+        self._metricas: Dict[str, Metrica] = {}
+        self._colectores: List[Callable[[], Iterable[Tuple[str, str, str, List[Muestra]]]]] = []
+        self._lock = threading.Lock()
+
+    def _registrar(self, clase, nombre: str, *args, **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, *args, **kwargs)
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                funcion: Optional[Callable[[], float]] = None) -> Medidor:
+        return self._registrar(Medidor, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   cubetas: Sequence[float] = CUBETAS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, cubetas=cubetas)
+
+    def agregar_colector(self, colector: Callable[[], Iterable[Tuple[str, str, str, List[Muestra]]]]) -> None:
+        """colector() -> [(nombre, tipo, ayuda, muestras)], evaluado en cada exportacion."""
+        self._colectores.append(colector)
+
+    def familias(self) -> List[Tuple[str, str, str, List[Muestra]]]:
+        """Todas las metricas como (nombre, tipo, ayuda, muestras)."""
+        with self._lock:
+            propias = list(self._metricas.values())
+        familias = [(m.nombre, m.tipo, m.ayuda, m.muestras()) for m in propias]
+        for colector in self._colectores:
+            try:
+                familias.extend(colector())
+            except Exception as e:
+                print(f"Error en un colector de metricas: {e}")
+        return sorted(familias, key=lambda f: f[0])
+
+    def exportar(self) -> str:
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        lineas = []
+        for nombre, tipo, ayuda, muestras in self.familias():
+            lineas.append(f"# HELP {nombre} {_escapar(ayuda)}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for nombre_muestra, etiquetas, valor in muestras:
+                if etiquetas:
+                    texto = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items())
+                    lineas.append(f"{nombre_muestra}{{{texto}}} {_formatear(valor)}")
+                else:
+                    lineas.append(f"{nombre_muestra} {_formatear(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+metricas = RegistroMetricas()
+
+
+# --- COLECTORES (datos que ya existen en otros modulos) ---
+
+def _colector_dao():
+    """Latencia, sentencias y errores por operacion del DAO (de Instrumentacion, sumando pantallas)."""
+    por_operacion: Dict[str, dict] = {}
+    for fila in instrumentacion.resumen():
+        acumulado = por_operacion.setdefault(fila['operacion'], {
+            'conteos': [0] * len(CUBETAS_MS), 'suma': 0.0, 'total': 0, 'sentencias': 0, 'errores': 0
+        })
+        for i, (_, conteo) in enumerate(fila['histograma']):
+            acumulado['conteos'][i] += conteo
+        acumulado['suma'] += fila['total_ms'] / 1000
+        acumulado['total'] += fila['llamadas']
+        acumulado['sentencias'] += round(fila['sentencias_por_llamada'] * fila['llamadas'])
+        acumulado['errores'] += fila['errores']
+
+    cubetas = [limite / 1000 for limite in CUBETAS_MS[:-1]]
+    latencia, sentencias, errores = [], [], []
+    for operacion, datos in sorted(por_operacion.items()):
+        etiquetas = {'operacion': operacion}
+        latencia.extend(_muestras_histograma("censo_dao_operacion_segundos", etiquetas, cubetas,
+                                             datos['conteos'], datos['suma'], datos['total']))
+        sentencias.append(("censo_dao_sentencias_total", etiquetas, datos['sentencias']))
+        errores.append(("censo_dao_errores_total", etiquetas, datos['errores']))
+    return [
+        ("censo_dao_operacion_segundos", "histogram", "Latencia de cada operacion del DAO", latencia),
+        ("censo_dao_sentencias_total", "counter", "Sentencias SQL ejecutadas por operacion", sentencias),
+        ("censo_dao_errores_total", "counter", "Operaciones del DAO con error de BD", errores),
+    ]
+
+
+def _colector_pools():
+    """Conexiones en uso, disponibles y de overflow de cada engine instrumentado."""
+    en_uso, disponibles, overflow = [], [], []
+    for engine in instrumentacion.engines():
+        pool = engine.pool
+        etiquetas = {'engine': f"{engine.url.get_backend_name()}:{engine.url.database or ''}"}
+        if hasattr(pool, 'checkedout'):
+            en_uso.append(("censo_pool_conexiones_en_uso", etiquetas, pool.checkedout()))
+        if hasattr(pool, 'checkedin'):
+            disponibles.append(("censo_pool_conexiones_disponibles", etiquetas, pool.checkedin()))
+        if hasattr(pool, 'overflow'):
+            # QueuePool reporta negativo mientras no se llena pool_size
+            overflow.append(("censo_pool_overflow", etiquetas, max(0, pool.overflow())))
+    return [
+        ("censo_pool_conexiones_en_uso", "gauge", "Conexiones tomadas del pool", en_uso),
+        ("censo_pool_conexiones_disponibles", "gauge", "Conexiones libres en el pool", disponibles),
+        ("censo_pool_overflow", "gauge", "Conexiones abiertas por encima de pool_size", overflow),
+    ]
+
+
+metricas.agregar_colector(_colector_dao)
+metricas.agregar_colector(_colector_pools)
+
+
+# --- ENDPOINT HTTP ---
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404, "Solo se expone /metrics")
+            return
+        cuerpo = metricas.exportar().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTENIDO)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass # Sin una linea en consola por cada scrape
+
+
+class ServidorMetricas:
+    """
+    Expone GET /metrics (texto de Prometheus) en un hilo de fondo.
+    Por defecto solo escucha en 127.0.0.1.
+    """
+
+    def __init__(self, puerto: int = 9464, host: str = "127.0.0.1"):
+        self.servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+        self.servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, name="metricas", daemon=True)
+
+    @property
+    def direccion(self) -> str:
+        host, puerto = self.servidor.server_address[:2]
+        return f"http://{host}:{puerto}/metrics"
+
+    def iniciar(self) -> "ServidorMetricas":
+        self._hilo.start()
+        print(f"Métricas disponibles en {self.direccion}")
+        return self
+
+    def cerrar(self) -> None:
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -0,0 +1,144 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from modelo import Base, EsquemaVersion, RegistroCampo, VersionDatos
+from .Busqueda import crear_indices_busqueda
+
+
+# --- MIGRACIONES ---
+# Cada migracion es (version, descripcion, funcion(conexion)). Deben ser idempotentes:
+# una BD creada antes de este sistema (sin 'esquema_version') las recibe todas.
+# Para cambiar el esquema: modificar el modelo Y agregar aqui la migracion equivalente.
+
+def _v1_esquema_inicial(conexion: Connection) -> None:
+    """Tablas del modelo tal como estaban antes del control de versiones."""
+    Base.metadata.create_all(conexion, checkfirst=True)
+
+
+def _crear_indice(conexion: Connection, tabla: str, nombre: str) -> None:
+    """Crea el indice 'nombre' (declarado en el modelo) si aun no existe."""
+    indice = next(i for i in Base.metadata.tables[tabla].indexes if i.name == nombre)
+    indice.create(conexion, checkfirst=True)
+
+
+def _v2_indices_llaves_foraneas(conexion: Connection) -> None:
+    """Indices en las llaves foraneas que usan los JOIN de reportes y del asistente."""
+    _crear_indice(conexion, 'localidad', 'ix_localidad_municipio_id')
+    _crear_indice(conexion, 'vivienda', 'ix_vivienda_localidad_id')
+    _crear_indice(conexion, 'vivienda', 'ix_vivienda_tipo_vivienda_id')
+    _crear_indice(conexion, 'habitante', 'ix_habitante_vivienda_id')
+
+
+def _v3_registro_campo(conexion: Connection) -> None:
+    """Tabla de altas recibidas de los equipos de campo (sincronizacion idempotente)."""
+    RegistroCampo.__table__.create(conexion, checkfirst=True)
+
+
+def _v4_columnas_version(conexion: Connection) -> None:
+    """Columna 'version' (concurrencia optimista) en las entidades que se editan: vivienda y habitante."""
+    for tabla in ('vivienda', 'habitante'):
+        columnas = {c['name'] for c in inspect(conexion).get_columns(tabla)}
+        if 'version' not in columnas:
+            conexion.execute(text(f"ALTER TABLE {tabla} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def _v5_indices_busqueda(conexion: Connection) -> None:
+    """Texto completo sobre nombres de habitantes y direcciones de viviendas (FTS5 / FULLTEXT, ver dao/Busqueda.py)."""
+    crear_indices_busqueda(conexion)
+
+
+def _v6_fila_version_datos(conexion: Connection) -> None:
+    """
+    Siembra la fila unica del sello de version de los datos: las escrituras solo
+    la incrementan (sin INSERT concurrentes de la primera fila).
+    """
+    if conexion.execute(select(VersionDatos.id).where(VersionDatos.id == 1)).first() is None:
+        conexion.execute(insert(VersionDatos).values(id=1, version=0))
+
+
+MIGRACIONES: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Esquema inicial", _v1_esquema_inicial),
+    (2, "Indices de llaves foraneas", _v2_indices_llaves_foraneas),
+    (3, "Registro de altas de campo", _v3_registro_campo),
+    (4, "Columnas de version (concurrencia optimista)", _v4_columnas_version),
+    (5, "Indices de busqueda de texto", _v5_indices_busqueda),
+    (6, "Fila del sello de version de los datos", _v6_fila_version_datos),
+]
+
+# Objetos y filas que no estan en el modelo (create_all no los crea): una BD nueva tambien los recibe
+FUERA_DEL_MODELO: List[Callable[[Connection], None]] = [_v5_indices_busqueda, _v6_fila_version_datos]
+
+# Version que espera el codigo (la ultima migracion)
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def version_actual(engine: Engine) -> Optional[int]:
+    """
+    Version del esquema aplicada a la BD (una sola consulta).
+    Retorna None si la BD no tiene la tabla 'esquema_version' (sin migrar) o no responde.
+    """
+    try:
+        with engine.connect() as conexion:
+            return conexion.execute(select(func.max(EsquemaVersion.version))).scalar() or 0
+    except SQLAlchemyError:
+        return None
+
+
+def verificar_esquema(engine: Engine) -> bool:
+    """
+    Revisa al arrancar que la BD este en la version que espera el codigo.
+    No ejecuta DDL: si falta migrar, indica el comando y retorna False.
+    """
+    version = version_actual(engine)
+    if version is None or version < VERSION_ESQUEMA:
+        encontrada = "sin control de versiones" if version is None else f"version {version}"
+        print(f"Error: El esquema de la BD está desactualizado ({encontrada}, se requiere la {VERSION_ESQUEMA}).")
+        print("Ejecuta 'python migrar.py' para crear/actualizar las tablas.")
+        return False
+    if version > VERSION_ESQUEMA:
+        print(f"Advertencia: La BD tiene el esquema {version}, más nuevo que el de esta versión del programa ({VERSION_ESQUEMA}).")
+    return True
+
+
+def migrar(engine: Engine) -> int:
+    """
+    Lleva la BD a VERSION_ESQUEMA y registra cada migracion en 'esquema_version'.
+
+    - BD vacia: crea el esquema completo del modelo y lo marca en la ultima version.
+    - BD existente: aplica, en orden, las migraciones que le faltan (cada una en su
+      propia transaccion, junto con su registro).
+
+    Retorna el numero de migraciones aplicadas.
+    """
+    with engine.begin() as conexion:
+        tablas = set(inspect(conexion).get_table_names())
+        EsquemaVersion.__table__.create(conexion, checkfirst=True)
+
+        if not tablas - {EsquemaVersion.__tablename__}:
+            # BD nueva: el modelo ya incluye todas las migraciones
+            Base.metadata.create_all(conexion)
+            for funcion in FUERA_DEL_MODELO:
+                funcion(conexion)
+            conexion.execute(insert(EsquemaVersion).values([
+                {'version': version, 'descripcion': descripcion, 'aplicada_en': datetime.now()}
+                for version, descripcion, _ in MIGRACIONES
+            ]))
+            print(f"Esquema creado en la version {VERSION_ESQUEMA}.")
+            return len(MIGRACIONES)
+
+        version = conexion.execute(select(func.max(EsquemaVersion.version))).scalar() or 0
+
+    aplicadas = 0
+    for numero, descripcion, funcion in MIGRACIONES:
+        if numero <= version:
+            continue
+        print(f"Aplicando migración {numero}: {descripcion}...")
+        with engine.begin() as conexion:
+            funcion(conexion)
+            conexion.execute(insert(EsquemaVersion).values(
+                version=numero, descripcion=descripcion, aplicada_en=datetime.now()
+            ))
+        aplicadas += 1
+    return aplicadas
\ No newline at end of file
@@ -0,0 +1,175 @@
+import time
+import random
+import functools
+import contextvars
+from typing import Any, Callable, Optional
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError, TimeoutError as TimeoutPool
+from .Metricas import metricas
+
+# --- CLASIFICACION DE ERRORES ---
+# Codigos de MySQL/MariaDB
+DEADLOCK = 1213
+ESPERA_LOCK = 1205
+CONEXION_PERDIDA = (2006, 2013) # "server has gone away" / "lost connection"
+
+# Transitorios en los que la BD ya hizo rollback (la escritura seguro no se aplico):
+# repetir cualquier transaccion es seguro.
+SIN_EFECTO = ('deadlock', 'espera_lock', 'bd_bloqueada', 'pool_agotado')
+# Transitorios de resultado incierto (el COMMIT pudo aplicarse antes de perder la conexion):
+# solo se repiten las operaciones idempotentes.
+INCIERTOS = ('conexion_perdida',)
+
+REINTENTOS = metricas.contador(
+    "censo_reintentos_total", "Transacciones de escritura repetidas tras un error transitorio", ('tipo',))
+AGOTADOS = metricas.contador(
+    "censo_escrituras_fallidas_total", "Escrituras que fallaron por un error transitorio sin poder repetirse", ('tipo',))
+
+# True mientras se ejecuta una funcion con reintentos (las llamadas anidadas no repiten por su cuenta)
+_en_reintento = contextvars.ContextVar('en_reintento', default=False)
+# Numero del intento en curso (0 = el primero)
+_intento = contextvars.ContextVar('intento', default=0)
+
+
+class ErrorPersistencia(Exception):
+    """Una escritura del censo no se pudo completar. 'tipo' clasifica la causa."""
+
+    def __init__(self, mensaje: str, tipo: str = 'otro', intentos: int = 1):
+        super().__init__(mensaje)
+        self.tipo = tipo
+        self.intentos = intentos
+
+
+class ErrorTransitorio(ErrorPersistencia):
+    """
+    Error pasajero de concurrencia (deadlock, espera de lock, BD ocupada, pool
+    agotado o conexion perdida). Repetir la operacion mas tarde puede funcionar.
+    """
+    pass
+
+
+class ConflictoConcurrencia(ErrorPersistencia):
+    """
+    Otro usuario modifico (o elimino) la fila despues de que se leyo, asi que la
+    escritura no se aplico (concurrencia optimista, columna 'version'). No se
+    repite automaticamente: la vista vuelve a leer la fila y fusiona los cambios.
+    """
+
+    def __init__(self, entidad: str, id_entidad: Optional[int], version_esperada: Optional[int] = None,
+                 version_actual: Optional[int] = None):
+        super().__init__(f"El registro {entidad} ID {id_entidad} fue modificado por otro usuario", 'conflicto')
+        self.entidad = entidad
+        self.id_entidad = id_entidad
+        self.version_esperada = version_esperada
+        self.version_actual = version_actual
+
+
+def clasificar_error(excepcion: BaseException) -> Optional[str]:
+    """Tipo de error transitorio ('deadlock', 'espera_lock', ...) o None si es permanente."""
+    if isinstance(excepcion, ErrorTransitorio):
+        return excepcion.tipo
+    if isinstance(excepcion, TimeoutPool):
+        return 'pool_agotado'
+
+    original = getattr(excepcion, 'orig', None) or excepcion
+    codigo = original.args[0] if getattr(original, 'args', None) else None
+    mensaje = str(original).lower()
+    if codigo == DEADLOCK or 'deadlock' in mensaje:
+        return 'deadlock'
+    if codigo == ESPERA_LOCK or 'lock wait timeout' in mensaje:
+        return 'espera_lock'
+    if 'database is locked' in mensaje or 'database is busy' in mensaje:
+        return 'bd_bloqueada'
+    if codigo in CONEXION_PERDIDA or (isinstance(excepcion, DBAPIError) and excepcion.connection_invalidated):
+        return 'conexion_perdida'
+    return None
+
+
+def relanzar_si_transitorio(excepcion: SQLAlchemyError) -> None:
+    """Para los DAOs: convierte un error transitorio en ErrorTransitorio (los permanentes siguen igual)."""
+    tipo = clasificar_error(excepcion)
+    if tipo is not None:
+        raise ErrorTransitorio(f"Error transitorio de BD ({tipo}): {excepcion}", tipo) from excepcion
+
+
+# --- POLITICA DE REINTENTOS ---
+
+class PoliticaReintentos:
+    """
+    Cuantas veces se repite una transaccion y cuanto se espera entre intentos:
+    backoff exponencial con jitter completo (espera al azar entre 0 y
+    base * 2^intento, con tope), para que los encuestadores que chocaron
+    en el mismo deadlock no vuelvan a chocar al mismo tiempo.
+    """
+
+    def __init__(self, intentos: int = 5, espera_base: float = 0.02, espera_maxima: float = 1.0):
+        self.intentos = max(1, intentos)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+    def espera(self, intento: int) -> float:
+        """Segundos a esperar despues del intento numero 'intento' (desde 0)."""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+
+
+POLITICA_ESCRITURA = PoliticaReintentos()
+
+
+def reintentar(funcion: Callable, *args, idempotente: bool = False,
+               politica: Optional[PoliticaReintentos] = None, **kwargs) -> Any:
+    """
+    Ejecuta 'funcion' (una transaccion completa) y la repite ante errores transitorios.
+
+    - deadlock, espera de lock, BD ocupada y pool agotado: siempre se repite.
+    - conexion perdida: solo si 'idempotente' (la primera vez pudo confirmarse).
+    - errores permanentes: se propagan sin repetir.
+    Si no se puede repetir mas, lanza ErrorTransitorio con el tipo y los intentos.
+    """
+    if _en_reintento.get():
+        # Ya hay un reintento mas arriba: él repite la transaccion completa
+        return funcion(*args, **kwargs)
+
+    politica = politica or POLITICA_ESCRITURA
+    marca = _en_reintento.set(True)
+    try:
+        for intento in range(politica.intentos):
+            _intento.set(intento)
+            try:
+                return funcion(*args, **kwargs)
+            except (ErrorTransitorio, SQLAlchemyError) as e:
+                tipo = clasificar_error(e)
+                if tipo is None:
+                    raise
+                repetible = tipo in SIN_EFECTO or (idempotente and tipo in INCIERTOS)
+                if not repetible or intento == politica.intentos - 1:
+                    AGOTADOS.con_etiquetas(tipo).inc()
+                    raise ErrorTransitorio(
+                        f"{funcion.__name__}: error transitorio de BD ({tipo}) tras {intento + 1} intento(s)",
+                        tipo, intento + 1) from e
+                REINTENTOS.con_etiquetas(tipo).inc()
+                time.sleep(politica.espera(intento))
+    finally:
+        _intento.set(0)
+        _en_reintento.reset(marca)
+
+
+def es_reintento() -> bool:
+    """
+    True si la transaccion en curso es una repeticion: un intento anterior pudo
+    confirmarse antes de perder la conexion, asi que encontrar la fila ya en el
+    estado buscado cuenta como exito (no como conflicto ni como "no existe").
+    """
+    return _intento.get() > 0
+
+
+def con_reintentos(idempotente: bool = False, politica: Optional[PoliticaReintentos] = None) -> Callable:
+    """
+    Decorador para los metodos de escritura de los controladores.
+    Cada intento vuelve a leer las entidades por ID: nunca se reusan objetos
+    ORM de una transaccion que fallo.
+    """
+    def decorador(funcion: Callable) -> Callable:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            return reintentar(funcion, *args, idempotente=idempotente, politica=politica, **kwargs)
+        return envoltura
+    return decorador
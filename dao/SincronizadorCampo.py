@@ -0,0 +1,296 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Engine
+from modelo import Base, vivienda_actividad
+from .AlmacenCampo import (
+    COLUMNAS_CATALOGO, COLUMNAS_SUBIDA, conflicto_campo, desempaquetar, empaquetar,
+    enlaces_sincronizados, guardar_estado, huella, leer_estado, mapa_ids
+)
+from .BaseDAO import incrementar_version_datos
+
+# Quien referencia a cada catalogo en el almacen local (para no borrar filas en uso)
+REFERENCIAS_CATALOGO = {
+    'municipio': [('localidad', 'municipio_id')],
+    'localidad': [('vivienda', 'localidad_id')],
+    'tipo_vivienda': [('vivienda', 'tipo_vivienda_id')],
+    'actividad_economica': [('vivienda_actividad', 'actividad_id')],
+}
+
+
+class SincronizadorCampo:
+    """
+    Sincroniza el almacen de campo (SQLite local) con la BD central.
+
+    La captura nunca espera a la red: los controladores escriben en el almacen
+    local, y 'sincronizar' (cuando hay conexion) hace dos cosas:
+        1. bajar_catalogos: trae municipios, localidades, tipos y actividades,
+           solo de los catalogos que cambiaron (huella por tabla). Las cuentas
+           de administrador no se bajan: se dan de alta en el equipo.
+        2. subir: manda las viviendas, habitantes y actividades capturados o
+           modificados desde la ultima vez, en lotes comprimidos de 'tam_lote'
+           filas; cada lote es una transaccion en la central.
+
+    Los ids locales nunca se mandan como ids centrales: 'mapa_ids' guarda la
+    correspondencia, y los habitantes se suben con el id central de su vivienda.
+    Lo que la central rechaza queda en 'conflicto_campo' y se reintenta en la
+    siguiente sincronizacion.
+
+    Args:
+        engine_local: engine del almacen de campo (crear_almacen_campo)
+        transporte: objeto con enviar_lote(bytes) -> bytes y
+                    obtener_catalogos(bytes) -> bytes (ej. TransporteDirecto o TransporteHttp)
+        tam_lote: movimientos por lote
+    """
+
+    def __init__(self, engine_local: Engine, transporte, tam_lote: int = 500):
+        self.engine = engine_local
+        self.transporte = transporte
+        self.tam_lote = tam_lote
+        with self.engine.connect() as conexion:
+            self.dispositivo = leer_estado(conexion, 'dispositivo')
+
+    # --- Catalogos (central -> campo) ---
+
+    def bajar_catalogos(self) -> int:
+        """Actualiza los catalogos locales. Retorna el numero de filas insertadas, cambiadas o borradas."""
+        with self.engine.connect() as conexion:
+            huellas = json.loads(leer_estado(conexion, 'huellas_catalogos') or '{}')
+        respuesta = desempaquetar(self.transporte.obtener_catalogos(empaquetar({'huellas': huellas})))
+        if not respuesta:
+            return 0
+
+        cambios = 0
+        with self.engine.begin() as conexion:
+            # Altas y cambios en orden de dependencias (municipio antes que localidad)
+            for nombre in COLUMNAS_CATALOGO:
+                if nombre in respuesta:
+                    cambios += self._actualizar_catalogo(conexion, nombre, respuesta[nombre]['filas'])
+
+            # Bajas al reves (localidad antes que municipio); las filas en uso se conservan
+            for nombre in reversed(list(COLUMNAS_CATALOGO)):
+                if nombre not in respuesta:
+                    continue
+                borradas, conservadas = self._borrar_sobrantes(conexion, nombre, respuesta[nombre]['filas'])
+                cambios += borradas
+                if conservadas:
+                    print(f"Aviso: {conservadas} fila(s) de '{nombre}' ya no existen en la central pero se usan en campo.")
+                    continue  # Sin guardar la huella: se vuelve a revisar la proxima vez
+                huellas[nombre] = respuesta[nombre]['huella']
+
+            guardar_estado(conexion, 'huellas_catalogos', json.dumps(huellas))
+        if cambios:
+            incrementar_version_datos(self.engine)
+        return cambios
+
+    @staticmethod
+    def _actualizar_catalogo(conexion, nombre: str, filas: List[Dict[str, Any]]) -> int:
+        tabla = Base.metadata.tables[nombre]
+        columnas = COLUMNAS_CATALOGO[nombre]
+        locales = {fila.id: dict(fila._mapping) for fila in conexion.execute(select(*(tabla.c[c] for c in columnas)))}
+
+        nuevas = [fila for fila in filas if fila['id'] not in locales]
+        distintas = [fila for fila in filas if fila['id'] in locales and locales[fila['id']] != fila]
+        if nuevas:
+            conexion.execute(insert(tabla), nuevas)
+        for fila in distintas:
+            conexion.execute(update(tabla).where(tabla.c.id == fila['id']).values(**fila))
+        return len(nuevas) + len(distintas)
+
+    @staticmethod
+    def _borrar_sobrantes(conexion, nombre: str, filas: List[Dict[str, Any]]):
+        """Borra las filas que ya no estan en la central; retorna (borradas, conservadas por estar en uso)."""
+        tabla = Base.metadata.tables[nombre]
+        sobrantes = set(conexion.execute(select(tabla.c.id)).scalars()) - {fila['id'] for fila in filas}
+        if not sobrantes:
+            return 0, 0
+
+        en_uso = set()
+        for tabla_hija, columna in REFERENCIAS_CATALOGO[nombre]:
+            hija = Base.metadata.tables[tabla_hija]
+            en_uso |= set(conexion.execute(select(hija.c[columna]).where(hija.c[columna].in_(sobrantes)).distinct()).scalars())
+
+        borrar = sobrantes - en_uso
+        if borrar:
+            conexion.execute(delete(tabla).where(tabla.c.id.in_(borrar)))
+        return len(borrar), len(en_uso)
+
+    # --- Captura (campo -> central) ---
+
+    def _movimientos(self, conexion, nombre: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Altas, cambios y bajas locales de 'nombre' desde la ultima subida."""
+        tabla = Base.metadata.tables[nombre]
+        columnas = COLUMNAS_SUBIDA[nombre]
+        subidas = {f.id_local: (f.id_central, f.huella) for f in conexion.execute(
+            select(mapa_ids.c.id_local, mapa_ids.c.id_central, mapa_ids.c.huella).where(mapa_ids.c.tabla == nombre)
+        )}
+        viviendas = {}
+        if nombre == 'habitante':
+            viviendas = dict(conexion.execute(
+                select(mapa_ids.c.id_local, mapa_ids.c.id_central).where(mapa_ids.c.tabla == 'vivienda')
+            ).all())
+
+        movimientos = {'altas': [], 'cambios': [], 'bajas': [], 'pendientes': []}
+        vistos = set()
+        for fila in conexion.execute(select(tabla.c.id, *(tabla.c[c] for c in columnas))):
+            vistos.add(fila.id)
+            datos = {c: fila._mapping[c] for c in columnas}
+            if nombre == 'habitante':
+                if datos['vivienda_id'] not in viviendas:
+                    movimientos['pendientes'].append(fila.id)  # Su vivienda aun no llega a la central
+                    continue
+                datos['vivienda_id'] = viviendas[datos['vivienda_id']]
+
+            if fila.id not in subidas:
+                movimientos['altas'].append({'id_local': fila.id, 'datos': datos})
+            elif huella(datos) != subidas[fila.id][1]:
+                id_central, huella_base = subidas[fila.id]
+                movimientos['cambios'].append({'id_local': fila.id, 'id_central': id_central, 'huella': huella_base, 'datos': datos})
+
+        for id_local, (id_central, huella_base) in subidas.items():
+            if id_local not in vistos:
+                movimientos['bajas'].append({'id_local': id_local, 'id_central': id_central, 'huella': huella_base})
+        return movimientos
+
+    def _movimientos_enlaces(self, conexion) -> Dict[str, List[Dict[str, Any]]]:
+        viviendas = dict(conexion.execute(
+            select(mapa_ids.c.id_local, mapa_ids.c.id_central).where(mapa_ids.c.tabla == 'vivienda')
+        ).all())
+        locales = set(conexion.execute(select(vivienda_actividad.c.vivienda_id, vivienda_actividad.c.actividad_id)).all())
+        subidos = set(conexion.execute(select(enlaces_sincronizados.c.vivienda_id, enlaces_sincronizados.c.actividad_id)).all())
+
+        movimientos = {'altas': [], 'bajas': [], 'pendientes': [], 'olvidar': []}
+        for vivienda_local, actividad_id in sorted(locales - subidos):
+            if vivienda_local not in viviendas:
+                movimientos['pendientes'].append(vivienda_local)
+            else:
+                movimientos['altas'].append({'vivienda_local': vivienda_local, 'vivienda_id': viviendas[vivienda_local], 'actividad_id': actividad_id})
+        for vivienda_local, actividad_id in sorted(subidos - locales):
+            if vivienda_local not in viviendas:
+                # La vivienda se borro en campo: su baja ya elimino el enlace en la central
+                movimientos['olvidar'].append((vivienda_local, actividad_id))
+            else:
+                movimientos['bajas'].append({'vivienda_local': vivienda_local, 'vivienda_id': viviendas[vivienda_local], 'actividad_id': actividad_id})
+        return movimientos
+
+    def pendientes(self) -> Dict[str, int]:
+        """Movimientos locales que faltan por subir, por tabla (para mostrar en la UI)."""
+        with self.engine.connect() as conexion:
+            conteo = {}
+            for nombre in COLUMNAS_SUBIDA:
+                movimientos = self._movimientos(conexion, nombre)
+                conteo[nombre] = sum(len(movimientos[t]) for t in ('altas', 'cambios', 'bajas', 'pendientes'))
+            enlaces = self._movimientos_enlaces(conexion)
+            conteo[vivienda_actividad.name] = len(enlaces['altas']) + len(enlaces['bajas'])
+        return conteo
+
+    def _enviar(self, lote: Dict[str, Any], resumen: Dict[str, int]) -> Dict[str, Any]:
+        paquete = empaquetar({'dispositivo': self.dispositivo, **lote})
+        resumen['lotes'] += 1
+        resumen['bytes_enviados'] += len(paquete)
+        return desempaquetar(self.transporte.enviar_lote(paquete))
+
+    @staticmethod
+    def _registrar_conflictos(conexion, nombre: str, resueltos: List[int], conflictos: List[Dict[str, Any]]) -> None:
+        """Quita los conflictos ya resueltos y guarda los nuevos (uno por fila local)."""
+        ids = list(resueltos) + [c['id_local'] for c in conflictos]
+        if ids:
+            conexion.execute(delete(conflicto_campo).where(conflicto_campo.c.tabla == nombre, conflicto_campo.c.id_local.in_(ids)))
+        unicos = {c['id_local']: c['motivo'] for c in conflictos}
+        if unicos:
+            conexion.execute(insert(conflicto_campo), [
+                {'tabla': nombre, 'id_local': id_local, 'motivo': motivo[:255], 'detectado_en': datetime.now()}
+                for id_local, motivo in unicos.items()
+            ])
+
+    def _subir_tabla(self, nombre: str, resumen: Dict[str, int]) -> None:
+        with self.engine.connect() as conexion:
+            movimientos = self._movimientos(conexion, nombre)
+
+        if movimientos['pendientes']:
+            with self.engine.begin() as conexion:
+                self._registrar_conflictos(conexion, nombre, [], [
+                    {'id_local': id_local, 'motivo': "Su vivienda aun no se sincroniza con la central"}
+                    for id_local in movimientos['pendientes']
+                ])
+            resumen['conflictos'] += len(movimientos['pendientes'])
+
+        # Lotes de hasta tam_lote movimientos (altas, luego cambios, luego bajas)
+        todos = [('altas', m) for m in movimientos['altas']] + [('cambios', m) for m in movimientos['cambios']] + \
+                [('bajas', m) for m in movimientos['bajas']]
+        for inicio in range(0, len(todos), self.tam_lote):
+            lote = {'tabla': nombre, 'altas': [], 'cambios': [], 'bajas': []}
+            for tipo, movimiento in todos[inicio:inicio + self.tam_lote]:
+                lote[tipo].append(movimiento)
+            respuesta = self._enviar(lote, resumen)
+
+            with self.engine.begin() as conexion:
+                ids = respuesta['ids']
+                if ids:
+                    conexion.execute(delete(mapa_ids).where(mapa_ids.c.tabla == nombre, mapa_ids.c.id_local.in_([i[0] for i in ids])))
+                    conexion.execute(insert(mapa_ids), [
+                        {'tabla': nombre, 'id_local': id_local, 'id_central': id_central, 'huella': huella_datos}
+                        for id_local, id_central, huella_datos in ids
+                    ])
+                if respuesta['bajas']:
+                    conexion.execute(delete(mapa_ids).where(mapa_ids.c.tabla == nombre, mapa_ids.c.id_local.in_(respuesta['bajas'])))
+                self._registrar_conflictos(conexion, nombre, [i[0] for i in ids] + respuesta['bajas'], respuesta['conflictos'])
+            resumen['subidas'] += len(ids) + len(respuesta['bajas'])
+            resumen['conflictos'] += len(respuesta['conflictos'])
+
+    def _subir_enlaces(self, resumen: Dict[str, int]) -> None:
+        nombre = vivienda_actividad.name
+        with self.engine.connect() as conexion:
+            movimientos = self._movimientos_enlaces(conexion)
+
+        if movimientos['olvidar']:
+            with self.engine.begin() as conexion:
+                for vivienda_local, actividad_id in movimientos['olvidar']:
+                    conexion.execute(delete(enlaces_sincronizados).where(
+                        enlaces_sincronizados.c.vivienda_id == vivienda_local,
+                        enlaces_sincronizados.c.actividad_id == actividad_id
+                    ))
+
+        todos = [('altas', m) for m in movimientos['altas']] + [('bajas', m) for m in movimientos['bajas']]
+        for inicio in range(0, len(todos), self.tam_lote):
+            lote = {'tabla': nombre, 'altas': [], 'bajas': []}
+            for tipo, movimiento in todos[inicio:inicio + self.tam_lote]:
+                lote[tipo].append(movimiento)
+            respuesta = self._enviar(lote, resumen)
+
+            with self.engine.begin() as conexion:
+                if respuesta['enlaces']:
+                    conexion.execute(insert(enlaces_sincronizados), [
+                        {'vivienda_id': vivienda_local, 'actividad_id': actividad_id}
+                        for vivienda_local, actividad_id in respuesta['enlaces']
+                    ])
+                for vivienda_local, actividad_id in respuesta['bajas']:
+                    conexion.execute(delete(enlaces_sincronizados).where(
+                        enlaces_sincronizados.c.vivienda_id == vivienda_local,
+                        enlaces_sincronizados.c.actividad_id == actividad_id
+                    ))
+                self._registrar_conflictos(conexion, nombre, [e[0] for e in respuesta['enlaces']], respuesta['conflictos'])
+            resumen['subidas'] += len(respuesta['enlaces']) + len(respuesta['bajas'])
+            resumen['conflictos'] += len(respuesta['conflictos'])
+
+    def subir(self) -> Dict[str, int]:
+        """
+        Sube lo capturado en campo: primero viviendas (para conocer sus ids
+        centrales), luego habitantes y al final las actividades de cada vivienda.
+        """
+        resumen = {'lotes': 0, 'bytes_enviados': 0, 'subidas': 0, 'conflictos': 0}
+        for nombre in COLUMNAS_SUBIDA:
+            self._subir_tabla(nombre, resumen)
+        self._subir_enlaces(resumen)
+        return resumen
+
+    def sincronizar(self) -> Dict[str, int]:
+        """Baja catalogos y sube la captura. Retorna un resumen con los conteos."""
+        catalogos = self.bajar_catalogos()
+        resumen = self.subir()
+        resumen['catalogos'] = catalogos
+        guardar = datetime.now().isoformat(timespec='seconds')
+        with self.engine.begin() as conexion:
+            guardar_estado(conexion, 'ultima_sincronizacion', guardar)
+        return resumen
@@ -5,6 +5,17 @@ from .LocalidadDAO import LocalidadDAO
 from .TipoViviendaDAO import TipoViviendaDAO
 from .ActividadEconomicaDAO import ActividadEconomicaDAO
 from .CensoDAO import CensoDAO
+from .AsyncBaseDAO import AsyncBaseDAO, crear_engine_asincrono
+from .AsyncCensoDAO import AsyncCensoDAO
+from .Instrumentacion import instrumentacion, medir_operacion
+from .Metricas import metricas, ServidorMetricas
+from .Reintentos import ErrorPersistencia, ErrorTransitorio, ConflictoConcurrencia, PoliticaReintentos, reintentar, con_reintentos
+from .DetectorConsultas import accion_ui, contar_consultas, maximo_consultas
+from .Conexion import crear_engine, crear_engine_asistente, calentar_engine
+from .Migraciones import migrar, verificar_esquema, version_actual, VERSION_ESQUEMA
+from .AlmacenCampo import crear_almacen_campo
+from .AplicadorLotes import AplicadorLotes, TransporteDirecto, TransporteHttp, crear_transporte
+from .SincronizadorCampo import SincronizadorCampo
 
 __all__ = [
     'BaseDAO',
@@ -13,5 +24,34 @@ __all__ = [
     'LocalidadDAO',
     'TipoViviendaDAO',
     'ActividadEconomicaDAO',
-    'CensoDAO'
+    'CensoDAO',
+    'AsyncBaseDAO',
+    'AsyncCensoDAO',
+    'crear_engine_asincrono',
+    'crear_engine',
+    'crear_engine_asistente',
+    'calentar_engine',
+    'migrar',
+    'verificar_esquema',
+    'version_actual',
+    'VERSION_ESQUEMA',
+    'crear_almacen_campo',
+    'AplicadorLotes',
+    'TransporteDirecto',
+    'TransporteHttp',
+    'crear_transporte',
+    'SincronizadorCampo',
+    'instrumentacion',
+    'medir_operacion',
+    'metricas',
+    'ServidorMetricas',
+    'ErrorPersistencia',
+    'ErrorTransitorio',
+    'ConflictoConcurrencia',
+    'PoliticaReintentos',
+    'reintentar',
+    'con_reintentos',
+    'accion_ui',
+    'contar_consultas',
+    'maximo_consultas'
 ]
\ No newline at end of file
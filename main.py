@@ -1,12 +1,24 @@
 import sys
+import time
+import asyncio
+import threading
+
+# Marca de inicio para el reporte de arranque (python main.py --reporte-arranque)
+INICIO_ARRANQUE = time.perf_counter()
+REPORTE_ARRANQUE = "--reporte-arranque" in sys.argv
+# Modo campo (python main.py --campo censo_campo.db): captura sobre un SQLite local
+RUTA_CAMPO = sys.argv[sys.argv.index("--campo") + 1] if "--campo" in sys.argv[:-1] else None
+# Endpoint de metricas (python main.py --metricas 9464): GET http://127.0.0.1:9464/metrics
+PUERTO_METRICAS = int(sys.argv[sys.argv.index("--metricas") + 1]) if "--metricas" in sys.argv[:-1] else None
+
 from PyQt5.QtWidgets import QApplication
-from sqlalchemy import create_engine
+from PyQt5.QtCore import QTimer
 from sqlalchemy.exc import OperationalError
-from constants import DB_CONNECTION_STRING, ASSISTANT_CONNECTION_STRING
+from constants import DB_CONNECTION_STRING, ASSISTANT_CONNECTION_STRING, API_TOKEN
 
-# --- 1. IMPORTAR MODELOS (Para creación de tablas) ---
+# --- 1. IMPORTAR MODELOS ---
 try:
-    from modelo import Base
+    from modelo import Base, Administrador, Municipio
 except ImportError as e:
     print(f"Error: No se pudo importar el Modelo. Verifica 'modelo/__init__.py'. {e}")
     sys.exit(1)
@@ -21,33 +33,73 @@ except ImportError as e:
     print(f"Error: No se pudieron importar los Controladores. Verifica 'controlador/__init__.py'. {e}")
     sys.exit(1)
 
+from dao import crear_engine, crear_engine_asistente, calentar_engine, verificar_esquema
+from dao import crear_almacen_campo, SincronizadorCampo, crear_transporte
+from dao import ServidorMetricas
+
+# --- 2.1. INTEGRACIÓN ASYNCIO + QT (Opcional) ---
+# qasync permite que las corrutinas de los DAOs asincronos corran sobre el
+# event loop de Qt. Si no esta instalado, la aplicación usa solo la ruta sincrona.
+try:
+    import qasync
+except ImportError:
+    qasync = None
+
 # --- 3. IMPORTAR VISTAS ---
 try:
     from vista.login_view import LoginView
+    from vista.metricas_widget import MonitorBloqueos
 except ImportError as e:
     print(f"Error: No se pudo importar LoginView. Verifica 'vista/login_view.py'. {e}")
     sys.exit(1)
 
 
+# Las vistas del Dashboard (pyqtgraph, numpy) y el SDK de Gemini se importan
+# hasta que se usan: el login no espera por ellos.
+
 # --- 4. CONFIGURACIÓN DE BASE DE DATOS ---
 # (Asegúrate de que la base de datos que aparece en la url exista en tu MySQL)
 DB_URL = DB_CONNECTION_STRING
 ASISTENTE_URL = ASSISTANT_CONNECTION_STRING
+# En modo campo la app (y el asistente) usan el almacen local; DB_URL queda como la central
+DATOS_URL = f"sqlite:///{RUTA_CAMPO}" if RUTA_CAMPO else DB_URL
+
+
+def reportar_fase(fase):
+    """Con --reporte-arranque, imprime los ms transcurridos desde el inicio del proceso."""
+    if REPORTE_ARRANQUE:
+        print(f"[arranque] {(time.perf_counter() - INICIO_ARRANQUE) * 1000:8.1f} ms  {fase}")
+
+
+def _bajar_catalogos_en_fondo(sincronizador):
+    """Actualiza los catalogos del almacen de campo si hay red (sin avisar si no la hay)."""
+    try:
+        sincronizador.bajar_catalogos()
+    except Exception as e:
+        print(f"Aviso: Sin conexión a la central; se usan los catálogos locales. {e}")
 
 
 def inicializar_aplicacion():
     """
     Inicializa la BD, los controladores y la aplicación MVC.
     """
-    
+    reportar_fase("importaciones")
+
     # --- 5. CREAR ENGINE DE SQLALCHEMY ---
     try:
-        engine = create_engine(DB_URL)
-        asistente_engine = create_engine(ASISTENTE_URL)
+        # MySQL o SQLite (archivo local para equipos de campo y pruebas)
+        if RUTA_CAMPO:
+            # Almacen de campo: se crea/migra aqui mismo, sin depender de la red
+            engine = crear_almacen_campo(RUTA_CAMPO)
+        else:
+            engine = crear_engine(DB_URL)
+        # Engine del asistente: pool propio, chico, de solo lectura y con limite de tiempo
+        asistente_engine = crear_engine_asistente(DATOS_URL if RUTA_CAMPO else ASISTENTE_URL)
         # Intentar una conexión simple para verificar
         with engine.connect() as connection:
             pass
-        print("Conexión a MySQL (Engine) exitosa.")
+        print(f"Conexión a {engine.dialect.name} (Engine) exitosa.")
+        reportar_fase("conexión a la BD")
     except OperationalError as e:
         print(f"Error Crítico: No se pudo conectar a la base de datos MySQL.")
         print(f"Detalle: {e}")
@@ -57,17 +109,60 @@ def inicializar_aplicacion():
         print(f"Error al crear el engine de SQLAlchemy: {e}")
         return
 
-    # --- 6. CREAR TABLAS (Si no existen) ---
-    try:
-        Base.metadata.create_all(engine)
-        print("Tablas del Modelo verificadas/creadas exitosamente.")
-    except Exception as e:
-        print(f"Error al intentar crear las tablas: {e}")
+    # Precalentar el pool del asistente en segundo plano (no retrasa el arranque)
+    threading.Thread(target=calentar_engine, args=(asistente_engine,), daemon=True).start()
+
+    # --- 5.1. CREAR ENGINE ASÍNCRONO (Opcional) ---
+    # Requiere qasync y un driver asyncio (aiosqlite, asyncmy o aiomysql).
+    async_engine = None
+    if qasync is not None:
+        try:
+            from dao import crear_engine_asincrono
+            async_engine = crear_engine_asincrono(DATOS_URL)
+            print("Engine asincrono creado (reportes concurrentes habilitados).")
+        except Exception as e:
+            print(f"Advertencia: No se pudo crear el engine asincrono, se usará la ruta sincrona. {e}")
+
+    # --- 6. VERIFICAR VERSIÓN DEL ESQUEMA ---
+    # Una sola consulta a 'esquema_version'; las tablas e índices se crean con 'python migrar.py'
+    if not verificar_esquema(engine):
         return
+    print("Versión del esquema verificada.")
+    reportar_fase("esquema verificado")
+
+    # --- 6.1. MODO CAMPO: SINCRONIZADOR CON LA CENTRAL ---
+    sincronizador = None
+    if RUTA_CAMPO:
+        sincronizador = SincronizadorCampo(engine, crear_transporte(DB_URL, API_TOKEN))
+        # La primera vez se necesitan los catalogos para poder capturar;
+        # despues se actualizan en segundo plano sin retrasar el arranque.
+        admin_dao = AdminController(engine).admin_dao
+        primera_vez = admin_dao.listar_pagina(Municipio, 1) == []
+        if admin_dao.listar_pagina(Administrador, 1) == []:
+            # Las cuentas no bajan de la central: se crean en el equipo
+            print(f"Aviso: El almacén de campo no tiene usuarios. Crea uno con "
+                  f"'python sincronizar.py --campo {RUTA_CAMPO} --crear-usuario USUARIO'.")
+        if primera_vez:
+            try:
+                print(f"Catálogos bajados de la central: {sincronizador.bajar_catalogos()} registro(s).")
+            except Exception as e:
+                print(f"Advertencia: No se pudieron bajar los catálogos de la central (sin red). {e}")
+        else:
+            threading.Thread(target=lambda: _bajar_catalogos_en_fondo(sincronizador), daemon=True).start()
+        print(f"Modo campo: almacén local '{RUTA_CAMPO}'.")
 
     # --- 7. INICIALIZAR LA APLICACIÓN PYQT5 ---
     app = QApplication(sys.argv)
 
+    # Latido del event loop: cuenta los bloqueos de la interfaz en las metricas
+    monitor_bloqueos = MonitorBloqueos(app)
+    monitor_bloqueos.iniciar()
+    if PUERTO_METRICAS:
+        try:
+            ServidorMetricas(PUERTO_METRICAS).iniciar()
+        except OSError as e:
+            print(f"Advertencia: No se pudo abrir el puerto de métricas {PUERTO_METRICAS}. {e}")
+
     # --- 7.1. CARGAR LA HOJA DE ESTILO (NUEVO) ---
     try:
         with open("stylesheet.qss", "r") as f:
@@ -83,9 +178,10 @@ def inicializar_aplicacion():
     # Se pasa el 'engine' a los controladores para que sus DAOs puedan usarlo.
     admin_controller = AdminController(engine)
     catalogo_controller = CatalogoController(engine)
-    censo_controller = CensoController(engine)
+    censo_controller = CensoController(engine, async_engine=async_engine)
     asistente_controller = AsistenteController(asistente_engine)
     print("Controladores inicializados.")
+    reportar_fase("controladores")
     
     # --- 9. INICIALIZAR VISTA PRINCIPAL ---
     # Se pasan los controladores a la Vista para que pueda interactuar con ellos.
@@ -93,12 +189,24 @@ def inicializar_aplicacion():
         admin_controller=admin_controller,
         catalogo_controller=catalogo_controller,
         censo_controller=censo_controller,
-        asistente_controller=asistente_controller
+        asistente_controller=asistente_controller,
+        sincronizador=sincronizador
     )
     
     # --- 10. MOSTRAR Y EJECUTAR ---
     print("Iniciando la aplicación...")
     login_view.show()
+    # Se dispara cuando el event loop ya pintó la ventana de login
+    QTimer.singleShot(0, lambda: reportar_fase("ventana de login lista"))
+
+    if async_engine is not None:
+        # Event loop de Qt compartido con asyncio
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        with loop:
+            loop.run_forever()
+        sys.exit(0)
+
     sys.exit(app.exec_())
 
 # --- PUNTO DE ENTRADA DEL PROGRAMA ---
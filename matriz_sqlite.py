@@ -0,0 +1,406 @@
+# matriz_sqlite.py
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import importlib.util
+
+# --- 1. IMPORTAR CAPA DE DATOS Y CONTROLADORES ---
+try:
+    from dao import crear_engine, migrar
+    from modelo import Administrador
+    from controlador.AdminController import AdminController
+    from controlador.CatalogoController import CatalogoController
+    from controlador.CensoController import CensoController
+    from controlador.AsistenteController import AsistenteController
+    from controlador.CacheAsistente import CacheAsistente
+    from controlador.ProveedorLLM import ProveedorStub
+    from controlador.Precarga import PrecargaDashboard
+    from controlador.Seguridad import hashear_contrasena
+    from dao import maximo_consultas, ConflictoConcurrencia
+except ImportError as e:
+    print(f"Error: No se pudieron importar los módulos. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+PREGUNTA_CAST = "¿Cuántos habitantes declararon las viviendas en total?"
+
+# Máximo de sentencias SQL por método del controlador (detecta N+1 y cargas perezosas)
+# (controlador, método, argumentos a partir del contexto, máximo)
+LIMITES_CONSULTAS = [
+    # Catalogos: sello de version (valida el cache) + la lista
+    ('catalogo', 'obtener_todos_municipios', lambda ctx: (), 2),
+    ('catalogo', 'obtener_todas_localidades', lambda ctx: (), 2),
+    ('catalogo', 'obtener_localidades_por_municipio', lambda ctx: (ctx['municipio'].id,), 1),
+    ('censo', 'obtener_pagina_viviendas_con_localidad', lambda ctx: (ctx['viviendas'], 0), 1),
+    ('censo', 'obtener_habitantes_por_vivienda', lambda ctx: (ctx['lista_viviendas'][0].id,), 2),
+    ('censo', 'obtener_actividades_por_vivienda', lambda ctx: (ctx['lista_viviendas'][0].id,), 2),
+    ('censo', 'generar_dashboard_poblacion', lambda ctx: (), 1),
+    ('censo', 'generar_reporte_tipos_vivienda', lambda ctx: (), 1),
+    ('censo', 'generar_reporte_distribucion_edad', lambda ctx: (ctx['municipio'].id,), 1),
+]
+
+
+# --- 2. CASOS (cada uno recibe el contexto y regresa True si pasó) ---
+
+def caso_catalogos(ctx):
+    cat = ctx['catalogo']
+    municipio = cat.guardar_municipio("Matriz Municipio")
+    localidad = cat.guardar_localidad("Matriz Localidad", municipio.id)
+    tipo = cat.guardar_tipo_vivienda("Matriz Tipo")
+    actividad = cat.guardar_actividad_economica("Matriz Actividad")
+    ctx.update(municipio=municipio, localidad=localidad, tipo=tipo, actividad=actividad)
+
+    renombrado = cat.actualizar_municipio(municipio.id, "Matriz Municipio 2")
+    nombres = [m.nombre for m in cat.obtener_todos_municipios()]
+    # Una escritura de otro cliente (otra instancia del controlador) invalida el cache de este
+    en_cache = maximo_consultas(1, cat.obtener_todos_municipios)
+    CatalogoController(ctx['engine']).guardar_municipio("Matriz Municipio Externo")
+    externo = "Matriz Municipio Externo" in [m.nombre for m in cat.obtener_todos_municipios()]
+    return bool(renombrado) and "Matriz Municipio 2" in nombres and len(en_cache) == len(nombres) and externo and \
+        [l.id for l in cat.obtener_localidades_por_municipio(municipio.id)] == [localidad.id]
+
+
+def caso_registro_censo(ctx):
+    censo = ctx['censo']
+    viviendas = []
+    for i in range(ctx['viviendas']):
+        vivienda = censo.registrar_nueva_vivienda(
+            {'direccion': f"Calle Matriz {i}", 'total_habitantes': "2"},
+            ctx['localidad'].id, ctx['tipo'].id
+        )
+        if vivienda is None:
+            return False
+        viviendas.append(vivienda)
+        for j, sexo in enumerate(("F", "M")):
+            datos = {'nombre_completo': f"Persona {i}-{j}", 'edad': 20 + i % 50 + j, 'sexo': sexo,
+                     'parentesco_con_jefe_familia': "Hijo(a)"}
+            if censo.registrar_habitante_en_vivienda(vivienda.id, datos) is None:
+                return False
+    ctx['lista_viviendas'] = viviendas
+    return censo.asociar_actividad_a_vivienda(viviendas[0].id, ctx['actividad'].id)
+
+
+def caso_reportes(ctx):
+    censo = ctx['censo']
+    total = 2 * ctx['viviendas']
+    poblacion = censo.generar_dashboard_poblacion(ctx['municipio'].id)
+    tipos = censo.generar_reporte_tipos_vivienda(localidad_id=ctx['localidad'].id)
+    edades = censo.generar_reporte_distribucion_edad(ctx['municipio'].id)
+    return poblacion[0]['total_habitantes'] == total and tipos[0]['habitantes'] == total and len(edades) == total
+
+
+def caso_limites_consultas(ctx):
+    """Cada método del controlador se resuelve con un número fijo de sentencias."""
+    ctx['catalogo'].invalidar_catalogos()
+    for controlador, metodo, argumentos, maximo in LIMITES_CONSULTAS:
+        # Lanza LimiteConsultasExcedido / ConsultasRepetidas con el detalle de las sentencias
+        maximo_consultas(maximo, getattr(ctx[controlador], metodo), *argumentos(ctx))
+    return True
+
+
+def caso_paginacion(ctx):
+    censo = ctx['censo']
+    primera = censo.obtener_pagina_viviendas_con_localidad(10, 0)
+    segunda = censo.obtener_pagina_viviendas_con_localidad(10, 10)
+    ids = [v.id for v in primera + segunda]
+    return len(ids) == len(set(ids)) == min(20, ctx['viviendas']) and primera[0].localidad.nombre == "Matriz Localidad"
+
+
+def caso_precarga(ctx):
+    resultados = {}
+    precarga = PrecargaDashboard(ctx['catalogo'], ctx['censo'])
+    precarga.iniciar()
+    for nombre in ('catalogos', 'viviendas', 'reporte_poblacion', 'reporte_tipos_vivienda', 'reporte_edades'):
+        precarga.cuando_lista(nombre, lambda resultado, nombre=nombre: resultados.__setitem__(nombre, resultado))
+    limite = time.perf_counter() + 10
+    while len(resultados) < 5 and time.perf_counter() < limite:
+        time.sleep(0.01)
+    precarga.cerrar()
+    return len(resultados) == 5 and all(resultados[n] for n in ('viviendas', 'reporte_poblacion', 'reporte_edades'))
+
+
+def caso_actualizar_eliminar(ctx):
+    censo = ctx['censo']
+    vivienda = ctx['lista_viviendas'][-1]
+    if censo.actualizar_vivienda(vivienda.id, {'direccion': "Calle Editada"}, ctx['localidad'].id, ctx['tipo'].id) is None:
+        return False
+    habitantes = censo.obtener_habitantes_por_vivienda(vivienda.id)
+    if not censo.eliminar_habitante(habitantes[0].id):
+        return False
+    # ON DELETE CASCADE (en SQLite requiere PRAGMA foreign_keys)
+    return censo.eliminar_vivienda(vivienda.id) and censo.obtener_habitantes_por_vivienda(vivienda.id) == []
+
+
+def caso_lote_exportacion(ctx):
+    """Registro por lote (una transacción) y exportación por bloques."""
+    censo = ctx['censo']
+    lote = [{
+        'vivienda': {'direccion': f"Calle Lote {i}"},
+        'id_localidad': ctx['localidad'].id,
+        'id_tipo_vivienda': ctx['tipo'].id,
+        'habitantes': [{'nombre_completo': f"Lote {i}", 'edad': 30, 'sexo': "F"}],
+        'actividades': [ctx['actividad'].id],
+    } for i in range(5)]
+    ids = censo.registrar_lote_viviendas(lote)
+    # Una referencia inválida rechaza todo el lote
+    invalido = censo.registrar_lote_viviendas([{**lote[0], 'id_localidad': -1}])
+    viviendas = [fila['id'] for fila in censo.iterar_exportacion('viviendas', tam_bloque=7)]
+    habitantes = list(censo.iterar_exportacion('habitantes', tam_bloque=7))
+    return ids is not None and invalido is None and set(ids) <= set(viviendas) and \
+        len(viviendas) == len(set(viviendas)) and len(habitantes) == len(censo.generar_reporte_distribucion_edad()) and \
+        censo.desasociar_actividad_de_vivienda(ids[0], ctx['actividad'].id)
+
+
+def caso_concurrencia_optimista(ctx):
+    """Dos usuarios editan la misma vivienda: el segundo recibe ConflictoConcurrencia y fusiona."""
+    censo = ctx['censo']
+    vivienda = censo.registrar_nueva_vivienda({'direccion': "Calle Version"}, ctx['localidad'].id, ctx['tipo'].id)
+    leida = vivienda.version
+    # Usuario A guarda primero
+    censo.actualizar_vivienda(vivienda.id, {'direccion': "Calle Version A"}, ctx['localidad'].id, ctx['tipo'].id, leida)
+    # Usuario B, con la version vieja, choca
+    try:
+        censo.actualizar_vivienda(vivienda.id, {'direccion': "Calle Version B"}, ctx['localidad'].id, ctx['tipo'].id, leida)
+        return False
+    except ConflictoConcurrencia as e:
+        conflicto = e
+    actual = censo.obtener_vivienda(vivienda.id)
+    fusion, conflictos = censo.fusionar_cambios({'direccion': "Calle Version"}, {'direccion': "Calle Version B"},
+                                                {'direccion': actual.direccion})
+    # Carrera entre la lectura y el UPDATE: la detecta el 'WHERE version' del ORM
+    vieja = censo.obtener_vivienda(vivienda.id)
+    censo.actualizar_vivienda(vivienda.id, {'direccion': fusion['direccion']}, ctx['localidad'].id, ctx['tipo'].id,
+                              conflicto.version_actual)
+    vieja.direccion = "Calle Version C"
+    try:
+        censo.censo_dao.guardar(vieja)
+        return False
+    except ConflictoConcurrencia:
+        pass
+    final = censo.obtener_vivienda(vivienda.id)
+    return conflictos == ['direccion'] and final.direccion == "Calle Version B" and final.version == leida + 2
+
+
+def caso_eliminar_en_bloque(ctx):
+    """Eliminar un municipio con todo su arbol: un DELETE, la BD borra en cascada (sin cargar hijos)."""
+    censo, catalogo = ctx['censo'], ctx['catalogo']
+    municipio = catalogo.guardar_municipio("Municipio Bloque")
+    localidades = [catalogo.guardar_localidad(f"Localidad Bloque {i}", municipio.id) for i in range(3)]
+    habitantes = []
+    for localidad in localidades:
+        for i in range(5):
+            vivienda = censo.registrar_nueva_vivienda({'direccion': f"Calle Bloque {i}"}, localidad.id, ctx['tipo'].id)
+            censo.asociar_actividad_a_vivienda(vivienda.id, ctx['actividad'].id)
+            habitante = censo.registrar_habitante_en_vivienda(
+                vivienda.id, {'nombre_completo': "Persona Bloque", 'edad': 30, 'sexo': "F"})
+            habitantes.append(habitante.id)
+    version = censo.obtener_version_datos()
+    # DELETE + sello de version, sin importar cuantos hijos tenga
+    eliminados = maximo_consultas(2, catalogo.eliminar_municipios, [municipio.id])
+    restantes = [h for h in habitantes if censo.obtener_habitante(h) is not None]
+    return (eliminados == 1 and restantes == [] and censo.obtener_version_datos() != version
+            and catalogo.eliminar_municipios([municipio.id]) == 0)
+
+
+def caso_operaciones_en_bloque(ctx):
+    """Acciones sobre varias filas seleccionadas: una sentencia (+ sello de version) por accion."""
+    censo, catalogo = ctx['censo'], ctx['catalogo']
+    ids = [censo.registrar_nueva_vivienda({'direccion': f"Calle Seleccion {i}"}, ctx['localidad'].id, ctx['tipo'].id).id
+           for i in range(6)]
+    censo.asociar_actividad_a_vivienda(ids[0], ctx['actividad'].id)
+    # Asociar a todas: la que ya la tenia se omite (NOT EXISTS) y repetir no duplica
+    asociadas = maximo_consultas(2, censo.asociar_actividad_a_viviendas, ctx['actividad'].id, ids)
+    repetidas = censo.asociar_actividad_a_viviendas(ctx['actividad'].id, ids)
+    todas = all([a.id for a in censo.obtener_actividades_por_vivienda(i)] == [ctx['actividad'].id] for i in ids)
+
+    destino = catalogo.guardar_municipio("Municipio Destino")
+    localidades = [catalogo.guardar_localidad(f"Localidad Seleccion {i}", ctx['municipio'].id).id for i in range(3)]
+    movidas = maximo_consultas(2, catalogo.mover_localidades, localidades, destino.id)
+    en_destino = sorted(l.id for l in catalogo.obtener_localidades_por_municipio(destino.id))
+
+    eliminadas = maximo_consultas(2, censo.eliminar_viviendas, ids)
+    return (asociadas == 5 and repetidas == 0 and todas and movidas == 3 and en_destino == sorted(localidades)
+            and eliminadas == 6 and all(censo.obtener_vivienda(i) is None for i in ids))
+
+
+def caso_busqueda(ctx):
+    """Busqueda global: por palabra (sin acentos), aproximada (error de dedo), por paginas y sin LIKE de respaldo."""
+    censo = ctx['censo']
+    vivienda = censo.registrar_nueva_vivienda({'direccion': "Privada Búsqueda 7"}, ctx['localidad'].id, ctx['tipo'].id)
+    for nombre in ("Ramón Núñez Buscado", "Ramona Buscado Ibarra", "Otro Buscado"):
+        censo.registrar_habitante_en_vivienda(vivienda.id, {'nombre_completo': nombre, 'edad': 40, 'sexo': "F"})
+    exacta = maximo_consultas(1, censo.buscar, "ramon nunez")
+    direccion = censo.buscar("privada busqueda")
+    aproximada = censo.buscar("Buscadp")
+    primera = censo.buscar("buscado", 0, 2)
+    segunda = censo.buscar("buscado", 1, 2, primera['modo'])
+    # Sin coincidencias en el indice no se recorre la tabla con LIKE: palabras + aproximada
+    nada = maximo_consultas(2, censo.buscar, "zzqxw")
+    textos = [r['texto'] for r in primera['resultados'] + segunda['resultados']]
+    return ([r['texto'] for r in exacta['resultados']] == ["Ramón Núñez Buscado"]
+            and direccion['resultados'][0]['vivienda_id'] == vivienda.id
+            and len(aproximada['resultados']) == 3
+            and primera['hay_mas'] and not segunda['hay_mas'] and len(set(textos)) == 3
+            and nada['resultados'] == [] and nada['modo'] is None)
+
+
+def caso_pool_una_conexion(ctx):
+    """Con un pool de una sola conexion, una escritura sube el sello sin esperar una segunda conexion."""
+    engine = crear_engine(ctx['url'], pool_size=1, max_overflow=0, pool_timeout=2)
+    try:
+        catalogo, censo = CatalogoController(engine), CensoController(engine)
+        version = censo.obtener_version_datos()
+        inicio = time.perf_counter()
+        municipio = catalogo.guardar_municipio("Municipio Pool Unico")
+        segundos = time.perf_counter() - inicio
+        return municipio is not None and segundos < 1 and censo.obtener_version_datos() == version + 1
+    finally:
+        engine.dispose()
+
+
+def caso_login(ctx):
+    admin = ctx['admin']
+    admin.admin_dao.guardar(Administrador(usuario="matriz", contrasena_hash=hashear_contrasena("clave-matriz")))
+    return admin.verificar_login("matriz", "clave-matriz") and not admin.verificar_login("matriz", "otra")
+
+
+def caso_asistente(ctx):
+    asistente = ctx['asistente']
+    # Ruta rapida (plantilla) y ruta LLM con el ejemplo de CAST del dialecto
+    rapida, tiempos_rapida = asistente.chatear_medido("¿Cuántos habitantes hay en total?")
+    respuesta, tiempos = asistente.chatear_medido(PREGUNTA_CAST)
+    # total_habitantes (VARCHAR, sumado con CAST) debe coincidir con los habitantes registrados
+    esperado = str(len(ctx['censo'].generar_reporte_distribucion_edad()))
+    return tiempos_rapida['ruta'] == 'rapida' and tiempos['ruta'] == 'llm' and esperado in respuesta
+
+
+def caso_async(ctx):
+    """Reportes concurrentes sobre el DAO asyncio (solo BD en archivo con aiosqlite)."""
+    from dao import crear_engine_asincrono
+    from controlador.CensoController import CensoController as Controlador
+
+    async def _reportes():
+        engine = crear_engine_asincrono(ctx['url'])
+        try:
+            return await Controlador(ctx['engine'], async_engine=engine).generar_reportes_dashboard_async()
+        finally:
+            await engine.dispose()
+
+    reportes = asyncio.run(_reportes())
+    return len(reportes['edades']) == len(ctx['censo'].generar_reporte_distribucion_edad())
+
+
+CASOS = [
+    ("catalogos", caso_catalogos),
+    ("registro_censo", caso_registro_censo),
+    ("reportes", caso_reportes),
+    ("limites_consultas", caso_limites_consultas),
+    ("paginacion", caso_paginacion),
+    ("precarga", caso_precarga),
+    ("actualizar_eliminar", caso_actualizar_eliminar),
+    ("lote_exportacion", caso_lote_exportacion),
+    ("concurrencia_optimista", caso_concurrencia_optimista),
+    ("eliminar_en_bloque", caso_eliminar_en_bloque),
+    ("operaciones_en_bloque", caso_operaciones_en_bloque),
+    ("busqueda", caso_busqueda),
+    ("pool_una_conexion", caso_pool_una_conexion),
+    ("login", caso_login),
+    ("asistente", caso_asistente),
+    ("async", caso_async),
+]
+
+
+# --- 3. EJECUCIÓN POR BACKEND ---
+
+def crear_contexto(url, viviendas):
+    engine = crear_engine(url)
+    migrar(engine)
+    asistente = AsistenteController(engine, proveedor=ProveedorStub(), usar_cache=False)
+    sql_cast = next(sql for _, sql in asistente.esquema.ejemplos({'vivienda'}) if 'CAST' in sql)
+    asistente.proveedor.grabaciones = {CacheAsistente.normalizar_pregunta(PREGUNTA_CAST): {'sql': sql_cast}}
+    return {
+        'url': url,
+        'engine': engine,
+        'viviendas': viviendas,
+        'admin': AdminController(engine),
+        'catalogo': CatalogoController(engine),
+        'censo': CensoController(engine),
+        'asistente': asistente,
+    }
+
+
+def ejecutar_backend(nombre, url, viviendas):
+    """Corre todos los casos en orden; regresa [(caso, ok, ms, detalle)]."""
+    resultados = []
+    try:
+        ctx = crear_contexto(url, viviendas)
+    except Exception as e:
+        return [("conexion", False, 0.0, str(e))]
+
+    en_memoria = ctx['engine'].url.database in (None, '', ':memory:')
+    for caso, funcion in CASOS:
+        if caso == 'async' and (en_memoria or importlib.util.find_spec('aiosqlite') is None):
+            resultados.append((caso, None, 0.0, "omitido (requiere archivo y aiosqlite)"))
+            continue
+        if caso == 'pool_una_conexion' and en_memoria:
+            resultados.append((caso, None, 0.0, "omitido (la BD en memoria comparte una conexion)"))
+            continue
+        inicio = time.perf_counter()
+        try:
+            ok, detalle = bool(funcion(ctx)), ""
+        except Exception as e:
+            ok, detalle = False, f"{type(e).__name__}: {e}"
+        resultados.append((caso, ok, (time.perf_counter() - inicio) * 1000, detalle))
+    ctx['engine'].dispose()
+    return resultados
+
+
+def reportar(matriz):
+    backends = list(matriz)
+    print("\n--- MATRIZ DE PRUEBAS DE LA CAPA DE CONTROLADORES ---")
+    print(f"{'Caso':<22}" + "".join(f"{b:>22}" for b in backends))
+    fallos = 0
+    for caso, _ in [("conexion", None)] + CASOS:
+        celdas = []
+        for backend in backends:
+            fila = next((r for r in matriz[backend] if r[0] == caso), None)
+            if fila is None:
+                celdas.append("")
+            elif fila[1] is None:
+                celdas.append("omitido")
+            else:
+                fallos += not fila[1]
+                celdas.append(f"{'OK' if fila[1] else 'FALLO'} {fila[2]:8.1f} ms")
+        if any(celdas):
+            print(f"{caso:<22}" + "".join(f"{c:>22}" for c in celdas))
+
+    for backend, filas in matriz.items():
+        for caso, ok, _, detalle in filas:
+            if ok is False and detalle:
+                print(f"  [{backend}] {caso}: {detalle}")
+    return fallos
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Corre la capa de controladores contra SQLite en memoria y en archivo (y otras BD opcionales)."
+    )
+    parser.add_argument("--db", action="append", default=[], help="URL adicional a probar (ej. una BD MySQL de pruebas)")
+    parser.add_argument("--viviendas", type=int, default=50, help="Viviendas a registrar por backend (2 habitantes c/u)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="matriz_censo_")
+    backends = {
+        "sqlite-memoria": "sqlite://",
+        "sqlite-archivo": f"sqlite:///{os.path.join(directorio, 'censo.db')}",
+    }
+    for i, url in enumerate(args.db, start=1):
+        backends[f"db-{i}"] = url
+
+    matriz = {nombre: ejecutar_backend(nombre, url, args.viviendas) for nombre, url in backends.items()}
+    fallos = reportar(matriz)
+    print(f"\n{'Todo OK' if not fallos else f'{fallos} caso(s) fallaron'} (BD en archivo: {directorio})")
+    sys.exit(1 if fallos else 0)
\ No newline at end of file
@@ -0,0 +1,50 @@
+# migrar.py
+import sys
+import argparse
+from constants import DB_CONNECTION_STRING
+
+# --- 1. IMPORTAR MIGRACIONES ---
+try:
+    from dao import crear_engine
+    from dao.Migraciones import migrar, version_actual, MIGRACIONES, VERSION_ESQUEMA
+except ImportError as e:
+    print(f"Error: No se pudieron importar las migraciones. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+
+def mostrar_estado(engine):
+    """Imprime la versión aplicada y las migraciones pendientes."""
+    version = version_actual(engine)
+    if version is None:
+        print("La BD no tiene control de versiones (o no responde): se aplicarán todas las migraciones.")
+        version = 0
+    else:
+        print(f"Versión aplicada: {version} / versión del código: {VERSION_ESQUEMA}")
+
+    pendientes = [(numero, descripcion) for numero, descripcion, _ in MIGRACIONES if numero > version]
+    if not pendientes:
+        print("El esquema está al día.")
+    for numero, descripcion in pendientes:
+        print(f"  pendiente {numero}: {descripcion}")
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crea o actualiza el esquema de la BD (tablas e índices).")
+    parser.add_argument("--db", default=DB_CONNECTION_STRING, help="URL de la base de datos (ej. sqlite:///censo.db)")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra la versión aplicada y lo pendiente")
+    args = parser.parse_args()
+
+    # Mismos PRAGMA que la aplicacion en SQLite (llaves foraneas, WAL, busy_timeout)
+    engine = crear_engine(args.db)
+    if args.estado:
+        mostrar_estado(engine)
+        sys.exit(0)
+
+    print(f"Migrando el esquema de {engine.url.render_as_string().split('@')[-1]}...")
+    try:
+        total = migrar(engine)
+    except Exception as e:
+        print(f"Error al migrar el esquema: {e}")
+        sys.exit(1)
+    print(f"--- MIGRACIÓN COMPLETA: {total} migración(es) aplicada(s), versión {VERSION_ESQUEMA} ---")
\ No newline at end of file
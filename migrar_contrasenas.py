@@ -0,0 +1,39 @@
+# migrar_contrasenas.py
+import sys
+from constants import DB_CONNECTION_STRING
+
+# --- 1. IMPORTAR DAO Y SEGURIDAD ---
+try:
+    from dao import AdministradorDAO
+    from controlador.Seguridad import hashear_contrasena, es_hash
+except ImportError as e:
+    print(f"Error: No se pudieron importar los módulos. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+
+def migrar_contrasenas(admin_dao: AdministradorDAO) -> int:
+    """
+    Rehashea con scrypt las contraseñas guardadas en texto plano.
+    Los hashes scrypt con otro costo no se pueden recalcular sin la contraseña:
+    se actualizan solos la siguiente vez que el usuario inicia sesión.
+    Retorna el número de filas migradas.
+    """
+    migradas = 0
+    for id_administrador, usuario, contrasena_hash in admin_dao.listar_credenciales():
+        if es_hash(contrasena_hash):
+            continue
+        # En las filas heredadas, 'contrasena_hash' contiene la contraseña en texto plano
+        nuevo_hash = hashear_contrasena(contrasena_hash)
+        if admin_dao.actualizar_contrasena_hash(id_administrador, nuevo_hash, hash_anterior=contrasena_hash):
+            print(f"Contraseña de '{usuario}' migrada a scrypt.")
+            migradas += 1
+        else:
+            print(f"No se pudo migrar la contraseña de '{usuario}'.")
+    return migradas
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    print(f"Migrando contraseñas de administradores en {DB_CONNECTION_STRING.split('@')[-1]}...")
+    total = migrar_contrasenas(AdministradorDAO(None))
+    print(f"--- MIGRACIÓN COMPLETA: {total} contraseña(s) rehasheada(s) ---")
@@ -17,13 +17,15 @@ class ActividadEconomica(Base):
     """
 
     __tablename__='actividad_economica'
-    __table_args__={'extend_existing':True}
+    __table_args__={'extend_existing':True, 'comment': 'Catalogo de sostenes economicos de las viviendas'}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    nombre: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    nombre: Mapped[str] = mapped_column(String(100), nullable=False, unique=True,
+                                        comment="Ej. 'Agricultura', 'Comercio'")
 
     # Relacion Many-to-Many (M:M)
     viviendas: Mapped[List["Vivienda"]] = relationship(
         secondary=vivienda_actividad,
-        back_populates="actividades"
+        back_populates="actividades",
+        passive_deletes=True # Las filas de vivienda_actividad las borra la BD (ON DELETE CASCADE)
     )
\ No newline at end of file
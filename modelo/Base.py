@@ -14,5 +14,6 @@ vivienda_actividad = Table(
     Base.metadata,
     Column('vivienda_id', ForeignKey('vivienda.id', ondelete="CASCADE"), primary_key=True),
     Column('actividad_id', ForeignKey('actividad_economica.id', ondelete="CASCADE"), primary_key=True),
-    extend_existing=True
+    extend_existing=True,
+    comment='Asociacion vivienda <-> actividad_economica (muchos a muchos)'
 )
\ No newline at end of file
@@ -0,0 +1,25 @@
+from .Base import Base
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+class EsquemaVersion(Base):
+    """
+    Historial de migraciones del esquema aplicadas a la BD (una fila por migracion)
+
+    Atributos:
+        version: (PK) numero de la migracion [int]
+        descripcion: [str]
+        aplicada_en: [datetime]
+
+    Usos:
+        Al arrancar, la aplicacion solo consulta MAX(version) en lugar de
+        reflejar todas las tablas con create_all (ver dao/Migraciones.py)
+    """
+
+    __tablename__ = 'esquema_version'
+    __table_args__ = {'extend_existing': True}
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    descripcion: Mapped[str] = mapped_column(String(255), nullable=False)
+    aplicada_en: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
\ No newline at end of file
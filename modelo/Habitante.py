@@ -16,6 +16,7 @@ class Habitante(Base):
         parentesco_con_jefe_familia: (Define el vinculo con el jefe de familia) [str]
 
         nivel_educativo (puede no venir)
+        version: (Control de concurrencia optimista; la incrementa cada UPDATE) [int]
 
     Relaciones:
         Vivienda:
@@ -25,16 +26,30 @@ class Habitante(Base):
     """
 
     __tablename__='habitante'
-    __table_args__={'extend_existing':True}
+    __table_args__={'extend_existing':True, 'comment': 'Habitantes censados; cada uno vive en una vivienda'}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     nombre_completo: Mapped[str] = mapped_column(String(150), nullable=False)
     edad: Mapped[int] = mapped_column(Integer, nullable=False)
-    sexo: Mapped[str] = mapped_column(String(10))
-    parentesco_con_jefe_familia: Mapped[str] = mapped_column(String(50))
+    sexo: Mapped[str] = mapped_column(
+        String(10),
+        comment="Codificado: 'F' = Femenino (Mujer), 'M' = Masculino (Hombre)",
+        info={'valores': ['F', 'M']}
+    )
+    parentesco_con_jefe_familia: Mapped[str] = mapped_column(
+        String(50),
+        info={'valores': ['Jefe(a) de Familia', 'Cónyuge', 'Hijo(a)', 'Nieto(a)', 'Padre/Madre',
+                          'Suegro(a)', 'Yerno/Nuera', 'Otro familiar']}
+    )
+
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1",
+                                         comment="Version de la fila (concurrencia optimista); no es un dato del censo")
 
     # Clave foranea
-    vivienda_id: Mapped[int] = mapped_column(ForeignKey('vivienda.id', ondelete="CASCADE"))
+    vivienda_id: Mapped[int] = mapped_column(ForeignKey('vivienda.id', ondelete="CASCADE"), index=True)
+
+    # Cada UPDATE/DELETE lleva 'WHERE version = <leida>': si otro usuario la cambio, no se aplica
+    __mapper_args__ = {'version_id_col': version}
 
     # Relacion: Un Habitante pertenece a una Vivienda
     vivienda: Mapped["Vivienda"] = relationship(back_populates="habitantes")
\ No newline at end of file
@@ -19,12 +19,13 @@ class Localidad(Base):
     """
 
     __tablename__='localidad'
-    __table_args__={'extend_existing':True}
+    __table_args__={'extend_existing':True, 'comment': 'Catalogo de localidades; cada una pertenece a un municipio'}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     nombre: Mapped[str] = mapped_column(String(100), nullable=False)
-    municipio_id: Mapped[int] = mapped_column(ForeignKey('municipio.id', ondelete="CASCADE"))
+    municipio_id: Mapped[int] = mapped_column(ForeignKey('municipio.id', ondelete="CASCADE"), index=True)
 
     # Relaciones
     municipio: Mapped["Municipio"] = relationship(back_populates="localidades")
-    viviendas: Mapped[List["Vivienda"]] = relationship(back_populates="localidad", cascade="all, delete-orphan")
\ No newline at end of file
+    viviendas: Mapped[List["Vivienda"]] = relationship(back_populates="localidad", cascade="all, delete-orphan",
+                                                       passive_deletes=True) # La BD borra en cascada
\ No newline at end of file
@@ -17,10 +17,14 @@ class Municipio(Base):
     """
     
     __tablename__ = 'municipio'
-    __table_args__ = {'extend_existing':True}
+    __table_args__ = {'extend_existing':True, 'comment': 'Catalogo de municipios'}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    nombre: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    nombre: Mapped[str] = mapped_column(String(100), nullable=False, unique=True,
+                                        comment="Ej. 'Saltillo', 'Arteaga'")
 
     # Relacion: Un municipio tiene muchas localidades
-    localidades: Mapped[List["Localidad"]] = relationship(back_populates="municipio", cascade="all, delete-orphan")
\ No newline at end of file
+    # passive_deletes: al borrar, las localidades (y lo que cuelga de ellas) las borra la BD
+    # con ON DELETE CASCADE, sin cargarlas en memoria
+    localidades: Mapped[List["Localidad"]] = relationship(back_populates="municipio", cascade="all, delete-orphan",
+                                                          passive_deletes=True)
\ No newline at end of file
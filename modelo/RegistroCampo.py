@@ -0,0 +1,26 @@
+from .Base import Base
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+class RegistroCampo(Base):
+    """
+    Altas recibidas de los equipos de campo (en la BD central)
+
+    Atributos:
+        dispositivo: (PK) identificador del almacen de campo que envio la fila [str]
+        tabla: (PK) 'vivienda' o 'habitante' [str]
+        id_local: (PK) id de la fila en el almacen de campo [int]
+        id_central: id asignado en la BD central [int]
+
+    Usos:
+        Hace idempotente la sincronizacion: si un lote se reenvia (ej. se corto la
+        conexion despues del commit), las altas ya recibidas no se duplican
+    """
+
+    __tablename__ = 'registro_campo'
+    __table_args__ = {'extend_existing': True}
+
+    dispositivo: Mapped[str] = mapped_column(String(36), primary_key=True)
+    tabla: Mapped[str] = mapped_column(String(30), primary_key=True)
+    id_local: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    id_central: Mapped[int] = mapped_column(Integer, nullable=False)
\ No newline at end of file
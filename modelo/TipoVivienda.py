@@ -17,10 +17,12 @@ class TipoVivienda(Base):
     """
 
     __tablename__ = 'tipo_vivienda'
-    __table_args__ = {'extend_existing':True}
+    __table_args__ = {'extend_existing':True, 'comment': 'Catalogo de tipos de vivienda (material de construccion)'}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    nombre: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
+    nombre: Mapped[str] = mapped_column(String(50), nullable=False, unique=True,
+                                        comment="Ej. 'Vivienda de concreto', 'Vivienda de ladrillo'")
 
     # Relacion
-    viviendas: Mapped[List["Vivienda"]] = relationship(back_populates="tipo_vivienda", cascade="all, delete-orphan")
\ No newline at end of file
+    viviendas: Mapped[List["Vivienda"]] = relationship(back_populates="tipo_vivienda", cascade="all, delete-orphan",
+                                                       passive_deletes=True) # La BD borra en cascada
\ No newline at end of file
@@ -0,0 +1,21 @@
+from .Base import Base
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+class VersionDatos(Base):
+    """
+    Sello de version de los datos del censo (una sola fila, id = 1)
+
+    Atributos:
+        id: (PK)
+        version: (Se incrementa en cada escritura de datos del censo) [int]
+
+    Usos:
+        Invalidar caches (ej. respuestas del asistente) sin consultar las tablas grandes
+    """
+
+    __tablename__ = 'version_datos'
+    __table_args__ = {'extend_existing': True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,6 +1,6 @@
 from typing import List
 from .Base import Base, vivienda_actividad
-from sqlalchemy import ForeignKey, String, Date
+from sqlalchemy import ForeignKey, String, Date, Integer
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 class Vivienda(Base):
@@ -16,6 +16,7 @@ class Vivienda(Base):
         fecha_censo: [str]
         
         coordenadas_gps, total_habitantes (pueden no venir)
+        version: (Control de concurrencia optimista; la incrementa cada UPDATE) [int]
 
     Relaciones:
         Habitantes:
@@ -27,27 +28,36 @@ class Vivienda(Base):
     """
 
     __tablename__='vivienda'
-    __table_args__={'extend_existing':True}
+    __table_args__={'extend_existing':True, 'comment': 'Viviendas censadas'}
     
     id: Mapped[int] = mapped_column(primary_key=True)
     direccion: Mapped[str] = mapped_column(String(255), nullable=False)
     fecha_censo: Mapped[Date] = mapped_column(Date, nullable=True)
     coordenadas_gps: Mapped[str | None] = mapped_column(String(50), nullable=True)
-    total_habitantes: Mapped[int] = mapped_column(String(50), nullable=True)
+    total_habitantes: Mapped[int] = mapped_column(String(50), nullable=True,
+                                                  comment="Numero de habitantes capturado como texto; convertir con CAST para operar")
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1",
+                                         comment="Version de la fila (concurrencia optimista); no es un dato del censo")
 
     # Claves foraneas
-    localidad_id: Mapped[int] = mapped_column(ForeignKey('localidad.id', ondelete="CASCADE"))
-    tipo_vivienda_id: Mapped[int] = mapped_column(ForeignKey('tipo_vivienda.id', ondelete="CASCADE"))
+    localidad_id: Mapped[int] = mapped_column(ForeignKey('localidad.id', ondelete="CASCADE"), index=True)
+    tipo_vivienda_id: Mapped[int] = mapped_column(ForeignKey('tipo_vivienda.id', ondelete="CASCADE"), index=True)
+
+    # Cada UPDATE/DELETE lleva 'WHERE version = <leida>': si otro usuario la cambio, no se aplica
+    __mapper_args__ = {'version_id_col': version}
 
     # Relaciones
     localidad: Mapped["Localidad"] = relationship(back_populates="viviendas")
     tipo_vivienda: Mapped["TipoVivienda"] = relationship(back_populates="viviendas")
 
     # (1:M): Una vivienda tiene muchos habitantes
-    habitantes: Mapped[List["Habitante"]] = relationship(back_populates="vivienda", cascade="all, delete-orphan")
+    # passive_deletes: al borrar la vivienda, la BD borra habitantes y asociaciones (ON DELETE CASCADE)
+    habitantes: Mapped[List["Habitante"]] = relationship(back_populates="vivienda", cascade="all, delete-orphan",
+                                                         passive_deletes=True)
 
     # (M:M): Actividades Economicas
     actividades: Mapped[List["ActividadEconomica"]] = relationship(
         secondary=vivienda_actividad,
-        back_populates="viviendas"
+        back_populates="viviendas",
+        passive_deletes=True
     )
@@ -6,6 +6,9 @@ from .Localidad import Localidad
 from .Municipio import Municipio
 from .TipoVivienda import TipoVivienda
 from .Vivienda import Vivienda
+from .VersionDatos import VersionDatos
+from .EsquemaVersion import EsquemaVersion
+from .RegistroCampo import RegistroCampo
 
 __all__ = [
     'Base',
@@ -16,5 +19,8 @@ __all__ = [
     'Municipio',
     'TipoVivienda',
     'vivienda_actividad',
-    'Vivienda'
+    'Vivienda',
+    'VersionDatos',
+    'EsquemaVersion',
+    'RegistroCampo'
 ]
\ No newline at end of file
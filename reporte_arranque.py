@@ -0,0 +1,76 @@
+# reporte_arranque.py
+import sys
+import argparse
+import subprocess
+
+# --- 1. MÓDULOS PESADOS ---
+# No deberían cargarse antes de que aparezca la ventana de login
+MODULOS_DIFERIDOS = ['pyqtgraph', 'numpy', 'google.genai']
+
+
+def medir_importaciones(modulo):
+    """
+    Importa 'modulo' en un proceso nuevo con 'python -X importtime' y regresa
+    una lista de (acumulado_us, propio_us, nombre) por cada módulo importado.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        errores = [l for l in proceso.stderr.splitlines() if not l.startswith("import time:")]
+        detalle = errores[-1] if errores else ""
+        print(f"Advertencia: 'import {modulo}' terminó con código {proceso.returncode}. {detalle}")
+
+    registros = []
+    for linea in proceso.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not linea.startswith("import time:"):
+            continue
+        partes = linea[len("import time:"):].split("|")
+        if len(partes) != 3:
+            continue
+        try:
+            propio, acumulado = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue # Encabezado
+        registros.append((acumulado, propio, partes[2].strip()))
+    return registros
+
+
+def reportar(args):
+    registros = medir_importaciones(args.modulo)
+    if not registros:
+        print("No se obtuvo información de importaciones.")
+        return
+
+    nombres = {nombre for _, _, nombre in registros}
+    total = sum(propio for _, propio, _ in registros)
+
+    # --- 2. REPORTE ---
+    print(f"\n--- IMPORTACIONES AL ARRANCAR ('import {args.modulo}') ---")
+    print(f"Módulos importados: {len(registros)}   Tiempo total: {total / 1000:.1f} ms")
+
+    print(f"\n{'acumulado ms':>14}{'propio ms':>12}  módulo")
+    # Solo módulos de primer nivel o paquetes, para no repetir cada submódulo
+    principales = [r for r in registros if args.todos or "." not in r[2]]
+    for acumulado, propio, nombre in sorted(principales, reverse=True)[:args.top]:
+        print(f"{acumulado / 1000:>14.1f}{propio / 1000:>12.1f}  {nombre}")
+
+    print("\nMódulos diferidos (deben aparecer como 'no cargado'):")
+    for modulo in MODULOS_DIFERIDOS:
+        estado = "CARGADO AL ARRANCAR" if modulo in nombres else "no cargado"
+        print(f"  {modulo:<16}{estado}")
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reporte de tiempos de importación del arranque (python -X importtime). "
+                    "Para los tiempos hasta la ventana de login use: python main.py --reporte-arranque"
+    )
+    parser.add_argument("--modulo", default="main", help="Módulo a importar (por defecto 'main')")
+    parser.add_argument("--top", type=int, default=15, help="Cantidad de módulos a mostrar")
+    parser.add_argument("--todos", action="store_true", help="Incluye submódulos en la lista")
+
+    reportar(parser.parse_args())
\ No newline at end of file
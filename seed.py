@@ -19,6 +19,10 @@ except ImportError:
     print("Error: Asegúrate de que 'modelo' sea un paquete importable.")
     sys.exit(1)
 
+# Hash de contraseñas (scrypt); solo depende de la biblioteca estandar
+from controlador.Seguridad import hashear_contrasena
+from dao.Migraciones import verificar_esquema
+
 # --- 2. INICIALIZACIÓN ---
 engine = create_engine(DB_URL)
 SessionLocal = sessionmaker(bind=engine)
@@ -41,7 +45,7 @@ def seed_data():
         
         # Administrador
         # (En un proyecto real, esta contraseña debe estar hasheada)
-        admin = Administrador(usuario='admin', contrasena_hash='admin123')
+        admin = Administrador(usuario='admin', contrasena_hash=hashear_contrasena('admin123'))
         
         # Tipos de Vivienda (Fuente: Documento de requisitos)
         tipos_vivienda_nombres = [
@@ -130,8 +134,8 @@ def seed_data():
 # --- PUNTO DE ENTRADA DEL SCRIPT ---
 if __name__ == "__main__":
     print("ADVERTENCIA: Este script poblará la base de datos definida en DB_URL.")
-    # (Opcional) Crear tablas primero (aunque main.py lo hace)
-    # print("Asegurando que las tablas existan...")
-    # Base.metadata.create_all(engine)
+    # Las tablas se crean con 'python migrar.py'; aquí solo se revisa la versión del esquema
+    if not verificar_esquema(engine):
+        sys.exit(1)
     
     seed_data()
\ No newline at end of file
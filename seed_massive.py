@@ -21,6 +21,10 @@ except ImportError:
     print("Error: No se pudo importar el 'modelo'. Asegúrate de que el script esté en la raíz.")
     sys.exit(1)
 
+# Hash de contraseñas (scrypt); solo depende de la biblioteca estandar
+from controlador.Seguridad import hashear_contrasena
+from dao.Migraciones import verificar_esquema
+
 # --- 2. PARÁMETROS DE GENERACIÓN ---
 fake = Faker('es_MX') # Nombres y direcciones en español (México)
 
@@ -30,7 +34,7 @@ MAX_HABITANTES_POR_VIVIENDA = 7
 MAX_ACTIVIDADES_POR_VIVIENDA = 3
 
 # --- 3. DATOS DE CATÁLOGO ---
-ADMIN_USER = {"usuario": "admin", "contrasena_hash": "admin123"}
+ADMIN_USER = {"usuario": "admin", "contrasena": "admin123"}
 
 TIPOS_VIVIENDA_LIST = [
     "Vivienda de concreto", "Vivienda de adobe(antiguo)", "Vivienda de ladrillo",
@@ -84,7 +88,7 @@ def seed_data_massive():
         print(f"Generando 1 Administrador, {len(TIPOS_VIVIENDA_LIST)} Tipos de Vivienda, {len(ACTIVIDADES_LIST)} Actividades y {len(MUNICIPIOS_COAHUILA)} Municipios...")
         
         # Administrador
-        admin = Administrador(usuario=ADMIN_USER["usuario"], contrasena_hash=ADMIN_USER["contrasena_hash"])
+        admin = Administrador(usuario=ADMIN_USER["usuario"], contrasena_hash=hashear_contrasena(ADMIN_USER["contrasena"]))
         session.add(admin)
         
         # Tipos de Vivienda
@@ -206,12 +210,9 @@ if __name__ == "__main__":
     print("ADVERTENCIA: Este script poblará masivamente la base de datos definida en DB_URL.")
     print("Asegúrate de que las tablas estén vacías y que la BBDD exista.")
     
-    # Asegurar que las tablas existan (main.py también lo hace)
-    try:
-        print("Verificando/Creando tablas...")
-        Base.metadata.create_all(engine)
-    except Exception as e:
-        print(f"No se pudieron crear las tablas (¿Error de conexión?): {e}")
+    # Las tablas se crean con 'python migrar.py'; aquí solo se revisa la versión del esquema
+    print("Verificando versión del esquema...")
+    if not verificar_esquema(engine):
         sys.exit(1)
     
     seed_data_massive()
\ No newline at end of file
@@ -0,0 +1,80 @@
+# servicio.py
+import sys
+import argparse
+import threading
+from constants import DB_CONNECTION_STRING, ASSISTANT_CONNECTION_STRING, API_TOKEN
+
+# --- 1. IMPORTAR CAPA DE DATOS, CONTROLADORES Y API (sin PyQt5) ---
+try:
+    from dao import crear_engine, crear_engine_asistente, calentar_engine, verificar_esquema, ServidorMetricas
+    from dao import AplicadorLotes
+    from dao.Conexion import es_sqlite_en_memoria
+    from sqlalchemy.engine import make_url
+    from controlador.CatalogoController import CatalogoController
+    from controlador.CensoController import CensoController
+    from controlador.AsistenteController import AsistenteController
+    from api import ApiCenso, ServidorApi
+except ImportError as e:
+    print(f"Error: No se pudo importar la capa de datos. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+
+def iniciar_servicio(db_url: str, asistente_url: str, puerto_metricas: int, host: str,
+                     puerto_api: int = 0, conexiones: int = 10, token: str = "") -> dict:
+    """
+    Modo sin interfaz: engines, controladores, la API (si puerto_api) y el endpoint de métricas.
+    Fuera de 127.0.0.1 la API exige 'token' (variable de entorno CENSO_API_TOKEN).
+    Retorna los controladores (o {} si la BD no está lista).
+    """
+    # --- 2. ENGINES Y ESQUEMA ---
+    # Un solo engine para todos los hilos de la API: 'conexiones' fijas y la mitad más de overflow
+    opciones = {}
+    if not es_sqlite_en_memoria(make_url(db_url)):
+        opciones = {'pool_size': conexiones, 'max_overflow': conexiones // 2, 'pool_timeout': 10}
+    engine = crear_engine(db_url, **opciones)
+    if not verificar_esquema(engine):
+        return {}
+    asistente_engine = crear_engine_asistente(asistente_url)
+    threading.Thread(target=calentar_engine, args=(asistente_engine,), daemon=True).start()
+
+    # --- 3. CONTROLADORES ---
+    controladores = {
+        'catalogo': CatalogoController(engine),
+        'censo': CensoController(engine),
+        'asistente': AsistenteController(asistente_engine),
+    }
+
+    # --- 4. API ---
+    if puerto_api:
+        api = ApiCenso(controladores['censo'], controladores['catalogo'], controladores['asistente'],
+                       aplicador=AplicadorLotes(engine), token=token)
+        ServidorApi(api, puerto_api, host).iniciar()
+
+    # --- 5. MÉTRICAS ---
+    ServidorMetricas(puerto_metricas, host).iniciar()
+    return controladores
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Censo en modo servicio (sin interfaz): API JSON y endpoint de métricas.")
+    parser.add_argument("--bd", default=DB_CONNECTION_STRING, help="URL de la BD del censo")
+    parser.add_argument("--asistente", default=ASSISTANT_CONNECTION_STRING, help="URL de solo lectura del asistente")
+    parser.add_argument("--api", type=int, default=8080, help="Puerto de la API (0 = sin API)")
+    parser.add_argument("--conexiones", type=int, default=10, help="Conexiones del pool compartido por la API")
+    parser.add_argument("--metricas", type=int, default=9464, help="Puerto del endpoint /metrics")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz donde se escucha (por defecto solo local; otra exige CENSO_API_TOKEN)")
+    args = parser.parse_args()
+
+    try:
+        if not iniciar_servicio(args.bd, args.asistente, args.metricas, args.host, args.api, args.conexiones, API_TOKEN):
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: No se pudo iniciar el servicio. {e}")
+        sys.exit(1)
+
+    print("Servicio en ejecución (Ctrl+C para terminar).")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Servicio detenido.")
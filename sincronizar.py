@@ -0,0 +1,74 @@
+# sincronizar.py
+import sys
+import argparse
+import getpass
+from constants import DB_CONNECTION_STRING, API_TOKEN
+
+# --- 1. IMPORTAR CAPA DE DATOS ---
+try:
+    from dao import crear_almacen_campo, crear_transporte, SincronizadorCampo, AdministradorDAO
+    from modelo import Administrador
+    from controlador.Seguridad import hashear_contrasena
+except ImportError as e:
+    print(f"Error: No se pudo importar la capa de datos. Asegúrate de que el script esté en la raíz. {e}")
+    sys.exit(1)
+
+
+def crear_usuario_campo(almacen, usuario: str) -> bool:
+    """
+    Da de alta (o cambia la contraseña de) un administrador SOLO en el almacén de
+    campo, para iniciar sesión sin red. La contraseña se pide en la terminal del
+    equipo y únicamente se guarda su hash; nunca pasa por la central.
+    """
+    contrasena = getpass.getpass(f"Contraseña para '{usuario}': ")
+    if not contrasena or contrasena != getpass.getpass("Repite la contraseña: "):
+        print("Error: Las contraseñas no coinciden (o están vacías).")
+        return False
+
+    admin_dao = AdministradorDAO(almacen)
+    credenciales = admin_dao.obtener_credenciales(usuario)
+    if credenciales:
+        return admin_dao.actualizar_contrasena_hash(credenciales[0], hashear_contrasena(contrasena))
+    return admin_dao.guardar(Administrador(usuario=usuario, contrasena_hash=hashear_contrasena(contrasena))) is not None
+
+
+# --- PUNTO DE ENTRADA DEL SCRIPT ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sincroniza un almacén de campo (SQLite) con la BD central.")
+    parser.add_argument("--campo", required=True, help="Ruta del almacén de campo (ej. censo_campo.db)")
+    parser.add_argument("--central", default=DB_CONNECTION_STRING, help="URL de la BD central o de su API (http://servidor:8080)")
+    parser.add_argument("--tam-lote", type=int, default=500, help="Movimientos por lote (una transacción cada uno)")
+    parser.add_argument("--solo-catalogos", action="store_true", help="Solo baja los catálogos de la central")
+    parser.add_argument("--pendientes", action="store_true", help="Solo muestra lo que falta por subir")
+    parser.add_argument("--crear-usuario", metavar="USUARIO", help="Da de alta un administrador en el almacén (login sin red)")
+    args = parser.parse_args()
+
+    # --- 2. ABRIR ALMACÉN Y CENTRAL ---
+    almacen = crear_almacen_campo(args.campo)
+    if args.crear_usuario:
+        if not crear_usuario_campo(almacen, args.crear_usuario):
+            sys.exit(1)
+        print(f"Usuario '{args.crear_usuario}' listo en '{args.campo}'.")
+        sys.exit(0)
+    sincronizador = SincronizadorCampo(almacen, crear_transporte(args.central, API_TOKEN), tam_lote=args.tam_lote)
+
+    if args.pendientes:
+        for tabla, total in sincronizador.pendientes().items():
+            print(f"  {tabla:<20} {total} pendiente(s)")
+        sys.exit(0)
+
+    # --- 3. SINCRONIZAR ---
+    try:
+        if args.solo_catalogos:
+            print(f"Catálogos actualizados: {sincronizador.bajar_catalogos()} registro(s).")
+            sys.exit(0)
+        resumen = sincronizador.sincronizar()
+    except Exception as e:
+        print(f"Error: No se pudo sincronizar con la central (la captura sigue a salvo en '{args.campo}'). {e}")
+        sys.exit(1)
+
+    print("--- SINCRONIZACIÓN COMPLETA ---")
+    print(f"Catálogos actualizados: {resumen['catalogos']}")
+    print(f"Registros enviados:     {resumen['subidas']} en {resumen['lotes']} lote(s), {resumen['bytes_enviados']} bytes comprimidos")
+    print(f"Conflictos:             {resumen['conflictos']} (ver tabla 'conflicto_campo'; se reintentan en la siguiente sincronización)")
+    sys.exit(1 if resumen['conflictos'] else 0)
\ No newline at end of file
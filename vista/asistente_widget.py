@@ -1,27 +1,19 @@
+import html
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QTextEdit, QLineEdit, 
-    QPushButton, QHBoxLayout, QLabel
+    QPushButton, QHBoxLayout, QLabel, QApplication
 )
-from PyQt5.QtCore import QThread, pyqtSignal, QObject
-
-# --- Worker Thread ---
-# Clase para ejecutar el controlador en segundo plano
-class AsistenteWorker(QObject):
-    # Señal que emitirá la respuesta cuando esté lista
-    respuesta_lista = pyqtSignal(str)
-    
-    def __init__(self, controller, pregunta):
-        super().__init__()
-        self.controller = controller
-        self.pregunta = pregunta
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from controlador.PoolAsistente import PoolAsistente, CANCELADA
 
-    def run(self):
-        """Ejecuta la tarea en segundo plano."""
-        try:
-            respuesta = self.controller.chatear(self.pregunta)
-            self.respuesta_lista.emit(respuesta)
-        except Exception as e:
-            self.respuesta_lista.emit(f"Error en el hilo: {e}")
+# --- Puente de señales ---
+# El pool entrega las respuestas desde sus hilos; la señal las pasa al hilo de la UI
+class PuenteAsistente(QObject):
+    # Emite la SolicitudAsistente ya terminada (o cancelada)
+    solicitud_entregada = pyqtSignal(object)
+    # Emite (id_solicitud, texto) por cada fragmento de la respuesta en stream
+    fragmento_recibido = pyqtSignal(int, str)
 
 # --- Pestaña de Chat ---
 class AsistenteWidget(QWidget):
@@ -31,7 +23,29 @@ class AsistenteWidget(QWidget):
     def __init__(self, asistente_controller):
         super().__init__()
         self.controller = asistente_controller
-        self.thread = None # Para manejar la referencia al hilo
+
+        # Pool persistente: varias preguntas en vuelo, respuestas en orden de llegada
+        self.puente = PuenteAsistente()
+        self.puente.solicitud_entregada.connect(self.mostrar_respuesta)
+        self.puente.fragmento_recibido.connect(self.agregar_fragmento)
+        self.pool = PoolAsistente(
+            self.controller,
+            al_entregar=self.puente.solicitud_entregada.emit,
+            al_fragmento=self.puente.fragmento_recibido.emit
+        )
+
+        # Por solicitud en curso: (cursor al inicio de su respuesta, cursor al final)
+        self._respuestas_en_curso = {}
+
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.pool.cerrar)
+
+        # Refresca la cola/latencias mientras haya preguntas pendientes
+        self.timer_estado = QTimer(self)
+        self.timer_estado.setInterval(500)
+        self.timer_estado.timeout.connect(self.actualizar_estado)
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -49,58 +63,103 @@ class AsistenteWidget(QWidget):
         self.txt_pregunta.setPlaceholderText("Escribe tu pregunta aquí (ej: ¿Cuántos habitantes hay en Saltillo?)")
         
         self.btn_enviar = QPushButton("Enviar")
+        self.btn_cancelar = QPushButton("Cancelar pendientes")
+        self.btn_cancelar.setEnabled(False)
         
         input_layout.addWidget(self.txt_pregunta)
         input_layout.addWidget(self.btn_enviar)
+        input_layout.addWidget(self.btn_cancelar)
         layout.addLayout(input_layout)
+
+        # 3. Estado del pool (cola y latencias)
+        self.lbl_estado = QLabel("Sin preguntas pendientes")
+        layout.addWidget(self.lbl_estado)
         
         # --- Conexiones ---
         self.btn_enviar.clicked.connect(self.enviar_pregunta)
         self.txt_pregunta.returnPressed.connect(self.enviar_pregunta)
+        self.btn_cancelar.clicked.connect(self.cancelar_pendientes)
 
     def enviar_pregunta(self):
         pregunta = self.txt_pregunta.text().strip()
         if not pregunta:
             return
-            
-        # Deshabilitar UI mientras se procesa
-        self.btn_enviar.setEnabled(False)
-        self.txt_pregunta.setEnabled(False)
+
+        # Encolar en el pool (la entrada sigue habilitada para mas preguntas)
+        id_solicitud = self.pool.enviar(pregunta)
         
-        # Mostrar la pregunta en el chat
-        self.visor_chat.append(f"<b>Tú:</b> {pregunta}\n")
-        self.visor_chat.append("<b>Asistente:</b> Pensando...")
+        # Mostrar la pregunta en el chat, con un marcador por solicitud
+        self.visor_chat.append(f"<b>Tú:</b> {html.escape(pregunta)}\n")
+        self.visor_chat.append(f"<b>Asistente:</b> {self._marcador(id_solicitud)}")
+
+        # El cursor 'fin' selecciona el marcador; 'inicio' no se mueve al insertar texto en él
+        fin = self.visor_chat.document().find(self._marcador(id_solicitud))
+        inicio = QTextCursor(fin)
+        inicio.setPosition(fin.selectionStart())
+        inicio.setKeepPositionOnInsert(True)
+        self._respuestas_en_curso[id_solicitud] = (inicio, fin)
         
         # Limpiar la entrada
         self.txt_pregunta.clear()
+        self.txt_pregunta.setFocus()
 
-        # 1. Crear el Worker y el Hilo
-        self.worker = AsistenteWorker(self.controller, pregunta)
-        self.thread = QThread()
-        self.worker.moveToThread(self.thread)
-        
-        # 2. Conectar señales
-        self.thread.started.connect(self.worker.run)
-        self.worker.respuesta_lista.connect(self.mostrar_respuesta)
-        
-        # 3. Limpieza del hilo
-        self.worker.respuesta_lista.connect(self.thread.quit)
-        self.worker.respuesta_lista.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        
-        # 4. Iniciar el hilo
-        self.thread.start()
-
-    def mostrar_respuesta(self, respuesta: str):
-        """Slot que recibe la respuesta del hilo y actualiza la UI."""
-        # Reemplazar el "Pensando..." con la respuesta real
-        cursor = self.visor_chat.textCursor()
-        cursor.movePosition(cursor.End)
-        cursor.select(cursor.BlockUnderCursor)
-        cursor.removeSelectedText()
-        self.visor_chat.append(f"<b>Asistente:</b> {respuesta}\n")
-        
-        # Rehabilitar UI
-        self.btn_enviar.setEnabled(True)
-        self.txt_pregunta.setEnabled(True)
-        self.txt_pregunta.setFocus()
\ No newline at end of file
+        self.btn_cancelar.setEnabled(True)
+        self.timer_estado.start()
+        self.actualizar_estado()
+
+    @staticmethod
+    def _marcador(id_solicitud: int) -> str:
+        return f"Pensando... (#{id_solicitud})"
+
+    def cancelar_pendientes(self):
+        """Cancela todas las preguntas que aun no tienen respuesta."""
+        self.pool.cancelar_todas()
+        self.actualizar_estado()
+
+    def agregar_fragmento(self, id_solicitud: int, texto: str):
+        """Slot que agrega un fragmento de la respuesta en stream, en su lugar del chat."""
+        cursores = self._respuestas_en_curso.get(id_solicitud)
+        if cursores is None:
+            return
+        # El primer fragmento reemplaza el marcador seleccionado; los demas se agregan al final
+        _, fin = cursores
+        fin.insertText(texto)
+
+    def mostrar_respuesta(self, solicitud):
+        """Slot que recibe la solicitud entregada por el pool y actualiza la UI."""
+        if solicitud.estado == CANCELADA:
+            respuesta_html = "<i>Pregunta cancelada.</i>"
+        else:
+            # Las respuestas pueden traer varias lineas (ej. listados de la ruta rapida)
+            respuesta_html = html.escape(solicitud.respuesta).replace("\n", "<br>")
+
+        # Reemplazar el marcador (o el texto parcial del stream) con la respuesta final
+        cursores = self._respuestas_en_curso.pop(solicitud.id, None)
+        if cursores is None:
+            self.visor_chat.append(f"<b>Asistente:</b> {respuesta_html}\n")
+        else:
+            inicio, fin = cursores
+            posicion_fin = fin.position()
+            fin.setPosition(inicio.position())
+            fin.setPosition(posicion_fin, QTextCursor.KeepAnchor)
+            fin.insertHtml(respuesta_html)
+
+        self.actualizar_estado()
+
+    def actualizar_estado(self):
+        """Muestra la profundidad de la cola y las latencias del pool."""
+        metricas = self.pool.metricas()
+        pendientes = metricas['por_entregar']
+
+        texto = f"En cola: {metricas['en_cola']} | En proceso: {metricas['en_proceso']}"
+        if metricas['completadas']:
+            texto += (f" | Latencia p50: {metricas['latencia_p50']:.1f} s,"
+                      f" p95: {metricas['latencia_p95']:.1f} s"
+                      f" | Espera p50: {metricas['espera_p50']:.1f} s")
+        if metricas['primer_fragmento_p50']:
+            texto += f" | Primer fragmento p50: {metricas['primer_fragmento_p50']:.1f} s"
+        self.lbl_estado.setText(texto if pendientes or metricas['completadas'] else "Sin preguntas pendientes")
+
+        self.btn_cancelar.setEnabled(pendientes > 0)
+        if not pendientes:
+            self.timer_estado.stop()
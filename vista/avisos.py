@@ -0,0 +1,29 @@
+import functools
+from typing import Callable
+from PyQt5.QtWidgets import QMessageBox
+from dao.DetectorConsultas import recortar_argumentos_qt
+from dao.Reintentos import ErrorPersistencia, ErrorTransitorio
+
+
+def avisar_errores_bd(funcion: Callable) -> Callable:
+    """
+    Decorador para los slots que escriben en la BD: si la escritura no se pudo
+    completar aun con reintentos (ErrorPersistencia), avisa al usuario en vez
+    de perder el error. Los datos del formulario se conservan para reintentar.
+    """
+    recortar = recortar_argumentos_qt(funcion)
+
+    @functools.wraps(funcion)
+    def envoltura(self, *args):
+        args = recortar(args)
+        try:
+            return funcion(self, *args)
+        except ErrorTransitorio as e:
+            print(f"Escritura no completada ({e.tipo}): {e}")
+            QMessageBox.warning(self, "Base de datos ocupada",
+                                "La base de datos está ocupada por otros usuarios y no se pudo guardar.\n"
+                                "Los datos siguen en el formulario: intente de nuevo en unos segundos.")
+        except ErrorPersistencia as e:
+            print(f"Escritura no completada ({e.tipo}): {e}")
+            QMessageBox.critical(self, "Error", f"No se pudo completar la operación: {e}")
+    return envoltura
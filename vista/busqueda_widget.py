@@ -0,0 +1,111 @@
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QPushButton, QLabel, QLineEdit, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+from dao.DetectorConsultas import accion_ui
+
+TAM_PAGINA_BUSQUEDA = 25
+
+# Texto para el usuario de cada modo de búsqueda (ver dao/Busqueda.py)
+DESCRIPCION_MODOS = {
+    'palabras': "coincidencias por palabra",
+    'aproximada': "sin coincidencias exactas: resultados parecidos",
+    'like': "búsqueda sin índice",
+}
+
+
+class BusquedaWidget(QWidget):
+    """
+    Búsqueda global de habitantes (por nombre) y viviendas (por dirección),
+    en una ventana aparte que se abre desde la barra de búsqueda del dashboard.
+    Los resultados se piden por páginas; doble clic abre la vivienda en la
+    pestaña del censo (señal 'resultado_elegido').
+    """
+
+    # (id de la vivienda, id del habitante o None)
+    resultado_elegido = pyqtSignal(int, object)
+
+    def __init__(self, censo_controller):
+        super().__init__()
+        self.censo_controller = censo_controller
+        self.setWindowTitle("Búsqueda")
+        self.resize(800, 550)
+
+        # Búsqueda en curso
+        self.texto = ""
+        self.pagina = 0
+        self.modo = None
+
+        layout = QVBoxLayout(self)
+        barra = QHBoxLayout()
+        self.txt_busqueda = QLineEdit()
+        self.txt_busqueda.setPlaceholderText("Nombre de un habitante o dirección de una vivienda...")
+        self.btn_buscar = QPushButton("Buscar")
+        barra.addWidget(self.txt_busqueda, 1)
+        barra.addWidget(self.btn_buscar)
+        layout.addLayout(barra)
+
+        self.tabla = QTableWidget()
+        self.tabla.setColumnCount(4)
+        self.tabla.setHorizontalHeaderLabels(["Tipo", "Nombre / Dirección", "Vivienda / Localidad", "ID Vivienda"])
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.tabla)
+
+        paginas = QHBoxLayout()
+        self.lbl_estado = QLabel("")
+        self.btn_anterior = QPushButton("< Anterior")
+        self.btn_siguiente = QPushButton("Siguiente >")
+        paginas.addWidget(self.lbl_estado, 1)
+        paginas.addWidget(self.btn_anterior)
+        paginas.addWidget(self.btn_siguiente)
+        layout.addLayout(paginas)
+        self.btn_anterior.setEnabled(False)
+        self.btn_siguiente.setEnabled(False)
+
+        # --- Conexiones ---
+        self.btn_buscar.clicked.connect(lambda: self.buscar(self.txt_busqueda.text()))
+        self.txt_busqueda.returnPressed.connect(lambda: self.buscar(self.txt_busqueda.text()))
+        self.btn_anterior.clicked.connect(lambda: self.mostrar_pagina(self.pagina - 1))
+        self.btn_siguiente.clicked.connect(lambda: self.mostrar_pagina(self.pagina + 1))
+        self.tabla.itemDoubleClicked.connect(self.elegir_resultado)
+
+    def buscar(self, texto):
+        """Nueva búsqueda desde la primera página (el modo lo decide la capa de datos)."""
+        self.texto = texto.strip()
+        self.txt_busqueda.setText(self.texto)
+        self.modo = None
+        self.mostrar_pagina(0)
+
+    @accion_ui
+    def mostrar_pagina(self, pagina):
+        if not self.texto or pagina < 0:
+            return
+        respuesta = self.censo_controller.buscar(self.texto, pagina, TAM_PAGINA_BUSQUEDA, self.modo)
+        self.pagina = pagina
+        # Las páginas siguientes repiten el modo de la primera
+        self.modo = respuesta['modo']
+
+        self.tabla.setRowCount(len(respuesta['resultados']))
+        for i, resultado in enumerate(respuesta['resultados']):
+            item_tipo = QTableWidgetItem("Habitante" if resultado['tipo'] == 'habitante' else "Vivienda")
+            item_tipo.setData(Qt.UserRole, (resultado['tipo'], resultado['id'], resultado['vivienda_id']))
+            self.tabla.setItem(i, 0, item_tipo)
+            self.tabla.setItem(i, 1, QTableWidgetItem(resultado['texto']))
+            self.tabla.setItem(i, 2, QTableWidgetItem(resultado['detalle'] or ""))
+            self.tabla.setItem(i, 3, QTableWidgetItem(str(resultado['vivienda_id'])))
+
+        if not respuesta['resultados']:
+            self.lbl_estado.setText(f"Sin resultados para '{self.texto}'.")
+        else:
+            inicio = pagina * TAM_PAGINA_BUSQUEDA + 1
+            fin = inicio + len(respuesta['resultados']) - 1
+            self.lbl_estado.setText(f"Resultados {inicio}-{fin} ({DESCRIPCION_MODOS.get(self.modo, self.modo)})")
+        self.btn_anterior.setEnabled(pagina > 0)
+        self.btn_siguiente.setEnabled(respuesta['hay_mas'])
+
+    def elegir_resultado(self, item):
+        tipo, id_resultado, id_vivienda = self.tabla.item(self.tabla.row(item), 0).data(Qt.UserRole)
+        self.resultado_elegido.emit(id_vivienda, id_resultado if tipo == 'habitante' else None)
@@ -5,6 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from modelo import Municipio, Localidad, TipoVivienda, ActividadEconomica
+from dao.DetectorConsultas import accion_ui
+from .avisos import avisar_errores_bd
+from .seleccion import ids_seleccionados
 
 class CatalogoWidget(QWidget):
     """
@@ -18,7 +21,7 @@ class CatalogoWidget(QWidget):
     # CensoWidget la escuchará para recargar sus ComboBoxes.
     catalogos_actualizados = pyqtSignal()
     
-    def __init__(self, catalogo_controller):
+    def __init__(self, catalogo_controller, precarga=None):
         super().__init__()
         self.catalogo_controller = catalogo_controller
         
@@ -30,7 +33,13 @@ class CatalogoWidget(QWidget):
         
         self.setup_ui()
         
-        # Carga inicial de datos
+        # Carga inicial de datos (desde el cache de catálogos cuando la precarga termine)
+        if precarga is None or not precarga.cuando_lista('catalogos', lambda _: self.cargar_catalogos()):
+            self.cargar_catalogos()
+
+    @accion_ui
+    def cargar_catalogos(self):
+        """Carga las tablas de los cuatro catálogos."""
         self.poblar_combo_municipios()
         self.cargar_municipios()
         self.cargar_localidades()
@@ -80,6 +89,7 @@ class CatalogoWidget(QWidget):
         self.tabla_municipios.setColumnCount(2)
         self.tabla_municipios.setHorizontalHeaderLabels(["ID", "Nombre"])
         self.tabla_municipios.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_municipios.setSelectionMode(QAbstractItemView.ExtendedSelection) # Ctrl/Shift: varias filas
         self.tabla_municipios.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla_municipios.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
@@ -113,12 +123,14 @@ class CatalogoWidget(QWidget):
         self.btn_limpiar_form_loc = QPushButton("Limpiar Formulario")
         self.btn_eliminar_localidad = QPushButton("Eliminar Seleccionado")
         self.btn_eliminar_localidad.setObjectName("btn_eliminar") # Para QSS
+        self.btn_mover_localidades = QPushButton("Mover Seleccionadas al Municipio")
         
         form_layout_loc.addRow(QLabel("Nombre:"), self.txt_localidad_nombre)
         form_layout_loc.addRow(QLabel("Municipio:"), self.combo_localidad_municipio)
         form_layout_loc.addRow(self.btn_guardar_localidad)
         form_layout_loc.addRow(self.btn_limpiar_form_loc)
         form_layout_loc.addRow(self.btn_eliminar_localidad)
+        form_layout_loc.addRow(self.btn_mover_localidades)
 
         # Lado Derecho (Filtro + Tabla)
         right_layout = QVBoxLayout()
@@ -129,6 +141,7 @@ class CatalogoWidget(QWidget):
         self.tabla_localidades.setColumnCount(3)
         self.tabla_localidades.setHorizontalHeaderLabels(["ID", "Nombre", "Municipio"])
         self.tabla_localidades.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_localidades.setSelectionMode(QAbstractItemView.ExtendedSelection) # Ctrl/Shift: varias filas
         self.tabla_localidades.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla_localidades.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
@@ -143,6 +156,7 @@ class CatalogoWidget(QWidget):
         self.btn_guardar_localidad.clicked.connect(self.guardar_localidad)
         self.btn_limpiar_form_loc.clicked.connect(self.limpiar_form_localidad)
         self.btn_eliminar_localidad.clicked.connect(self.eliminar_localidad)
+        self.btn_mover_localidades.clicked.connect(self.mover_localidades)
         self.tabla_localidades.itemClicked.connect(self.seleccionar_localidad)
         self.filtro_localidad.textChanged.connect(self.filtrar_tabla_localidades)
         
@@ -176,6 +190,7 @@ class CatalogoWidget(QWidget):
         self.tabla_tipos_vivienda.setColumnCount(2)
         self.tabla_tipos_vivienda.setHorizontalHeaderLabels(["ID", "Nombre"])
         self.tabla_tipos_vivienda.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_tipos_vivienda.setSelectionMode(QAbstractItemView.ExtendedSelection) # Ctrl/Shift: varias filas
         self.tabla_tipos_vivienda.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla_tipos_vivienda.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
@@ -223,6 +238,7 @@ class CatalogoWidget(QWidget):
         self.tabla_actividades.setColumnCount(2)
         self.tabla_actividades.setHorizontalHeaderLabels(["ID", "Nombre"])
         self.tabla_actividades.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_actividades.setSelectionMode(QAbstractItemView.ExtendedSelection) # Ctrl/Shift: varias filas
         self.tabla_actividades.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla_actividades.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
@@ -287,6 +303,30 @@ class CatalogoWidget(QWidget):
                 else:
                     self.tabla_actividades.setRowHidden(i, True)
 
+    # --- SELECCIÓN MÚLTIPLE ---
+    def _eliminar_seleccionados(self, tabla: QTableWidget, id_actual, entidad: str, advertencia: str, eliminar) -> bool:
+        """
+        Confirma y elimina en una sola sentencia todas las filas seleccionadas de 'tabla'
+        ('eliminar' recibe la lista de IDs). Retorna True si se eliminó algo.
+        """
+        ids = ids_seleccionados(tabla, id_actual)
+        if not ids:
+            QMessageBox.warning(self, "Sin Selección", f"Seleccione uno o más registros de {entidad} para eliminar.")
+            return False
+        descripcion = f"el registro ID {ids[0]}" if len(ids) == 1 else f"{len(ids)} registros"
+        confirmar = QMessageBox.question(self, "Confirmar Eliminación",
+                                         f"¿Seguro desea eliminar {descripcion} de {entidad}?\nADVERTENCIA: {advertencia}",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if confirmar != QMessageBox.Yes:
+            return False
+        eliminados = eliminar(ids)
+        if eliminados:
+            QMessageBox.information(self, "Eliminado", f"Se eliminaron {eliminados} registro(s) de {entidad}.")
+            self.catalogos_actualizados.emit()
+            return True
+        QMessageBox.critical(self, "Error", f"No se pudo eliminar {descripcion} de {entidad}.")
+        return False
+
     # --- MÉTODOS CRUD (MUNICIPIO) ---
     def limpiar_form_municipio(self): 
         self.current_municipio_id = None
@@ -310,6 +350,8 @@ class CatalogoWidget(QWidget):
         self.current_municipio_id = int(id_municipio)
         self.txt_municipio_nombre.setText(nombre_municipio)
 
+    @accion_ui
+    @avisar_errores_bd
     def guardar_municipio(self): 
         nombre = self.txt_municipio_nombre.text()
         if not nombre:
@@ -328,21 +370,13 @@ class CatalogoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo guardar el municipio.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_municipio(self): 
-        if self.current_municipio_id is None:
-            QMessageBox.warning(self, "Sin Selección", "Seleccione un municipio de la tabla para eliminar.")
-            return
-        confirmar = QMessageBox.question(self, "Confirmar Eliminación",
-                                         f"¿Seguro desea eliminar el municipio ID {self.current_municipio_id}?\nADVERTENCIA: Esto eliminará sus localidades asociadas.",
-                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if confirmar == QMessageBox.Yes:
-            exito = self.catalogo_controller.eliminar_municipio(self.current_municipio_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "El municipio ha sido eliminado.")
-                self.cargar_municipios()
-                self.catalogos_actualizados.emit()
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar el municipio (puede tener localidades activas).")
+        if self._eliminar_seleccionados(self.tabla_municipios, self.current_municipio_id, "municipios",
+                                        "Esto eliminará sus localidades, viviendas y habitantes.",
+                                        self.catalogo_controller.eliminar_municipios):
+            self.cargar_municipios()
 
     # --- MÉTODOS DE LOCALIDAD ---
     def poblar_combo_municipios(self):
@@ -379,6 +413,8 @@ class CatalogoWidget(QWidget):
         if index >= 0:
             self.combo_localidad_municipio.setCurrentIndex(index)
 
+    @accion_ui
+    @avisar_errores_bd
     def guardar_localidad(self): 
         nombre = self.txt_localidad_nombre.text()
         id_municipio = self.combo_localidad_municipio.currentData()
@@ -398,21 +434,33 @@ class CatalogoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo guardar la localidad.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_localidad(self): 
-        if self.current_localidad_id is None:
-            QMessageBox.warning(self, "Sin Selección", "Seleccione una localidad de la tabla para eliminar.")
+        if self._eliminar_seleccionados(self.tabla_localidades, self.current_localidad_id, "localidades",
+                                        "Esto eliminará sus viviendas y habitantes.",
+                                        self.catalogo_controller.eliminar_localidades):
+            self.cargar_localidades()
+
+    @accion_ui
+    @avisar_errores_bd
+    def mover_localidades(self):
+        ids = ids_seleccionados(self.tabla_localidades, self.current_localidad_id)
+        id_municipio = self.combo_localidad_municipio.currentData()
+        if not ids or not id_municipio:
+            QMessageBox.warning(self, "Datos Incompletos",
+                                "Seleccione una o más localidades de la tabla y el municipio destino.")
             return
-        confirmar = QMessageBox.question(self, "Confirmar Eliminación",
-                                         f"¿Seguro desea eliminar la localidad ID {self.current_localidad_id}?\nADVERTENCIA: Esto eliminará sus viviendas asociadas.",
+        confirmar = QMessageBox.question(self, "Confirmar Cambio",
+                                         f"¿Mover {len(ids)} localidad(es) al municipio '{self.combo_localidad_municipio.currentText()}'?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if confirmar == QMessageBox.Yes:
-            exito = self.catalogo_controller.eliminar_localidad(self.current_localidad_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "La localidad ha sido eliminada.")
+            movidas = self.catalogo_controller.mover_localidades(ids, id_municipio)
+            QMessageBox.information(self, "Éxito", f"Se movieron {movidas} localidad(es) "
+                                                   f"({len(ids) - movidas} ya estaban en ese municipio).")
+            if movidas:
                 self.cargar_localidades()
                 self.catalogos_actualizados.emit()
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar la localidad (puede tener viviendas activas).")
 
     # --- MÉTODOS PARA TIPO VIVIENDA ---
     
@@ -437,6 +485,8 @@ class CatalogoWidget(QWidget):
         self.current_tipo_vivienda_id = int(id_tipo)
         self.txt_tipo_vivienda_nombre.setText(nombre_tipo)
 
+    @accion_ui
+    @avisar_errores_bd
     def guardar_tipo_vivienda(self):
         nombre = self.txt_tipo_vivienda_nombre.text()
         if not nombre:
@@ -455,21 +505,13 @@ class CatalogoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo guardar el tipo de vivienda.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_tipo_vivienda(self):
-        if self.current_tipo_vivienda_id is None:
-            QMessageBox.warning(self, "Sin Selección", "Seleccione un tipo de la tabla para eliminar.")
-            return
-        confirmar = QMessageBox.question(self, "Confirmar Eliminación",
-                                         f"¿Seguro desea eliminar el Tipo de Vivienda ID {self.current_tipo_vivienda_id}?\nADVERTENCIA: Esto eliminará sus viviendas asociadas.",
-                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if confirmar == QMessageBox.Yes:
-            exito = self.catalogo_controller.eliminar_tipo_vivienda(self.current_tipo_vivienda_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "El tipo de vivienda ha sido eliminado.")
-                self.cargar_tipos_vivienda()
-                self.catalogos_actualizados.emit()
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar (puede tener viviendas activas).")
+        if self._eliminar_seleccionados(self.tabla_tipos_vivienda, self.current_tipo_vivienda_id, "tipos de vivienda",
+                                        "Esto eliminará sus viviendas y habitantes.",
+                                        self.catalogo_controller.eliminar_tipos_vivienda):
+            self.cargar_tipos_vivienda()
 
     # --- MÉTODOS PARA ACTIVIDAD ECONOMICA ---
     
@@ -494,6 +536,8 @@ class CatalogoWidget(QWidget):
         self.current_actividad_id = int(id_act)
         self.txt_actividad_nombre.setText(nombre_act)
 
+    @accion_ui
+    @avisar_errores_bd
     def guardar_actividad_economica(self):
         nombre = self.txt_actividad_nombre.text()
         if not nombre:
@@ -512,18 +556,10 @@ class CatalogoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo guardar la actividad.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_actividad_economica(self):
-        if self.current_actividad_id is None:
-            QMessageBox.warning(self, "Sin Selección", "Seleccione una actividad de la tabla para eliminar.")
-            return
-        confirmar = QMessageBox.question(self, "Confirmar Eliminación",
-                                         f"¿Seguro desea eliminar la Actividad ID {self.current_actividad_id}?\nADVERTENCIA: Esto eliminará sus asociaciones con viviendas.",
-                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if confirmar == QMessageBox.Yes:
-            exito = self.catalogo_controller.eliminar_actividad_economica(self.current_actividad_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "La actividad ha sido eliminada.")
-                self.cargar_actividades_economicas()
-                self.catalogos_actualizados.emit()
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar (puede estar en uso por viviendas).")
\ No newline at end of file
+        if self._eliminar_seleccionados(self.tabla_actividades, self.current_actividad_id, "actividades económicas",
+                                        "Esto eliminará sus asociaciones con viviendas.",
+                                        self.catalogo_controller.eliminar_actividades_economicas):
+            self.cargar_actividades_economicas()
\ No newline at end of file
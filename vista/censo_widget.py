@@ -1,16 +1,28 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, 
     QPushButton, QLineEdit, QLabel, QFormLayout, QGroupBox, QMessageBox,
-    QComboBox, QAbstractItemView, QHeaderView
+    QComboBox, QAbstractItemView, QHeaderView, QDialog
 )
 from PyQt5.QtCore import Qt
+from controlador.Precarga import TAM_PAGINA_VIVIENDAS
+from dao.DetectorConsultas import accion_ui
+from dao.Reintentos import ConflictoConcurrencia
+from .avisos import avisar_errores_bd
+from .conflicto_dialog import ConflictoDialog
+from .seleccion import ids_seleccionados
+
+# Campos editables (nombre en el dialogo de conflictos)
+ETIQUETAS_VIVIENDA = {'direccion': "Dirección", 'localidad_id': "Localidad", 'tipo_vivienda_id': "Tipo de Vivienda"}
+ETIQUETAS_HABITANTE = {'nombre_completo': "Nombre", 'edad': "Edad", 'sexo': "Sexo",
+                       'parentesco_con_jefe_familia': "Parentesco"}
 
 class CensoWidget(QWidget):
     """
     Pestaña para las operaciones principales del censo (CRUD Completo).
     Implementa filtros de búsqueda en vivo para todas las tablas.
+    La tabla de viviendas se carga por páginas (botón "Cargar más").
     """
-    def __init__(self, censo_controller, catalogo_controller):
+    def __init__(self, censo_controller, catalogo_controller, precarga=None):
         super().__init__()
         self.censo_controller = censo_controller
         self.catalogo_controller = catalogo_controller
@@ -18,10 +30,21 @@ class CensoWidget(QWidget):
         self.current_vivienda_id = None 
         self.current_habitante_id = None
         self.current_actividad_id = None
+
+        # Valores (y 'version') del registro como estaban al seleccionarlo: base para fusionar conflictos
+        self.original_vivienda = None
+        self.original_habitante = None
+
+        # Paginación de la tabla de viviendas
+        self.viviendas_cargadas = 0
         
         self.setup_ui()
-        self.poblar_comboboxes()
-        self.cargar_tabla_viviendas()
+
+        # Carga inicial: usa los resultados de la precarga si los hay
+        if precarga is None or not precarga.cuando_lista('catalogos', lambda _: self.poblar_comboboxes()):
+            self.poblar_comboboxes()
+        if precarga is None or not precarga.cuando_lista('viviendas', self.mostrar_primera_pagina_viviendas):
+            self.cargar_tabla_viviendas()
 
     def setup_ui(self):
         main_layout = QHBoxLayout(self)
@@ -35,7 +58,7 @@ class CensoWidget(QWidget):
         self.combo_tipo_vivienda = QComboBox()
         self.btn_guardar_vivienda = QPushButton("Guardar / Actualizar Vivienda")
         self.btn_limpiar_vivienda = QPushButton("Limpiar / Cancelar Edición")
-        self.btn_eliminar_vivienda = QPushButton("Eliminar Vivienda Seleccionada")
+        self.btn_eliminar_vivienda = QPushButton("Eliminar Viviendas Seleccionadas")
         vivienda_layout.addRow("Dirección:", self.txt_vivienda_direccion)
         vivienda_layout.addRow("Localidad:", self.combo_localidad)
         vivienda_layout.addRow("Tipo de Vivienda:", self.combo_tipo_vivienda)
@@ -83,12 +106,17 @@ class CensoWidget(QWidget):
         self.tabla_viviendas.setColumnCount(4)
         self.tabla_viviendas.setHorizontalHeaderLabels(["ID", "Dirección", "Localidad", "Tipo de Vivienda"])
         self.tabla_viviendas.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_viviendas.setSelectionMode(QAbstractItemView.ExtendedSelection) # Ctrl/Shift: varias viviendas
         self.tabla_viviendas.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla_viviendas.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        self.btn_cargar_mas_viviendas = QPushButton("Cargar más viviendas")
+        self.btn_cargar_mas_viviendas.setEnabled(False)
         
         layout_lista_viviendas.addWidget(QLabel("Filtrar Tabla:"))
         layout_lista_viviendas.addWidget(self.filtro_viviendas)
         layout_lista_viviendas.addWidget(self.tabla_viviendas)
+        layout_lista_viviendas.addWidget(self.btn_cargar_mas_viviendas)
         group_lista_viviendas.setLayout(layout_lista_viviendas)
         
         # Tabla de Habitantes (Con Filtro)
@@ -116,7 +144,7 @@ class CensoWidget(QWidget):
         
         add_actividad_layout = QHBoxLayout()
         self.combo_add_actividad = QComboBox()
-        self.btn_add_actividad = QPushButton("Añadir")
+        self.btn_add_actividad = QPushButton("Añadir a Seleccionadas")
         add_actividad_layout.addWidget(QLabel("Añadir actividad:"))
         add_actividad_layout.addWidget(self.combo_add_actividad, 1)
         add_actividad_layout.addWidget(self.btn_add_actividad)
@@ -156,6 +184,7 @@ class CensoWidget(QWidget):
         self.btn_limpiar_vivienda.clicked.connect(self.limpiar_form_vivienda)
         self.btn_eliminar_vivienda.clicked.connect(self.eliminar_vivienda)
         self.tabla_viviendas.itemClicked.connect(self.seleccionar_vivienda)
+        self.btn_cargar_mas_viviendas.clicked.connect(self.cargar_mas_viviendas)
         
         self.btn_guardar_habitante.clicked.connect(self.guardar_habitante)
         self.btn_limpiar_habitante.clicked.connect(self.limpiar_form_habitante)
@@ -215,6 +244,7 @@ class CensoWidget(QWidget):
                     self.tabla_actividades.setRowHidden(i, True)
 
     # --- MÉTODOS DE CARGA Y LIMPIEZA ---
+    @accion_ui
     def poblar_comboboxes(self):
         # Llenar Localidades
         self.combo_localidad.clear()
@@ -237,21 +267,57 @@ class CensoWidget(QWidget):
         for act in actividades:
             self.combo_add_actividad.addItem(act.nombre, act.id)
             
+    @accion_ui
     def cargar_tabla_viviendas(self):
+        """Recarga la tabla desde el inicio, con tantas viviendas como ya se habían cargado."""
+        limite = max(TAM_PAGINA_VIVIENDAS, self.viviendas_cargadas)
+        viviendas = self.censo_controller.obtener_pagina_viviendas_con_localidad(limite, 0)
         self.tabla_viviendas.setRowCount(0)
-        viviendas = self.censo_controller.obtener_todas_viviendas_con_localidad()
+        self.viviendas_cargadas = 0
+        self.agregar_filas_viviendas(viviendas, limite)
         
-        for i, vivienda in enumerate(viviendas):
-            self.tabla_viviendas.insertRow(i)
-            self.tabla_viviendas.setItem(i, 0, QTableWidgetItem(str(vivienda.id)))
+        self.limpiar_form_vivienda() 
+
+    def mostrar_primera_pagina_viviendas(self, viviendas):
+        """Dibuja la primera página precargada (si la precarga falló, la consulta)."""
+        if viviendas is None:
+            self.cargar_tabla_viviendas()
+            return
+        self.tabla_viviendas.setRowCount(0)
+        self.viviendas_cargadas = 0
+        self.agregar_filas_viviendas(viviendas, TAM_PAGINA_VIVIENDAS)
+        self.limpiar_form_vivienda()
+
+    @accion_ui
+    def cargar_mas_viviendas(self):
+        """Agrega la siguiente página de viviendas al final de la tabla."""
+        viviendas = self.censo_controller.obtener_pagina_viviendas_con_localidad(
+            TAM_PAGINA_VIVIENDAS, self.viviendas_cargadas
+        )
+        self.agregar_filas_viviendas(viviendas, TAM_PAGINA_VIVIENDAS)
+
+    def agregar_filas_viviendas(self, viviendas, limite):
+        """Agrega filas a la tabla; si llegaron menos de 'limite' ya no hay más páginas."""
+        inicio = self.tabla_viviendas.rowCount()
+        self.tabla_viviendas.setRowCount(inicio + len(viviendas))
+        for i, vivienda in enumerate(viviendas, start=inicio):
+            item_id = QTableWidgetItem(str(vivienda.id))
+            item_id.setData(Qt.UserRole, {'version': vivienda.version, 'localidad_id': vivienda.localidad_id,
+                                          'tipo_vivienda_id': vivienda.tipo_vivienda_id})
+            self.tabla_viviendas.setItem(i, 0, item_id)
             self.tabla_viviendas.setItem(i, 1, QTableWidgetItem(vivienda.direccion))
             self.tabla_viviendas.setItem(i, 2, QTableWidgetItem(vivienda.localidad.nombre))
             self.tabla_viviendas.setItem(i, 3, QTableWidgetItem(vivienda.tipo_vivienda.nombre))
-        
-        self.limpiar_form_vivienda() 
+
+        self.viviendas_cargadas += len(viviendas)
+        self.btn_cargar_mas_viviendas.setEnabled(len(viviendas) >= limite)
+        # El filtro en vivo también aplica a las filas nuevas
+        if self.filtro_viviendas.text():
+            self.filtrar_tabla_viviendas()
 
     def limpiar_form_vivienda(self):
         self.current_vivienda_id = None
+        self.original_vivienda = None
         self.txt_vivienda_direccion.clear()
         self.combo_localidad.setCurrentIndex(0)
         self.combo_tipo_vivienda.setCurrentIndex(0)
@@ -274,6 +340,7 @@ class CensoWidget(QWidget):
 
     def limpiar_form_habitante(self):
         self.current_habitante_id = None
+        self.original_habitante = None
         self.txt_habitante_nombre.clear()
         self.txt_habitante_edad.clear()
         self.txt_habitante_sexo.clear()
@@ -281,20 +348,45 @@ class CensoWidget(QWidget):
         self.tabla_habitantes.clearSelection()
 
     # --- MÉTODOS DE SELECCIÓN ---
+    @accion_ui
     def seleccionar_vivienda(self, item):
         fila = self.tabla_viviendas.row(item)
         id_vivienda = int(self.tabla_viviendas.item(fila, 0).text())
         direccion = self.tabla_viviendas.item(fila, 1).text()
-        nombre_localidad = self.tabla_viviendas.item(fila, 2).text()
-        nombre_tipo_vivienda = self.tabla_viviendas.item(fila, 3).text()
-        
+        datos_fila = self.tabla_viviendas.item(fila, 0).data(Qt.UserRole)
+        self._cargar_vivienda(id_vivienda, direccion, datos_fila)
+
+    @accion_ui
+    def abrir_vivienda(self, id_vivienda, id_habitante=None):
+        """
+        Carga una vivienda (y opcionalmente uno de sus habitantes) en los formularios
+        aunque no esté en las páginas cargadas de la tabla (ej. desde la búsqueda global).
+        """
+        vivienda = self.censo_controller.obtener_vivienda(id_vivienda)
+        if vivienda is None:
+            QMessageBox.warning(self, "No Encontrada", f"La vivienda ID {id_vivienda} ya no existe.")
+            return
+        self.tabla_viviendas.clearSelection()
+        datos_fila = {'version': vivienda.version, 'localidad_id': vivienda.localidad_id,
+                      'tipo_vivienda_id': vivienda.tipo_vivienda_id}
+        self._cargar_vivienda(vivienda.id, vivienda.direccion, datos_fila)
+        if id_habitante is not None:
+            for fila in range(self.tabla_habitantes.rowCount()):
+                if int(self.tabla_habitantes.item(fila, 0).text()) == id_habitante:
+                    self.tabla_habitantes.selectRow(fila)
+                    self.seleccionar_habitante(self.tabla_habitantes.item(fila, 0))
+                    break
+
+    def _cargar_vivienda(self, id_vivienda, direccion, datos_fila):
+        """Llena el formulario de vivienda y sus tablas de habitantes y actividades."""
         self.current_vivienda_id = id_vivienda
+        self.original_vivienda = {'direccion': direccion, **datos_fila}
         
         # Cargar datos en el formulario
         self.txt_vivienda_direccion.setText(direccion)
-        index_loc = self.combo_localidad.findText(nombre_localidad, Qt.MatchContains)
+        index_loc = self.combo_localidad.findData(datos_fila['localidad_id'])
         if index_loc >= 0: self.combo_localidad.setCurrentIndex(index_loc)
-        index_tipo = self.combo_tipo_vivienda.findText(nombre_tipo_vivienda, Qt.MatchFixedString)
+        index_tipo = self.combo_tipo_vivienda.findData(datos_fila['tipo_vivienda_id'])
         if index_tipo >= 0: self.combo_tipo_vivienda.setCurrentIndex(index_tipo)
 
         # Habilitar secciones
@@ -310,13 +402,21 @@ class CensoWidget(QWidget):
     def seleccionar_habitante(self, item):
         fila = self.tabla_habitantes.row(item)
         self.current_habitante_id = int(self.tabla_habitantes.item(fila, 0).text())
+        datos_fila = self.tabla_habitantes.item(fila, 0).data(Qt.UserRole)
         
         self.txt_habitante_nombre.setText(self.tabla_habitantes.item(fila, 1).text())
         self.txt_habitante_edad.setText(self.tabla_habitantes.item(fila, 2).text())
         self.txt_habitante_parentesco.setText(self.tabla_habitantes.item(fila, 3).text())
-        
-        # Lógica para cargar el sexo (requiere obtener el objeto completo o añadirlo a la tabla)
-        # Por simplicidad, lo omitimos del formulario de edición por ahora.
+        # El sexo no tiene columna en la tabla: viene en los datos de la fila
+        self.txt_habitante_sexo.setText(datos_fila['sexo'] or "")
+
+        self.original_habitante = {
+            'nombre_completo': self.txt_habitante_nombre.text(),
+            'edad': int(self.txt_habitante_edad.text()),
+            'sexo': datos_fila['sexo'],
+            'parentesco_con_jefe_familia': self.txt_habitante_parentesco.text(),
+            'version': datos_fila['version']
+        }
 
     def seleccionar_actividad(self, item):
         fila = self.tabla_actividades.row(item)
@@ -329,7 +429,9 @@ class CensoWidget(QWidget):
         habitantes = self.censo_controller.obtener_habitantes_por_vivienda(id_vivienda)
         for i, hab in enumerate(habitantes):
             self.tabla_habitantes.insertRow(i)
-            self.tabla_habitantes.setItem(i, 0, QTableWidgetItem(str(hab.id)))
+            item_id = QTableWidgetItem(str(hab.id))
+            item_id.setData(Qt.UserRole, {'version': hab.version, 'sexo': hab.sexo})
+            self.tabla_habitantes.setItem(i, 0, item_id)
             self.tabla_habitantes.setItem(i, 1, QTableWidgetItem(hab.nombre_completo))
             self.tabla_habitantes.setItem(i, 2, QTableWidgetItem(str(hab.edad)))
             self.tabla_habitantes.setItem(i, 3, QTableWidgetItem(hab.parentesco_con_jefe_familia))
@@ -346,7 +448,67 @@ class CensoWidget(QWidget):
             self.tabla_actividades.setItem(i, 0, QTableWidgetItem(str(act.id)))
             self.tabla_actividades.setItem(i, 1, QTableWidgetItem(act.nombre))
 
+    # --- CONCURRENCIA OPTIMISTA (FUSIÓN DE CAMBIOS) ---
+    def _avisar_conflicto_al_eliminar(self, descripcion):
+        """El registro cambio desde que el usuario lo cargo: no se borra y se recargan los datos."""
+        QMessageBox.warning(self, "Conflicto al eliminar",
+                            f"Otro usuario modificó {descripcion} después de cargarse en el formulario; no se eliminó.\n"
+                            "Se cargaron los datos actuales: revíselos e intente de nuevo.")
+
+    def _guardar_con_fusion(self, titulo, etiquetas, original, mios, guardar, obtener_actual,
+                            formatear=lambda campo, valor: str(valor)):
+        """
+        Guarda con la 'version' que vio el usuario. Si otro usuario guardó antes
+        (ConflictoConcurrencia), vuelve a leer el registro y fusiona: los cambios que
+        no chocan se combinan solos y los campos en conflicto se deciden en ConflictoDialog.
+        Retorna el resultado de 'guardar', o False si el usuario descartó sus cambios
+        (o el registro ya no existe).
+        """
+        valores, version = dict(mios), original['version']
+        while True:
+            try:
+                return guardar(valores, version)
+            except ConflictoConcurrencia:
+                actuales = obtener_actual()
+                if actuales is None:
+                    QMessageBox.warning(self, titulo, "Otro usuario eliminó este registro mientras usted lo editaba.")
+                    return False
+                version = actuales.pop('version')
+                fusion, conflictos = self.censo_controller.fusionar_cambios(original, valores, actuales)
+                if conflictos:
+                    dialogo = ConflictoDialog(titulo, etiquetas, original, valores, actuales, fusion, conflictos,
+                                              formatear, self)
+                    if dialogo.exec_() != QDialog.Accepted:
+                        return False
+                    fusion = dialogo.valores()
+                # Si vuelve a chocar, la base de la siguiente fusion es lo que se acaba de leer
+                original, valores = actuales, fusion
+
+    @staticmethod
+    def _valores_vivienda(vivienda):
+        if vivienda is None:
+            return None
+        return {'direccion': vivienda.direccion, 'localidad_id': vivienda.localidad_id,
+                'tipo_vivienda_id': vivienda.tipo_vivienda_id, 'version': vivienda.version}
+
+    @staticmethod
+    def _valores_habitante(habitante):
+        if habitante is None:
+            return None
+        valores = {campo: getattr(habitante, campo) for campo in ETIQUETAS_HABITANTE}
+        valores['version'] = habitante.version
+        return valores
+
+    def _formatear_vivienda(self, campo, valor):
+        """Los IDs de localidad y tipo se muestran con su nombre (el de los combos)."""
+        combo = {'localidad_id': self.combo_localidad, 'tipo_vivienda_id': self.combo_tipo_vivienda}.get(campo)
+        if combo is not None and combo.findData(valor) >= 0:
+            return combo.itemText(combo.findData(valor))
+        return str(valor)
+
     # --- MÉTODOS CRUD VIVIENDA ---
+    @accion_ui
+    @avisar_errores_bd
     def guardar_vivienda(self):
         datos = { "direccion": self.txt_vivienda_direccion.text() }
         id_localidad = self.combo_localidad.currentData()
@@ -358,12 +520,22 @@ class CensoWidget(QWidget):
 
         if self.current_vivienda_id is None:
             resultado = self.censo_controller.registrar_nueva_vivienda(datos, id_localidad, id_tipo_vivienda)
-            mensaje = f"Vivienda registrada con ID {resultado.id}."
+            mensaje = f"Vivienda registrada con ID {resultado.id}." if resultado else ""
         else:
-            resultado = self.censo_controller.actualizar_vivienda(
-                self.current_vivienda_id, datos, id_localidad, id_tipo_vivienda
+            id_vivienda = self.current_vivienda_id
+            mios = {'direccion': datos["direccion"], 'localidad_id': id_localidad, 'tipo_vivienda_id': id_tipo_vivienda}
+            resultado = self._guardar_con_fusion(
+                "Conflicto al guardar la vivienda", ETIQUETAS_VIVIENDA, self.original_vivienda, mios,
+                guardar=lambda valores, version: self.censo_controller.actualizar_vivienda(
+                    id_vivienda, {'direccion': valores['direccion']},
+                    valores['localidad_id'], valores['tipo_vivienda_id'], version),
+                obtener_actual=lambda: self._valores_vivienda(self.censo_controller.obtener_vivienda(id_vivienda)),
+                formatear=self._formatear_vivienda
             )
-            mensaje = f"Vivienda ID {resultado.id} actualizada."
+            if resultado is False:
+                self.cargar_tabla_viviendas() # Descartó sus cambios: se muestra lo que hay en la BD
+                return
+            mensaje = f"Vivienda ID {id_vivienda} actualizada."
         
         if resultado:
             QMessageBox.information(self, "Éxito", mensaje)
@@ -371,23 +543,39 @@ class CensoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo guardar la vivienda.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_vivienda(self):
-        if self.current_vivienda_id is None:
-            QMessageBox.warning(self, "Sin Selección", "Seleccione una vivienda de la tabla para eliminar.")
+        ids = ids_seleccionados(self.tabla_viviendas, self.current_vivienda_id)
+        if not ids:
+            QMessageBox.warning(self, "Sin Selección", "Seleccione una o más viviendas de la tabla para eliminar.")
             return
+        descripcion = f"la vivienda ID {ids[0]}" if len(ids) == 1 else f"{len(ids)} viviendas"
         confirmar = QMessageBox.question(self, "Confirmar Eliminación",
-                                         f"¿Seguro desea eliminar la vivienda ID {self.current_vivienda_id}?\nADVERTENCIA: Se eliminarán TODOS sus habitantes y asociaciones.",
+                                         f"¿Seguro desea eliminar {descripcion}?\nADVERTENCIA: Se eliminarán TODOS sus habitantes y asociaciones.",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if confirmar == QMessageBox.Yes:
-            exito = self.censo_controller.eliminar_vivienda(self.current_vivienda_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "La vivienda y sus habitantes han sido eliminados.")
+            if ids == [self.current_vivienda_id] and self.original_vivienda is not None:
+                # La vivienda cargada en el formulario: se borra con la version que vio el usuario
+                try:
+                    eliminadas = int(self.censo_controller.eliminar_vivienda(ids[0], self.original_vivienda['version']))
+                except ConflictoConcurrencia:
+                    self._avisar_conflicto_al_eliminar("la vivienda")
+                    self.cargar_tabla_viviendas()
+                    return
+            else:
+                # Una sola sentencia para todas las seleccionadas
+                eliminadas = self.censo_controller.eliminar_viviendas(ids)
+            if eliminadas:
+                QMessageBox.information(self, "Eliminado", f"Se eliminaron {eliminadas} vivienda(s) con sus habitantes.")
                 self.cargar_tabla_viviendas()
             else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar la vivienda.")
+                QMessageBox.critical(self, "Error", f"No se pudo eliminar {descripcion}.")
 
     # --- MÉTODOS CRUD HABITANTE ---
+    @accion_ui
+    @avisar_errores_bd
     def guardar_habitante(self):
         if self.current_vivienda_id is None:
             QMessageBox.warning(self, "Error", "Debe seleccionar una vivienda de la tabla primero.")
@@ -416,10 +604,19 @@ class CensoWidget(QWidget):
 
         if self.current_habitante_id is None:
             resultado = self.censo_controller.registrar_habitante_en_vivienda(self.current_vivienda_id, datos)
-            mensaje = f"Habitante '{resultado.nombre_completo}' registrado."
+            mensaje = f"Habitante '{datos['nombre_completo']}' registrado."
         else:
-            resultado = self.censo_controller.actualizar_habitante(self.current_habitante_id, datos)
-            mensaje = f"Habitante '{resultado.nombre_completo}' actualizado."
+            id_habitante = self.current_habitante_id
+            resultado = self._guardar_con_fusion(
+                "Conflicto al guardar el habitante", ETIQUETAS_HABITANTE, self.original_habitante, datos,
+                guardar=lambda valores, version: self.censo_controller.actualizar_habitante(id_habitante, valores, version),
+                obtener_actual=lambda: self._valores_habitante(self.censo_controller.obtener_habitante(id_habitante))
+            )
+            if resultado is False:
+                self.cargar_datos_habitantes(self.current_vivienda_id)
+                self.limpiar_form_habitante()
+                return
+            mensaje = f"Habitante '{resultado.nombre_completo if resultado else datos['nombre_completo']}' actualizado."
 
         if resultado:
             QMessageBox.information(self, "Éxito", mensaje)
@@ -428,6 +625,8 @@ class CensoWidget(QWidget):
         else:
             QMessageBox.critical(self, "Error", "No se pudo registrar al habitante.")
 
+    @accion_ui
+    @avisar_errores_bd
     def eliminar_habitante(self):
         if self.current_habitante_id is None:
             QMessageBox.warning(self, "Sin Selección", "Seleccione un habitante de la tabla para eliminar.")
@@ -438,7 +637,15 @@ class CensoWidget(QWidget):
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if confirmar == QMessageBox.Yes:
-            exito = self.censo_controller.eliminar_habitante(self.current_habitante_id)
+            # Con la version que vio el usuario: si otro lo cambio, se avisa en vez de borrarlo
+            version = (self.original_habitante or {}).get('version')
+            try:
+                exito = self.censo_controller.eliminar_habitante(self.current_habitante_id, version)
+            except ConflictoConcurrencia:
+                self._avisar_conflicto_al_eliminar("el habitante")
+                self.cargar_datos_habitantes(self.current_vivienda_id)
+                self.limpiar_form_habitante()
+                return
             if exito:
                 QMessageBox.information(self, "Eliminado", "El habitante ha sido eliminado.")
                 self.cargar_datos_habitantes(self.current_vivienda_id)
@@ -447,8 +654,11 @@ class CensoWidget(QWidget):
                 QMessageBox.critical(self, "Error", "No se pudo eliminar al habitante.")
 
     # --- MÉTODOS M:M ACTIVIDAD ---
+    @accion_ui
+    @avisar_errores_bd
     def asociar_actividad(self):
-        if self.current_vivienda_id is None:
+        ids = ids_seleccionados(self.tabla_viviendas, self.current_vivienda_id)
+        if not ids:
             QMessageBox.warning(self, "Error", "Debe seleccionar una vivienda.")
             return
             
@@ -457,17 +667,19 @@ class CensoWidget(QWidget):
             QMessageBox.warning(self, "Error", "Debe seleccionar una actividad del combo para añadir.")
             return
 
-        exito = self.censo_controller.asociar_actividad_a_vivienda(
-            self.current_vivienda_id, id_actividad
-        )
+        # Todas las viviendas seleccionadas en una sola sentencia (las que ya la tienen se omiten)
+        asociadas = self.censo_controller.asociar_actividad_a_viviendas(id_actividad, ids)
         
-        if exito:
-            QMessageBox.information(self, "Éxito", "Actividad asociada a la vivienda.")
-            self.cargar_datos_actividades(self.current_vivienda_id)
+        if asociadas:
+            QMessageBox.information(self, "Éxito", f"Actividad asociada a {asociadas} vivienda(s).")
+            if self.current_vivienda_id is not None:
+                self.cargar_datos_actividades(self.current_vivienda_id)
             self.combo_add_actividad.setCurrentIndex(0)
         else:
             QMessageBox.warning(self, "Error", "No se pudo asociar la actividad (posiblemente ya existía).")
 
+    @accion_ui
+    @avisar_errores_bd
     def desasociar_actividad(self):
         if self.current_vivienda_id is None or self.current_actividad_id is None:
             QMessageBox.warning(self, "Error", "Debe seleccionar una vivienda Y una actividad de la tabla inferior para eliminar.")
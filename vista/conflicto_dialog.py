@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, List
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QLabel,
+    QPushButton, QComboBox, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtGui import QColor
+
+
+class ConflictoDialog(QDialog):
+    """
+    Dialogo de fusion cuando otro usuario guardo el mismo registro mientras se
+    editaba (ConflictoConcurrencia). Muestra, por campo, el valor original, el
+    del usuario y el que hay ahora en la BD; los campos que ambos cambiaron se
+    resaltan y el usuario elige cual conservar.
+
+    Aceptar -> guardar los valores elegidos (valores()).
+    Rechazar -> descartar los cambios propios y recargar el registro actual.
+    """
+    def __init__(self, titulo: str, etiquetas: Dict[str, str], original: Dict[str, Any], mios: Dict[str, Any],
+                 actuales: Dict[str, Any], fusion: Dict[str, Any], conflictos: List[str],
+                 formatear: Callable[[str, Any], str] = lambda campo, valor: str(valor), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(titulo)
+        self.resize(720, 320)
+        self._campos = list(fusion)
+        self._opciones = {} # campo -> (combo, valor mio, valor actual)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            "Otro usuario guardó este registro mientras usted lo editaba.\n"
+            "Los cambios que no chocan ya se combinaron; elija qué valor conservar en los campos resaltados."))
+
+        # 1. Tabla campo por campo
+        self.tabla = QTableWidget(len(self._campos), 5)
+        self.tabla.setHorizontalHeaderLabels(["Campo", "Original", "Mis cambios", "Versión actual", "Conservar"])
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla.setSelectionMode(QAbstractItemView.NoSelection)
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        resaltado = QColor(255, 235, 180)
+
+        for fila, campo in enumerate(self._campos):
+            valores = [etiquetas.get(campo, campo), formatear(campo, original.get(campo)),
+                       formatear(campo, mios.get(campo)), formatear(campo, actuales.get(campo))]
+            for columna, texto in enumerate(valores):
+                item = QTableWidgetItem(texto)
+                if campo in conflictos:
+                    item.setBackground(resaltado)
+                self.tabla.setItem(fila, columna, item)
+
+            combo = QComboBox()
+            combo.addItem("Mi valor")
+            combo.addItem("Valor actual")
+            combo.setCurrentIndex(0 if fusion[campo] == mios.get(campo) else 1)
+            combo.setEnabled(campo in conflictos)
+            self.tabla.setCellWidget(fila, 4, combo)
+            self._opciones[campo] = (combo, mios.get(campo), actuales.get(campo))
+        layout.addWidget(self.tabla)
+
+        # 2. Botones
+        botones = QHBoxLayout()
+        self.btn_descartar = QPushButton("Descartar mis cambios")
+        self.btn_guardar = QPushButton("Guardar fusión")
+        self.btn_guardar.setDefault(True)
+        botones.addStretch()
+        botones.addWidget(self.btn_descartar)
+        botones.addWidget(self.btn_guardar)
+        layout.addLayout(botones)
+
+        self.btn_descartar.clicked.connect(self.reject)
+        self.btn_guardar.clicked.connect(self.accept)
+
+    def valores(self) -> Dict[str, Any]:
+        """Valores a guardar segun lo elegido en cada campo."""
+        return {
+            campo: mio if combo.currentIndex() == 0 else actual
+            for campo, (combo, mio, actual) in self._opciones.items()
+        }
@@ -1,78 +1,163 @@
-from PyQt5.QtWidgets import QMainWindow, QTabWidget, QAction, QApplication, QMessageBox, QStyle
+import threading
+from PyQt5.QtWidgets import (
+    QMainWindow, QTabWidget, QAction, QApplication, QMessageBox, QStyle, QWidget, QVBoxLayout, QLineEdit
+)
 from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
+from controlador.Precarga import PrecargaDashboard
+from dao.Instrumentacion import instrumentacion
+from dao.DetectorConsultas import accion_ui
 
-# Importamos los QWidget que actuarán como pestañas
-from .reports_widget import ReportsWidget
-from .catalogo_widget import CatalogoWidget
-from .censo_widget import CensoWidget
-from .asistente_widget import AsistenteWidget
+# Las pestañas (reports_widget, censo_widget, ...) se importan al construirlas:
+# reports_widget carga pyqtgraph y numpy, que tardan en importarse.
+
+# --- Puente de Señales (hilos de precarga -> hilo de la UI) ---
+class PuentePrecarga(QObject):
+    # Emite una función sin argumentos que debe ejecutarse en el hilo de la UI
+    ejecutar = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.ejecutar.connect(lambda funcion: funcion())
 
 class DashboardView(QMainWindow):
     """
     Ventana principal de la aplicación (Dashboard).
     Contiene QTabWidget para la navegación (Requisito 3) y el menú de cierre.
+
+    Cada pestaña se construye (y consulta la BD) la primera vez que se muestra;
+    mientras tanto el QTabWidget solo tiene un contenedor vacío en su lugar.
+    Al abrirse lanza la precarga (catálogos, primera página de viviendas y
+    reportes sin filtros) para que las pestañas se dibujen con datos ya listos.
+
+    En modo campo (con 'sincronizador') agrega el menú para sincronizar el
+    almacén local con la BD central.
     """
-    def __init__(self, catalogo_controller, censo_controller, asistente_controller):
+    def __init__(self, catalogo_controller, censo_controller, asistente_controller, sincronizador=None):
         super().__init__()
         
         self.catalogo_controller = catalogo_controller
         self.censo_controller = censo_controller
         self.asistente_controller = asistente_controller
+        self.sincronizador = sincronizador
+
+        # Precarga en segundo plano mientras se pinta la ventana
+        self.puente_precarga = PuentePrecarga()
+        self.precarga = PrecargaDashboard(
+            catalogo_controller, censo_controller,
+            despachar=self.puente_precarga.ejecutar.emit
+        )
+        self.precarga.iniciar()
+
+        # Pestañas (None hasta que se construyen)
+        self.reports_tab = None
+        self.censo_tab = None
+        self.catalogo_tab = None
+        self.asistente_tab = None
         
         self.setWindowTitle("Dashboard - Censo de Población INEGI")
         self.setGeometry(100, 100, 950, 700) # Ventana principal más grande
         
         self.setup_ui()
         self.crear_menu() # Requisito 3: Menú para navegar/cerrar
+        self.crear_barra_busqueda()
 
     def setup_ui(self):
         """Configura la interfaz principal con pestañas (Navegación)."""
         
         # 1. Crear el contenedor de pestañas (Navegación)
         self.tab_widget = QTabWidget()
-        
-        # 2. Crear las pestañas individuales (cada una es un QWidget)
-        
-        # Pestaña 1: Reportes
-        self.reports_tab = ReportsWidget(self.censo_controller, self.catalogo_controller)
-        
-        # Pestaña 2: Operaciones del Censo
-        self.censo_tab = CensoWidget(self.censo_controller, self.catalogo_controller)
-        
-        # Pestaña 3: CRUD de Catálogos
-        self.catalogo_tab = CatalogoWidget(self.catalogo_controller)
+        style = self.style() # Obtener el estilo actual de la UI
 
-        # Pestaña 4: Asistente IA
-        self.asistente_tab = AsistenteWidget(self.asistente_controller)
+        # 2. Definir las pestañas: (titulo, icono, método que la construye)
+        self._pestanas = [
+            # Pestaña 1: Reportes (Icono de Gráfico/Reporte)
+            ("Dashboard y Reportes", QStyle.SP_FileDialogDetailedView, self._crear_reports_tab),
+            # Pestaña 2: Operaciones del Censo (Icono de Censo/Formulario)
+            ("Operaciones del Censo", QStyle.SP_FileIcon, self._crear_censo_tab),
+            # Pestaña 3: CRUD de Catálogos (Icono de Catálogo/Configuración)
+            ("Administración de Catálogos", QStyle.SP_ToolBarHorizontalExtensionButton, self._crear_catalogo_tab),
+            # Pestaña 4: Asistente IA (Icono de Asistente/IA)
+            ("Asistente IA", QStyle.SP_MessageBoxInformation, self._crear_asistente_tab),
+        ]
+        self._construidas = set()
 
-        # --- 3. CONEXIÓN DE SEÑAL ENTRE PESTAÑAS ---
-        # Conecta la señal 'catalogos_actualizados' de la pestaña de catálogos
-        # al slot (método) 'poblar_comboboxes' de la pestaña del censo.
-        # Esto asegura que CensoWidget vea los nuevos catálogos sin reiniciar.
-        self.catalogo_tab.catalogos_actualizados.connect(self.censo_tab.poblar_comboboxes)
-        
-        # 4. Añadir las pestañas al contenedor (con Iconos)
-        style = self.style() # Obtener el estilo actual de la UI
+        # 3. Añadir un contenedor vacío por pestaña (con Iconos)
+        for titulo, icono, _ in self._pestanas:
+            contenedor = QWidget()
+            layout = QVBoxLayout(contenedor)
+            layout.setContentsMargins(0, 0, 0, 0)
+            self.tab_widget.addTab(contenedor, QIcon(style.standardPixmap(icono)), titulo)
+
+        # 4. Construir cada pestaña la primera vez que se muestra
+        self.tab_widget.currentChanged.connect(self.construir_pestana)
+        # Las consultas se atribuyen a la pestaña visible (panel de diagnóstico)
+        self.tab_widget.currentChanged.connect(self.registrar_pantalla_activa)
+        self.registrar_pantalla_activa(self.tab_widget.currentIndex())
 
-        # Icono de Gráfico/Reporte
-        icon_reports = QIcon(style.standardPixmap(QStyle.SP_FileDialogDetailedView))
-        self.tab_widget.addTab(self.reports_tab, icon_reports, "Dashboard y Reportes")
-        
-        # Icono de Censo/Formulario
-        icon_censo = QIcon(style.standardPixmap(QStyle.SP_FileIcon))
-        self.tab_widget.addTab(self.censo_tab, icon_censo, "Operaciones del Censo")
-        
-        # Icono de Catálogo/Configuración
-        icon_catalogo = QIcon(style.standardPixmap(QStyle.SP_ToolBarHorizontalExtensionButton))
-        self.tab_widget.addTab(self.catalogo_tab, icon_catalogo, "Administración de Catálogos")
-        
-        # Icono de Asistente/IA
-        icon_asistente = QIcon(style.standardPixmap(QStyle.SP_MessageBoxInformation))
-        self.tab_widget.addTab(self.asistente_tab, icon_asistente, "Asistente IA")
-        
         # 5. Establecer el QTabWidget como el widget central
         self.setCentralWidget(self.tab_widget)
 
+        # La pestaña inicial se construye cuando la ventana ya se pintó
+        QTimer.singleShot(0, lambda: self.construir_pestana(self.tab_widget.currentIndex()))
+
+    @accion_ui
+    def construir_pestana(self, indice):
+        """Construye la pestaña 'indice' si todavía no existe (slot de currentChanged)."""
+        if indice < 0 or indice in self._construidas:
+            return
+        self._construidas.add(indice)
+
+        _, _, crear = self._pestanas[indice]
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            widget = crear()
+            self.tab_widget.widget(indice).layout().addWidget(widget)
+        except Exception as e:
+            print(f"Error al construir la pestaña {indice}: {e}")
+            QMessageBox.critical(self, "Error", f"No se pudo cargar la pestaña: {e}")
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def registrar_pantalla_activa(self, indice):
+        if indice >= 0:
+            instrumentacion.pantalla_activa = self._pestanas[indice][0]
+
+    # --- Construcción de cada pestaña (importación diferida) ---
+
+    def _crear_reports_tab(self):
+        from .reports_widget import ReportsWidget
+        self.reports_tab = ReportsWidget(self.censo_controller, self.catalogo_controller, precarga=self.precarga)
+        return self.reports_tab
+
+    def _crear_censo_tab(self):
+        from .censo_widget import CensoWidget
+        self.censo_tab = CensoWidget(self.censo_controller, self.catalogo_controller, precarga=self.precarga)
+        return self.censo_tab
+
+    def _crear_catalogo_tab(self):
+        from .catalogo_widget import CatalogoWidget
+        self.catalogo_tab = CatalogoWidget(self.catalogo_controller, precarga=self.precarga)
+
+        # --- CONEXIÓN DE SEÑAL ENTRE PESTAÑAS ---
+        # Conecta la señal 'catalogos_actualizados' de la pestaña de catálogos
+        # con la pestaña del censo (si ya se construyó; si no, leerá los
+        # catálogos nuevos al construirse).
+        self.catalogo_tab.catalogos_actualizados.connect(self.actualizar_catalogos_censo)
+        return self.catalogo_tab
+
+    def _crear_asistente_tab(self):
+        from .asistente_widget import AsistenteWidget
+        self.asistente_tab = AsistenteWidget(self.asistente_controller)
+        return self.asistente_tab
+
+    def actualizar_catalogos_censo(self):
+        """Asegura que CensoWidget vea los nuevos catálogos sin reiniciar."""
+        # Los resultados precargados pueden mostrar nombres de catálogo viejos
+        self.precarga.descartar()
+        if self.censo_tab is not None:
+            self.censo_tab.poblar_comboboxes()
+
     def crear_menu(self):
         """Crea la barra de menú principal (Requisito 3)."""
         menubar = self.menuBar()
@@ -89,6 +174,115 @@ class DashboardView(QMainWindow):
         
         archivo_menu.addAction(exit_action)
 
+        # Menú "Herramientas"
+        herramientas_menu = menubar.addMenu("&Herramientas")
+        diagnostico_action = QAction(QIcon(), "&Diagnóstico de consultas", self)
+        diagnostico_action.setStatusTip("Tiempos, sentencias y consultas lentas por pantalla")
+        diagnostico_action.triggered.connect(self.mostrar_diagnostico)
+        herramientas_menu.addAction(diagnostico_action)
+        self.diagnostico_view = None
+        metricas_action = QAction(QIcon(), "&Métricas", self)
+        metricas_action.setStatusTip("Contadores, medidores e histogramas (los mismos del endpoint /metrics)")
+        metricas_action.triggered.connect(self.mostrar_metricas)
+        herramientas_menu.addAction(metricas_action)
+        self.metricas_view = None
+
+        # Menú "Campo" (solo con almacén local)
+        if self.sincronizador is not None:
+            campo_menu = menubar.addMenu("&Campo")
+            self.sync_action = QAction(QIcon(), "&Sincronizar con la central", self)
+            self.sync_action.setStatusTip("Baja catálogos y sube la captura pendiente")
+            self.sync_action.triggered.connect(self.sincronizar_campo)
+            campo_menu.addAction(self.sync_action)
+
+    def crear_barra_busqueda(self):
+        """Barra con la búsqueda global de habitantes y viviendas (Ctrl+F la enfoca)."""
+        barra = self.addToolBar("Búsqueda")
+        barra.setMovable(False)
+        self.txt_busqueda_global = QLineEdit()
+        self.txt_busqueda_global.setPlaceholderText("Buscar habitante o dirección... (Ctrl+F)")
+        self.txt_busqueda_global.setClearButtonEnabled(True)
+        self.txt_busqueda_global.returnPressed.connect(self.mostrar_busqueda)
+        barra.addWidget(self.txt_busqueda_global)
+
+        enfocar_action = QAction(self)
+        enfocar_action.setShortcut("Ctrl+F")
+        enfocar_action.triggered.connect(self.txt_busqueda_global.setFocus)
+        self.addAction(enfocar_action)
+        self.busqueda_view = None
+
+    def mostrar_busqueda(self):
+        """Abre (o trae al frente) la ventana de resultados con el texto de la barra."""
+        texto = self.txt_busqueda_global.text().strip()
+        if not texto:
+            return
+        if self.busqueda_view is None:
+            from .busqueda_widget import BusquedaWidget
+            self.busqueda_view = BusquedaWidget(self.censo_controller)
+            self.busqueda_view.resultado_elegido.connect(self.abrir_resultado_busqueda)
+        self.busqueda_view.buscar(texto)
+        self.busqueda_view.show()
+        self.busqueda_view.raise_()
+
+    def abrir_resultado_busqueda(self, id_vivienda, id_habitante):
+        """Muestra la vivienda elegida en la búsqueda (y su habitante) en la pestaña del censo."""
+        indice = next(i for i, (_, _, crear) in enumerate(self._pestanas) if crear == self._crear_censo_tab)
+        self.tab_widget.setCurrentIndex(indice)
+        self.construir_pestana(indice) # Por si ya era la pestaña visible
+        if self.censo_tab is not None:
+            self.censo_tab.abrir_vivienda(id_vivienda, id_habitante)
+            self.activateWindow()
+
+    def mostrar_diagnostico(self):
+        """Abre (o trae al frente) la ventana de diagnóstico de consultas."""
+        if self.diagnostico_view is None:
+            from .diagnostico_widget import DiagnosticoWidget
+            self.diagnostico_view = DiagnosticoWidget()
+        self.diagnostico_view.show()
+        self.diagnostico_view.raise_()
+
+    def mostrar_metricas(self):
+        """Abre (o trae al frente) la ventana de métricas."""
+        if self.metricas_view is None:
+            from .metricas_widget import MetricasWidget
+            self.metricas_view = MetricasWidget()
+        self.metricas_view.show()
+        self.metricas_view.raise_()
+
+    def sincronizar_campo(self):
+        """Sincroniza en un hilo de fondo; la captura puede seguir mientras tanto."""
+        self.sync_action.setEnabled(False)
+        self.statusBar().showMessage("Sincronizando con la central...")
+
+        def _trabajo():
+            try:
+                resumen, error = self.sincronizador.sincronizar(), None
+            except Exception as e:
+                resumen, error = None, e
+            self.puente_precarga.ejecutar.emit(lambda: self._sincronizacion_terminada(resumen, error))
+
+        threading.Thread(target=_trabajo, daemon=True).start()
+
+    def _sincronizacion_terminada(self, resumen, error):
+        self.sync_action.setEnabled(True)
+        self.statusBar().clearMessage()
+        if error is not None:
+            QMessageBox.warning(self, "Sin conexión", f"No se pudo sincronizar con la central:\n{error}")
+            return
+
+        if resumen['catalogos']:
+            # Catálogos nuevos o renombrados desde la central
+            self.catalogo_controller.invalidar_catalogos()
+            self.actualizar_catalogos_censo()
+            if self.catalogo_tab is not None:
+                self.catalogo_tab.cargar_catalogos()
+        QMessageBox.information(
+            self, "Sincronización",
+            f"Catálogos actualizados: {resumen['catalogos']}\n"
+            f"Registros enviados: {resumen['subidas']} ({resumen['lotes']} lotes, {resumen['bytes_enviados']} bytes)\n"
+            f"Conflictos (se reintentan la próxima vez): {resumen['conflictos']}"
+        )
+
     def closeEvent(self, event):
         """Sobreescribe el evento de cierre para confirmación."""
         reply = QMessageBox.question(self, 'Confirmar Salida',
@@ -97,6 +291,7 @@ class DashboardView(QMainWindow):
 
         if reply == QMessageBox.Yes:
             # (Aquí iría la lógica de destruir variables de sesión si existieran)
+            self.precarga.cerrar()
             event.accept() # Cierra la aplicación
         else:
             event.ignore() # Cancela el cierre
\ No newline at end of file
@@ -0,0 +1,135 @@
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QPushButton, QLabel, QSplitter, QHeaderView, QAbstractItemView, QCheckBox
+)
+from PyQt5.QtCore import Qt, QTimer
+from dao.Instrumentacion import instrumentacion
+
+# Columnas de la tabla de operaciones: (encabezado, llave del resumen)
+COLUMNAS_OPERACIONES = [
+    ("Pantalla", 'pantalla'),
+    ("Operación", 'operacion'),
+    ("Llamadas", 'llamadas'),
+    ("Errores", 'errores'),
+    ("Prom. ms", 'promedio_ms'),
+    ("p50 ms", 'p50_ms'),
+    ("p95 ms", 'p95_ms'),
+    ("Máx. ms", 'max_ms'),
+    ("Total ms", 'total_ms'),
+    ("SQL/llamada", 'sentencias_por_llamada'),
+    ("Filas", 'filas'),
+    ("Conexiones", 'checkouts'),
+]
+
+COLUMNAS_LENTAS = [
+    ("Hora", 'fecha'),
+    ("ms", 'duracion_ms'),
+    ("Pantalla", 'pantalla'),
+    ("Operación", 'operacion'),
+    ("SQL", 'sql'),
+]
+
+
+class DiagnosticoWidget(QWidget):
+    """
+    Panel de diagnóstico de consultas (ventana aparte, desde el menú Herramientas).
+    Muestra, por pantalla y operación del DAO, llamadas, latencias (p50/p95/máx),
+    sentencias SQL por llamada, filas y conexiones tomadas del pool, además de
+    las últimas consultas lentas.
+    """
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Diagnóstico de consultas")
+        self.resize(1100, 600)
+
+        # Refresco periódico mientras la ventana está visible
+        self.timer = QTimer(self)
+        self.timer.setInterval(2000)
+        self.timer.timeout.connect(self.actualizar)
+
+        self.setup_ui()
+        self.actualizar()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 1. Barra superior: estado y acciones
+        barra = QHBoxLayout()
+        self.lbl_estado = QLabel()
+        self.chk_auto = QCheckBox("Actualizar cada 2 s")
+        self.chk_auto.setChecked(True)
+        self.btn_actualizar = QPushButton("Actualizar")
+        self.btn_reiniciar = QPushButton("Reiniciar contadores")
+        barra.addWidget(self.lbl_estado, 1)
+        barra.addWidget(self.chk_auto)
+        barra.addWidget(self.btn_actualizar)
+        barra.addWidget(self.btn_reiniciar)
+        layout.addLayout(barra)
+
+        # 2. Tablas: operaciones arriba, consultas lentas abajo
+        divisor = QSplitter(Qt.Vertical)
+        self.tabla_operaciones = self._crear_tabla([c[0] for c in COLUMNAS_OPERACIONES])
+        self.tabla_lentas = self._crear_tabla([c[0] for c in COLUMNAS_LENTAS])
+        self.tabla_lentas.horizontalHeader().setSectionResizeMode(len(COLUMNAS_LENTAS) - 1, QHeaderView.Stretch)
+        divisor.addWidget(self.tabla_operaciones)
+        divisor.addWidget(self.tabla_lentas)
+        divisor.setSizes([380, 220])
+        layout.addWidget(divisor)
+
+        # --- Conexiones ---
+        self.btn_actualizar.clicked.connect(self.actualizar)
+        self.btn_reiniciar.clicked.connect(self.reiniciar)
+        self.chk_auto.toggled.connect(lambda activo: self.timer.start() if activo else self.timer.stop())
+
+    @staticmethod
+    def _crear_tabla(encabezados):
+        tabla = QTableWidget(0, len(encabezados))
+        tabla.setHorizontalHeaderLabels(encabezados)
+        tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        tabla.setSelectionBehavior(QAbstractItemView.SelectRows)
+        tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        return tabla
+
+    def actualizar(self):
+        """Vuelve a leer el resumen de la instrumentación."""
+        resumen = instrumentacion.resumen()
+        self.tabla_operaciones.setSortingEnabled(False)
+        self.tabla_operaciones.setRowCount(len(resumen))
+        for fila, datos in enumerate(resumen):
+            for columna, (_, llave) in enumerate(COLUMNAS_OPERACIONES):
+                item = QTableWidgetItem()
+                valor = datos[llave]
+                # Numeros como dato (para que la columna ordene numericamente)
+                item.setData(Qt.DisplayRole, valor if isinstance(valor, (str, int)) else round(valor, 1))
+                if llave == 'operacion':
+                    item.setToolTip("\n".join(f"<= {limite} ms: {n}" for limite, n in datos['histograma'] if n))
+                self.tabla_operaciones.setItem(fila, columna, item)
+        self.tabla_operaciones.setSortingEnabled(True)
+
+        lentas = instrumentacion.consultas_lentas()
+        self.tabla_lentas.setRowCount(len(lentas))
+        for fila, registro in enumerate(lentas):
+            for columna, (_, llave) in enumerate(COLUMNAS_LENTAS):
+                item = QTableWidgetItem(str(registro[llave]))
+                if llave == 'sql':
+                    item.setToolTip(registro['sql'])
+                self.tabla_lentas.setItem(fila, columna, item)
+
+        archivo = instrumentacion.archivo_lentas or "desactivado"
+        self.lbl_estado.setText(
+            f"Desde {instrumentacion.desde:%H:%M:%S} | pantalla activa: {instrumentacion.pantalla_activa} | "
+            f"consultas lentas: >= {instrumentacion.umbral_lenta_ms:.0f} ms (log: {archivo})"
+        )
+
+    def reiniciar(self):
+        instrumentacion.reiniciar()
+        self.actualizar()
+
+    def showEvent(self, event):
+        if self.chk_auto.isChecked():
+            self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
\ No newline at end of file
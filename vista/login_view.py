@@ -3,15 +3,13 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, 
     QVBoxLayout, QMessageBox, QDesktopWidget
 )
-# Importamos la ventana principal (Dashboard)
-from .dashboard_view import DashboardView 
 
 class LoginView(QWidget):
     """
     Vista de Login (Requisito 1). 
     Interactúa con AdminController para la autenticación.
     """
-    def __init__(self, admin_controller, catalogo_controller, censo_controller, asistente_controller):
+    def __init__(self, admin_controller, catalogo_controller, censo_controller, asistente_controller, sincronizador=None):
         super().__init__()
         
         # Guardamos referencias a todos los controladores
@@ -19,6 +17,8 @@ class LoginView(QWidget):
         self.catalogo_controller = catalogo_controller
         self.censo_controller = censo_controller
         self.asistente_controller = asistente_controller
+        # Solo en modo campo (main.py --campo): SincronizadorCampo
+        self.sincronizador = sincronizador
         
         # Referencia a la ventana principal
         self.dashboard_view = None
@@ -88,11 +88,15 @@ class LoginView(QWidget):
 
     def abrir_dashboard(self):
         """Crea y muestra la ventana principal (Dashboard)."""
+        # Importación diferida: el Dashboard (y sus pestañas) no se carga hasta el login
+        from .dashboard_view import DashboardView
+
         # Creamos la ventana principal y le pasamos los controladores necesarios
         self.dashboard_view = DashboardView(
             catalogo_controller=self.catalogo_controller,
             censo_controller=self.censo_controller,
-            asistente_controller=self.asistente_controller
+            asistente_controller=self.asistente_controller,
+            sincronizador=self.sincronizador
         )
         self.dashboard_view.show()
         self.close() # Cierra la ventana de login
\ No newline at end of file
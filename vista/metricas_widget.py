@@ -0,0 +1,132 @@
+import time
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QPushButton, QLabel, QHeaderView, QAbstractItemView, QCheckBox, QLineEdit
+)
+from PyQt5.QtCore import Qt, QObject, QTimer
+from dao.Metricas import metricas
+
+# Cada cuanto late el monitor y a partir de que retraso se cuenta un bloqueo
+INTERVALO_LATIDO_MS = 100
+UMBRAL_BLOQUEO_MS = 200
+
+BLOQUEOS = metricas.contador(
+    "censo_ui_bloqueos_total", f"Veces que el event loop de Qt se detuvo mas de {UMBRAL_BLOQUEO_MS} ms")
+DURACION_BLOQUEO = metricas.histograma(
+    "censo_ui_bloqueo_segundos", "Duracion de los bloqueos del event loop de Qt",
+    cubetas=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0))
+
+
+class MonitorBloqueos(QObject):
+    """
+    Latido con QTimer sobre el event loop de Qt: si un latido llega mucho
+    despues de lo esperado, algo bloqueó el hilo de la interfaz (una consulta
+    sincrona, un reporte pesado...). El retraso se registra en las métricas.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setInterval(INTERVALO_LATIDO_MS)
+        self.timer.timeout.connect(self._latido)
+        self._ultimo = None
+
+    def iniciar(self):
+        self._ultimo = time.perf_counter()
+        self.timer.start()
+
+    def _latido(self):
+        ahora = time.perf_counter()
+        retraso = ahora - self._ultimo - INTERVALO_LATIDO_MS / 1000
+        self._ultimo = ahora
+        if retraso * 1000 >= UMBRAL_BLOQUEO_MS:
+            BLOQUEOS.inc()
+            DURACION_BLOQUEO.observar(retraso)
+
+
+class MetricasWidget(QWidget):
+    """
+    Vista de las métricas exportadas (ventana aparte, desde el menú Herramientas).
+    Muestra lo mismo que el endpoint /metrics, una muestra por fila.
+    """
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Métricas")
+        self.resize(900, 600)
+
+        # Refresco periódico mientras la ventana está visible
+        self.timer = QTimer(self)
+        self.timer.setInterval(2000)
+        self.timer.timeout.connect(self.actualizar)
+
+        self.setup_ui()
+        self.actualizar()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 1. Barra superior: filtro y acciones
+        barra = QHBoxLayout()
+        self.txt_filtro = QLineEdit()
+        self.txt_filtro.setPlaceholderText("Filtrar por nombre (ej. censo_dao, cache, ui)")
+        self.chk_ocultar_cubetas = QCheckBox("Ocultar cubetas")
+        self.chk_ocultar_cubetas.setChecked(True)
+        self.chk_auto = QCheckBox("Actualizar cada 2 s")
+        self.chk_auto.setChecked(True)
+        self.btn_actualizar = QPushButton("Actualizar")
+        barra.addWidget(self.txt_filtro, 1)
+        barra.addWidget(self.chk_ocultar_cubetas)
+        barra.addWidget(self.chk_auto)
+        barra.addWidget(self.btn_actualizar)
+        layout.addLayout(barra)
+
+        # 2. Tabla de muestras
+        self.tabla = QTableWidget(0, 3)
+        self.tabla.setHorizontalHeaderLabels(["Métrica", "Etiquetas", "Valor"])
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.tabla.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.tabla)
+
+        self.lbl_estado = QLabel()
+        layout.addWidget(self.lbl_estado)
+
+        # --- Conexiones ---
+        self.btn_actualizar.clicked.connect(self.actualizar)
+        self.txt_filtro.textChanged.connect(self.actualizar)
+        self.chk_ocultar_cubetas.toggled.connect(self.actualizar)
+        self.chk_auto.toggled.connect(lambda activo: self.timer.start() if activo else self.timer.stop())
+
+    def actualizar(self):
+        """Vuelve a leer todas las métricas del registro."""
+        filtro = self.txt_filtro.text().strip().lower()
+        filas = []
+        for nombre, tipo, ayuda, muestras in metricas.familias():
+            if filtro and filtro not in nombre.lower():
+                continue
+            for nombre_muestra, etiquetas, valor in muestras:
+                if self.chk_ocultar_cubetas.isChecked() and nombre_muestra.endswith("_bucket"):
+                    continue
+                filas.append((nombre_muestra, ", ".join(f"{k}={v}" for k, v in etiquetas.items()), valor, ayuda))
+
+        self.tabla.setSortingEnabled(False)
+        self.tabla.setRowCount(len(filas))
+        for fila, (nombre, etiquetas, valor, ayuda) in enumerate(filas):
+            item_nombre = QTableWidgetItem(nombre)
+            item_nombre.setToolTip(ayuda)
+            item_valor = QTableWidgetItem()
+            item_valor.setData(Qt.DisplayRole, int(valor) if float(valor).is_integer() else round(valor, 4))
+            self.tabla.setItem(fila, 0, item_nombre)
+            self.tabla.setItem(fila, 1, QTableWidgetItem(etiquetas))
+            self.tabla.setItem(fila, 2, item_valor)
+        self.tabla.setSortingEnabled(True)
+        self.lbl_estado.setText(f"{len(filas)} muestra(s). Mismos datos que el endpoint /metrics.")
+
+    def showEvent(self, event):
+        if self.chk_auto.isChecked():
+            self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
@@ -4,10 +4,12 @@ from PyQt5.QtWidgets import (
     QSplitter, QComboBox, QLabel, QFormLayout
 )
 from PyQt5.QtCore import Qt
+import asyncio
 
 # --- 1. IMPORTACIONES DE PYQTGRAPH y NUMPY ---
 import pyqtgraph as pg
 import numpy as np
+from dao.DetectorConsultas import accion_ui
 
 pg.setConfigOption('background', '#2E2F30')
 pg.setConfigOption('foreground', '#E0E0E0')
@@ -17,8 +19,9 @@ class ReportsWidget(QWidget):
     """
     Pestaña que muestra los reportes y el dashboard principal.
     AHORA incluye filtros de datos (Municipio/Localidad).
+    La primera vista (sin filtros) se dibuja con los reportes precargados.
     """
-    def __init__(self, censo_controller, catalogo_controller):
+    def __init__(self, censo_controller, catalogo_controller, precarga=None):
         super().__init__()
         self.censo_controller = censo_controller
         self.catalogo_controller = catalogo_controller
@@ -26,7 +29,11 @@ class ReportsWidget(QWidget):
         self.histograma_widget = pg.PlotWidget(antialiasing=True)
         
         self.setup_ui()
-        self.poblar_filtros_municipio()
+        if precarga is None or not precarga.cuando_lista('catalogos', lambda _: self.poblar_filtros_municipio()):
+            self.poblar_filtros_municipio()
+
+        # Carga inicial de datos
+        self.cargar_reportes_iniciales(precarga)
         
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -84,9 +91,6 @@ class ReportsWidget(QWidget):
         self.btn_aplicar_filtros.clicked.connect(self.recargar_todos_los_reportes)
         self.btn_limpiar_filtros.clicked.connect(self.limpiar_filtros_y_recargar)
         self.combo_filtro_municipio.currentIndexChanged.connect(self.actualizar_filtro_localidad)
-        
-        # Carga inicial de datos
-        self.recargar_todos_los_reportes()
 
     # --- Métodos de Filtros (Sin cambios) ---
     def poblar_filtros_municipio(self):
@@ -99,6 +103,7 @@ class ReportsWidget(QWidget):
         except Exception as e:
             print(f"Error poblando filtro de municipios: {e}")
 
+    @accion_ui
     def actualizar_filtro_localidad(self):
         self.combo_filtro_localidad.clear()
         self.combo_filtro_localidad.addItem("Todas las Localidades", None) 
@@ -111,23 +116,82 @@ class ReportsWidget(QWidget):
             except Exception as e:
                 print(f"Error poblando filtro de localidades: {e}")
 
+    def cargar_reportes_iniciales(self, precarga=None):
+        """Dibuja los reportes sin filtros; cada uno usa su resultado precargado si existe."""
+        if precarga is None:
+            self.recargar_todos_los_reportes()
+            return
+
+        reportes = [
+            ('reporte_poblacion', self.mostrar_reporte_poblacion, self.cargar_reporte_poblacion),
+            ('reporte_tipos_vivienda', self.mostrar_reporte_tipo_vivienda, self.cargar_reporte_tipo_vivienda),
+            ('reporte_edades', self.mostrar_histograma_edad, self.cargar_histograma_edad),
+        ]
+        for nombre, mostrar, cargar in reportes:
+            callback = lambda datos, mostrar=mostrar, cargar=cargar: self._mostrar_precargado(datos, mostrar, cargar)
+            if not precarga.cuando_lista(nombre, callback):
+                cargar()
+
+    def _mostrar_precargado(self, datos, mostrar, cargar):
+        # El reporte precargado es sin filtros: si el usuario ya filtró, se descarta
+        if self.combo_filtro_municipio.currentData() is not None or self.combo_filtro_localidad.currentData() is not None:
+            return
+        if datos is None:
+            cargar() # La precarga falló
+        else:
+            mostrar(datos)
+
+    @accion_ui
     def limpiar_filtros_y_recargar(self):
         self.combo_filtro_municipio.setCurrentIndex(0)
         self.recargar_todos_los_reportes()
 
+    @accion_ui
     def recargar_todos_los_reportes(self):
         print("Recargando reportes con filtros...")
+
+        # Si hay un event loop asyncio corriendo (qasync) y DAO asincrono,
+        # los tres reportes se consultan en paralelo sin bloquear la UI.
+        if self.censo_controller.soporta_async():
+            try:
+                asyncio.get_running_loop()
+                asyncio.ensure_future(self.recargar_todos_los_reportes_async())
+                return
+            except RuntimeError:
+                pass # No hay loop asyncio: se usa la ruta sincrona
+
         self.cargar_reporte_poblacion()
         self.cargar_reporte_tipo_vivienda()
         self.cargar_histograma_edad()
         print("Reportes recargados.")
 
+    async def recargar_todos_los_reportes_async(self):
+        """Consulta los reportes de forma concurrente y los dibuja al terminar."""
+        municipio_id = self.combo_filtro_municipio.currentData()
+        localidad_id = self.combo_filtro_localidad.currentData()
+        self.btn_aplicar_filtros.setEnabled(False)
+        try:
+            reportes = await self.censo_controller.generar_reportes_dashboard_async(municipio_id, localidad_id)
+        except Exception as e:
+            print(f"Error al recargar reportes (async): {e}")
+            return
+        finally:
+            self.btn_aplicar_filtros.setEnabled(True)
+
+        self.mostrar_reporte_poblacion(reportes['poblacion'])
+        self.mostrar_reporte_tipo_vivienda(reportes['tipos_vivienda'])
+        self.mostrar_histograma_edad(reportes['edades'])
+        print("Reportes recargados (async).")
+
     # --- Métodos de Carga de Datos (Tablas sin cambios) ---
     def cargar_reporte_poblacion(self):
-        self.tabla_reporte_poblacion.setRowCount(0)
         municipio_id = self.combo_filtro_municipio.currentData()
         localidad_id = self.combo_filtro_localidad.currentData()
         datos_reporte = self.censo_controller.generar_dashboard_poblacion(municipio_id, localidad_id)
+        self.mostrar_reporte_poblacion(datos_reporte)
+
+    def mostrar_reporte_poblacion(self, datos_reporte):
+        self.tabla_reporte_poblacion.setRowCount(0)
         if not datos_reporte:
             QMessageBox.information(self, "Reporte de Población", "No hay datos de población para los filtros seleccionados.")
             return
@@ -138,10 +202,13 @@ class ReportsWidget(QWidget):
             self.tabla_reporte_poblacion.setItem(i, 2, QTableWidgetItem(str(fila['total_habitantes'])))
 
     def cargar_reporte_tipo_vivienda(self):
-        self.tabla_reporte_tipo.setRowCount(0)
         municipio_id = self.combo_filtro_municipio.currentData()
         localidad_id = self.combo_filtro_localidad.currentData()
         datos_reporte = self.censo_controller.generar_reporte_tipos_vivienda(municipio_id, localidad_id)
+        self.mostrar_reporte_tipo_vivienda(datos_reporte)
+
+    def mostrar_reporte_tipo_vivienda(self, datos_reporte):
+        self.tabla_reporte_tipo.setRowCount(0)
         if not datos_reporte:
             QMessageBox.information(self, "Reporte de Vivienda", "No hay datos de tipos de vivienda para los filtros seleccionados.")
             return
@@ -156,7 +223,9 @@ class ReportsWidget(QWidget):
         localidad_id = self.combo_filtro_localidad.currentData()
 
         lista_edades = self.censo_controller.generar_reporte_distribucion_edad(municipio_id, localidad_id)
-        
+        self.mostrar_histograma_edad(lista_edades)
+
+    def mostrar_histograma_edad(self, lista_edades):
         self.histograma_widget.clear()
 
         if not lista_edades:
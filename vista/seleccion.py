@@ -0,0 +1,15 @@
+from typing import List, Optional
+from PyQt5.QtWidgets import QTableWidget
+
+
+def ids_seleccionados(tabla: QTableWidget, id_actual: Optional[int] = None) -> List[int]:
+    """
+    IDs (columna 0) de las filas seleccionadas y visibles de 'tabla' (las que
+    oculta el filtro no cuentan). Si no hay ninguna, el registro cargado en el
+    formulario ('id_actual'), si lo hay.
+    """
+    filas = {indice.row() for indice in tabla.selectionModel().selectedRows()}
+    ids = [int(tabla.item(fila, 0).text()) for fila in sorted(filas) if not tabla.isRowHidden(fila)]
+    if not ids and id_actual is not None:
+        ids = [id_actual]
+    return ids